@@ -0,0 +1,75 @@
+import gzip
+from flask import Flask, Request, Response, request
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # brotli is optional (pip install -e ".[brotli]"); gzip is always available
+    brotli = None
+
+# Response types worth compressing; event streams are flushed event by event, so they are left alone
+COMPRESSIBLE_TYPES = ('application/json', 'text/plain', 'text/html')
+
+
+def available_encodings() -> list[str]:
+    """Content codings the server can produce, most preferred first."""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """The strong ETag of a representation compressed with ``encoding``.
+
+    Each content coding is a different representation, so it gets its own
+    entity tag (``"<etag>-gzip"``, ``"<etag>-br"``).
+    """
+    return f"{etag}-{encoding}"
+
+
+def matching_etag(req: Request, etag: str) -> str | None:
+    """Find which representation of ``etag`` (plain or compressed) the client already has.
+
+    Args:
+        req (Request): The request, with its ``If-None-Match`` header.
+        etag (str): The entity tag of the uncompressed representation.
+
+    Returns:
+        str | None: The tag from ``If-None-Match`` that matched, or None if the client's copy is stale.
+    """
+    for candidate in [etag, *(encoded_etag(etag, encoding) for encoding in available_encodings())]:
+        if req.if_none_match.contains(candidate):
+            return candidate
+    return None
+
+
+def compress_response(response: Response) -> Response:
+    """Compress a large response body with the best coding the client accepts."""
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if (response.content_length or 0) < settings.compression_min_size:
+        return response
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    if encoding == 'br':
+        response.set_data(brotli.compress(data, quality=min(11, settings.compression_level)))
+    else:
+        response.set_data(gzip.compress(data, compresslevel=settings.compression_level))
+    response.headers['Content-Encoding'] = encoding
+
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(encoded_etag(etag, encoding))
+    return response
+
+
+def init_compression(app: Flask) -> None:
+    """Compress the app's responses (see ``compress_response``)."""
+    app.after_request(compress_response)
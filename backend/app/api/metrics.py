@@ -0,0 +1,52 @@
+import time
+from flask import Response, Flask, g, request
+from app.core import metrics
+
+# Prometheus text exposition format
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def request_outcome(status_code: int) -> str:
+    """Classify a response status for the request counter."""
+    if status_code == 429:
+        return "rate_limited"
+    if status_code == 503:
+        return "shed"
+    if status_code == 504:
+        return "timeout"
+    if status_code >= 500:
+        return "error"
+    if status_code >= 400:
+        return "client_error"
+    return "success"
+
+
+def observe_request(endpoint: str | None, status_code: int, seconds: float) -> None:
+    """Count a finished request and record its latency."""
+    endpoint = endpoint or "unmatched"
+    metrics.http_requests_total.inc(endpoint=endpoint, outcome=request_outcome(status_code))
+    metrics.http_request_seconds.observe(seconds, endpoint=endpoint)
+
+
+def start_request_timer() -> None:
+    g.request_started = time.perf_counter()
+
+
+def record_request(response: Response) -> Response:
+    started = g.pop('request_started', None)
+    if started is not None and request.endpoint != 'metrics':
+        observe_request(request.endpoint, response.status_code, time.perf_counter() - started)
+    return response
+
+
+def metrics_view():
+    """Expose the metrics of every worker on the host in the Prometheus text format."""
+    return Response(metrics.registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+def init_metrics(app: Flask) -> None:
+    """Instrument every request to the app and serve ``/metrics``."""
+    app.before_request(start_request_timer)
+    app.after_request(record_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view, methods=['GET'])
+    metrics.registry.start()
@@ -0,0 +1,33 @@
+from typing import IO
+from flask import Request
+from app.core.config import settings
+from app.services.batch import ARCHIVE_SUFFIXES
+from app.services.uploads import DiscardedUpload, TextUploadStream, upload_container
+
+
+class UploadRequest(Request):
+    """A request whose file uploads are validated and stored as they stream in.
+
+    Ada sources are decoded to text chunk by chunk, archives are spooled to disk
+    once they outgrow UPLOAD_SPOOL_MAX_MEMORY, and a file with a bad extension
+    or encoding is rejected as soon as it is seen rather than after the whole
+    body has been read (see ``upload_container``).
+    """
+    
+    # Reject the request at the first bad file. Views that report bad files one by
+    # one (batch conversion) turn this off before reading the form.
+    strict_uploads: bool = True
+    
+    def _get_file_stream(self,
+                         total_content_length: int | None,
+                         content_type: str | None,
+                         filename: str | None = None,
+                         content_length: int | None = None) -> IO[bytes] | TextUploadStream | DiscardedUpload:
+        return upload_container(
+            filename,
+            allowed_extensions=settings.allowed_extensions,
+            archive_suffixes=ARCHIVE_SUFFIXES,
+            strict=self.strict_uploads,
+            spool_max_memory=settings.upload_spool_max_memory,
+            spool_dir=settings.upload_spool_dir
+        )
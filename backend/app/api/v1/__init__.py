@@ -1,8 +1,31 @@
 from flask import Blueprint
-from app.api.v1.endpoints.convert import convert_ada_file
+from app.core.config import settings
+from app.api.v1.endpoints.convert import convert_ada_file, convert_ada_file_stream
+from app.api.v1.endpoints.batch import convert_batch_files
+from app.api.v1.endpoints.conversions import get_conversion
+from app.api.v1.endpoints.jobs import create_conversion_job, get_conversion_job
+from app.api.v1.endpoints.sessions import get_session, delete_session
+from app.api.v1.endpoints.admin import (
+    inspect_cache, get_cache_entry, purge_cache, delete_cache_entry, get_profile, profiled
+)
 
 # Create v1 API blueprint
 api_v1 = Blueprint('api_v1', __name__, url_prefix='/api/v1')
 
 # Register routes
-api_v1.add_url_rule('/convert', 'convert', convert_ada_file, methods=['POST'])
\ No newline at end of file
+# Admins can profile single conversions when PROFILING_ENABLED is set; otherwise the view is left unwrapped
+api_v1.add_url_rule('/convert', 'convert',
+                    profiled(convert_ada_file) if settings.profiling_enabled else convert_ada_file,
+                    methods=['POST'])
+api_v1.add_url_rule('/convert/stream', 'convert_stream', convert_ada_file_stream, methods=['POST'])
+api_v1.add_url_rule('/convert/batch', 'convert_batch', convert_batch_files, methods=['POST'])
+api_v1.add_url_rule('/convert/jobs', 'create_conversion_job', create_conversion_job, methods=['POST'])
+api_v1.add_url_rule('/convert/jobs/<job_id>', 'get_conversion_job', get_conversion_job, methods=['GET'])
+api_v1.add_url_rule('/conversions/<conversion_id>', 'get_conversion', get_conversion, methods=['GET'])
+api_v1.add_url_rule('/sessions/<session_id>', 'get_session', get_session, methods=['GET'])
+api_v1.add_url_rule('/sessions/<session_id>', 'delete_session', delete_session, methods=['DELETE'])
+api_v1.add_url_rule('/admin/cache', 'inspect_cache', inspect_cache, methods=['GET'])
+api_v1.add_url_rule('/admin/cache', 'purge_cache', purge_cache, methods=['DELETE'])
+api_v1.add_url_rule('/admin/cache/<key>', 'get_cache_entry', get_cache_entry, methods=['GET'])
+api_v1.add_url_rule('/admin/cache/<key>', 'delete_cache_entry', delete_cache_entry, methods=['DELETE'])
+api_v1.add_url_rule('/admin/profiles/<profile_id>', 'get_profile', get_profile, methods=['GET'])
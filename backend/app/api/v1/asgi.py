@@ -0,0 +1,9 @@
+from quart import Blueprint
+from app.api.v1.endpoints.async_convert import convert_ada_file, convert_ada_file_stream
+
+# Create the v1 API blueprint for the async (ASGI) app
+async_api_v1 = Blueprint('async_api_v1', __name__, url_prefix='/api/v1')
+
+# Register routes
+async_api_v1.add_url_rule('/convert', 'convert', convert_ada_file, methods=['POST'])
+async_api_v1.add_url_rule('/convert/stream', 'convert_stream', convert_ada_file_stream, methods=['POST'])
@@ -0,0 +1,117 @@
+import hmac
+import threading
+from functools import wraps
+from flask import Response, request, jsonify, make_response
+from app.core.config import settings
+from app.core.profiling import ProfileStore, SamplingProfiler
+from app.api.v1.endpoints import convert
+
+# Collapsed stacks of requests profiled on demand (see ``profiled``)
+profile_store = ProfileStore.from_settings()
+
+
+def _json_response(payload, status: int = 200):
+    response = make_response(jsonify(payload), status)
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
+
+
+def is_admin() -> bool:
+    """Whether the caller presents the admin token as a bearer token."""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return (bool(settings.admin_token) and scheme.lower() == 'bearer'
+            and hmac.compare_digest(token.encode(), settings.admin_token.encode()))
+
+
+def admin_required(view):
+    """Restrict a view to callers presenting the admin token as a bearer token."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not settings.admin_token:
+            return _json_response({"error": "Admin API is disabled"}, 403)
+        
+        if not is_admin():
+            return _json_response({"error": "Admin token required"}, 401)
+        
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def profiled(view):
+    """Let admins profile a single request to ``view`` by sending ``X-Profile: true``.
+    
+    The request's thread is sampled while the view runs (see ``SamplingProfiler``).
+    The response carries the estimated wall time of each span (request parsing,
+    upstream calls, response parsing, serialization, ...) in a ``Server-Timing``
+    header, and an ``X-Profile-Id`` to fetch the collapsed stacks from
+    ``GET /api/v1/admin/profiles/<profile_id>``. The header is ignored for
+    anyone else. Views are only wrapped when PROFILING_ENABLED is set, so
+    otherwise profiling costs nothing.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.headers.get('X-Profile', '').lower() not in ('1', 'true', 'yes') or not is_admin():
+            return view(*args, **kwargs)
+        
+        with SamplingProfiler(threading.get_ident(), interval=settings.profiling_interval_ms / 1000) as profiler:
+            response = make_response(view(*args, **kwargs))
+        profile_store.save(profiler.profile)
+        response.headers['Server-Timing'] = profiler.profile.server_timing()
+        response.headers['X-Profile-Id'] = profiler.profile.profile_id
+        return response
+    return wrapper
+
+
+@admin_required
+def inspect_cache():
+    """Report conversion cache statistics and the most recently used entries."""
+    try:
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        return _json_response({"error": "limit must be an integer"}, 400)
+    
+    cache = convert.conversion_cache
+    return _json_response({
+        "stats": cache.stats(),
+        "entries": cache.entries(limit=max(0, min(limit, 1000)))
+    })
+
+
+@admin_required
+def get_cache_entry(key: str):
+    """Get a single cached conversion, including its raw converter response."""
+    entry = convert.conversion_cache.lookup(key)
+    
+    if entry is None:
+        return _json_response({"error": "Cache entry not found"}, 404)
+    return _json_response({**entry.describe(), "value": entry.value})
+
+
+@admin_required
+def purge_cache():
+    """Remove every cached conversion, including those indexed for near-duplicate reuse."""
+    purged = convert.conversion_cache.clear()
+    purged["similarity"] = convert.similarity_index.clear()
+    return _json_response({"purged": purged})
+
+
+@admin_required
+def delete_cache_entry(key: str):
+    """Remove a single cached conversion, including its near-duplicate index entry."""
+    cached = convert.conversion_cache.delete(key)
+    indexed = convert.similarity_index.delete(key)
+    if not (cached or indexed):
+        return _json_response({"error": "Cache entry not found"}, 404)
+    return _json_response({"purged": key})
+
+
+@admin_required
+def get_profile(profile_id: str):
+    """Get the collapsed stacks of a profiled request (see ``profiled``)."""
+    stacks = profile_store.read(profile_id)
+    
+    if stacks is None:
+        return _json_response({"error": "Profile not found"}, 404)
+    response = Response(stacks, content_type='text/plain; charset=utf-8')
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
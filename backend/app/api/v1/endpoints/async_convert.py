@@ -0,0 +1,276 @@
+import asyncio
+from contextlib import nullcontext
+from typing import AsyncIterator
+from quart import Response, request, jsonify, make_response
+from werkzeug.exceptions import HTTPException
+from app.core.config import settings
+from app.core.lazy import Lazy
+from app.services.conversion_cache import conversion_key
+from app.services.section_parser import IncrementalResponseParser
+from app.core.exceptions import (
+    FileUploadError, UpstreamRateLimitError, UpstreamTimeoutError, ClientOverLimitError, ServiceOverloadedError
+)
+from app.api.v1.endpoints import convert
+import math
+
+def _create_converter():
+    from app.services.ada_converter import AsyncAdaConverter
+    return AsyncAdaConverter(unit_cache=convert.conversion_cache if settings.incremental_conversion else None)
+
+
+# Initialize converter on first use; conversions are awaited, so one worker can hold many in flight
+ada_converter = Lazy(_create_converter)
+
+
+async def get_session_id() -> str | None:
+    """Get the optional conversation session id from the form or the X-Session-Id header.
+
+    Raises:
+        FileUploadError: If the session id is malformed.
+    """
+    form = await request.form
+    return convert.validate_session_id(form.get('session_id') or request.headers.get('X-Session-Id'))
+
+
+async def wants_verification() -> bool:
+    """Check the client's ``verify`` flag (see ``convert.wants_verification``).
+
+    Raises:
+        FileUploadError: If verification is asked for but not enabled.
+    """
+    form = await request.form
+    return convert.wants_verification(request.args.get('verify') or form.get('verify'))
+
+
+async def read_ada_upload() -> str:
+    """Read and decode the uploaded ada_file.
+
+    Raises:
+        FileUploadError: If the file is missing, empty or not valid UTF-8 text.
+    """
+    files = await request.files
+    return convert.decode_ada_upload(files.get('ada_file'))
+
+
+async def run_conversion(ada_code: str,
+                         session_id: str | None = None,
+                         client: str | None = None) -> tuple[dict, str]:
+    """Convert Ada code, serving stateless conversions from the shared conversion cache when possible.
+
+    Args:
+        ada_code (str): The Ada source to convert.
+        session_id (str | None, optional): Conversation session to continue; bypasses the cache.
+        client (str | None, optional): The caller; calls to the model are then subject to
+            admission control (see ``convert.run_conversion``).
+
+    Returns:
+        tuple[dict, str]: The parsed conversion and the cache status ("HIT", "MISS",
+            "SIMILAR", "COALESCED" or "BYPASS").
+
+    Raises:
+        ServiceOverloadedError: If admission control sheds the conversion.
+    """
+    conversion_cache = convert.conversion_cache
+    normalization = convert.normalize_upload(ada_code)
+    ada_code = normalization.text
+    similarity_index = convert.similarity_index
+    match = None
+
+    def admitted(weight: int = 1):
+        return convert.admission.admit_async(client, weight) if client is not None else nullcontext()
+
+    if session_id is not None:
+        async with admitted():
+            converter_response = await ada_converter.convert(ada_code, session_id=session_id)
+        cache_status = "BYPASS"
+    else:
+        key = conversion_key(ada_code, str(ada_converter.model), str(ada_converter.system_prompt))
+        cached = conversion_cache.get(key) if conversion_cache.enabled else None
+        if cached is not None:
+            converter_response, _ = cached
+            cache_status = "HIT"
+        else:
+            async def convert_once() -> str:
+                nonlocal match
+                if similarity_index.enabled:
+                    match = await asyncio.to_thread(convert.find_similar, ada_code, ada_converter)
+                if match is not None and match.exact:
+                    response = match.response
+                else:
+                    if match is not None:
+                        async with admitted():
+                            response = await ada_converter.adapt(ada_code, match.source, match.response)
+                    else:
+                        async with admitted(ada_converter.concurrent_calls(ada_code)):
+                            response = await ada_converter.convert(ada_code, session_id=None)
+                    if similarity_index.enabled:
+                        await asyncio.to_thread(similarity_index.add, key, ada_code, response,
+                                                str(ada_converter.model), str(ada_converter.system_prompt))
+                if conversion_cache.enabled:
+                    conversion_cache.set(key, response, model=str(ada_converter.model))
+                return response
+
+            converter_response, shared = await convert.single_flight.do_async(key, convert_once)
+            if shared:
+                cache_status = "COALESCED"
+            elif match is not None and match.exact:
+                cache_status = "SIMILAR"
+            else:
+                cache_status = "MISS" if conversion_cache.enabled else "BYPASS"
+
+    parsed_response = convert.parse_converter_response(converter_response)
+    parsed_response["normalization"] = normalization.to_dict()
+    if session_id is None and conversion_cache.enabled:
+        parsed_response["conversion_id"] = key
+    if match is not None:
+        parsed_response["similar_to"] = {"conversion_id": match.key, "similarity": match.similarity}
+    return parsed_response, cache_status
+
+
+async def convert_ada_file():
+    """Convert Ada code to Python via REST API using file upload."""
+    try:
+        session_id = await get_session_id()
+        verify = await wants_verification()
+        ada_code = await read_ada_upload()
+
+        parsed_response, cache_status = await run_conversion(
+            ada_code, session_id=session_id, client=convert.get_client_id(request)
+        )
+        if session_id is not None:
+            parsed_response["session"] = ada_converter.session_stats(session_id)
+        if verify:
+            # Waiting on the sandbox process blocks, so it gets a thread
+            parsed_response["verification"] = await asyncio.to_thread(convert.verify_conversion, parsed_response)
+
+        response = await make_response(jsonify(parsed_response), 200)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        response.headers['X-Cache'] = cache_status
+        return response
+
+    except FileUploadError as e:
+        response = await make_response(jsonify({"error": str(e)}), 400)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        return response
+    except ClientOverLimitError as e:
+        response = await make_response(jsonify({"error": str(e)}), 429)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    except ServiceOverloadedError as e:
+        response = await make_response(jsonify({"error": str(e)}), 503)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    except UpstreamRateLimitError as e:
+        response = await make_response(jsonify({"error": str(e)}), 429)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        response.headers['Retry-After'] = str(max(1, math.ceil(e.retry_after)))
+        return response
+    except UpstreamTimeoutError as e:
+        response = await make_response(jsonify({"error": str(e)}), 504)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        return response
+    except HTTPException:
+        # e.g. 413 for an upload over MAX_FILE_SIZE, raised while the form is parsed
+        raise
+    except Exception as e:
+        response = await make_response(jsonify({"error": str(e)}), 500)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        return response
+
+
+async def stream_conversion(ada_code: str,
+                           session_id: str | None = None,
+                           client: str | None = None) -> tuple[AsyncIterator[str], str]:
+    """Convert Ada code as a stream of Server-Sent Events (see ``convert.stream_conversion``).
+
+    Args:
+        ada_code (str): The Ada source to convert.
+        session_id (str | None, optional): Conversation session to continue; bypasses the cache.
+        client (str | None, optional): The caller; the stream then holds admission slots until it ends.
+
+    Returns:
+        tuple[AsyncIterator[str], str]: The event stream and the cache status ("HIT", "MISS" or "BYPASS").
+
+    Raises:
+        ServiceOverloadedError: If admission control sheds the conversion (before any event is sent).
+    """
+    conversion_cache = convert.conversion_cache
+    normalization = convert.normalize_upload(ada_code)
+    ada_code = normalization.text
+
+    key = None
+    if session_id is None and conversion_cache.enabled:
+        key = conversion_key(ada_code, str(ada_converter.model), str(ada_converter.system_prompt))
+        cached = conversion_cache.get(key)
+        if cached is not None:
+            parsed_response = convert.parse_converter_response(cached[0])
+
+            async def replay() -> AsyncIterator[str]:
+                for field, content in parsed_response.items():
+                    yield convert.sse_event(field, {"content": content})
+                yield convert.sse_event("done", {**parsed_response, "normalization": normalization.to_dict()})
+
+            return replay(), "HIT"
+
+    weight = ada_converter.concurrent_calls(ada_code) if session_id is None else 1
+    release = await convert.admission.acquire_async(client, weight) if client is not None else (lambda: None)
+
+    async def generate() -> AsyncIterator[str]:
+        parser = IncrementalResponseParser()
+        fragments = []
+        try:
+            async for fragment in ada_converter.convert_stream(ada_code, session_id=session_id):
+                fragments.append(fragment)
+                yield convert.sse_event("delta", {"content": fragment})
+                for field, content in parser.feed(fragment):
+                    yield convert.sse_event(field, {"content": content})
+            for field, content in parser.close():
+                yield convert.sse_event(field, {"content": content})
+
+            converter_response = "".join(fragments)
+            if key is not None:
+                conversion_cache.set(key, converter_response, model=str(ada_converter.model))
+            parsed_response = convert.parse_converter_response(converter_response)
+            parsed_response["normalization"] = normalization.to_dict()
+            if session_id is not None:
+                parsed_response["session"] = ada_converter.session_stats(session_id)
+            yield convert.sse_event("done", parsed_response)
+        except Exception as e:
+            yield convert.sse_event("error", {"error": str(e)})
+        finally:
+            release()
+
+    return generate(), "MISS" if key is not None else "BYPASS"
+
+
+async def convert_ada_file_stream():
+    """Convert Ada code to Python via file upload, streaming progress as Server-Sent Events."""
+    try:
+        session_id = await get_session_id()
+        ada_code = await read_ada_upload()
+        events, cache_status = await stream_conversion(
+            ada_code, session_id=session_id, client=convert.get_client_id(request)
+        )
+    except FileUploadError as e:
+        response = await make_response(jsonify({"error": str(e)}), 400)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        return response
+    except ClientOverLimitError as e:
+        response = await make_response(jsonify({"error": str(e)}), 429)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    except ServiceOverloadedError as e:
+        response = await make_response(jsonify({"error": str(e)}), 503)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+
+    response = Response(events, mimetype='text/event-stream')
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.headers['X-Cache'] = cache_status
+    return response
@@ -0,0 +1,134 @@
+import functools
+import time
+from flask import request, jsonify, make_response
+from app.core.config import settings
+from app.core.exceptions import FileUploadError
+from app.services.batch import (
+    BatchFile,
+    build_result_archive,
+    convert_batch,
+    extract_archive,
+    has_allowed_extension,
+    is_archive,
+    summarize_batch,
+)
+from app.services.ada_dependencies import DependencyGraph, DependencyIndex
+from app.services.uploads import decode_upload
+from app.api.v1.endpoints import convert
+
+# Dependency graphs of uploaded projects, reused when the same project is uploaded again
+dependency_index = DependencyIndex.from_settings()
+
+
+def read_batch_upload() -> tuple[list[BatchFile], list[str]]:
+    """Collect the Ada sources from the ada_files and archive form fields.
+    
+    Raises:
+        FileUploadError: If no files were uploaded or an archive is invalid.
+    """
+    files: list[BatchFile] = []
+    skipped: list[str] = []
+    
+    for upload in request.files.getlist('ada_files'):
+        if upload.filename == '':
+            continue
+        if not has_allowed_extension(upload.filename, settings.allowed_extensions):
+            skipped.append(upload.filename)
+            continue
+        try:
+            files.append(BatchFile(filename=upload.filename, content=decode_upload(upload.stream, upload.filename)))
+        except FileUploadError as e:
+            # Reported in the file's manifest entry; the rest of the batch still converts
+            files.append(BatchFile(filename=upload.filename, content="", error=str(e)))
+    
+    for upload in request.files.getlist('archive'):
+        if upload.filename == '':
+            continue
+        if not is_archive(upload.filename):
+            raise FileUploadError(f"{upload.filename} is not a zip or tar archive")
+        archived, archive_skipped = extract_archive(
+            upload.filename,
+            upload.stream,
+            allowed_extensions=settings.allowed_extensions,
+            max_files=settings.batch_max_files - len(files),
+            max_total_bytes=settings.batch_max_upload_size
+        )
+        files.extend(archived)
+        skipped.extend(archive_skipped)
+    
+    if not files:
+        raise FileUploadError(
+            "ada_files or archive with at least one "
+            + "/".join(sorted(settings.allowed_extensions)) + " file is required"
+        )
+    if len(files) > settings.batch_max_files:
+        raise FileUploadError(f"A batch may contain at most {settings.batch_max_files} files")
+    
+    return files, skipped
+
+
+def project_graph(files: list[BatchFile]) -> DependencyGraph:
+    """Index the readable sources of a batch (see ``DependencyIndex``)."""
+    sources = {}
+    for batch_file in files:
+        if batch_file.error is not None or batch_file.filename in sources:
+            continue
+        try:
+            content = batch_file.content
+            sources[batch_file.filename] = content.decode('utf-8') if isinstance(content, bytes) else content
+        except UnicodeDecodeError:
+            continue
+    return dependency_index.graph(sources)
+
+
+def convert_batch_files():
+    """Convert several uploaded Ada files (or a zip/tar of them) concurrently.
+    
+    Returns a JSON manifest with per-file results, timings and errors, or with
+    ``format=zip`` a zip archive of the converted files plus manifest.json.
+    With BATCH_DEPENDENCY_ORDER the files are converted in dependency order
+    (see ``convert_batch``) and the summary reports the number of ``levels``.
+    """
+    request.max_content_length = settings.batch_max_upload_size
+    # A file that is not valid UTF-8 fails on its own instead of failing the batch
+    request.strict_uploads = False
+    
+    output_format = request.args.get('format', request.form.get('format', 'json'))
+    if output_format not in ('json', 'zip'):
+        response = make_response(jsonify({"error": "format must be 'json' or 'zip'"}), 400)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        return response
+    
+    try:
+        files, skipped = read_batch_upload()
+    except FileUploadError as e:
+        response = make_response(jsonify({"error": str(e)}), 400)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        return response
+    
+    started = time.perf_counter()
+    graph = project_graph(files) if settings.batch_dependency_order else None
+    # Each file's calls to the model go through admission control as the caller's
+    run_conversion = functools.partial(convert.run_conversion, client=convert.get_client_id(request))
+    entries = convert_batch(files, run_conversion, concurrency=settings.batch_concurrency,
+                            graph=graph, context_max_tokens=settings.dependency_context_max_tokens)
+    manifest = {
+        "files": entries,
+        "skipped": skipped,
+        "summary": summarize_batch(
+            entries,
+            duration_ms=(time.perf_counter() - started) * 1000,
+            concurrency=settings.batch_concurrency
+        )
+    }
+    if graph is not None:
+        manifest["summary"]["levels"] = len(graph.levels())
+    
+    if output_format == 'zip':
+        response = make_response(build_result_archive(manifest), 200)
+        response.headers['Content-Type'] = 'application/zip'
+        response.headers['Content-Disposition'] = 'attachment; filename="converted.zip"'
+    else:
+        response = make_response(jsonify(manifest), 200)
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
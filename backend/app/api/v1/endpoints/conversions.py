@@ -0,0 +1,55 @@
+import hashlib
+from flask import request, jsonify, make_response
+from app.api.compression import matching_etag
+from app.api.v1.endpoints import convert
+from app.services.conversion_cache import CacheEntry
+
+
+def conversion_etag(entry: CacheEntry) -> str:
+    """Strong entity tag of a stored conversion.
+
+    A SHA-256 of everything the response body is built from: the converter
+    response, the model and the creation time, so a re-conversion under the
+    same id that reproduces the same text still gets a new tag.
+    """
+    digest = hashlib.sha256()
+    for part in (entry.value, entry.model, repr(entry.created_at)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def get_conversion(conversion_id: str):
+    """Get a past conversion by the ``conversion_id`` it was returned with.
+
+    Conversions are stored in the conversion cache under the hash of their
+    source, model and prompt, for as long as the cache keeps them. Responses
+    carry a strong ETag, so clients re-fetching a result they already have get
+    a 304 without a body.
+    """
+    entry = convert.conversion_cache.lookup(conversion_id)
+
+    if entry is None:
+        response = make_response(jsonify({"error": "Conversion not found"}), 404)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        return response
+
+    etag = conversion_etag(entry)
+    matched = matching_etag(request, etag)
+    if matched is not None:
+        response = make_response('', 304)
+        response.set_etag(matched)
+    else:
+        parsed_response = convert.parse_converter_response(entry.value)
+        response = make_response(jsonify({
+            "conversion_id": entry.key,
+            **parsed_response,
+            "model": entry.model,
+            "created_at": entry.created_at,
+        }), 200)
+        response.set_etag(etag)
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    # The result may be re-converted under the same id once evicted, so clients revalidate
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
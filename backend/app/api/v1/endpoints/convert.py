@@ -1,78 +1,425 @@
-from flask import request, jsonify, make_response
-from app.services.ada_converter import AdaConverter
-from app.core.exceptions import FileUploadError, AdaConverterError
+from contextlib import nullcontext
+from typing import Iterator
+from flask import Response, request, jsonify, make_response
+from werkzeug.exceptions import HTTPException
+from werkzeug.wsgi import ClosingIterator
+from app.core import metrics
+from app.core.lazy import Lazy
+from app.core.config import settings
+from app.services.admission import AdmissionController
+from app.services.ada_normalizer import NormalizationResult, normalize_ada
+from app.services.conversion_cache import ConversionCache, conversion_key
+from app.services.section_parser import IncrementalResponseParser, parse_response
+from app.services.similarity_index import SimilarityIndex, SimilarMatch
+from app.services.single_flight import SingleFlight
+from app.services.uploads import TextUploadStream, check_extension, decode_upload
+from app.services.verifier import Verifier
+from app.core.exceptions import (
+    FileUploadError, AdaConverterError, UpstreamRateLimitError, UpstreamTimeoutError,
+    ClientOverLimitError, ServiceOverloadedError
+)
+import hashlib
+import json
+import math
 import re
 
-# Initialize converter
-ada_converter = AdaConverter()
+def _create_converter():
+    # Imported here: the converter pulls in the OpenAI SDK, the bulk of a worker's start-up time
+    from app.services.ada_converter import AdaConverter
+    return AdaConverter(unit_cache=conversion_cache if settings.incremental_conversion else None)
+
+
+# Initialize converter on first use, in each worker (see Lazy)
+ada_converter = Lazy(_create_converter)
+
+# Cache of converter responses, keyed on source, model and system prompt
+conversion_cache = ConversionCache.from_settings()
+
+# Earlier conversions, for reusing or adapting them when a near-duplicate unit is uploaded
+similarity_index = SimilarityIndex.from_settings()
+
+# Identical conversions in flight at the same time share one converter call
+single_flight = SingleFlight.from_settings()
+
+# Runs each conversion's unit tests against its code in a sandbox, when asked to (verify=true)
+verifier = Verifier.from_settings()
+
+# Bounds the conversions calling the LLM at once, queueing or shedding the rest
+admission = AdmissionController.from_settings()
+
+SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,128}$')
+
+
+def get_session_id() -> str | None:
+    """Get the optional conversation session id from the form or the X-Session-Id header.
+    
+    Raises:
+        FileUploadError: If the session id is malformed.
+    """
+    return validate_session_id(request.form.get('session_id') or request.headers.get('X-Session-Id'))
+
+
+def validate_session_id(session_id: str | None) -> str | None:
+    """Check a client-supplied session id, treating an empty one as absent.
+    
+    Raises:
+        FileUploadError: If the session id is malformed.
+    """
+    if not session_id:
+        return None
+    if not SESSION_ID_PATTERN.match(session_id):
+        raise FileUploadError(
+            "session_id must be 1-128 characters of letters, digits, '-' or '_'"
+        )
+    return session_id
+
+
+def get_client_id(req) -> str:
+    """Identify the caller of a Flask or Quart request for admission control's fair sharing.
+    
+    Callers presenting a token (an ``Authorization`` or ``X-API-Key`` header) are
+    told apart by a hash of it, others by their address.
+    """
+    scheme, _, token = req.headers.get('Authorization', '').partition(' ')
+    token = req.headers.get('X-API-Key') or (token if scheme.lower() == 'bearer' else '')
+    if token:
+        return "key:" + hashlib.sha256(token.encode('utf-8')).hexdigest()[:16]
+    return "ip:" + (req.remote_addr or "unknown")
+
+
+def wants_verification(value: str | None) -> bool:
+    """Check the client's ``verify`` flag (form field or query parameter).
+    
+    Raises:
+        FileUploadError: If verification is asked for but VERIFICATION_ENABLED is off.
+    """
+    if (value or "").lower() not in ("1", "true", "yes"):
+        return False
+    if not verifier.enabled:
+        raise FileUploadError("Verification is not enabled on this server")
+    return True
+
+
+def verify_conversion(parsed_response: dict) -> dict:
+    """Run a parsed conversion's unit tests against its Python code (see ``Verifier.verify``)."""
+    result = verifier.verify(parsed_response.get("python_code", ""), parsed_response.get("unit_tests", ""))
+    return result.to_dict()
 
 
 def parse_converter_response(response: str) -> dict:
     """Parse the structured response from AdaConverter into components."""
-    # Initialize default values
-    logic = ""
-    unit_tests = ""
-    python_code = ""
+    with metrics.stage_seconds.time(stage="parse"):
+        return parse_response(response)
+
+
+def normalize_upload(ada_code: str) -> NormalizationResult:
+    """Normalize uploaded Ada source at the configured ADA_NORMALIZATION level."""
+    with metrics.stage_seconds.time(stage="normalize"):
+        normalization = normalize_ada(ada_code, settings.ada_normalization)
+    metrics.normalization_tokens_saved_total.inc(normalization.tokens_saved, level=normalization.level)
+    return normalization
+
+
+def run_conversion(ada_code: str,
+                   session_id: str | None = None,
+                   client: str | None = None,
+                   dependencies: str | None = None) -> tuple[dict, str]:
+    """Convert Ada code, serving stateless conversions from the conversion cache when possible.
     
-    # Split by sections using regex
-    sections = re.split(r'# (Logic|Unit Test|Python Code)', response)
+    The source is normalized first (see ``normalize_upload``); the normalized text
+    is what the model sees and what the cache is keyed on, and the token savings
+    are reported under ``normalization`` in the result. A cache miss that is
+    already being converted by another request (in this or another worker)
+    waits for that conversion instead of starting its own. A miss that nearly
+    duplicates an earlier conversion (see ``find_similar``) is converted by
+    adapting it, or reuses it if only formatting and comments differ; the result
+    then names it under ``similar_to``.
     
-    for i in range(1, len(sections), 2):
-        section_name = sections[i]
-        section_content = sections[i + 1].strip() if i + 1 < len(sections) else ""
-        
-        if section_name == "Logic":
-            logic = section_content
-        elif section_name == "Unit Test":
-            unit_tests = section_content
-        elif section_name == "Python Code":
-            python_code = section_content
+    Args:
+        ada_code (str): The Ada source to convert.
+        session_id (str | None, optional): Conversation session to continue. Session
+            conversions depend on earlier turns, so they bypass the cache.
+        client (str | None, optional): The caller (see ``get_client_id``); calls to the
+            model are then subject to admission control, weighted by the calls the
+            conversion makes at once. Cache hits never wait.
+        dependencies (str | None, optional): Interfaces of the already converted units the
+            source depends on (batch conversions of a project); part of the cache key.
     
-    return {
-        "logic": logic,
-        "unit_tests": unit_tests,
-        "python_code": python_code
-    }
+    Returns:
+        tuple[dict, str]: The parsed conversion and the cache status ("HIT", "MISS",
+            "SIMILAR", "COALESCED" or "BYPASS"). Cached conversions include a ``conversion_id``
+            to fetch them again from ``GET /api/v1/conversions/<conversion_id>``.
+    
+    Raises:
+        ServiceOverloadedError: If admission control sheds the conversion.
+    """
+    normalization = normalize_upload(ada_code)
+    ada_code = normalization.text
+    match = None
+    
+    def admitted(weight: int = 1):
+        return admission.admit(client, weight) if client is not None else nullcontext()
+    
+    if session_id is not None:
+        with admitted():
+            converter_response = ada_converter.convert(ada_code, session_id=session_id, dependencies=dependencies)
+        cache_status = "BYPASS"
+    else:
+        source = dependencies + "\n" + ada_code if dependencies else ada_code
+        key = conversion_key(source, str(ada_converter.model), str(ada_converter.system_prompt))
+        cached = conversion_cache.get(key) if conversion_cache.enabled else None
+        if cached is not None:
+            converter_response, _ = cached
+            cache_status = "HIT"
+        else:
+            def convert_once() -> str:
+                nonlocal match
+                match = find_similar(ada_code, ada_converter, dependencies)
+                if match is not None and match.exact:
+                    response = match.response
+                else:
+                    if match is not None:
+                        with admitted():
+                            response = ada_converter.adapt(ada_code, match.source, match.response,
+                                                           dependencies=dependencies)
+                    else:
+                        with admitted(ada_converter.concurrent_calls(ada_code)):
+                            response = ada_converter.convert(ada_code, session_id=None, dependencies=dependencies)
+                    if similarity_index.enabled:
+                        similarity_index.add(key, ada_code, response, str(ada_converter.model),
+                                             str(ada_converter.system_prompt), contextual=bool(dependencies))
+                if conversion_cache.enabled:
+                    conversion_cache.set(key, response, model=str(ada_converter.model))
+                return response
+            
+            converter_response, shared = single_flight.do(key, convert_once)
+            if shared:
+                cache_status = "COALESCED"
+            elif match is not None and match.exact:
+                cache_status = "SIMILAR"
+            else:
+                cache_status = "MISS" if conversion_cache.enabled else "BYPASS"
+    
+    parsed_response = parse_converter_response(converter_response)
+    parsed_response["normalization"] = normalization.to_dict()
+    if session_id is None and conversion_cache.enabled:
+        parsed_response["conversion_id"] = key
+    if match is not None:
+        parsed_response["similar_to"] = {"conversion_id": match.key, "similarity": match.similarity}
+    return parsed_response, cache_status
 
 
-def convert_ada_file():
-    """Convert Ada code to Python via REST API using file upload."""
-    if 'ada_file' not in request.files:
-        response = make_response(jsonify({"error": "ada_file is required"}), 400)
-        response.headers['Access-Control-Allow-Origin'] = '*'
-        return response
+def find_similar(ada_code: str, converter, dependencies: str | None = None) -> SimilarMatch | None:
+    """Look up an earlier conversion of a near-duplicate of ``ada_code`` in the similarity index.
     
-    file = request.files['ada_file']
+    Args:
+        ada_code (str): The normalized Ada source about to be converted.
+        converter: The converter about to convert it; only conversions by its model and
+            system prompt match.
+        dependencies (str | None, optional): The dependency context it is converted with.
     
-    if file.filename == '':
-        response = make_response(jsonify({"error": "ada_file is required"}), 400)
-        response.headers['Access-Control-Allow-Origin'] = '*'
-        return response
+    Returns:
+        SimilarMatch | None: The closest earlier conversion, or None if there is none
+            (or the index is disabled).
+    """
+    if not similarity_index.enabled:
+        return None
+    match = similarity_index.find(ada_code, str(converter.model), str(converter.system_prompt),
+                                  contextual=bool(dependencies))
+    if match is None:
+        metrics.similar_conversions_total.inc(result="unmatched")
+    else:
+        metrics.similar_conversions_total.inc(result="reused" if match.exact else "adapted")
+    return match
+
+
+def read_ada_upload() -> str:
+    """Read and decode the uploaded ada_file.
+    
+    Raises:
+        FileUploadError: If the file is missing, empty or not valid UTF-8 text.
+    """
+    return decode_ada_upload(request.files.get('ada_file'))
+
+
+def decode_ada_upload(file) -> str:
+    """Decode an uploaded Ada file (a werkzeug ``FileStorage``, or None if it was not sent).
     
+    Uploads to the Flask app are decoded as they arrive (see ``UploadRequest``);
+    any other upload is decoded a chunk at a time, never holding its bytes and
+    text together.
+    
+    Raises:
+        FileUploadError: If the file is missing, not an Ada source, empty or not valid UTF-8 text.
+    """
+    if file is None or file.filename == '':
+        raise FileUploadError("ada_file is required")
+    if not isinstance(file.stream, TextUploadStream):
+        # Uploads streamed into a TextUploadStream had their extension checked on arrival
+        check_extension(file.filename, settings.allowed_extensions)
+    
+    with metrics.stage_seconds.time(stage="decode"):
+        ada_code = decode_upload(file.stream, file.filename)
+    
+    if not ada_code.strip():
+        raise FileUploadError("File is empty")
+    
+    return ada_code
+
+
+def convert_ada_file():
+    """Convert Ada code to Python via REST API using file upload."""
     try:
-        # Read the file content
-        ada_code = file.read().decode('utf-8')
+        session_id = get_session_id()
+        verify = wants_verification(request.values.get('verify'))
         
-        if not ada_code.strip():
-            response = make_response(jsonify({"error": "File is empty"}), 400)
-            response.headers['Access-Control-Allow-Origin'] = '*'
-            return response
-        
-        # Convert using AdaConverter
-        converter_response = ada_converter.convert(ada_code)
+        # Read the file content
+        ada_code = read_ada_upload()
         
-        # Parse the structured response
-        parsed_response = parse_converter_response(converter_response)
+        # Convert using AdaConverter (or the conversion cache) and parse the structured response
+        parsed_response, cache_status = run_conversion(
+            ada_code, session_id=session_id, client=get_client_id(request)
+        )
+        if session_id is not None:
+            parsed_response["session"] = ada_converter.session_stats(session_id)
+        if verify:
+            parsed_response["verification"] = verify_conversion(parsed_response)
         
         response = make_response(jsonify(parsed_response), 200)
         response.headers['Access-Control-Allow-Origin'] = '*'
+        response.headers['X-Cache'] = cache_status
         return response
         
-    except UnicodeDecodeError:
-        response = make_response(jsonify({"error": "File must be valid UTF-8 text"}), 400)
+    except FileUploadError as e:
+        response = make_response(jsonify({"error": str(e)}), 400)
         response.headers['Access-Control-Allow-Origin'] = '*'
         return response
+    except ClientOverLimitError as e:
+        response = make_response(jsonify({"error": str(e)}), 429)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    except ServiceOverloadedError as e:
+        response = make_response(jsonify({"error": str(e)}), 503)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    except UpstreamRateLimitError as e:
+        response = make_response(jsonify({"error": str(e)}), 429)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        response.headers['Retry-After'] = str(max(1, math.ceil(e.retry_after)))
+        return response
+    except UpstreamTimeoutError as e:
+        response = make_response(jsonify({"error": str(e)}), 504)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        return response
+    except HTTPException:
+        # e.g. 413 for an upload over MAX_FILE_SIZE, raised while the form is parsed
+        raise
     except Exception as e:
         response = make_response(jsonify({"error": str(e)}), 500)
         response.headers['Access-Control-Allow-Origin'] = '*'
-        return response
\ No newline at end of file
+        return response
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format a Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_conversion(ada_code: str,
+                      session_id: str | None = None,
+                      client: str | None = None) -> tuple[Iterator[str], str]:
+    """Convert Ada code as a stream of Server-Sent Events.
+    
+    Emits a ``delta`` event for each generated fragment, a ``logic``, ``unit_tests``
+    or ``python_code`` event as soon as each section is complete, then a ``done``
+    event with the full result (or an ``error`` event if the conversion fails).
+    Cached conversions are replayed immediately. The source is normalized as in
+    ``run_conversion``.
+    
+    Args:
+        ada_code (str): The Ada source to convert.
+        session_id (str | None, optional): Conversation session to continue; bypasses the cache.
+        client (str | None, optional): The caller; the stream then holds admission slots
+            (see ``run_conversion``) until it ends or the client goes away.
+    
+    Returns:
+        tuple[Iterator[str], str]: The event stream and the cache status ("HIT", "MISS" or "BYPASS").
+    
+    Raises:
+        ServiceOverloadedError: If admission control sheds the conversion (before any event is sent).
+    """
+    normalization = normalize_upload(ada_code)
+    ada_code = normalization.text
+    
+    key = None
+    if session_id is None and conversion_cache.enabled:
+        key = conversion_key(ada_code, str(ada_converter.model), str(ada_converter.system_prompt))
+        cached = conversion_cache.get(key)
+        if cached is not None:
+            parsed_response = parse_converter_response(cached[0])
+            events = [sse_event(field, {"content": content}) for field, content in parsed_response.items()]
+            parsed_response["normalization"] = normalization.to_dict()
+            events.append(sse_event("done", parsed_response))
+            return iter(events), "HIT"
+    
+    weight = ada_converter.concurrent_calls(ada_code) if session_id is None else 1
+    release = admission.acquire(client, weight) if client is not None else (lambda: None)
+    
+    def generate() -> Iterator[str]:
+        parser = IncrementalResponseParser()
+        fragments = []
+        try:
+            for fragment in ada_converter.convert_stream(ada_code, session_id=session_id):
+                fragments.append(fragment)
+                yield sse_event("delta", {"content": fragment})
+                for field, content in parser.feed(fragment):
+                    yield sse_event(field, {"content": content})
+            for field, content in parser.close():
+                yield sse_event(field, {"content": content})
+            
+            converter_response = "".join(fragments)
+            if key is not None:
+                conversion_cache.set(key, converter_response, model=str(ada_converter.model))
+            parsed_response = parse_converter_response(converter_response)
+            parsed_response["normalization"] = normalization.to_dict()
+            if session_id is not None:
+                parsed_response["session"] = ada_converter.session_stats(session_id)
+            yield sse_event("done", parsed_response)
+        except Exception as e:
+            yield sse_event("error", {"error": str(e)})
+        finally:
+            release()
+    
+    # The slots are also given back if the response is closed before streaming starts
+    return ClosingIterator(generate(), release), "MISS" if key is not None else "BYPASS"
+
+
+def convert_ada_file_stream():
+    """Convert Ada code to Python via file upload, streaming progress as Server-Sent Events."""
+    try:
+        session_id = get_session_id()
+        ada_code = read_ada_upload()
+        events, cache_status = stream_conversion(ada_code, session_id=session_id, client=get_client_id(request))
+    except FileUploadError as e:
+        response = make_response(jsonify({"error": str(e)}), 400)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        return response
+    except ClientOverLimitError as e:
+        response = make_response(jsonify({"error": str(e)}), 429)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    except ServiceOverloadedError as e:
+        response = make_response(jsonify({"error": str(e)}), 503)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    
+    response = Response(events, mimetype='text/event-stream')
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.headers['X-Cache'] = cache_status
+    return response
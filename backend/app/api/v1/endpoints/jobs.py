@@ -0,0 +1,70 @@
+from flask import request, jsonify, make_response, url_for
+from werkzeug.exceptions import HTTPException
+from app.core.config import settings
+from app.core.exceptions import FileUploadError, JobQueueFullError
+from app.services.job_runner import JobRunner
+from app.services.job_store import JobStore
+from app.api.v1.endpoints import convert
+
+
+# Admission control client shared by the background jobs of a worker
+JOB_CLIENT = "jobs"
+
+
+def _convert_job(ada_code: str) -> dict:
+    parsed_response, _ = convert.run_conversion(ada_code, client=JOB_CLIENT)
+    return parsed_response
+
+
+# Background conversions, with state persisted where every worker can read it
+job_runner = JobRunner(
+    store=JobStore(settings.job_store_path, retention_seconds=settings.job_retention_seconds),
+    convert=_convert_job,
+    max_workers=settings.job_workers,
+    max_pending=settings.job_max_pending,
+    recover_interval=settings.job_recover_interval_seconds
+)
+
+
+def create_conversion_job():
+    """Queue an uploaded Ada file for conversion and return a job id immediately."""
+    job_runner.recover()
+    try:
+        ada_code = convert.read_ada_upload()
+        job_id = job_runner.submit(ada_code, filename=request.files['ada_file'].filename)
+    except FileUploadError as e:
+        response = make_response(jsonify({"error": str(e)}), 400)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        return response
+    except JobQueueFullError as e:
+        response = make_response(jsonify({"error": str(e)}), 503)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        response.headers['Retry-After'] = '5'
+        return response
+    except HTTPException:
+        # e.g. 413 for an upload over MAX_FILE_SIZE, raised while the form is parsed
+        raise
+    except Exception as e:
+        response = make_response(jsonify({"error": str(e)}), 500)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        return response
+    
+    status_url = url_for('api_v1.get_conversion_job', job_id=job_id)
+    response = make_response(jsonify({"job_id": job_id, "status": "queued", "status_url": status_url}), 202)
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    response.headers['Location'] = status_url
+    return response
+
+
+def get_conversion_job(job_id: str):
+    """Report a conversion job's status and, once finished, its result."""
+    # Polls also resume jobs orphaned by a recycled worker, in whichever worker serves them
+    job_runner.recover()
+    job = job_runner.store.get(job_id)
+    
+    if job is None:
+        response = make_response(jsonify({"error": "Job not found"}), 404)
+    else:
+        response = make_response(jsonify(job), 200)
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
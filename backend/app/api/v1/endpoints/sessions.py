@@ -0,0 +1,24 @@
+from flask import jsonify, make_response
+from app.api.v1.endpoints import convert
+
+
+def get_session(session_id: str):
+    """Report token usage for a conversion session."""
+    stats = convert.ada_converter.session_stats(session_id)
+    
+    if stats is None:
+        response = make_response(jsonify({"error": "Session not found"}), 404)
+    else:
+        response = make_response(jsonify(stats), 200)
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
+
+
+def delete_session(session_id: str):
+    """Discard a conversion session's history."""
+    if convert.ada_converter.end_session(session_id):
+        response = make_response('', 204)
+    else:
+        response = make_response(jsonify({"error": "Session not found"}), 404)
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
@@ -0,0 +1,83 @@
+"""Convert a whole Ada source tree from the command line (the ``ada-convert`` script).
+
+::
+
+    ada-convert path/to/ada -o path/to/python --concurrency 8
+
+Outputs are written under the output directory with a ``manifest.jsonl``
+checkpoint (see ``app.services.tree_conversion``); running the same command
+again resumes an interrupted run and only converts files that changed.
+"""
+import json
+import os
+
+import click
+
+from app.core.config import settings
+
+
+def _format_progress(progress, entry) -> str:
+    line = (f"[{progress.done}/{progress.total}] {entry['status']:<9} {entry['filename']}"
+            f"  ({progress.files_per_second:.2f} files/s, "
+            f"{int(progress.prompt_tokens + progress.completion_tokens)} tokens)")
+    if entry.get("error"):
+        line += f": {entry['error']}"
+    return line
+
+
+@click.command()
+@click.argument("source_dir", type=click.Path(exists=True, file_okay=False))
+@click.option("-o", "--output", "output_dir", type=click.Path(file_okay=False),
+              help="Where outputs and the manifest are written (default: SOURCE_DIR-python).")
+@click.option("-j", "--concurrency", type=click.IntRange(min=1), default=settings.batch_concurrency,
+              show_default=True, help="Files converted at once.")
+@click.option("--force", is_flag=True, help="Convert every file, even those already converted and unchanged.")
+@click.option("--quiet", is_flag=True, help="Only print the summary.")
+@click.option("--json", "as_json", is_flag=True, help="Print the summary as JSON.")
+def main(source_dir: str, output_dir: str | None, concurrency: int, force: bool, quiet: bool, as_json: bool) -> None:
+    """Convert every Ada file under SOURCE_DIR to Python, resumably."""
+    try:
+        settings.validate()
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    from app.services.ada_converter import AdaConverter
+    from app.services.tree_conversion import MANIFEST_NAME, convert_tree
+
+    output_dir = output_dir or os.path.normpath(source_dir) + "-python"
+
+    def report(progress, entry) -> None:
+        if not quiet:
+            click.echo(_format_progress(progress, entry), err=True)
+
+    try:
+        progress = convert_tree(
+            source_dir,
+            output_dir,
+            AdaConverter(),
+            concurrency=concurrency,
+            allowed_extensions=settings.allowed_extensions,
+            normalization=settings.ada_normalization,
+            force=force,
+            on_progress=report,
+        )
+    except KeyboardInterrupt:
+        click.echo(f"\nInterrupted; run the same command again to resume from "
+                   f"{os.path.join(output_dir, MANIFEST_NAME)}", err=True)
+        raise SystemExit(130)
+
+    summary = progress.to_dict()
+    if as_json:
+        click.echo(json.dumps(summary, indent=2))
+    else:
+        click.echo(
+            f"{summary['succeeded']} converted, {summary['skipped']} unchanged, {summary['failed']} failed "
+            f"of {summary['total']} files in {summary['elapsed_seconds']}s "
+            f"({summary['files_per_second']} files/s); "
+            f"{summary['prompt_tokens']} prompt + {summary['completion_tokens']} completion tokens"
+        )
+    if progress.failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
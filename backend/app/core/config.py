@@ -1,9 +1,26 @@
 import os
-from dotenv import load_dotenv
+import tempfile
 from typing import Optional
 
-# Load environment variables from .env file
-load_dotenv()
+
+def find_env_file() -> Optional[str]:
+    """Find the nearest .env file in this package's directory or above it."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        path = os.path.join(directory, ".env")
+        if os.path.isfile(path):
+            return path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+# Load environment variables from .env file (python-dotenv is only imported when there is one)
+_env_file = find_env_file()
+if _env_file is not None:
+    from dotenv import load_dotenv
+    load_dotenv(_env_file)
 
 
 class Settings:
@@ -12,22 +29,197 @@ class Settings:
     def __init__(self):
         self.openai_api_key: Optional[str] = os.getenv("OPENAI_API_KEY")
         self.openai_model: str = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
-        
+        self.openai_base_url: str = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+
+        # OpenAI transport settings (rate limits apply per worker process; 0 disables a limit)
+        self.openai_timeout_seconds: float = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "90"))
+        self.openai_connect_timeout_seconds: float = float(os.getenv("OPENAI_CONNECT_TIMEOUT_SECONDS", "5"))
+        self.openai_max_retries: int = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+        self.openai_retry_base_delay: float = float(os.getenv("OPENAI_RETRY_BASE_DELAY", "1"))
+        self.openai_retry_max_delay: float = float(os.getenv("OPENAI_RETRY_MAX_DELAY", "30"))
+        self.openai_requests_per_minute: int = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "0"))
+        self.openai_tokens_per_minute: int = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", "0"))
+        self.openai_expected_completion_tokens: int = int(os.getenv("OPENAI_EXPECTED_COMPLETION_TOKENS", "1024"))
+        self.openai_rate_limit_wait_seconds: float = float(os.getenv("OPENAI_RATE_LIMIT_WAIT_SECONDS", "30"))
+        self.openai_max_connections: int = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+        self.openai_async_max_connections: int = int(os.getenv("OPENAI_ASYNC_MAX_CONNECTIONS", "256"))
+        self.openai_keepalive_seconds: float = float(os.getenv("OPENAI_KEEPALIVE_SECONDS", "60"))
+        self.openai_prewarm: bool = os.getenv("OPENAI_PREWARM", "False").lower() == "true"
+
+        # Hedged requests: a call with no first token by a percentile of recent times to
+        # first token (clamped to the min/max delay) gets a second request, optionally on
+        # a faster fallback model, and the first to finish wins
+        self.openai_hedging_enabled: bool = os.getenv("OPENAI_HEDGING_ENABLED", "False").lower() == "true"
+        self.openai_hedge_percentile: float = float(os.getenv("OPENAI_HEDGE_PERCENTILE", "95"))
+        self.openai_hedge_min_delay_seconds: float = float(os.getenv("OPENAI_HEDGE_MIN_DELAY_SECONDS", "2"))
+        self.openai_hedge_max_delay_seconds: float = float(os.getenv("OPENAI_HEDGE_MAX_DELAY_SECONDS", "30"))
+        self.openai_hedge_min_samples: int = int(os.getenv("OPENAI_HEDGE_MIN_SAMPLES", "20"))
+        self.openai_hedge_model: str = os.getenv("OPENAI_HEDGE_MODEL", "")
+
         # API Settings
         self.api_host: str = os.getenv("API_HOST", "127.0.0.1")
         self.api_port: int = int(os.getenv("PORT", os.getenv("API_PORT", "8000")))
         self.debug: bool = os.getenv("DEBUG", "True").lower() == "true"
+        # Request threads per gunicorn worker (start.sh passes it as --threads)
+        self.web_threads: int = int(os.getenv("WEB_THREADS", "4"))
+        # Reverse proxies in front of the app whose X-Forwarded-For/-Proto headers are trusted
+        # (Render's load balancer is one; start.sh sets 1). 0 uses the connecting address as is
+        self.trusted_proxy_hops: int = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
         
         # File upload settings
         self.max_file_size: int = int(os.getenv("MAX_FILE_SIZE", "1048576"))  # 1MB default
         self.allowed_extensions: set = {".ada", ".adb", ".ads"}
-    
+        # Uploaded archives are kept in memory up to this size, then spooled to disk
+        # (UPLOAD_SPOOL_DIR, or the system temp directory); Ada sources are decoded as they arrive
+        self.upload_spool_max_memory: int = int(os.getenv("UPLOAD_SPOOL_MAX_MEMORY", "524288"))  # 512KB
+        self.upload_spool_dir: str = os.getenv("UPLOAD_SPOOL_DIR", "")
+
+        # Ada normalization before prompting: off, whitespace, banners or comments. Off by default:
+        # the higher levels drop comments the model may need (license terms, design notes)
+        self.ada_normalization: str = os.getenv("ADA_NORMALIZATION", "off").lower()
+
+        # Converter response format: sections (Markdown headers), or opt in to json (JSON
+        # mode) or json_schema (strict structured outputs; needs a model that supports them)
+        self.conversion_output_mode: str = os.getenv("CONVERSION_OUTPUT_MODE", "sections").lower()
+        # Follow-up requests for sections a structured response left out
+        self.conversion_max_repairs: int = int(os.getenv("CONVERSION_MAX_REPAIRS", "1"))
+        # Model tiers chosen by the complexity of the source: a JSON list of
+        # {"name", "model", "max_score", "max_tokens", "timeout_seconds"} objects.
+        # Empty sends every conversion to the default model.
+        self.model_tiers: str = os.getenv("MODEL_TIERS", "")
+
+        # Conversation session settings
+        self.session_max_count: int = int(os.getenv("SESSION_MAX_COUNT", "256"))
+        self.session_ttl_seconds: int = int(os.getenv("SESSION_TTL_SECONDS", "1800"))
+        self.session_max_history_tokens: int = int(os.getenv("SESSION_MAX_HISTORY_TOKENS", "6000"))
+
+        # Chunked conversion of large compilation units
+        self.chunking_enabled: bool = os.getenv("CHUNKING_ENABLED", "True").lower() == "true"
+        self.chunk_threshold_tokens: int = int(os.getenv("CHUNK_THRESHOLD_TOKENS", "3000"))
+        self.chunk_max_tokens: int = int(os.getenv("CHUNK_MAX_TOKENS", "1500"))
+        self.chunk_context_max_tokens: int = int(os.getenv("CHUNK_CONTEXT_MAX_TOKENS", "1000"))
+        self.chunk_concurrency: int = int(os.getenv("CHUNK_CONCURRENCY", "4"))
+        # Convert each subprogram of a chunked file separately and reuse the ones an edited
+        # revision leaves unchanged (needs the conversion cache)
+        self.incremental_conversion: bool = os.getenv("INCREMENTAL_CONVERSION", "False").lower() == "true"
+
+        # Local state shared by all workers on the host (caches, job results, ...)
+        self.data_dir: str = os.getenv(
+            "DATA_DIR", os.path.join(tempfile.gettempdir(), "ada-converter")
+        )
+
+        # Conversion cache settings
+        self.conversion_cache_enabled: bool = os.getenv("CONVERSION_CACHE_ENABLED", "True").lower() == "true"
+        self.conversion_cache_max_entries: int = int(os.getenv("CONVERSION_CACHE_MAX_ENTRIES", "256"))
+        self.conversion_cache_disk_max_entries: int = int(os.getenv("CONVERSION_CACHE_DISK_MAX_ENTRIES", "10000"))
+        self.conversion_cache_ttl_seconds: int = int(os.getenv("CONVERSION_CACHE_TTL_SECONDS", "604800"))  # 7 days
+        # An empty path disables the on-disk tier
+        self.conversion_cache_path: str = os.getenv(
+            "CONVERSION_CACHE_PATH", os.path.join(self.data_dir, "conversion_cache.sqlite3")
+        )
+
+        # Coalescing of identical concurrent conversions (an empty directory coalesces
+        # within each worker only)
+        self.single_flight_enabled: bool = os.getenv("SINGLE_FLIGHT_ENABLED", "True").lower() == "true"
+        self.single_flight_dir: str = os.getenv("SINGLE_FLIGHT_DIR", os.path.join(self.data_dir, "inflight"))
+        self.single_flight_wait_seconds: float = float(os.getenv("SINGLE_FLIGHT_WAIT_SECONDS", "300"))
+
+        # Verification of generated unit tests against generated code, in sandboxed
+        # processes (opt-in per request with verify=true)
+        self.verification_enabled: bool = os.getenv("VERIFICATION_ENABLED", "False").lower() == "true"
+        self.verification_workers: int = int(os.getenv("VERIFICATION_WORKERS", "2"))
+        self.verification_timeout_seconds: float = float(os.getenv("VERIFICATION_TIMEOUT_SECONDS", "10"))
+        self.verification_cpu_seconds: int = int(os.getenv("VERIFICATION_CPU_SECONDS", "5"))
+        self.verification_memory_mb: int = int(os.getenv("VERIFICATION_MEMORY_MB", "256"))
+        # An empty path keeps verification results in memory only
+        self.verification_cache_path: str = os.getenv(
+            "VERIFICATION_CACHE_PATH", os.path.join(self.data_dir, "verification_cache.sqlite3")
+        )
+
+        # Admission control of conversions that call the LLM, per worker: at most
+        # ADMISSION_MAX_IN_FLIGHT upstream calls at once (0 disables), ADMISSION_MAX_QUEUE more
+        # conversions waiting up to ADMISSION_QUEUE_TIMEOUT_SECONDS, and no client holding more than
+        # ADMISSION_CLIENT_SHARE of them. The defaults give each request thread two calls, so chunked,
+        # batch and background conversions queue once the threads' share is used up
+        self.admission_max_in_flight: int = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", str(2 * self.web_threads)))
+        self.admission_max_queue: int = int(os.getenv("ADMISSION_MAX_QUEUE", str(4 * self.web_threads)))
+        self.admission_queue_timeout_seconds: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "30"))
+        self.admission_client_share: float = float(os.getenv("ADMISSION_CLIENT_SHARE", "0.5"))
+
+        # Batch conversion settings
+        self.batch_concurrency: int = int(os.getenv("BATCH_CONCURRENCY", "4"))
+        self.batch_max_files: int = int(os.getenv("BATCH_MAX_FILES", "200"))
+        self.batch_max_upload_size: int = int(os.getenv("BATCH_MAX_UPLOAD_SIZE", "20971520"))  # 20MB default
+        # Convert a batch in dependency order (with clauses, spec before body), one level at a time,
+        # giving each file the Python interfaces of its converted dependencies
+        self.batch_dependency_order: bool = os.getenv("BATCH_DEPENDENCY_ORDER", "True").lower() == "true"
+        self.dependency_context_max_tokens: int = int(os.getenv("DEPENDENCY_CONTEXT_MAX_TOKENS", "1500"))
+        # Dependency graphs of projects already indexed; an empty path keeps them in memory only
+        self.dependency_graph_cache_path: str = os.getenv(
+            "DEPENDENCY_GRAPH_CACHE_PATH", os.path.join(self.data_dir, "dependency_graphs.sqlite3")
+        )
+        self.dependency_graph_cache_max_entries: int = int(os.getenv("DEPENDENCY_GRAPH_CACHE_MAX_ENTRIES", "256"))
+
+        # Near-duplicate reuse: a stateless conversion that closely matches an earlier one (identifiers
+        # and literals aside) is converted by adapting that conversion, or reuses it if only formatting differs
+        self.similarity_index_enabled: bool = os.getenv("SIMILARITY_INDEX_ENABLED", "False").lower() == "true"
+        self.similarity_threshold: float = float(os.getenv("SIMILARITY_THRESHOLD", "0.85"))
+        self.similarity_index_max_entries: int = int(os.getenv("SIMILARITY_INDEX_MAX_ENTRIES", "50000"))
+        self.similarity_index_path: str = os.getenv(
+            "SIMILARITY_INDEX_PATH", os.path.join(self.data_dir, "similarity_index.sqlite3")
+        )
+
+        # Background conversion job settings
+        self.job_workers: int = int(os.getenv("JOB_WORKERS", "2"))
+        self.job_max_pending: int = int(os.getenv("JOB_MAX_PENDING", "32"))
+        self.job_retention_seconds: int = int(os.getenv("JOB_RETENTION_SECONDS", "86400"))  # 1 day
+        self.job_store_path: str = os.getenv("JOB_STORE_PATH", os.path.join(self.data_dir, "jobs.sqlite3"))
+        # Minimum seconds between a worker's scans for jobs orphaned by an exited worker
+        self.job_recover_interval_seconds: float = float(os.getenv("JOB_RECOVER_INTERVAL_SECONDS", "5"))
+
+        # Conversation sessions, shared by the workers on the host so any of them can continue a session
+        self.session_store_path: str = os.getenv("SESSION_STORE_PATH", os.path.join(self.data_dir, "sessions.sqlite3"))
+
+        # Metrics settings (/metrics aggregates every worker's snapshot in METRICS_DIR;
+        # an empty directory reports this process only)
+        self.metrics_enabled: bool = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+        self.metrics_dir: str = os.getenv("METRICS_DIR", os.path.join(self.data_dir, "metrics"))
+        self.metrics_flush_seconds: float = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+        # Response compression (gzip, or brotli when installed) for bodies of at least
+        # COMPRESSION_MIN_SIZE bytes
+        self.compression_enabled: bool = os.getenv("COMPRESSION_ENABLED", "True").lower() == "true"
+        self.compression_min_size: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+        self.compression_level: int = int(os.getenv("COMPRESSION_LEVEL", "6"))
+
+        # Import the converter and OpenAI SDK in the gunicorn master (gunicorn.conf.py),
+        # so workers fork with them loaded
+        self.preload_modules: bool = os.getenv("PRELOAD_MODULES", "True").lower() == "true"
+
+        # On-demand profiling of single /convert requests by admins (X-Profile: true); the
+        # newest PROFILING_MAX_PROFILES collapsed-stack profiles are kept in PROFILING_DIR
+        self.profiling_enabled: bool = os.getenv("PROFILING_ENABLED", "False").lower() == "true"
+        self.profiling_interval_ms: float = float(os.getenv("PROFILING_INTERVAL_MS", "2"))
+        self.profiling_dir: str = os.getenv("PROFILING_DIR", os.path.join(self.data_dir, "profiles"))
+        self.profiling_max_profiles: int = int(os.getenv("PROFILING_MAX_PROFILES", "100"))
+
+        # Admin API settings (admin endpoints are disabled unless a token is set)
+        self.admin_token: Optional[str] = os.getenv("ADMIN_TOKEN")
+
     def validate(self) -> None:
         """Validate required configuration settings."""
         if not self.openai_api_key:
             raise ValueError(
                 "OPENAI_API_KEY environment variable is required"
             )
+        if self.ada_normalization not in ("off", "whitespace", "banners", "comments"):
+            raise ValueError(
+                "ADA_NORMALIZATION must be one of off, whitespace, banners or comments"
+            )
+        if self.conversion_output_mode not in ("sections", "json", "json_schema"):
+            raise ValueError(
+                "CONVERSION_OUTPUT_MODE must be one of sections, json or json_schema"
+            )
 
 
 # Global settings instance
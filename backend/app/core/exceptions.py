@@ -13,4 +13,35 @@ class FileUploadError(Exception):
 
 class ConfigurationError(Exception):
     """Exception raised for configuration related errors."""
-    pass
\ No newline at end of file
+    pass
+
+
+class JobQueueFullError(Exception):
+    """Exception raised when no more conversion jobs can be accepted."""
+    pass
+
+
+class UpstreamRateLimitError(AdaConverterError):
+    """Exception raised when the OpenAI API keeps rate limiting requests."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UpstreamTimeoutError(AdaConverterError):
+    """Exception raised when the OpenAI API keeps timing out."""
+    pass
+
+
+class ServiceOverloadedError(Exception):
+    """Exception raised when a request is shed because the service is at capacity."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ClientOverLimitError(ServiceOverloadedError):
+    """Exception raised when a client already holds its fair share of the service's capacity."""
+    pass
@@ -0,0 +1,55 @@
+"""Deferred construction of expensive process-wide objects."""
+
+import os
+import threading
+from typing import Callable, Generic, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    """Stands in for an object that is built on first use.
+
+    Attribute access is forwarded to the object, building it (once, under a
+    lock) if needed, so a module-level ``Lazy`` can replace a module-level
+    instance without changing its callers. A forked child discards the
+    parent's object and builds its own, so nothing holding sockets or threads
+    (e.g. an HTTP client) is shared across a fork.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        """Initialize the placeholder.
+
+        Args:
+            factory (Callable[[], T]): Builds the object; it may import what it needs.
+        """
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._state: Tuple[int, T] | None = None
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    @property
+    def loaded(self) -> bool:
+        """Whether this process has built the object yet."""
+        state = self._state
+        return state is not None and state[0] == os.getpid()
+
+    def get(self) -> T:
+        """Get the object, building it if this process has not yet."""
+        state = self._state
+        if state is None or state[0] != os.getpid():
+            with self._lock:
+                state = self._state
+                if state is None or state[0] != os.getpid():
+                    state = (os.getpid(), self._factory())
+                    self._state = state
+        return state[1]
+
+    def _after_fork(self) -> None:
+        # The lock may have been held by another thread of the parent
+        self._lock = threading.Lock()
+        self._state = None
+
+    def __getattr__(self, name: str):
+        return getattr(self.get(), name)
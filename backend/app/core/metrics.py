@@ -0,0 +1,461 @@
+"""Lightweight metrics with Prometheus text exposition, aggregated across worker processes.
+
+Each process records into in-memory counters, gauges and histograms (a lock and
+a dict update per observation). A background thread periodically writes the
+process's values to ``<directory>/<pid>.json``; ``/metrics`` merges every
+worker's file so the scrape reflects the whole host. Counters and histograms of
+exited workers are folded into an archive so totals never go backwards; their
+gauges are dropped.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+from app.core import processes
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+# Latency buckets in seconds, from fast local stages up to long LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+_ARCHIVE = "archive.json"
+_LOCK = ".lock"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str]):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {', '.join(self.labelnames) or '(none)'}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = [[list(key), value if not isinstance(value, list) else list(value)]
+                       for key, value in self._values.items()]
+        return {"kind": self.kind, "help": self.help, "labelnames": list(self.labelnames), "samples": samples}
+
+    def _reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """A monotonically increasing count."""
+
+    kind = COUNTER
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        """Add ``amount`` to the count for ``labels``."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def total(self, **labels: Any) -> float:
+        """This process's count summed over every label set that includes ``labels``."""
+        wanted = [(self.labelnames.index(name), str(value)) for name, value in labels.items()]
+        with self._lock:
+            return sum(value for key, value in self._values.items()
+                       if all(key[index] == label for index, label in wanted))
+
+
+class Gauge(_Metric):
+    """A value that goes up and down (e.g. calls in flight)."""
+
+    kind = GAUGE
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        """Add ``amount`` to the value for ``labels``."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        """Subtract ``amount`` from the value for ``labels``."""
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels: Any) -> Iterator[None]:
+        """Count the enclosed block as in progress while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    """A distribution of observations (e.g. latencies) in cumulative buckets."""
+
+    kind = HISTOGRAM
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str], buckets: Sequence[float]):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        """Record one observation for ``labels``."""
+        key = self._key(labels)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            # Per-bucket (not cumulative) counts, then the sum and count of observations
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe how long the enclosed block takes, in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _snapshot(self) -> Dict[str, Any]:
+        snapshot = super()._snapshot()
+        snapshot["buckets"] = list(self.buckets)
+        return snapshot
+
+
+class MetricsRegistry:
+    """The metrics of one process, and the aggregation of every worker's metrics for scraping."""
+
+    def __init__(self,
+                 directory: str | None = None,
+                 flush_interval: float = 5.0,
+                 process_alive: Callable[[int], bool] = processes.process_alive):
+        """Initialize the registry.
+
+        Args:
+            directory (str | None, optional): Directory shared by the workers on the host for
+                their snapshots. None (or empty) keeps metrics in this process only.
+            flush_interval (float, optional): Seconds between snapshot writes. Defaults to 5.
+            process_alive (Callable[[int], bool], optional): Liveness check for other workers.
+        """
+        self._directory = directory or None
+        self._flush_interval = flush_interval
+        self._process_alive = process_alive
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._started_pid: int | None = None
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Create and register a counter."""
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Create and register a gauge."""
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self,
+                  name: str,
+                  help_text: str,
+                  labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Create and register a histogram."""
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Get this process's current values."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric._snapshot() for metric in metrics}
+
+    def start(self) -> None:
+        """Start writing this process's snapshots for the other workers (idempotent per process)."""
+        with self._lock:
+            if self._directory is None or self._started_pid == os.getpid():
+                return
+            self._started_pid = os.getpid()
+        os.makedirs(self._directory, exist_ok=True)
+        # A file under our pid belongs to an earlier process that happened to have it.
+        with self._exclusive():
+            stale = self._read(self._snapshot_path(os.getpid()))
+            if stale is not None:
+                self._archive(stale)
+                os.remove(self._snapshot_path(os.getpid()))
+        threading.Thread(target=self._flush_forever, name="metrics-flush", daemon=True).start()
+        atexit.register(self.flush)
+
+    def flush(self) -> None:
+        """Write this process's snapshot where the other workers can read it."""
+        if self._directory is None or self._started_pid != os.getpid():
+            return
+        path = self._snapshot_path(os.getpid())
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(temporary, path)
+
+    def collect(self) -> Dict[str, Dict[str, Any]]:
+        """Aggregate the metrics of every worker on the host (this one's are current, others' are
+        as of their last flush)."""
+        merged: Dict[str, Dict[str, Any]] = {}
+        _merge(merged, self.snapshot(), include_gauges=True)
+        if self._directory is None or not os.path.isdir(self._directory):
+            return merged
+
+        with self._exclusive():
+            for name in os.listdir(self._directory):
+                pid = _snapshot_pid(name)
+                if pid is None or pid == os.getpid():
+                    continue
+                path = os.path.join(self._directory, name)
+                snapshot = self._read(path)
+                if snapshot is None:
+                    continue
+                if self._process_alive(pid):
+                    _merge(merged, snapshot, include_gauges=True)
+                else:
+                    self._archive(snapshot)
+                    os.remove(path)
+            archive = self._read(os.path.join(self._directory, _ARCHIVE))
+            if archive is not None:
+                _merge(merged, archive, include_gauges=False)
+        return merged
+
+    def render(self) -> str:
+        """Render the aggregated metrics in the Prometheus text exposition format."""
+        return render(self.collect())
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self._directory, f"{pid}.json")
+
+    def _archive(self, snapshot: Dict[str, Dict[str, Any]]) -> None:
+        path = os.path.join(self._directory, _ARCHIVE)
+        archive = self._read(path) or {}
+        _merge(archive, snapshot, include_gauges=False)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(archive, f)
+        os.replace(f"{path}.tmp", path)
+
+    @staticmethod
+    def _read(path: str) -> Dict[str, Dict[str, Any]] | None:
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Serialize archive maintenance between workers scraping at the same time."""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self._directory, _LOCK), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _flush_forever(self) -> None:
+        pid = os.getpid()
+        while self._started_pid == pid:
+            time.sleep(self._flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def _after_fork(self) -> None:
+        # The child starts from zero; the parent's values stay the parent's. Locks may
+        # have been held by other threads at the fork, so they are replaced.
+        self._lock = threading.Lock()
+        with self._lock:
+            metrics = list(self._metrics.values())
+            was_started = self._started_pid is not None
+            self._started_pid = None
+        for metric in metrics:
+            metric._lock = threading.Lock()
+            metric._reset()
+        if was_started:
+            self.start()
+
+
+def _snapshot_pid(filename: str) -> int | None:
+    stem, extension = os.path.splitext(filename)
+    return int(stem) if extension == ".json" and stem.isdigit() else None
+
+
+def _merge(target: Dict[str, Dict[str, Any]], snapshot: Dict[str, Dict[str, Any]], include_gauges: bool) -> None:
+    """Add a snapshot's samples into ``target`` (summing counters, gauges and histogram buckets)."""
+    for name, metric in snapshot.items():
+        if metric["kind"] == GAUGE and not include_gauges:
+            continue
+        entry = target.setdefault(name, {**metric, "samples": []})
+        samples = {tuple(labels): value for labels, value in entry["samples"]}
+        for labels, value in metric["samples"]:
+            key = tuple(labels)
+            if key not in samples:
+                samples[key] = list(value) if isinstance(value, list) else value
+            elif isinstance(value, list):
+                samples[key] = [a + b for a, b in zip(samples[key], value)]
+            else:
+                samples[key] += value
+        entry["samples"] = [[list(key), value] for key, value in samples.items()]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Tuple[str, str] | None = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else f"{int(value)}"
+
+
+def render(metrics: Dict[str, Dict[str, Any]]) -> str:
+    """Render metric snapshots in the Prometheus text exposition format (version 0.0.4).
+
+    Args:
+        metrics (Dict[str, Dict[str, Any]]): Snapshots as returned by ``MetricsRegistry.collect``.
+
+    Returns:
+        str: The exposition text.
+    """
+    lines: List[str] = []
+    for name in sorted(metrics):
+        metric = metrics[name]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        names = metric["labelnames"]
+        for values, value in sorted(metric["samples"]):
+            if metric["kind"] != HISTOGRAM:
+                lines.append(f"{name}{_labels(names, values)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip([*metric["buckets"], "+Inf"], value[:-2]):
+                cumulative += count
+                le = bound if isinstance(bound, str) else _number(bound)
+                lines.append(f"{name}_bucket{_labels(names, values, ('le', le))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(names, values)} {_number(value[-2])}")
+            lines.append(f"{name}_count{_labels(names, values)} {_number(value[-1])}")
+    return "\n".join(lines) + "\n"
+
+
+# Process-wide registry and the application's metrics
+registry = MetricsRegistry(settings.metrics_dir, flush_interval=settings.metrics_flush_seconds)
+
+http_requests_total = registry.counter(
+    "ada_http_requests_total", "HTTP requests by endpoint and outcome.", ("endpoint", "outcome")
+)
+http_request_seconds = registry.histogram(
+    "ada_http_request_seconds", "Time to produce an HTTP response (first byte for streams).", ("endpoint",)
+)
+stage_seconds = registry.histogram(
+    "ada_conversion_stage_seconds",
+    "Latency of each conversion stage (decode, normalize, cache, llm, parse, verify).",
+    ("stage",)
+)
+conversion_cache_lookups_total = registry.counter(
+    "ada_conversion_cache_lookups_total", "Conversion cache lookups by result (memory, disk or miss).", ("result",)
+)
+coalesced_requests_total = registry.counter(
+    "ada_coalesced_requests_total",
+    "Conversions served from an identical in-flight conversion, by where it ran (process or host).",
+    ("scope",),
+)
+conversion_repairs_total = registry.counter(
+    "ada_conversion_repairs_total", "Follow-up requests for sections missing from a structured response.", ("section",)
+)
+model_route_total = registry.counter(
+    "ada_model_route_total", "Converter calls by the model tier their source was routed to.", ("tier",)
+)
+model_route_score = registry.histogram(
+    "ada_model_route_score",
+    "Complexity score of the source routed to each model tier.",
+    ("tier",),
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+model_tier_seconds = registry.histogram(
+    "ada_model_tier_seconds", "Latency of converter calls (including repairs) by model tier.", ("tier",)
+)
+verifications_total = registry.counter(
+    "ada_verifications_total", "Verifications of generated unit tests, by status (passed, failed, ..., cached).",
+    ("status",)
+)
+unit_conversions_total = registry.counter(
+    "ada_unit_conversions_total",
+    "Chunks of chunked conversions, by whether they were converted or reused from an earlier revision.",
+    ("result",)
+)
+similar_conversions_total = registry.counter(
+    "ada_similar_conversions_total",
+    "Similarity index lookups of cache misses: reused (formatting-only difference), adapted "
+    "(converted from a near-duplicate's conversion) or unmatched.",
+    ("result",)
+)
+normalization_tokens_saved_total = registry.counter(
+    "ada_normalization_tokens_saved_total", "Estimated prompt tokens removed by Ada normalization.", ("level",)
+)
+admission_in_flight = registry.gauge(
+    "ada_admission_in_flight", "Admission slots held (upstream calls of admitted conversions).", ()
+)
+admission_queue_depth = registry.gauge(
+    "ada_admission_queue_depth", "Conversions waiting for admission slots.", ()
+)
+admission_wait_seconds = registry.histogram(
+    "ada_admission_wait_seconds", "Time conversions spent queued for admission slots.", ()
+)
+admission_shed_total = registry.counter(
+    "ada_admission_shed_total",
+    "Conversions shed by admission control, by reason (queue_full, timeout or client_limit).",
+    ("reason",)
+)
+llm_calls_in_flight = registry.gauge(
+    "ada_llm_calls_in_flight", "OpenAI calls currently in flight.", ("model",)
+)
+llm_calls_total = registry.counter(
+    "ada_llm_calls_total", "OpenAI calls by model and outcome.", ("model", "outcome")
+)
+llm_hedges_total = registry.counter(
+    "ada_llm_hedges_total", "Hedge requests fired for OpenAI calls with no first token by the deadline.", ("model",)
+)
+llm_hedge_wins_total = registry.counter(
+    "ada_llm_hedge_wins_total", "Hedged OpenAI calls won by the hedge request.", ("model",)
+)
+llm_tokens_total = registry.counter(
+    "ada_llm_tokens_total", "Tokens used by OpenAI calls, by model and kind (prompt or completion).", ("model", "kind")
+)
@@ -0,0 +1,15 @@
+"""Helpers for coordinating the worker processes on one host."""
+
+import os
+
+
+def process_alive(pid: int) -> bool:
+    """Whether a process with the given pid is still running."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists but belongs to another user.
+        return True
+    return True
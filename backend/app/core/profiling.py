@@ -0,0 +1,183 @@
+"""Sampling profiler for single requests, with collapsed-stack output.
+
+A background thread samples the stack of the profiled thread every few
+milliseconds (``sys._current_frames``), so the code under profile runs
+unmodified. Samples are aggregated into collapsed stacks (one
+``frame;frame;frame count`` line per distinct stack, the input of
+flamegraph.pl, speedscope and similar tools) and into wall-clock estimates of
+named spans: the share of samples spent inside each span, times the wall time.
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Tuple
+
+from app.core.config import settings
+
+# Named spans of a conversion request and the functions (module, name) that make them up.
+# A sample counts towards the outermost span function on its stack.
+CONVERSION_SPANS: Dict[str, FrozenSet[Tuple[str, str]]] = {
+    "request": frozenset({
+        ("app.api.v1.endpoints.convert", "get_session_id"),
+        ("app.api.v1.endpoints.convert", "wants_verification"),
+        ("app.api.v1.endpoints.convert", "read_ada_upload"),
+    }),
+    "normalize": frozenset({("app.api.v1.endpoints.convert", "normalize_upload")}),
+    "cache": frozenset({("app.services.conversion_cache", "get")}),
+    # Converting from scratch, or adapting the conversion of a near-duplicate unit
+    "upstream": frozenset({("app.services.ada_converter", "convert"), ("app.services.ada_converter", "adapt")}),
+    "parse": frozenset({("app.api.v1.endpoints.convert", "parse_converter_response")}),
+    "verify": frozenset({("app.api.v1.endpoints.convert", "verify_conversion")}),
+    "serialize": frozenset({("flask.json", "jsonify")}),
+}
+
+PROFILE_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+@dataclass
+class Profile:
+    """The samples of one profiled call."""
+
+    profile_id: str
+    wall_ms: float
+    samples: int
+    stacks: Counter = field(default_factory=Counter)
+    span_samples: Counter = field(default_factory=Counter)
+
+    def spans_ms(self) -> Dict[str, float]:
+        """Estimated wall time of each span, plus ``other`` for samples outside any span."""
+        if not self.samples:
+            return {}
+        spans = {name: round(self.wall_ms * count / self.samples, 1) for name, count in self.span_samples.items()}
+        spans.setdefault("other", 0.0)
+        return spans
+
+    def server_timing(self) -> str:
+        """The spans as a ``Server-Timing`` header value (``total`` first)."""
+        entries = [f"total;dur={self.wall_ms:.1f}"]
+        entries += [f"{name};dur={ms:.1f}" for name, ms in sorted(self.spans_ms().items(), key=lambda item: -item[1])]
+        return ", ".join(entries)
+
+    def collapsed(self) -> str:
+        """The samples in collapsed-stack format, most frequent stack first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class SamplingProfiler:
+    """Sample one thread's stack at a fixed interval while the ``with`` block runs."""
+
+    def __init__(self,
+                 thread_id: int | None = None,
+                 interval: float = 0.005,
+                 spans: Dict[str, FrozenSet[Tuple[str, str]]] | None = None):
+        """Initialize the profiler.
+
+        Args:
+            thread_id (int | None, optional): The thread to sample. Defaults to the thread entering the block.
+            interval (float, optional): Seconds between samples.
+            spans (Dict[str, FrozenSet[Tuple[str, str]]] | None, optional): Named spans to time.
+                Defaults to ``CONVERSION_SPANS``.
+        """
+        self._thread_id = thread_id
+        self._interval = interval
+        self._spans = {function: name for name, functions in (spans or CONVERSION_SPANS).items()
+                       for function in functions}
+        self._stop = threading.Event()
+        self._sampler: threading.Thread | None = None
+        self._started = 0.0
+        self.profile = Profile(profile_id=uuid.uuid4().hex, wall_ms=0.0, samples=0)
+
+    def __enter__(self) -> "SamplingProfiler":
+        if self._thread_id is None:
+            self._thread_id = threading.get_ident()
+        self._started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._sampler.join()
+        self.profile.wall_ms = round((time.perf_counter() - self._started) * 1000, 1)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self._sample(frame)
+
+    def _sample(self, frame) -> None:
+        names: List[str] = []
+        span = None
+        while frame is not None:
+            function = (frame.f_globals.get("__name__", "?"), frame.f_code.co_name)
+            names.append(f"{function[0]}:{function[1]}")
+            # Walking leaf to root, so the last match is the outermost span
+            span = self._spans.get(function, span)
+            frame = frame.f_back
+        names.reverse()
+        self.profile.stacks[";".join(names)] += 1
+        self.profile.span_samples[span or "other"] += 1
+        self.profile.samples += 1
+
+
+class ProfileStore:
+    """Keeps the collapsed stacks of recent profiles as files in a directory."""
+
+    def __init__(self, directory: str, max_profiles: int):
+        """Initialize the store.
+
+        Args:
+            directory (str): Where profiles are written (``<profile_id>.collapsed``).
+            max_profiles (int): How many profiles are kept; the oldest are removed first.
+        """
+        self._directory = directory
+        self._max_profiles = max_profiles
+
+    @classmethod
+    def from_settings(cls) -> "ProfileStore":
+        """Build a profile store configured from application settings."""
+        return cls(directory=settings.profiling_dir, max_profiles=settings.profiling_max_profiles)
+
+    def save(self, profile: Profile) -> None:
+        """Write a profile's collapsed stacks and prune the oldest profiles over the limit."""
+        os.makedirs(self._directory, exist_ok=True)
+        path = self._path(profile.profile_id)
+        with open(path + ".tmp", "w", encoding="utf-8") as output:
+            output.write(profile.collapsed())
+        os.replace(path + ".tmp", path)
+        self._prune()
+
+    def read(self, profile_id: str) -> str | None:
+        """Get a stored profile's collapsed stacks, or None if it is unknown or pruned."""
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        try:
+            with open(self._path(profile_id), encoding="utf-8") as source:
+                return source.read()
+        except FileNotFoundError:
+            return None
+
+    def _path(self, profile_id: str) -> str:
+        return os.path.join(self._directory, f"{profile_id}.collapsed")
+
+    def _prune(self) -> None:
+        paths = []
+        for name in os.listdir(self._directory):
+            if name.endswith(".collapsed"):
+                path = os.path.join(self._directory, name)
+                try:
+                    paths.append((os.path.getmtime(path), path))
+                except FileNotFoundError:
+                    continue
+        for _, path in sorted(paths)[:max(0, len(paths) - self._max_profiles)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,48 @@
+"""Helpers for SQLite databases shared by worker processes on the same host."""
+
+import os
+import sqlite3
+import threading
+from typing import Sequence
+
+
+class SQLiteConnections:
+    """Lazily opened SQLite connections, one per thread and per process.
+
+    SQLite connections must not be shared across threads or inherited across a
+    fork, so each thread of each worker opens its own. The database file (and its
+    directory) is created on first use and the schema statements are applied then.
+    """
+
+    def __init__(self, path: str, schema: Sequence[str] = ()):
+        """Initialize the connection factory.
+
+        Args:
+            path (str): Path of the database file.
+            schema (Sequence[str], optional): Idempotent statements (e.g. ``CREATE TABLE IF NOT EXISTS``)
+                run on every new connection.
+        """
+        self._path = path
+        self._schema = tuple(schema)
+        self._local = threading.local()
+
+    @property
+    def path(self) -> str:
+        """Path of the database file."""
+        return self._path
+
+    def get(self) -> sqlite3.Connection:
+        """Get the calling thread's connection, opening it if needed."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None or getattr(self._local, "pid", None) != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Autocommit mode; WAL lets readers proceed while another worker writes.
+            connection = sqlite3.connect(self._path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            for statement in self._schema:
+                connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
@@ -0,0 +1,21 @@
+"""Lightweight token estimation helpers."""
+
+# Roughly four characters per token for English prose and source code.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str | None) -> int:
+    """Estimate how many tokens a piece of text will consume.
+
+    This is a cheap heuristic used where exact counts from the API are not
+    available (e.g. before a request is sent).
+
+    Args:
+        text (str | None): The text to estimate.
+
+    Returns:
+        int: The estimated token count.
+    """
+    if not text:
+        return 0
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
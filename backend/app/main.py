@@ -1,7 +1,35 @@
+import asyncio
+import importlib
+import threading
+import time
 from flask import Flask
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from app.core.config import settings
 from app.api.v1 import api_v1
+from app.api.compression import init_compression
+from app.api.metrics import METRICS_CONTENT_TYPE, init_metrics, observe_request
+from app.api.uploads import UploadRequest
+from app.core import metrics
+from app.core.exceptions import ConfigurationError
+
+# Modules imported in the gunicorn master rather than on each worker's first conversion
+PRELOADED_MODULES = (
+    "app.api.v1",
+    "app.services.ada_converter",
+    "app.services.openai_transport",
+    # Imported on first use by the SDK (its API resources) and by httpx (its connection pool)
+    "openai.resources",
+    "httpcore",
+)
+
+# Enable CORS for frontend
+CORS_ORIGINS = [
+    "http://localhost:5173",  # Local development
+    "http://localhost:3000",  # Alternative local port
+    "https://*.netlify.app",  # Netlify deployments
+    # Add your production frontend URL here
+]
 
 
 def create_app() -> Flask:
@@ -11,28 +39,134 @@ def create_app() -> Flask:
     
     app = Flask(__name__)
     app.config['MAX_CONTENT_LENGTH'] = settings.max_file_size
-    
-    # Enable CORS for frontend
-    cors_origins = [
-        "http://localhost:5173",  # Local development
-        "http://localhost:3000",  # Alternative local port
-        "https://*.netlify.app",  # Netlify deployments
-        # Add your production frontend URL here
-    ]
+    # Uploads are decoded or spooled to disk as they arrive (see UploadRequest)
+    app.request_class = UploadRequest
+    # Behind a proxy every request comes from the proxy: take the client from X-Forwarded-For
+    if settings.trusted_proxy_hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=settings.trusted_proxy_hops,
+                                x_proto=settings.trusted_proxy_hops)
     
     CORS(app, 
-         origins=cors_origins if not settings.debug else "*",
-         methods=['GET', 'POST', 'OPTIONS'],
-         allow_headers=['Content-Type', 'Authorization'],
+         origins=CORS_ORIGINS if not settings.debug else "*",
+         methods=['GET', 'POST', 'DELETE', 'OPTIONS'],
+         allow_headers=['Content-Type', 'Authorization', 'X-Session-Id', 'X-API-Key', 'If-None-Match', 'X-Profile'],
+         expose_headers=['X-Cache', 'Location', 'Retry-After', 'ETag', 'Server-Timing', 'X-Profile-Id'],
          supports_credentials=False)
     
     # Register blueprints
     app.register_blueprint(api_v1)
     
+    if settings.compression_enabled:
+        init_compression(app)
+    
+    if settings.metrics_enabled:
+        init_metrics(app)
+    
+    # Open pooled OpenAI connections in the background so the first conversion skips the handshake
+    if settings.openai_prewarm:
+        from app.services.openai_transport import prewarm
+        threading.Thread(
+            target=prewarm,
+            args=(settings.openai_base_url, min(4, settings.openai_max_connections)),
+            name="openai-prewarm",
+            daemon=True
+        ).start()
+    
+    # Start the verification forkserver now rather than on the first verify=true request
+    if settings.verification_enabled:
+        from app.api.v1.endpoints.convert import verifier
+        verifier.warm()
     
     return app
 
 
+def create_async_app():
+    """Create and configure the async (ASGI) Quart application.
+    
+    Serves the convert endpoints (``/api/v1/convert`` and ``/api/v1/convert/stream``)
+    on ``AsyncOpenAI``, so a worker holds hundreds of conversions in flight on one
+    event loop instead of one per thread. Run it with an ASGI server, e.g.
+    ``hypercorn "app.main:create_async_app()"``; the other endpoints remain on the
+    Flask app from ``create_app``.
+    
+    Raises:
+        ConfigurationError: If the optional async dependencies are not installed.
+    """
+    settings.validate()
+    
+    try:
+        from quart import Quart
+        from quart_cors import cors
+        from app.api.v1.asgi import async_api_v1
+    except ImportError as e:
+        raise ConfigurationError(
+            "The async app requires the 'async' extras (pip install quart quart-cors hypercorn)"
+        ) from e
+    
+    app = Quart(__name__)
+    app.config['MAX_CONTENT_LENGTH'] = settings.max_file_size
+    if settings.trusted_proxy_hops:
+        from hypercorn.middleware import ProxyFixMiddleware
+        app.asgi_app = ProxyFixMiddleware(app.asgi_app, mode="legacy",
+                                          trusted_hops=settings.trusted_proxy_hops)
+    
+    app = cors(app,
+               allow_origin=CORS_ORIGINS if not settings.debug else "*",
+               allow_methods=['GET', 'POST', 'DELETE', 'OPTIONS'],
+               allow_headers=['Content-Type', 'Authorization', 'X-Session-Id', 'X-API-Key'],
+               expose_headers=['X-Cache', 'Location', 'Retry-After'])
+    
+    app.register_blueprint(async_api_v1)
+    
+    if settings.metrics_enabled:
+        from quart import Response, g, request
+        
+        @app.before_request
+        async def start_request_timer():
+            g.request_started = time.perf_counter()
+        
+        @app.after_request
+        async def record_request(response):
+            started = g.pop('request_started', None)
+            if started is not None and request.endpoint != 'metrics':
+                observe_request(request.endpoint, response.status_code, time.perf_counter() - started)
+            return response
+        
+        @app.route('/metrics', methods=['GET'])
+        async def metrics_view():
+            # Reading the other workers' snapshots touches the disk; keep it off the event loop
+            body = await asyncio.to_thread(metrics.registry.render)
+            return Response(body, content_type=METRICS_CONTENT_TYPE)
+        
+        metrics.registry.start()
+    
+    from app.services.openai_transport import prewarm_async, shared_async_http_client
+    
+    @app.before_serving
+    async def open_connections():
+        if settings.openai_prewarm:
+            app.add_background_task(
+                prewarm_async, settings.openai_base_url, min(16, settings.openai_async_max_connections)
+            )
+    
+    @app.after_serving
+    async def close_connections():
+        await shared_async_http_client().aclose()
+    
+    return app
+
+
+def preload_modules() -> None:
+    """Import the modules the app defers until first use (the converter and the OpenAI SDK).
+    
+    Called in the gunicorn master (see gunicorn.conf.py), so workers fork with
+    them already imported and a new or recycled worker is ready at once. Only
+    modules are loaded: clients and connections are still created in each worker.
+    """
+    for module in PRELOADED_MODULES:
+        importlib.import_module(module)
+
+
 def main():
     """Run the Flask application."""
     app = create_app()
@@ -1,36 +1,534 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List
+from app.core import metrics
+from app.core.config import settings
+from app.core.tokens import estimate_tokens
+from app.services.ada_segmenter import ChunkPlan, plan_chunks
+from app.services.async_openai_client import AsyncOpenAIClient
+from app.services.conversation_store import ConversationStore
+from app.services.conversion_cache import ConversionCache, conversion_key
+from app.services.model_router import ModelRouter, Route
 from app.services.openai_client import OpenAIClient
+from app.services.section_parser import (
+    SECTION_HEADERS,
+    format_sections,
+    format_structured,
+    missing_sections,
+    parse_response,
+    section_schema,
+)
+
+# Response formats the model can be asked for
+SECTIONS = "sections"        # "# Logic", "# Unit Test" and "# Python Code" headers
+JSON = "json"                # a JSON object (JSON mode), validated against the section schema
+JSON_SCHEMA = "json_schema"  # a JSON object the API constrains to the section schema (structured outputs)
+OUTPUT_MODES = (SECTIONS, JSON, JSON_SCHEMA)
+
+logger = logging.getLogger(__name__)
 
 
 class AdaConverter:
-    """A converter for transforming Ada programming language code to Python."""
+    """A converter for transforming Ada programming language code to Python.
+    
+    Each prompt is sent to the model tier its source is routed to (see
+    ``ModelRouter``); with MODEL_TIERS unset there is a single tier on the
+    default model.
+    
+    With a ``unit_cache``, chunked conversions are incremental: every subprogram
+    body is a chunk of its own and each chunk's response is cached, so when an
+    edited revision of a file is converted only the chunks that changed are sent
+    to the model. Chunks are keyed on their prompt, which includes the unit's
+    declarations, so editing a declaration re-converts every chunk.
+    """
     
-    def __init__(self):
-        """Initialize the AdaConverter with the appropriate system prompt."""
-        system_prompt = (
-            "You are a helpful code convertion agent. "
+    def __init__(self,
+                 output_mode: str | None = None,
+                 router: ModelRouter | None = None,
+                 unit_cache: ConversionCache | None = None):
+        """Initialize the AdaConverter with the appropriate system prompt.
+        
+        Args:
+            output_mode (str | None, optional): One of ``OUTPUT_MODES``. Defaults to CONVERSION_OUTPUT_MODE.
+            router (ModelRouter | None, optional): Chooses the model tier for each prompt.
+                Defaults to a router configured from MODEL_TIERS.
+            unit_cache (ConversionCache | None, optional): Where chunk responses are kept for
+                incremental re-conversion. None converts every chunk afresh.
+        
+        Raises:
+            ValueError: If the output mode is unknown or MODEL_TIERS is invalid.
+        """
+        self.output_mode = output_mode or settings.conversion_output_mode
+        if self.output_mode not in OUTPUT_MODES:
+            raise ValueError(
+                f"Unknown conversion output mode {self.output_mode!r}; expected one of {', '.join(OUTPUT_MODES)}"
+            )
+        
+        instructions = (
+            "You are a helpful code conversion agent. "
             "You will convert code written in Ada programming language into python. "
-            "You will firt describe the logic within Ada code. "
+            "You will first describe the logic within Ada code. "
             "You will then convert the code into Python, while maintaining overall structure as much as possible. "
-            "You will then write unit tests by reverse-engineering the python code."
-            "You will return the response in the following format: "
-            "# Logc"
-            "<logic wihtin the original Ada code>"
-            "# Unit Tests"
-            "<Unit Tests written in Python based on the extracted logc>"
-            "# Python Code"
-            "<Resulting Python Code>"
+            "You will then write unit tests by reverse-engineering the python code. "
         )
+        if self.output_mode == SECTIONS:
+            system_prompt = instructions + (
+                "You will return the response in the following format:\n"
+                "# Logic\n"
+                "<logic within the original Ada code>\n"
+                "# Unit Test\n"
+                "<Unit Tests written in Python based on the extracted logic>\n"
+                "# Python Code\n"
+                "<Resulting Python Code>"
+            )
+        else:
+            system_prompt = instructions + (
+                "You will return the response as a JSON object with the following string fields: "
+                "\"logic\": <logic within the original Ada code>, "
+                "\"unit_tests\": <Unit Tests written in Python based on the extracted logic>, "
+                "\"python_code\": <Resulting Python Code>."
+            )
         
-        self.client = OpenAIClient(system_prompt=system_prompt)
+        self.router = router if router is not None else ModelRouter.from_settings()
+        self.unit_cache = unit_cache if unit_cache is not None and unit_cache.enabled else None
+        self.clients: Dict[str, OpenAIClient] = {}
+        conversations = None
+        for tier in self.router.tiers:
+            # Every tier shares one conversation store, so a session can move between tiers
+            client = self._create_client(system_prompt, tier.model, conversations)
+            conversations = client.conversations
+            self.clients[tier.name] = client
+        self.client = self.clients[self.router.tiers[0].name]
+    
+    def _create_client(self,
+                       system_prompt: str,
+                       model: str | None = None,
+                       conversation_store: ConversationStore | None = None) -> OpenAIClient:
+        return OpenAIClient(system_prompt=system_prompt, **self._client_options(model, conversation_store))
+    
+    @staticmethod
+    def _client_options(model: str | None, conversation_store: ConversationStore | None) -> Dict[str, Any]:
+        options: Dict[str, Any] = {}
+        if model is not None:
+            options["model"] = model
+        if conversation_store is not None:
+            options["conversation_store"] = conversation_store
+        return options
+    
+    @property
+    def model(self) -> str:
+        """Get the model performing conversions.
+        
+        With several model tiers this describes the tiers instead (see ``ModelRouter.signature``).
+        """
+        if len(self.clients) > 1:
+            return self.router.signature
+        return self.client.model
     
-    def convert(self, code: str) -> str:
+    @property
+    def system_prompt(self) -> str:
+        """Get the system prompt used for conversions."""
+        return self.client.system_prompt
+    
+    def convert(self, code: str, session_id: str | None = None, dependencies: str | None = None) -> str:
         """Convert Ada code to Python.
         
+        Conversions are single-shot unless a session id is given, in which case
+        earlier conversions in the same session are sent along as context. Large
+        single-shot conversions are split into chunks that are converted concurrently
+        (see ``chunk_plan``) and stitched back into one response.
+        
+        Args:
+            code (str): The Ada code to convert.
+            session_id (str | None, optional): Conversation session to continue. Defaults to None.
+            dependencies (str | None, optional): The Python interfaces of units the code depends on
+                that are already converted (see ``ada_dependencies.dependency_context``).
+            
+        Returns:
+            str: The converted Python code.
+        """
+        prompt = self._prompt(code, dependencies)
+        if session_id is None:
+            plan = self.chunk_plan(code)
+            if plan is not None:
+                return self._convert_chunks(plan, dependencies)
+            return self._send(prompt, self.router.route(code))
+        return self._send(prompt, self.router.route(code), session_id=session_id)
+    
+    def adapt(self, code: str, reference_code: str, reference_response: str, dependencies: str | None = None) -> str:
+        """Convert Ada code that nearly duplicates an already converted unit, by editing that conversion.
+        
+        The model is shown the earlier unit and its response and asked to carry the
+        differences (names, literals, the odd statement) over, which keeps copy-pasted
+        units consistent with each other. The prompt is never chunked.
+        
+        Args:
+            code (str): The Ada code to convert.
+            reference_code (str): The similar unit converted earlier (see ``SimilarityIndex``).
+            reference_response (str): The converter's response for it.
+            dependencies (str | None, optional): The Python interfaces of already converted dependencies.
+            
+        Returns:
+            str: The converted Python code.
+        """
+        return self._send(self._adapt_prompt(code, reference_code, reference_response, dependencies),
+                          self.router.route(code))
+    
+    def _send(self, prompt: str, route: Route, **options: Any) -> str:
+        """Send one conversion prompt to its routed tier; structured responses are validated and
+        missing sections repaired."""
+        client = self.clients[route.tier.name]
+        tier_options = route.tier.request_options()
+        with self._routed_call(route):
+            response = client.send_message(prompt, **options, **tier_options, **self._format_options())
+            if self.output_mode == SECTIONS:
+                return response
+            
+            sections = parse_response(response)
+            for _ in range(settings.conversion_max_repairs):
+                missing = missing_sections(sections)
+                if not missing:
+                    break
+                repair_prompt, repair_options = self._repair_request(prompt, missing)
+                self._merge_repair(sections, missing,
+                                   client.send_message(repair_prompt, **tier_options, **repair_options))
+            return format_structured(sections)
+    
+    @contextmanager
+    def _routed_call(self, route: Route) -> Iterator[None]:
+        """Record the tier a prompt was routed to, the score it was routed on and how long it took.
+        
+        Together these show whether a tier's ``max_score`` is worth its latency, so
+        routing thresholds can be tuned from data.
+        """
+        tier = route.tier.name
+        metrics.model_route_total.inc(tier=tier)
+        metrics.model_route_score.observe(route.complexity.score, tier=tier)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            yield
+            outcome = "success"
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.model_tier_seconds.observe(elapsed, tier=tier)
+            complexity = route.complexity
+            logger.info(
+                "Conversion routed to tier %s (%s): score=%.2f tokens=%d subprograms=%d generics=%d "
+                "tasking=%d outcome=%s seconds=%.3f",
+                tier, self.clients[tier].model, complexity.score, complexity.tokens, complexity.subprograms,
+                complexity.generics, complexity.tasking, outcome, elapsed
+            )
+    
+    def _format_options(self, fields: List[str] | None = None) -> Dict[str, Any]:
+        """Request options asking the API for the output mode's response format."""
+        if self.output_mode == JSON:
+            return {"response_format": {"type": "json_object"}}
+        if self.output_mode == JSON_SCHEMA:
+            schema = section_schema(fields or list(SECTION_HEADERS))
+            return {"response_format": {
+                "type": "json_schema",
+                "json_schema": {"name": "ada_conversion", "strict": True, "schema": schema},
+            }}
+        return {}
+    
+    def _repair_request(self, prompt: str, missing: List[str]) -> tuple[str, Dict[str, Any]]:
+        """Build the follow-up request for the sections a structured response left out.
+        
+        The follow-up is stateless, so a session's history only records the original exchange.
+        """
+        for field in missing:
+            metrics.conversion_repairs_total.inc(section=field)
+        fields = ", ".join(f'"{field}"' for field in missing)
+        repair_prompt = (
+            prompt + "\n\n"
+            f"A previous answer to this request left out {fields}. "
+            f"Return a JSON object with only these fields."
+        )
+        return repair_prompt, self._format_options(missing)
+    
+    @staticmethod
+    def _merge_repair(sections: Dict[str, str], missing: List[str], response: str) -> None:
+        """Fill missing sections from a repair response, leaving the sections already received alone."""
+        repaired = parse_response(response)
+        for field in missing:
+            if repaired[field].strip():
+                sections[field] = repaired[field]
+    
+    def convert_stream(self, code: str, session_id: str | None = None) -> Iterator[str]:
+        """Convert Ada code to Python, streaming the response as it is generated.
+        
+        Args:
+            code (str): The Ada code to convert.
+            session_id (str | None, optional): Conversation session to continue. Defaults to None.
+            
+        Yields:
+            str: Successive fragments of the structured converter response. Chunked
+                conversions yield the stitched response once every chunk is done.
+                Streamed responses are passed through as generated, so missing
+                sections are not repaired.
+        """
+        if session_id is None:
+            plan = self.chunk_plan(code)
+            if plan is not None:
+                yield self._convert_chunks(plan)
+                return
+        route = self.router.route(code)
+        with self._routed_call(route):
+            yield from self.clients[route.tier.name].stream_message(
+                self._prompt(code), session_id=session_id, **route.tier.request_options(), **self._format_options()
+            )
+    
+    def chunk_plan(self, code: str) -> ChunkPlan | None:
+        """Decide whether to split a conversion into chunks.
+        
+        Args:
+            code (str): The Ada code to convert.
+            
+        Returns:
+            ChunkPlan | None: The chunks to convert, or None to convert the code in one prompt.
+        """
+        if not settings.chunking_enabled or estimate_tokens(code) <= settings.chunk_threshold_tokens:
+            return None
+        plan = plan_chunks(
+            code,
+            max_chunk_tokens=settings.chunk_max_tokens,
+            max_context_tokens=settings.chunk_context_max_tokens,
+            split_bodies=self.unit_cache is not None
+        )
+        return plan if len(plan.chunks) > 1 else None
+    
+    def concurrent_calls(self, code: str) -> int:
+        """How many upstream calls a single-shot conversion of ``code`` makes at once.
+        
+        Chunked conversions send up to CHUNK_CONCURRENCY chunks together; admission
+        control weighs a conversion by this.
+        """
+        plan = self.chunk_plan(code)
+        return 1 if plan is None else max(1, min(settings.chunk_concurrency, len(plan.chunks)))
+    
+    def _convert_chunks(self, plan: ChunkPlan, dependencies: str | None = None) -> str:
+        """Convert chunks concurrently and stitch their sections together in source order.
+        
+        Chunks converted before (see ``unit_cache``) are reused instead of sent again.
+        """
+        prompts = [self._chunk_prompt(plan.context, chunk, dependencies) for chunk in plan.chunks]
+        responses = [self._reuse_unit(prompt) for prompt in prompts]
+        pending = [index for index, response in enumerate(responses) if response is None]
+        # Each chunk is routed on its own code, not the context shown with it
+        routes = [self.router.route(plan.chunks[index]) for index in pending]
+        with ThreadPoolExecutor(max_workers=max(1, min(settings.chunk_concurrency, len(pending))),
+                                thread_name_prefix="convert-chunk") as executor:
+            converted = executor.map(self._send, [prompts[index] for index in pending], routes)
+            for index, response in zip(pending, converted):
+                responses[index] = response
+                self._store_unit(prompts[index], response)
+        self._record_units(len(prompts), len(pending))
+        return self._stitch(responses)
+    
+    def _unit_key(self, prompt: str) -> str:
+        return conversion_key(prompt, str(self.model), str(self.system_prompt))
+    
+    def _reuse_unit(self, prompt: str) -> str | None:
+        """Get the cached response to a chunk prompt, if it has been converted before."""
+        if self.unit_cache is None:
+            return None
+        cached = self.unit_cache.get(self._unit_key(prompt))
+        return cached[0] if cached is not None else None
+    
+    def _store_unit(self, prompt: str, response: str) -> None:
+        if self.unit_cache is not None:
+            self.unit_cache.set(self._unit_key(prompt), response, model=str(self.model))
+    
+    def _record_units(self, total: int, converted: int) -> None:
+        metrics.unit_conversions_total.inc(total - converted, result="reused")
+        metrics.unit_conversions_total.inc(converted, result="converted")
+        if self.unit_cache is not None:
+            logger.info("Incremental conversion: %d of %d chunks reused", total - converted, total)
+    
+    def _stitch(self, responses: List[str]) -> str:
+        """Merge chunk responses section by section, in source order."""
+        parsed = [parse_response(response) for response in responses]
+        sections = {
+            field: "\n\n".join(sections[field] for sections in parsed if sections[field])
+            for field in SECTION_HEADERS
+        }
+        return format_sections(sections) if self.output_mode == SECTIONS else format_structured(sections)
+    
+    @staticmethod
+    def _prompt(code: str, dependencies: str | None = None) -> str:
+        if dependencies:
+            return (
+                "Convert the following Ada code into Python\n"
+                + AdaConverter._dependencies_section(dependencies)
+                + "-- Code to convert\n" + code
+            )
+        return "Convert the following Ada code into Python\n" + code
+    
+    @staticmethod
+    def _chunk_prompt(context: str, chunk: str, dependencies: str | None = None) -> str:
+        return (
+            "Convert the following Ada code into Python\n"
+            + (AdaConverter._dependencies_section(dependencies) if dependencies else "") +
+            "It is one part of a larger compilation unit. The unit's context clauses and "
+            "declarations are shown first for reference; only convert the code after "
+            "\"-- Code to convert\".\n"
+            "-- Context\n" + context + "\n"
+            "-- Code to convert\n" + chunk
+        )
+    
+    @staticmethod
+    def _dependencies_section(dependencies: str) -> str:
+        return (
+            "It depends on units of the same project that are already converted. Their Python "
+            "interfaces are shown first for reference; use them instead of redefining them.\n"
+            "-- Converted dependencies\n" + dependencies + "\n"
+        )
+    
+    @staticmethod
+    def _adapt_prompt(code: str, reference_code: str, reference_response: str, dependencies: str | None = None) -> str:
+        return (
+            "Convert the following Ada code into Python\n"
+            + (AdaConverter._dependencies_section(dependencies) if dependencies else "") +
+            "It is a near copy of an Ada unit that was already converted; that unit and its "
+            "conversion are shown first. Adapt the existing conversion to the differences in the "
+            "code to convert (names, literals, statements), keeping its structure and format.\n"
+            "-- Converted unit\n" + reference_code + "\n"
+            "-- Its conversion\n" + reference_response + "\n"
+            "-- Code to convert\n" + code
+        )
+    
+    def session_stats(self, session_id: str) -> dict | None:
+        """Get token accounting for a conversion session.
+        
+        Args:
+            session_id (str): The conversation session identifier.
+            
+        Returns:
+            dict | None: The session summary, or None if the session does not exist.
+        """
+        return self.client.conversations.stats(session_id)
+    
+    def end_session(self, session_id: str) -> bool:
+        """Discard a conversion session's history.
+        
+        Args:
+            session_id (str): The conversation session identifier.
+            
+        Returns:
+            bool: True if the session existed.
+        """
+        return self.client.conversations.drop(session_id)
+
+
+class AsyncAdaConverter(AdaConverter):
+    """An ``AdaConverter`` for event loops: conversions are coroutines backed by ``AsyncOpenAIClient``.
+    
+    Prompts, chunking and session handling are the same as the synchronous converter.
+    """
+    
+    def _create_client(self,
+                       system_prompt: str,
+                       model: str | None = None,
+                       conversation_store: ConversationStore | None = None) -> AsyncOpenAIClient:
+        return AsyncOpenAIClient(system_prompt=system_prompt, **self._client_options(model, conversation_store))
+    
+    async def convert(self, code: str, session_id: str | None = None, dependencies: str | None = None) -> str:
+        """Convert Ada code to Python (see ``AdaConverter.convert``).
+        
         Args:
             code (str): The Ada code to convert.
+            session_id (str | None, optional): Conversation session to continue. Defaults to None.
+            dependencies (str | None, optional): The Python interfaces of already converted dependencies.
             
         Returns:
             str: The converted Python code.
         """
-        prompt = "Convert the following Ada code into Python\n" + code
-        return self.client.send_message(prompt)
\ No newline at end of file
+        prompt = self._prompt(code, dependencies)
+        if session_id is None:
+            plan = self.chunk_plan(code)
+            if plan is not None:
+                return await self._convert_chunks(plan, dependencies)
+            return await self._send(prompt, self.router.route(code))
+        return await self._send(prompt, self.router.route(code), session_id=session_id)
+    
+    async def adapt(self,
+                    code: str,
+                    reference_code: str,
+                    reference_response: str,
+                    dependencies: str | None = None) -> str:
+        """Convert Ada code by editing a near-duplicate's conversion (see ``AdaConverter.adapt``).
+        
+        Returns:
+            str: The converted Python code.
+        """
+        return await self._send(self._adapt_prompt(code, reference_code, reference_response, dependencies),
+                                self.router.route(code))
+    
+    async def _send(self, prompt: str, route: Route, **options: Any) -> str:
+        """Send one conversion prompt to its routed tier (see ``AdaConverter._send``)."""
+        client = self.clients[route.tier.name]
+        tier_options = route.tier.request_options()
+        with self._routed_call(route):
+            response = await client.send_message(prompt, **options, **tier_options, **self._format_options())
+            if self.output_mode == SECTIONS:
+                return response
+            
+            sections = parse_response(response)
+            for _ in range(settings.conversion_max_repairs):
+                missing = missing_sections(sections)
+                if not missing:
+                    break
+                repair_prompt, repair_options = self._repair_request(prompt, missing)
+                self._merge_repair(sections, missing,
+                                   await client.send_message(repair_prompt, **tier_options, **repair_options))
+            return format_structured(sections)
+    
+    async def convert_stream(self, code: str, session_id: str | None = None) -> AsyncIterator[str]:
+        """Convert Ada code to Python, streaming the response as it is generated (see ``AdaConverter.convert_stream``).
+        
+        Args:
+            code (str): The Ada code to convert.
+            session_id (str | None, optional): Conversation session to continue. Defaults to None.
+            
+        Yields:
+            str: Successive fragments of the structured converter response.
+        """
+        if session_id is None:
+            plan = self.chunk_plan(code)
+            if plan is not None:
+                yield await self._convert_chunks(plan)
+                return
+        route = self.router.route(code)
+        with self._routed_call(route):
+            async for fragment in self.clients[route.tier.name].stream_message(
+                self._prompt(code), session_id=session_id, **route.tier.request_options(), **self._format_options()
+            ):
+                yield fragment
+    
+    async def _convert_chunks(self, plan: ChunkPlan, dependencies: str | None = None) -> str:
+        """Convert chunks concurrently (at most CHUNK_CONCURRENCY at a time) and stitch them together.
+        
+        Chunks converted before (see ``unit_cache``) are reused instead of sent again.
+        """
+        semaphore = asyncio.Semaphore(max(1, settings.chunk_concurrency))
+        converted = 0
+        
+        async def convert_chunk(chunk: str) -> str:
+            nonlocal converted
+            prompt = self._chunk_prompt(plan.context, chunk, dependencies)
+            response = self._reuse_unit(prompt)
+            if response is not None:
+                return response
+            async with semaphore:
+                response = await self._send(prompt, self.router.route(chunk))
+            self._store_unit(prompt, response)
+            converted += 1
+            return response
+        
+        responses = await asyncio.gather(*(convert_chunk(chunk) for chunk in plan.chunks))
+        self._record_units(len(plan.chunks), converted)
+        return self._stitch(list(responses))
@@ -0,0 +1,401 @@
+import ast
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Mapping, Sequence, Tuple
+
+from app.core.config import settings
+from app.core.sqlite import SQLiteConnections
+from app.core.tokens import estimate_tokens
+from app.services.ada_lexer import SYMBOL, WORD, Token, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Words that can start the library item after the context clause
+_UNIT_KEYWORDS = ("package", "procedure", "function")
+
+_SIGNATURE_LINE = re.compile(r"^\s*(async\s+def|def|class)\s+\w+")
+
+
+@dataclass(frozen=True)
+class AdaUnit:
+    """The library unit a source file declares, with what it depends on.
+
+    Names are lower case (Ada names are case-insensitive) and fully qualified,
+    e.g. ``shapes.circles`` for a child unit.
+    """
+
+    filename: str
+    name: str
+    is_spec: bool
+    withs: Tuple[str, ...] = ()
+    separate_from: str | None = None
+
+
+def scan_unit(filename: str, source: str) -> AdaUnit | None:
+    """Find the library unit a file declares: its name, whether it is a spec, and its ``with`` clauses.
+
+    ``limited with`` clauses are left out: they may be circular and do not need
+    the other unit converted first. Only the first unit of a file is considered.
+
+    Args:
+        filename (str): The file's name (used only to label the unit).
+        source (str): The Ada source.
+
+    Returns:
+        AdaUnit | None: The unit, or None if no library unit was found.
+    """
+    tokens = tokenize(source)
+    withs: List[str] = []
+    position = 0
+
+    # Context clause: with, use and pragma items
+    while position < len(tokens):
+        word = _word(tokens, position)
+        if word == "limited" or (word == "private" and _word(tokens, position + 1) in ("with", "limited")):
+            limited = word == "limited" or _word(tokens, position + 1) == "limited"
+            position = _skip_to(tokens, position, "with")
+            names, position = _names_until_semicolon(tokens, position + 1)
+            if not limited:
+                withs.extend(names)
+        elif word == "with":
+            names, position = _names_until_semicolon(tokens, position + 1)
+            withs.extend(names)
+        elif word in ("use", "pragma"):
+            position = _skip_to(tokens, position, ";") + 1
+        else:
+            break
+
+    separate_from = None
+    if _word(tokens, position) == "separate" and _symbol(tokens, position + 1) == "(":
+        separate_from, position = _name(tokens, position + 2)
+        position += 1  # the closing parenthesis
+    if _word(tokens, position) == "private":
+        position += 1
+    if _word(tokens, position) == "generic":
+        # Skip the formal part: the unit's keyword is the first one not introduced by "with"
+        position += 1
+        while position < len(tokens) and not (
+                _word(tokens, position) in _UNIT_KEYWORDS and _word(tokens, position - 1) != "with"):
+            position += 1
+
+    keyword = _word(tokens, position)
+    if keyword not in _UNIT_KEYWORDS:
+        return None
+    position += 1
+    is_body = _word(tokens, position) == "body"
+    if is_body:
+        position += 1
+    name, position = _name(tokens, position)
+    if not name:
+        return None
+    if keyword != "package":
+        is_body = _subprogram_has_body(tokens, position)
+    if separate_from is not None:
+        name, is_body = f"{separate_from}.{name}", True
+
+    return AdaUnit(filename=filename, name=name, is_spec=not is_body,
+                   withs=tuple(dict.fromkeys(withs)), separate_from=separate_from)
+
+
+def _word(tokens: Sequence[Token], position: int) -> str | None:
+    if 0 <= position < len(tokens) and tokens[position].kind == WORD:
+        return tokens[position].lower
+    return None
+
+
+def _symbol(tokens: Sequence[Token], position: int) -> str | None:
+    if 0 <= position < len(tokens) and tokens[position].kind == SYMBOL:
+        return tokens[position].text
+    return None
+
+
+def _skip_to(tokens: Sequence[Token], position: int, text: str) -> int:
+    while position < len(tokens) and tokens[position].lower != text:
+        position += 1
+    return position
+
+
+def _name(tokens: Sequence[Token], position: int) -> Tuple[str, int]:
+    """Read a (possibly dotted) name, returning it in lower case and the position after it."""
+    parts = []
+    while _word(tokens, position) is not None:
+        parts.append(tokens[position].lower)
+        if _symbol(tokens, position + 1) != ".":
+            return ".".join(parts), position + 1
+        position += 2
+    return ".".join(parts), position
+
+
+def _names_until_semicolon(tokens: Sequence[Token], position: int) -> Tuple[List[str], int]:
+    names = []
+    while position < len(tokens) and _symbol(tokens, position) != ";":
+        if _word(tokens, position) is not None:
+            name, position = _name(tokens, position)
+            names.append(name)
+        else:
+            position += 1
+    return names, position + 1
+
+
+def _subprogram_has_body(tokens: Sequence[Token], position: int) -> bool:
+    """Whether a subprogram, from just after its name, is a body (``is ... begin``) rather than a
+    declaration, renaming or instantiation."""
+    depth = 0
+    while position < len(tokens):
+        text = tokens[position].lower
+        if text == "(":
+            depth += 1
+        elif text == ")":
+            depth -= 1
+        elif depth == 0 and text == ";":
+            return False
+        elif depth == 0 and text == "is":
+            return _word(tokens, position + 1) not in ("new", "abstract", "separate") and \
+                _symbol(tokens, position + 1) != "("
+        position += 1
+    return False
+
+
+def _ancestors(name: str) -> List[str]:
+    """``a.b.c`` and the parent units it implies: ``a`` and ``a.b``."""
+    parts = name.split(".")
+    return [".".join(parts[:end]) for end in range(1, len(parts) + 1)]
+
+
+class DependencyGraph:
+    """Dependencies between the files of an Ada project.
+
+    A file depends on the specs of the units it ``with``s (and of their parent
+    units), a child unit on its parent's spec, a body on its own spec and a
+    subunit (``separate``) on its parent body. Dependencies on units outside the
+    project (e.g. ``Ada.Text_IO``) are ignored.
+    """
+
+    def __init__(self, units: Dict[str, AdaUnit | None], dependencies: Dict[str, Tuple[str, ...]]):
+        """Initialize the graph.
+
+        Args:
+            units (Dict[str, AdaUnit | None]): The unit of each file (None if none was found).
+            dependencies (Dict[str, Tuple[str, ...]]): The files each file depends on.
+        """
+        self.units = units
+        self.dependencies = dependencies
+
+    @classmethod
+    def build(cls, sources: Mapping[str, str]) -> "DependencyGraph":
+        """Index a project's sources (filename to Ada source) and link its units."""
+        units = {filename: scan_unit(filename, source) for filename, source in sources.items()}
+        specs: Dict[str, str] = {}
+        bodies: Dict[str, str] = {}
+        for filename in sorted(units):
+            unit = units[filename]
+            if unit is not None:
+                (specs if unit.is_spec else bodies).setdefault(unit.name, filename)
+
+        dependencies: Dict[str, Tuple[str, ...]] = {}
+        for filename, unit in units.items():
+            needed = set()
+            if unit is not None:
+                for name in unit.withs:
+                    needed.update(specs.get(ancestor) for ancestor in _ancestors(name))
+                # A child unit needs its parents' specs; a body (or subunit) also needs its own spec
+                own_names = _ancestors(unit.name)
+                needed.update(specs.get(ancestor) for ancestor in (own_names if not unit.is_spec else own_names[:-1]))
+                if unit.separate_from is not None:
+                    needed.add(bodies.get(unit.separate_from) or specs.get(unit.separate_from))
+            needed.discard(None)
+            needed.discard(filename)
+            dependencies[filename] = tuple(sorted(needed))
+        return cls(units, dependencies)
+
+    def levels(self) -> List[List[str]]:
+        """Group the files into levels that can each be converted in parallel.
+
+        Every file comes after all the files it depends on. Files caught in a
+        dependency cycle (not legal Ada, but uploads may be incomplete or wrong)
+        are placed together in a final level.
+        """
+        remaining = {filename: set(dependencies) for filename, dependencies in self.dependencies.items()}
+        levels: List[List[str]] = []
+        while remaining:
+            level = sorted(filename for filename, dependencies in remaining.items() if not dependencies)
+            if not level:
+                logger.warning("Dependency cycle between %s", ", ".join(sorted(remaining)))
+                levels.append(sorted(remaining))
+                break
+            levels.append(level)
+            for filename in level:
+                del remaining[filename]
+            for dependencies in remaining.values():
+                dependencies.difference_update(level)
+        return levels
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "units": {filename: asdict(unit) if unit is not None else None for filename, unit in self.units.items()},
+            "dependencies": {filename: list(dependencies) for filename, dependencies in self.dependencies.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DependencyGraph":
+        units = {
+            filename: AdaUnit(**{**unit, "withs": tuple(unit["withs"])}) if unit is not None else None
+            for filename, unit in data["units"].items()
+        }
+        return cls(units, {filename: tuple(dependencies) for filename, dependencies in data["dependencies"].items()})
+
+
+def project_fingerprint(sources: Mapping[str, str]) -> str:
+    """A SHA-256 over every file's name and content, identifying one revision of a project."""
+    digest = hashlib.sha256()
+    for filename in sorted(sources):
+        digest.update(filename.encode("utf-8") + b"\0")
+        digest.update(hashlib.sha256(sources[filename].encode("utf-8")).digest())
+    return digest.hexdigest()
+
+
+class DependencyIndex:
+    """Builds dependency graphs, reusing the graph of a project already indexed.
+
+    Graphs are cached by ``project_fingerprint`` in memory and, with a path, in a
+    SQLite file shared by the workers on the host.
+    """
+
+    def __init__(self, path: str | None, max_entries: int, clock: Callable[[], float] = time.time):
+        """Initialize the index.
+
+        Args:
+            path (str | None): SQLite file for graphs shared across workers and restarts,
+                or None to keep them in memory only.
+            max_entries (int): How many project graphs are kept.
+            clock (Callable[[], float], optional): Wall-clock time source, injectable for tests.
+        """
+        self._max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, DependencyGraph]" = OrderedDict()
+        self._connections = SQLiteConnections(path, schema=(
+            "CREATE TABLE IF NOT EXISTS dependency_graphs ("
+            "key TEXT PRIMARY KEY, graph TEXT NOT NULL, used_at REAL NOT NULL)",
+        )) if path else None
+
+    @classmethod
+    def from_settings(cls) -> "DependencyIndex":
+        """Build a dependency index configured from application settings."""
+        return cls(path=settings.dependency_graph_cache_path or None,
+                   max_entries=settings.dependency_graph_cache_max_entries)
+
+    def graph(self, sources: Mapping[str, str]) -> DependencyGraph:
+        """Get the dependency graph of a project, building it unless it was indexed before."""
+        key = project_fingerprint(sources)
+        with self._lock:
+            graph = self._memory.get(key)
+            if graph is not None:
+                self._memory.move_to_end(key)
+                return graph
+        graph = self._load(key)
+        if graph is None:
+            graph = DependencyGraph.build(sources)
+            self._store(key, graph)
+        with self._lock:
+            self._memory[key] = graph
+            while len(self._memory) > self._max_entries:
+                self._memory.popitem(last=False)
+        return graph
+
+    def _load(self, key: str) -> DependencyGraph | None:
+        if self._connections is None:
+            return None
+        connection = self._connections.get()
+        row = connection.execute("SELECT graph FROM dependency_graphs WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        connection.execute("UPDATE dependency_graphs SET used_at = ? WHERE key = ?", (self._clock(), key))
+        return DependencyGraph.from_dict(json.loads(row[0]))
+
+    def _store(self, key: str, graph: DependencyGraph) -> None:
+        if self._connections is None or self._max_entries <= 0:
+            return
+        connection = self._connections.get()
+        connection.execute(
+            "INSERT OR REPLACE INTO dependency_graphs (key, graph, used_at) VALUES (?, ?, ?)",
+            (key, json.dumps(graph.to_dict()), self._clock()),
+        )
+        connection.execute(
+            "DELETE FROM dependency_graphs WHERE key IN ("
+            "SELECT key FROM dependency_graphs ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+            (self._max_entries,),
+        )
+
+
+def python_interface(python_code: str) -> str:
+    """Reduce converted Python code to its interface: imports, constants, and class and
+    function signatures, without bodies.
+
+    Code that does not parse is reduced to its ``def`` and ``class`` lines.
+    """
+    try:
+        module = ast.parse(python_code)
+    except SyntaxError:
+        return "\n".join(line.rstrip() for line in python_code.splitlines() if _SIGNATURE_LINE.match(line))
+    return "\n".join(_interface_lines(module.body, indent=""))
+
+
+def _interface_lines(statements: List[ast.stmt], indent: str) -> List[str]:
+    lines = []
+    for statement in statements:
+        if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            prefix = "async def" if isinstance(statement, ast.AsyncFunctionDef) else "def"
+            returns = f" -> {ast.unparse(statement.returns)}" if statement.returns is not None else ""
+            lines.append(f"{indent}{prefix} {statement.name}({ast.unparse(statement.args)}){returns}: ...")
+        elif isinstance(statement, ast.ClassDef):
+            bases = ", ".join(ast.unparse(base) for base in statement.bases)
+            lines.append(f"{indent}class {statement.name}" + (f"({bases})" if bases else "") + ":")
+            lines.extend(_interface_lines(statement.body, indent + "    ") or [f"{indent}    ..."])
+        elif isinstance(statement, (ast.Assign, ast.AnnAssign, ast.Import, ast.ImportFrom)):
+            text = ast.unparse(statement)
+            if "\n" not in text and len(text) <= 120:
+                lines.append(indent + text)
+    return lines
+
+
+def dependency_context(filename: str,
+                       graph: DependencyGraph,
+                       results: Mapping[str, Dict[str, Any]],
+                       max_tokens: int) -> str:
+    """Describe the already-converted direct dependencies of a file for its conversion prompt.
+
+    Each dependency that converted successfully contributes the interface of
+    its Python code (see ``python_interface``); dependencies past ``max_tokens``
+    are left out.
+
+    Args:
+        filename (str): The file about to be converted.
+        graph (DependencyGraph): The project's dependency graph.
+        results (Mapping[str, Dict[str, Any]]): Parsed conversions of finished files, by filename.
+        max_tokens (int): Budget for the whole context.
+
+    Returns:
+        str: The context, or an empty string if no dependency has been converted.
+    """
+    sections = []
+    used = 0
+    for dependency in graph.dependencies.get(filename, ()):
+        result = results.get(dependency)
+        if not result or not result.get("python_code"):
+            continue
+        unit = graph.units.get(dependency)
+        label = f"{unit.name} ({'spec' if unit.is_spec else 'body'}, {dependency})" if unit else dependency
+        section = f"# Converted from {label}\n{python_interface(result['python_code'])}"
+        tokens = estimate_tokens(section)
+        if used + tokens > max_tokens:
+            break
+        sections.append(section)
+        used += tokens
+    return "\n\n".join(sections)
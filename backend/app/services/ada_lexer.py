@@ -0,0 +1,105 @@
+import re
+from dataclasses import dataclass
+from typing import List
+
+# Token kinds
+WORD = "word"          # identifiers and reserved words
+NUMBER = "number"
+STRING = "string"
+CHARACTER = "character"
+SYMBOL = "symbol"
+COMMENT = "comment"
+
+_WHITESPACE = re.compile(r"\s+")
+_COMMENT = re.compile(r"--[^\n]*")
+_WORD = re.compile(r"[A-Za-z][A-Za-z0-9_]*")
+_NUMBER = re.compile(r"[0-9][0-9_]*(#[0-9A-Fa-f_.]+#)?(\.[0-9_]+)?([eE][+-]?[0-9_]+)?")
+_STRING = re.compile(r'"([^"\n]|"")*"')
+_COMPOUND_SYMBOLS = ("=>", "..", "**", ":=", "/=", ">=", "<=", "<<", ">>", "<>")
+
+
+@dataclass(frozen=True)
+class Token:
+    """A lexical element of Ada source."""
+
+    kind: str
+    text: str
+    start: int
+    end: int
+    line: int
+
+    @property
+    def lower(self) -> str:
+        """The token text in lower case (Ada identifiers and keywords are case-insensitive)."""
+        return self.text.lower()
+
+
+def tokenize(source: str, include_comments: bool = False) -> List[Token]:
+    """Split Ada source into tokens.
+
+    This is a lightweight lexer: it understands comments, string and character
+    literals (so their contents are never mistaken for code), numbers,
+    identifiers and symbols, which is enough to find structure in a unit.
+    Unrecognized characters become single-character symbols.
+
+    Args:
+        source (str): The Ada source.
+        include_comments (bool, optional): Whether to emit comment tokens. Defaults to False.
+
+    Returns:
+        List[Token]: The tokens in source order.
+    """
+    tokens: List[Token] = []
+    position = 0
+    line = 1
+    length = len(source)
+
+    while position < length:
+        match = _WHITESPACE.match(source, position)
+        if match:
+            line += source.count("\n", position, match.end())
+            position = match.end()
+            continue
+
+        char = source[position]
+        kind = SYMBOL
+        if source.startswith("--", position):
+            match, kind = _COMMENT.match(source, position), COMMENT
+        elif char.isalpha():
+            match, kind = _WORD.match(source, position), WORD
+        elif char.isdigit():
+            match, kind = _NUMBER.match(source, position), NUMBER
+        elif char == '"':
+            match, kind = _STRING.match(source, position), STRING
+        elif char == "'" and _is_character_literal(source, position, tokens):
+            match, kind = None, CHARACTER
+        else:
+            match = None
+
+        if match is not None:
+            end = match.end()
+        elif kind == CHARACTER:
+            end = position + 3
+        else:
+            kind = SYMBOL
+            end = position + 2 if source.startswith(_COMPOUND_SYMBOLS, position) else position + 1
+
+        if kind != COMMENT or include_comments:
+            tokens.append(Token(kind=kind, text=source[position:end], start=position, end=end, line=line))
+        position = end
+
+    return tokens
+
+
+def _is_character_literal(source: str, position: int, tokens: List[Token]) -> bool:
+    # After a name or closing parenthesis an apostrophe is an attribute tick (X'Length).
+    if tokens and (tokens[-1].kind == WORD and tokens[-1].lower not in _RESERVED_BEFORE_LITERAL
+                   or tokens[-1].text == ")"):
+        return False
+    return position + 2 < len(source) and source[position + 2] == "'"
+
+
+# Reserved words that may directly precede a character literal (e.g. "when 'a' =>").
+_RESERVED_BEFORE_LITERAL = frozenset({
+    "when", "return", "and", "or", "xor", "not", "in", "then", "else", "mod", "rem", "abs", "of",
+})
@@ -0,0 +1,124 @@
+import re
+import textwrap
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+from app.core.tokens import estimate_tokens
+from app.services.ada_lexer import COMMENT, tokenize
+
+# Normalization levels, from least to most aggressive
+OFF = "off"                  # send the source as uploaded
+WHITESPACE = "whitespace"    # unify line endings, drop trailing whitespace, blank-line runs and common indentation
+BANNERS = "banners"          # also drop the leading banner/license comment block and separator lines
+COMMENTS = "comments"        # also drop every comment (SPARK "--#" annotations are kept)
+LEVELS = (OFF, WHITESPACE, BANNERS, COMMENTS)
+
+# A comment that is only a rule of dashes, equals signs, stars, ... (e.g. "-----------")
+_SEPARATOR = re.compile(r"^--[\s\-=*#~_+]*$")
+
+
+@dataclass
+class NormalizationResult:
+    """Ada source after normalization, with the estimated token savings."""
+
+    text: str
+    level: str
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def tokens_saved(self) -> int:
+        """Estimated prompt tokens saved by normalizing."""
+        return self.tokens_before - self.tokens_after
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the token accounting as a JSON-serializable dict (without the text)."""
+        return {
+            "level": self.level,
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "tokens_saved": self.tokens_saved,
+        }
+
+
+def normalize_ada(source: str, level: str = OFF) -> NormalizationResult:
+    """Canonicalize Ada source before it is sent to the model.
+
+    Every level above ``off`` is deterministic and idempotent, so the normalized
+    text is also a stable cache key: uploads that differ only in what a level
+    removes normalize to the same text. Code, string and character literals are
+    never changed.
+
+    Args:
+        source (str): The Ada source.
+        level (str, optional): One of ``LEVELS``. Defaults to ``banners``.
+
+    Returns:
+        NormalizationResult: The normalized text and its token accounting.
+
+    Raises:
+        ValueError: If the level is unknown.
+    """
+    if level not in LEVELS:
+        raise ValueError(f"Unknown Ada normalization level {level!r}; expected one of {', '.join(LEVELS)}")
+
+    text = source
+    if level != OFF:
+        text = source.replace("\r\n", "\n").replace("\r", "\n")
+        if level in (BANNERS, COMMENTS):
+            text = _strip_comments(text, level)
+        text = _collapse_whitespace(text)
+
+    return NormalizationResult(
+        text=text,
+        level=level,
+        tokens_before=estimate_tokens(source),
+        tokens_after=estimate_tokens(text),
+    )
+
+
+def _strip_comments(text: str, level: str) -> str:
+    tokens = tokenize(text, include_comments=True)
+    first_code = next((token.start for token in tokens if token.kind != COMMENT), len(text))
+
+    removed: List[Tuple[int, int]] = []
+    for token in tokens:
+        if token.kind != COMMENT:
+            continue
+        if level == COMMENTS:
+            drop = not token.text.startswith("--#")
+        else:
+            drop = token.start < first_code or bool(_SEPARATOR.match(token.text))
+        if drop:
+            removed.append((token.start, token.end))
+    if not removed:
+        return text
+
+    # Cut the comments out; lines left empty by a cut are dropped altogether.
+    lines = []
+    offset = 0
+    cuts = iter(removed)
+    cut = next(cuts, None)
+    for line in text.split("\n"):
+        end = offset + len(line)
+        kept = []
+        position = offset
+        while cut is not None and cut[0] < end:
+            kept.append(text[position:cut[0]])
+            position = cut[1]
+            cut = next(cuts, None)
+        kept.append(text[position:end])
+        new_line = "".join(kept)
+        if new_line.strip() or not line.strip():
+            lines.append(new_line)
+        offset = end + 1
+    return "\n".join(lines)
+
+
+def _collapse_whitespace(text: str) -> str:
+    lines = []
+    for line in text.split("\n"):
+        line = line.rstrip()
+        if line or (lines and lines[-1]):
+            lines.append(line)
+    return textwrap.dedent("\n".join(lines).strip("\n"))
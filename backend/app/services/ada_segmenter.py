@@ -0,0 +1,292 @@
+from dataclasses import dataclass, field
+from typing import List
+
+from app.core.tokens import estimate_tokens
+from app.services.ada_lexer import SYMBOL, WORD, Token, tokenize
+
+# Segment kinds
+CONTEXT = "context"            # with/use clauses and pragmas ahead of a unit
+DECLARATION = "declaration"    # types, objects, subprogram specs, ... (no executable body)
+BODY = "body"                  # subprogram, package, task, protected or entry bodies
+STATEMENTS = "statements"      # the begin ... part of the enclosing unit
+
+_UNIT_WORDS = frozenset({"procedure", "function", "package", "task", "protected", "entry"})
+# After "is", these mean the unit has no body of its own (renaming, instantiation, stub, ...).
+_NOT_A_BODY = frozenset({"new", "separate", "abstract", "null", "<>", "("})
+# Constructs closed by "end <word>"; as openers they must not follow "end" themselves.
+_BLOCK_WORDS = frozenset({"if", "case", "loop", "select", "record"})
+_CONTEXT_WORDS = frozenset({"with", "use", "pragma", "limited", "private"})
+
+
+@dataclass
+class AdaSegment:
+    """A top-level piece of an Ada compilation unit.
+
+    ``text`` includes the comments and whitespace leading up to the segment, so
+    concatenating consecutive segments reproduces the source exactly.
+    """
+
+    kind: str
+    name: str | None
+    text: str
+    start_line: int
+
+    @property
+    def tokens(self) -> int:
+        """Estimated prompt tokens for the segment."""
+        return estimate_tokens(self.text)
+
+
+@dataclass
+class SegmentedUnit:
+    """A compilation unit split into segments.
+
+    ``header + "".join(segment.text for segment in segments) + footer`` is the original source.
+    When the source holds a single library unit (e.g. one package body), the header is
+    its context clauses and opening line and the segments are the unit's declarations.
+    Otherwise the header is empty and each library unit is a segment.
+    """
+
+    header: str
+    segments: List[AdaSegment] = field(default_factory=list)
+    footer: str = ""
+
+
+@dataclass
+class _Frame:
+    kind: str
+    awaiting_begin: bool
+
+
+def _next_word(tokens: List[Token], index: int) -> str | None:
+    return tokens[index + 1].lower if index + 1 < len(tokens) else None
+
+
+def _token_depths(tokens: List[Token]) -> tuple[List[int], List[bool]]:
+    """Compute the nesting depth before each token, and which tokens are unit ``begin``s.
+
+    Depth counts enclosing units and blocks (package/subprogram bodies, declare
+    blocks, if/case/loop/select statements, records, accept/return ``do`` parts).
+    """
+    depths: List[int] = []
+    unit_begins: List[bool] = []
+    stack: List[_Frame] = []
+    pending_unit: str | None = None
+    parens = 0
+    previous: str | None = None
+
+    for index, token in enumerate(tokens):
+        depths.append(len(stack))
+        unit_begins.append(False)
+        word = token.lower if token.kind in (WORD, SYMBOL) else None
+
+        if word == "(":
+            parens += 1
+        elif word == ")":
+            parens = max(0, parens - 1)
+        elif parens == 0 and token.kind in (WORD, SYMBOL):
+            if word in _UNIT_WORDS and previous != "end":
+                # "task type" / "protected type" keep the unit kind; "package body" etc. too.
+                if pending_unit not in ("task", "protected"):
+                    pending_unit = word
+            elif word == "is" and pending_unit is not None:
+                if _next_word(tokens, index) not in _NOT_A_BODY:
+                    stack.append(_Frame(kind=pending_unit, awaiting_begin=pending_unit != "protected"))
+                pending_unit = None
+            elif word == ";":
+                pending_unit = None
+            elif word == "declare":
+                stack.append(_Frame(kind="declare", awaiting_begin=True))
+            elif word == "begin":
+                if stack and stack[-1].awaiting_begin:
+                    stack[-1].awaiting_begin = False
+                    unit_begins[-1] = stack[-1].kind != "declare"
+                else:
+                    stack.append(_Frame(kind="block", awaiting_begin=False))
+            elif word in _BLOCK_WORDS and previous != "end" and not (word == "record" and previous == "null"):
+                stack.append(_Frame(kind=word, awaiting_begin=False))
+            elif word == "do":
+                stack.append(_Frame(kind="do", awaiting_begin=False))
+            elif word == "end" and stack:
+                stack.pop()
+        previous = word if token.kind in (WORD, SYMBOL) else previous
+
+    return depths, unit_begins
+
+
+def _items(tokens: List[Token], depths: List[int], unit_begins: List[bool], depth: int,
+           first: int, last: int) -> List[tuple[int, int, bool]]:
+    """Find the items (token index ranges) at ``depth`` between tokens ``first`` and ``last``.
+
+    An item ends at a ``;`` at that depth. Generic formal parts are kept with the
+    unit they parameterize, and a unit's ``begin ... end`` part is a single item.
+    Returns ``(start, end, is_statements)`` triples with inclusive token indices.
+    """
+    items = []
+    start = None
+    in_generic = False
+    index = first
+    while index <= last:
+        token = tokens[index]
+        if depths[index] == depth:
+            if start is None:
+                start = index
+                in_generic = token.lower == "generic"
+            if unit_begins[index]:
+                # Everything from the unit's begin up to (not including) its end is one item.
+                end = index
+                while end + 1 <= last and not (depths[end + 1] == depth and tokens[end + 1].lower == "end"):
+                    end += 1
+                if start < index:
+                    items.append((start, index - 1, False))
+                items.append((index, end, True))
+                start, index = None, end + 1
+                continue
+            if in_generic and token.lower in _UNIT_WORDS and tokens[index - 1].lower != "with":
+                in_generic = False
+            elif token.text == ";" and not in_generic:
+                items.append((start, index, False))
+                start = None
+        index += 1
+    if start is not None:
+        items.append((start, last, False))
+    return items
+
+
+def _classify(tokens: List[Token], start: int, end: int) -> tuple[str, str | None]:
+    words = [token.lower for token in tokens[start:end + 1] if token.kind == WORD]
+    if not words:
+        return DECLARATION, None
+    if words[0] in _CONTEXT_WORDS and not any(word in _UNIT_WORDS for word in words):
+        return CONTEXT, None
+    # The unit name follows the unit keyword (skipping "body"/"type" and generic formals).
+    name = None
+    generic = words[0] == "generic"
+    for index in range(start, end + 1):
+        if generic and (tokens[index].lower not in _UNIT_WORDS or tokens[index - 1].lower == "with"):
+            continue
+        if tokens[index].lower in _UNIT_WORDS or tokens[index].lower == "type":
+            candidates = [t for t in tokens[index + 1:end + 1] if t.kind == WORD and t.lower not in ("body", "type")]
+            if candidates:
+                name = candidates[0].text
+            break
+    if "body" in words or ("begin" in words and any(word in _UNIT_WORDS for word in words)):
+        return BODY, name
+    return DECLARATION, name
+
+
+def segment_unit(source: str) -> SegmentedUnit:
+    """Split Ada source into top-level segments at unit, subprogram and declaration boundaries.
+
+    Args:
+        source (str): The Ada source of one file.
+
+    Returns:
+        SegmentedUnit: The header, segments and footer of the source.
+    """
+    tokens = tokenize(source)
+    if not tokens:
+        return SegmentedUnit(header=source)
+    depths, unit_begins = _token_depths(tokens)
+
+    top_items = _items(tokens, depths, unit_begins, 0, 0, len(tokens) - 1)
+    units = [item for item in top_items if _classify(tokens, item[0], item[1])[0] != CONTEXT]
+
+    if len(units) == 1:
+        unit_start, unit_end, _ = units[0]
+        inner = [index for index in range(unit_start, unit_end + 1) if depths[index] >= 1]
+        if inner and tokens[inner[-1]].lower == "end":
+            # The unit's own "end" closes the body; everything from it on is the footer.
+            first, last = inner[0], inner[-1] - 1
+            inner_items = _items(tokens, depths, unit_begins, 1, first, last)
+            if inner_items:
+                # Comments and blank lines after the opening line belong to the first segment.
+                header_end = tokens[first - 1].end
+                segments = _segments(source, tokens, inner_items, header_end)
+                footer_start = tokens[inner_items[-1][1]].end
+                return SegmentedUnit(
+                    header=source[:header_end],
+                    segments=segments,
+                    footer=source[footer_start:],
+                )
+
+    segments = _segments(source, tokens, top_items, 0)
+    return SegmentedUnit(header="", segments=segments, footer=source[tokens[top_items[-1][1]].end:])
+
+
+def _segments(source: str, tokens: List[Token],
+              items: List[tuple[int, int, bool]], offset: int) -> List[AdaSegment]:
+    segments = []
+    for start, end, is_statements in items:
+        kind, name = (STATEMENTS, None) if is_statements else _classify(tokens, start, end)
+        text = source[offset:tokens[end].end]
+        segments.append(AdaSegment(kind=kind, name=name, text=text, start_line=tokens[start].line))
+        offset = tokens[end].end
+    return segments
+
+
+@dataclass
+class ChunkPlan:
+    """How to convert a large compilation unit as several smaller prompts.
+
+    ``context`` is the shared spec context (context clauses, the unit's opening
+    line and its declarations) shown with every chunk; ``chunks`` are the pieces
+    of source to convert, in source order.
+    """
+
+    context: str
+    chunks: List[str]
+
+
+def plan_chunks(source: str, max_chunk_tokens: int, max_context_tokens: int,
+                split_bodies: bool = False) -> ChunkPlan:
+    """Group a unit's segments into chunks of roughly ``max_chunk_tokens``.
+
+    Declarations stay together in the first chunk and are also passed as context
+    to every chunk, so bodies can be converted independently. A single segment
+    larger than the budget becomes a chunk of its own.
+
+    Args:
+        source (str): The Ada source of one file.
+        max_chunk_tokens (int): Target size of each chunk.
+        max_context_tokens (int): Budget for the shared context; declarations beyond it
+            are reduced to their first line.
+        split_bodies (bool, optional): Give every body (and the unit's statements) a chunk
+            of its own, so that editing one subprogram changes only its chunk.
+
+    Returns:
+        ChunkPlan: The shared context and the chunks (a single chunk if the source cannot be split).
+    """
+    unit = segment_unit(source)
+    if len(unit.segments) < 2:
+        return ChunkPlan(context="", chunks=[source])
+
+    declarations = [s for s in unit.segments if s.kind in (CONTEXT, DECLARATION)]
+    others = [s for s in unit.segments if s.kind not in (CONTEXT, DECLARATION)]
+
+    context = unit.header.strip()
+    used = estimate_tokens(context)
+    for segment in declarations:
+        text = segment.text.strip("\n").rstrip()
+        if used + estimate_tokens(text) > max_context_tokens:
+            # Over budget: keep only the first line of code (the declaration's signature).
+            lines = [line for line in text.splitlines() if line.strip() and not line.strip().startswith("--")]
+            text = lines[0] + (" ..." if len(lines) > 1 else "") if lines else ""
+        context += "\n" + text
+        used += estimate_tokens(text)
+
+    chunks: List[str] = []
+    if declarations:
+        chunks.append(unit.header + "".join(s.text for s in declarations) + unit.footer)
+    current = ""
+    for segment in others:
+        if current and (split_bodies or estimate_tokens(current) + segment.tokens > max_chunk_tokens):
+            chunks.append(current)
+            current = ""
+        current += segment.text
+    if current:
+        chunks.append(current)
+
+    if len(chunks) < 2:
+        return ChunkPlan(context="", chunks=[source])
+    return ChunkPlan(context=context.strip(), chunks=chunks)
@@ -0,0 +1,298 @@
+import asyncio
+import math
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Callable, Dict, Iterator, List
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.exceptions import ClientOverLimitError, ServiceOverloadedError
+
+# Bounds of the Retry-After hint given to shed requests, in seconds
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+
+
+class _Waiter:
+    """A queued request, woken (from any thread) when it is given its slots."""
+
+    def __init__(self, client: str, weight: int, wake: Callable[[], None]):
+        self.client = client
+        self.weight = weight
+        self.admitted = False
+        self._wake = wake
+
+    def admit(self) -> None:
+        self.admitted = True
+        self._wake()
+
+
+class AdmissionController:
+    """Limit how many LLM calls run at once, queueing or shedding the requests that would exceed it.
+
+    Each slot stands for one upstream call in flight. A request is admitted with
+    a weight, the number of calls it makes at once (e.g. a chunked conversion
+    converts several chunks concurrently), and holds that many slots while it
+    runs; at most ``max_in_flight`` slots are held. Up to ``max_queue`` more
+    requests wait for their slots, each for at most ``queue_timeout`` seconds. A
+    request that finds the queue full, or whose wait runs out, is shed with
+    ``ServiceOverloadedError`` so it fails fast instead of tying up a worker
+    until it is killed.
+
+    Capacity is shared fairly between clients: no client may have more than
+    ``client_share`` of ``max_in_flight + max_queue`` requests admitted or queued
+    (``ClientOverLimitError``), and freed slots go to the queued client with the
+    fewest slots held, so one busy client cannot starve the others.
+
+    Limits apply per process (each gunicorn worker has its own controller).
+    """
+
+    def __init__(self,
+                 max_in_flight: int,
+                 max_queue: int,
+                 queue_timeout: float,
+                 client_share: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize the controller.
+
+        Args:
+            max_in_flight (int): Upstream calls allowed at once; 0 admits everything.
+            max_queue (int): Requests allowed to wait for a slot.
+            queue_timeout (float): Longest time a request waits for a slot, in seconds.
+            client_share (float, optional): Fraction of ``max_in_flight + max_queue`` requests one
+                client may have admitted or queued.
+            clock (Callable[[], float], optional): Monotonic time source, injectable for tests.
+        """
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.client_limit = max(1, int((max_in_flight + max_queue) * client_share))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._queue: List[_Waiter] = []
+        self._running: Dict[str, int] = {}
+        self._held: Dict[str, int] = {}
+        # Moving average of how long a request holds its slot, for Retry-After hints
+        self._hold_seconds: float | None = None
+
+    @classmethod
+    def from_settings(cls) -> "AdmissionController":
+        """Build an admission controller configured from application settings."""
+        return cls(
+            max_in_flight=settings.admission_max_in_flight,
+            max_queue=settings.admission_max_queue,
+            queue_timeout=settings.admission_queue_timeout_seconds,
+            client_share=settings.admission_client_share,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Whether requests are limited at all."""
+        return self.max_in_flight > 0
+
+    def stats(self) -> Dict[str, int]:
+        """Slots held and requests waiting in this process."""
+        with self._lock:
+            return {"in_flight": self._in_flight, "queued": len(self._queue)}
+
+    def retry_after(self) -> int:
+        """Seconds a shed client should wait before retrying: the time to drain the queue."""
+        with self._lock:
+            return self._retry_after()
+
+    def acquire(self, client: str, weight: int = 1) -> Callable[[], None]:
+        """Take ``weight`` slots for ``client``, waiting for them if needed.
+
+        Args:
+            client (str): Identifies the caller for fair sharing (e.g. its API key or address).
+            weight (int, optional): Upstream calls the request makes at once; capped at ``max_in_flight``.
+
+        Returns:
+            Callable[[], None]: Gives the slots back; calling it again does nothing.
+
+        Raises:
+            ClientOverLimitError: If the client already has its share of requests admitted or queued.
+            ServiceOverloadedError: If the queue is full or the slots do not free up in time.
+        """
+        if not self.enabled:
+            return lambda: None
+
+        weight = self._weight(weight)
+        event = threading.Event()
+        waiter = self._enter(client, weight, event.set)
+        if waiter is not None:
+            with metrics.admission_wait_seconds.time():
+                event.wait(self.queue_timeout)
+            self._leave_queue(waiter)
+        return self._releaser(client, weight)
+
+    @contextmanager
+    def admit(self, client: str, weight: int = 1) -> Iterator[None]:
+        """Hold ``weight`` slots for ``client`` while the enclosed block runs (see ``acquire``).
+
+        Raises:
+            ClientOverLimitError: If the client already has its share of requests admitted or queued.
+            ServiceOverloadedError: If the queue is full or the slots do not free up in time.
+        """
+        release = self.acquire(client, weight)
+        try:
+            yield
+        finally:
+            release()
+
+    async def acquire_async(self, client: str, weight: int = 1) -> Callable[[], None]:
+        """Take ``weight`` slots for ``client`` without blocking the event loop (see ``acquire``).
+
+        Raises:
+            ClientOverLimitError: If the client already has its share of requests admitted or queued.
+            ServiceOverloadedError: If the queue is full or the slots do not free up in time.
+        """
+        if not self.enabled:
+            return lambda: None
+
+        weight = self._weight(weight)
+        loop = asyncio.get_running_loop()
+        admitted = loop.create_future()
+
+        def wake() -> None:
+            # Slots may be freed by a thread (e.g. the sync app sharing this process)
+            loop.call_soon_threadsafe(lambda: admitted.done() or admitted.set_result(None))
+
+        waiter = self._enter(client, weight, wake)
+        if waiter is not None:
+            with metrics.admission_wait_seconds.time():
+                try:
+                    await asyncio.wait_for(admitted, self.queue_timeout)
+                except asyncio.TimeoutError:
+                    pass
+                except BaseException:
+                    # Cancelled while queued: give up the place (or the slots, if just granted)
+                    self._abandon(waiter)
+                    raise
+            self._leave_queue(waiter)
+        return self._releaser(client, weight)
+
+    @asynccontextmanager
+    async def admit_async(self, client: str, weight: int = 1) -> AsyncIterator[None]:
+        """Hold ``weight`` slots for ``client`` while the enclosed block runs (see ``acquire``).
+
+        Raises:
+            ClientOverLimitError: If the client already has its share of requests admitted or queued.
+            ServiceOverloadedError: If the queue is full or the slots do not free up in time.
+        """
+        release = await self.acquire_async(client, weight)
+        try:
+            yield
+        finally:
+            release()
+
+    def _weight(self, weight: int) -> int:
+        # A request heavier than the whole pool could never be admitted
+        return max(1, min(int(weight), self.max_in_flight))
+
+    def _releaser(self, client: str, weight: int) -> Callable[[], None]:
+        started = self._clock()
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            with self._lock:
+                if released:
+                    return
+                released = True
+            self._release(client, weight, self._clock() - started)
+
+        return release
+
+    def _enter(self, client: str, weight: int, wake: Callable[[], None]) -> _Waiter | None:
+        """Take the slots if they are free, or a place in the queue; None means the slots were taken."""
+        with self._lock:
+            if self._held.get(client, 0) >= self.client_limit:
+                metrics.admission_shed_total.inc(reason="client_limit")
+                raise ClientOverLimitError(
+                    "Too many conversions in progress for this client", retry_after=self._retry_after()
+                )
+            if self._in_flight + weight <= self.max_in_flight and not self._queue:
+                self._start(client, weight)
+                self._held[client] = self._held.get(client, 0) + 1
+                return None
+            if len(self._queue) >= self.max_queue:
+                metrics.admission_shed_total.inc(reason="queue_full")
+                raise ServiceOverloadedError(
+                    "The service is at capacity; try again later", retry_after=self._retry_after()
+                )
+            waiter = _Waiter(client, weight, wake)
+            self._queue.append(waiter)
+            self._held[client] = self._held.get(client, 0) + 1
+            metrics.admission_queue_depth.inc()
+            return waiter
+
+    def _leave_queue(self, waiter: _Waiter) -> None:
+        """Settle a waiter that was woken or timed out, raising if it never got a slot."""
+        with self._lock:
+            if waiter.admitted:
+                return
+            self._queue.remove(waiter)
+            self._drop(waiter.client)
+            metrics.admission_queue_depth.dec()
+            metrics.admission_shed_total.inc(reason="timeout")
+            raise ServiceOverloadedError(
+                f"No capacity became available within {self.queue_timeout:g}s; try again later",
+                retry_after=self._retry_after()
+            )
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        with self._lock:
+            if waiter.admitted:
+                self._finish(waiter.client, waiter.weight)
+                self._dispatch()
+            else:
+                self._queue.remove(waiter)
+                metrics.admission_queue_depth.dec()
+            self._drop(waiter.client)
+
+    def _release(self, client: str, weight: int, held_seconds: float) -> None:
+        with self._lock:
+            self._finish(client, weight)
+            self._drop(client)
+            self._hold_seconds = (held_seconds if self._hold_seconds is None
+                                  else 0.8 * self._hold_seconds + 0.2 * held_seconds)
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Give free slots to queued requests, fewest-slots client first (then oldest).
+
+        The chosen request waits until all its slots are free, so heavy requests are not starved.
+        """
+        while self._queue:
+            waiter = min(self._queue, key=lambda queued: self._running.get(queued.client, 0))
+            if self._in_flight + waiter.weight > self.max_in_flight:
+                return
+            self._queue.remove(waiter)
+            metrics.admission_queue_depth.dec()
+            self._start(waiter.client, waiter.weight)
+            waiter.admit()
+
+    def _start(self, client: str, weight: int) -> None:
+        self._in_flight += weight
+        self._running[client] = self._running.get(client, 0) + weight
+        metrics.admission_in_flight.inc(weight)
+
+    def _finish(self, client: str, weight: int) -> None:
+        self._in_flight -= weight
+        self._running[client] -= weight
+        if not self._running[client]:
+            del self._running[client]
+        metrics.admission_in_flight.dec(weight)
+
+    def _drop(self, client: str) -> None:
+        self._held[client] -= 1
+        if not self._held[client]:
+            del self._held[client]
+
+    def _retry_after(self) -> int:
+        hold_seconds = self._hold_seconds if self._hold_seconds is not None else self.queue_timeout
+        drain_seconds = hold_seconds * (len(self._queue) + 1) / max(1, self.max_in_flight)
+        return max(MIN_RETRY_AFTER, min(MAX_RETRY_AFTER, math.ceil(drain_seconds)))
@@ -0,0 +1,209 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Tuple
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletionMessageParam
+from openai.types.chat.chat_completion_user_message_param import ChatCompletionUserMessageParam
+from app.core import metrics
+from app.core.config import settings
+from app.services.hedging import run_hedged_async
+from app.services.openai_client import OpenAIClient
+from app.services.openai_transport import openai_timeout, shared_async_http_client
+
+
+class AsyncOpenAIClient(OpenAIClient):
+    """An ``OpenAIClient`` whose API calls are coroutines, for use from an event loop.
+    
+    Configuration, session history and rate limiting are shared with the
+    synchronous client; only ``send_message`` and ``stream_message`` differ,
+    awaiting the API instead of blocking a thread on it.
+    """
+    
+    def _create_client(self, api_key: str) -> AsyncOpenAI:
+        """Create the AsyncOpenAI client on the process-wide async connection pool."""
+        return AsyncOpenAI(
+            api_key=api_key,
+            base_url=settings.openai_base_url,
+            http_client=shared_async_http_client(),
+            max_retries=0,
+            timeout=openai_timeout()
+        )
+    
+    @property
+    def client(self) -> AsyncOpenAI:
+        """Get the underlying AsyncOpenAI client instance."""
+        return self._client
+    
+    async def send_message(self,
+                           message: str,
+                           session_id: str | None = None,
+                           timeout: float | None = None,
+                           response_format: Dict[str, Any] | None = None,
+                           max_tokens: int | None = None) -> str:
+        """Send a message to OpenAI's chat completion API and await the response.
+        
+        Args:
+            message (str): The message content to send.
+            session_id (str | None, optional): Conversation session to continue. Defaults to None.
+            timeout (float | None, optional): Seconds to allow this call, overriding
+                OPENAI_TIMEOUT_SECONDS. Defaults to None.
+            response_format (Dict[str, Any] | None, optional): The API's ``response_format``
+                (e.g. a JSON schema the response must follow). Defaults to None (free text).
+            max_tokens (int | None, optional): Completion token limit for this call. Defaults to None.
+        
+        Returns:
+            str: The assistant's response message content.
+            
+        Raises:
+            ValueError: If the API returns no content or None.
+            UpstreamRateLimitError: If the API keeps rate limiting the request.
+            UpstreamTimeoutError: If the API keeps timing out.
+        """
+        user_message: ChatCompletionUserMessageParam = {"role": "user", "content": message}
+        api_messages = self._api_messages(user_message, session_id)
+        
+        estimated_tokens = self._estimated_tokens(api_messages)
+        options = self._request_options(timeout, response_format, max_tokens)
+        model = self._model
+        with self._instrumented_call():
+            if self._hedge_policy.enabled:
+                assistant_content, usage, model = await self._hedged_completion(
+                    api_messages, options, estimated_tokens
+                )
+            else:
+                response = await self._transport.call_async(
+                    lambda: self._client.chat.completions.create(
+                        messages=api_messages,
+                        model=self._model,
+                        **options
+                    ),
+                    estimated_tokens
+                )
+                usage = getattr(response, "usage", None)
+                assistant_content = response.choices[0].message.content
+        self._account_usage(api_messages, assistant_content or "", usage, estimated_tokens, model)
+        if assistant_content is None:
+            raise ValueError("OpenAI API returned no content")
+        
+        if session_id is not None:
+            self._record_turn(session_id, api_messages, assistant_content, usage)
+        
+        return assistant_content
+    
+    async def _hedged_completion(self,
+                                 api_messages: List[ChatCompletionMessageParam],
+                                 options: Dict[str, Any],
+                                 estimated_tokens: int) -> Tuple[str | None, Any, str]:
+        """Stream a completion, hedging it if no token arrives in time (see ``OpenAIClient._hedged_completion``).
+        
+        The losing call's task is cancelled, which closes its stream; its rate limit
+        reservation is settled with what it used.
+        """
+        policy = self._hedge_policy
+        
+        def discard(result: Tuple[str | None, Any, str]) -> None:
+            content, usage, model = result
+            self._account_usage(api_messages, content or "", usage, estimated_tokens, model, partial=True)
+        
+        async def call(hedge: bool, first_token: asyncio.Event) -> Tuple[str | None, Any, str]:
+            model = policy.hedge_model(self._model) if hedge else self._model
+            started = time.perf_counter()
+            # Until the stream opens, a cancelled call's reservation is refunded by the transport
+            stream = None
+            fragments: List[str] = []
+            usage = None
+            try:
+                stream = await self._transport.call_async(
+                    lambda: self._client.chat.completions.create(
+                        messages=api_messages,
+                        model=model,
+                        stream=True,
+                        stream_options={"include_usage": True},
+                        **options
+                    ),
+                    estimated_tokens
+                )
+                async with stream:
+                    async for chunk in stream:
+                        if chunk.usage is not None:
+                            usage = chunk.usage
+                        if not chunk.choices:
+                            continue
+                        content = chunk.choices[0].delta.content
+                        if content:
+                            if not fragments:
+                                policy.record_first_token(model, time.perf_counter() - started)
+                                first_token.set()
+                            fragments.append(content)
+            except asyncio.CancelledError:
+                if stream is not None:
+                    discard(("".join(fragments) or None, usage, model))
+                raise
+            return "".join(fragments) or None, usage, model
+        
+        result, hedge_won = await run_hedged_async(
+            call, policy.delay(self._model), lambda: metrics.llm_hedges_total.inc(model=self._model), discard
+        )
+        if hedge_won:
+            metrics.llm_hedge_wins_total.inc(model=self._model)
+        return result
+    
+    async def stream_message(self,
+                             message: str,
+                             session_id: str | None = None,
+                             timeout: float | None = None,
+                             response_format: Dict[str, Any] | None = None,
+                             max_tokens: int | None = None) -> AsyncIterator[str]:
+        """Send a message to OpenAI's chat completion API and stream the response.
+        
+        Args:
+            message (str): The message content to send.
+            session_id (str | None, optional): Conversation session to continue. Defaults to None.
+            timeout (float | None, optional): Seconds to allow between streamed chunks,
+                overriding OPENAI_TIMEOUT_SECONDS. Defaults to None.
+            response_format (Dict[str, Any] | None, optional): The API's ``response_format``.
+                Defaults to None (free text).
+            max_tokens (int | None, optional): Completion token limit for this call. Defaults to None.
+        
+        Yields:
+            str: Successive fragments of the assistant's response.
+            
+        Raises:
+            ValueError: If the API streams no content.
+        """
+        user_message: ChatCompletionUserMessageParam = {"role": "user", "content": message}
+        api_messages = self._api_messages(user_message, session_id)
+        
+        estimated_tokens = self._estimated_tokens(api_messages)
+        fragments: List[str] = []
+        usage = None
+        with self._instrumented_call():
+            stream = await self._transport.call_async(
+                lambda: self._client.chat.completions.create(
+                    messages=api_messages,
+                    model=self._model,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **self._request_options(timeout, response_format, max_tokens)
+                ),
+                estimated_tokens
+            )
+            
+            async with stream:
+                async for chunk in stream:
+                    if chunk.usage is not None:
+                        usage = chunk.usage
+                    if not chunk.choices:
+                        continue
+                    content = chunk.choices[0].delta.content
+                    if content:
+                        fragments.append(content)
+                        yield content
+        
+        self._account_usage(api_messages, "".join(fragments), usage, estimated_tokens)
+        
+        if not fragments:
+            raise ValueError("OpenAI API returned no content")
+        
+        if session_id is not None:
+            self._record_turn(session_id, api_messages, "".join(fragments), usage)
@@ -0,0 +1,242 @@
+import io
+import json
+import os
+import posixpath
+import tarfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Tuple
+
+from app.core.exceptions import FileUploadError
+from app.services.ada_dependencies import DependencyGraph, dependency_context
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+@dataclass
+class BatchFile:
+    """A source file taken from a batch upload.
+
+    Uploaded sources are decoded as they arrive, so ``content`` is text; sources
+    extracted from archives are bytes. ``error`` records an upload that could not
+    be read (e.g. invalid UTF-8), which fails that file's conversion.
+    """
+
+    filename: str
+    content: bytes | str
+    error: str | None = None
+
+
+def is_archive(filename: str) -> bool:
+    """Whether a filename names a supported archive format."""
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def has_allowed_extension(filename: str, allowed_extensions: Iterable[str]) -> bool:
+    """Whether a filename has one of the allowed (Ada) extensions."""
+    return os.path.splitext(filename)[1].lower() in set(allowed_extensions)
+
+
+def extract_archive(filename: str,
+                    stream: BinaryIO,
+                    allowed_extensions: Iterable[str],
+                    max_files: int,
+                    max_total_bytes: int) -> Tuple[List[BatchFile], List[str]]:
+    """Extract the Ada sources from a zip or tar archive.
+
+    Only regular files with an allowed extension are read; everything else is
+    reported as skipped. Nothing is written to disk.
+
+    Args:
+        filename (str): Name of the uploaded archive, used to pick the format.
+        stream (BinaryIO): The archive contents.
+        allowed_extensions (Iterable[str]): Extensions of files to convert.
+        max_files (int): Maximum number of source files accepted.
+        max_total_bytes (int): Maximum total uncompressed size of the sources.
+
+    Returns:
+        Tuple[List[BatchFile], List[str]]: The extracted sources and the names of skipped members.
+
+    Raises:
+        FileUploadError: If the archive is unreadable or exceeds the limits.
+    """
+    allowed_extensions = set(allowed_extensions)
+    files: List[BatchFile] = []
+    skipped: List[str] = []
+    total_bytes = 0
+
+    def accept(name: str, size: int, read: Callable[[], bytes]) -> None:
+        nonlocal total_bytes
+        name = posixpath.normpath(name).lstrip("/")
+        if not has_allowed_extension(name, allowed_extensions) or name.startswith(".."):
+            skipped.append(name)
+            return
+        if len(files) >= max_files:
+            raise FileUploadError(f"Archive contains more than {max_files} Ada files")
+        total_bytes += size
+        if total_bytes > max_total_bytes:
+            raise FileUploadError(f"Archive expands to more than {max_total_bytes} bytes of Ada source")
+        files.append(BatchFile(filename=name, content=read()))
+
+    try:
+        if filename.lower().endswith(".zip"):
+            with zipfile.ZipFile(stream) as archive:
+                for info in archive.infolist():
+                    if info.is_dir():
+                        continue
+                    accept(info.filename, info.file_size, lambda info=info: archive.read(info))
+        else:
+            with tarfile.open(fileobj=stream, mode="r:*") as archive:
+                for member in archive:
+                    if member.isdir():
+                        continue
+                    if not member.isfile():
+                        skipped.append(member.name)
+                        continue
+                    accept(member.name, member.size, lambda member=member: archive.extractfile(member).read())
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+        raise FileUploadError(f"Could not read archive {filename}: {e}")
+
+    return files, skipped
+
+
+def convert_batch(files: List[BatchFile],
+                  convert: Callable[..., Tuple[Dict[str, Any], str]],
+                  concurrency: int,
+                  graph: DependencyGraph | None = None,
+                  context_max_tokens: int = 0) -> List[Dict[str, Any]]:
+    """Convert several Ada sources concurrently.
+
+    Each file succeeds or fails on its own; a failure is recorded in that file's
+    entry and never aborts the rest of the batch.
+
+    With a dependency ``graph`` the files are converted one dependency level at
+    a time, each level concurrently, and every file is converted with the
+    interfaces of its already converted dependencies (``convert(code,
+    dependencies=...)``, see ``dependency_context``). Entries then record their
+    ``level``.
+
+    Args:
+        files (List[BatchFile]): The sources to convert.
+        convert (Callable[..., Tuple[Dict[str, Any], str]]): Converts Ada source, returning
+            the parsed result and its cache status.
+        concurrency (int): Maximum number of conversions in flight.
+        graph (DependencyGraph | None, optional): The dependencies between the files, by filename.
+        context_max_tokens (int, optional): Budget for each file's dependency context.
+
+    Returns:
+        List[Dict[str, Any]]: One manifest entry per file, in input order.
+    """
+    def convert_one(batch_file: BatchFile, dependencies: str = "") -> Dict[str, Any]:
+        entry: Dict[str, Any] = {"filename": batch_file.filename}
+        started = time.perf_counter()
+        try:
+            if batch_file.error is not None:
+                raise FileUploadError(batch_file.error)
+            ada_code = batch_file.content
+            if isinstance(ada_code, bytes):
+                ada_code = ada_code.decode("utf-8")
+            if not ada_code.strip():
+                raise FileUploadError("File is empty")
+            result, cache_status = convert(ada_code, dependencies=dependencies) if dependencies else convert(ada_code)
+            entry.update(status="succeeded", cache=cache_status, result=result)
+        except UnicodeDecodeError:
+            entry.update(status="failed", error="File must be valid UTF-8 text")
+        except Exception as e:
+            entry.update(status="failed", error=str(e))
+        entry["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return entry
+
+    if not files:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(files))),
+                            thread_name_prefix="batch-convert") as executor:
+        if graph is None:
+            return list(executor.map(convert_one, files))
+        
+        # Files missing from the graph (e.g. unreadable ones) have no dependencies
+        level_of = {filename: index for index, level in enumerate(graph.levels()) for filename in level}
+        entries: List[Dict[str, Any]] = [{} for _ in files]
+        results: Dict[str, Dict[str, Any]] = {}
+        for level in sorted({level_of.get(batch_file.filename, 0) for batch_file in files}):
+            indexes = [index for index, batch_file in enumerate(files)
+                       if level_of.get(batch_file.filename, 0) == level]
+            contexts = [dependency_context(files[index].filename, graph, results, context_max_tokens)
+                        for index in indexes]
+            for index, entry in zip(indexes, executor.map(convert_one, [files[index] for index in indexes], contexts)):
+                entry["level"] = level
+                entries[index] = entry
+                if entry["status"] == "succeeded":
+                    results[entry["filename"]] = entry["result"]
+        return entries
+
+
+def summarize_batch(entries: List[Dict[str, Any]], duration_ms: float, concurrency: int) -> Dict[str, Any]:
+    """Summarize a converted batch for its manifest."""
+    succeeded = sum(1 for entry in entries if entry["status"] == "succeeded")
+    return {
+        "total": len(entries),
+        "succeeded": succeeded,
+        "failed": len(entries) - succeeded,
+        "concurrency": concurrency,
+        "duration_ms": round(duration_ms, 1),
+    }
+
+
+def build_result_archive(manifest: Dict[str, Any]) -> bytes:
+    """Package a batch manifest and its converted files as a zip archive.
+
+    For each converted ``dir/name.adb`` the archive holds ``dir/name.py``,
+    ``dir/test_name.py`` and ``dir/name.logic.md`` (specs get a ``_spec`` suffix).
+    ``manifest.json`` lists every file with its output paths, timing and any error.
+
+    Args:
+        manifest (Dict[str, Any]): The batch manifest, with per-file results.
+
+    Returns:
+        bytes: The zip archive.
+    """
+    buffer = io.BytesIO()
+    used_stems: set = set()
+    files_manifest = []
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for entry in manifest["files"]:
+            entry = dict(entry)
+            result = entry.pop("result", None)
+            if result is not None:
+                outputs = output_paths(entry["filename"], used_stems)
+                for field, path in outputs.items():
+                    archive.writestr(path, result.get(field, ""))
+                entry["outputs"] = outputs
+            files_manifest.append(entry)
+        archive.writestr("manifest.json", json.dumps({**manifest, "files": files_manifest}, indent=2))
+    return buffer.getvalue()
+
+
+def output_paths(filename: str, used_stems: set) -> Dict[str, str]:
+    """Choose the output files of a converted source, by result field.
+
+    ``dir/name.adb`` becomes ``dir/name.py``, ``dir/test_name.py`` and
+    ``dir/name.logic.md`` (specs get a ``_spec`` suffix); a stem already in
+    ``used_stems`` gets a numeric suffix, and the chosen stem is added to it.
+    """
+    directory, stem = _output_stem(filename, used_stems)
+    return {
+        "python_code": posixpath.join(directory, f"{stem}.py"),
+        "unit_tests": posixpath.join(directory, f"test_{stem}.py"),
+        "logic": posixpath.join(directory, f"{stem}.logic.md"),
+    }
+
+
+def _output_stem(filename: str, used: set) -> Tuple[str, str]:
+    directory, name = posixpath.split(filename)
+    stem, extension = os.path.splitext(name)
+    if extension.lower() == ".ads":
+        stem += "_spec"
+    candidate, counter = stem, 2
+    while (directory, candidate) in used:
+        candidate, counter = f"{stem}_{counter}", counter + 1
+    used.add((directory, candidate))
+    return directory, candidate
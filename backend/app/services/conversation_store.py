@@ -0,0 +1,211 @@
+import json
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+from openai.types.chat import ChatCompletionMessageParam
+
+from app.core.config import settings
+from app.core.sqlite import SQLiteConnections
+from app.core.tokens import estimate_tokens
+
+
+@dataclass
+class ConversationSession:
+    """History and token accounting for a single conversation session."""
+
+    session_id: str
+    messages: List[ChatCompletionMessageParam] = field(default_factory=list)
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    turns: int = 0
+    trimmed_turns: int = 0
+    last_used: float = 0.0
+
+    @property
+    def history_tokens(self) -> int:
+        """Estimated number of tokens the stored history adds to each prompt."""
+        return sum(estimate_tokens(str(message.get("content") or "")) for message in self.messages)
+
+    def to_dict(self) -> Dict[str, int | str]:
+        """Return a JSON-serializable summary of the session."""
+        return {
+            "session_id": self.session_id,
+            "turns": self.turns,
+            "trimmed_turns": self.trimmed_turns,
+            "history_messages": len(self.messages),
+            "history_tokens": self.history_tokens,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+        }
+
+
+class ConversationStore:
+    """A bounded store of per-session conversation history, in SQLite shared by the workers on the host.
+
+    Any worker can continue a session started on another. Sessions are evicted
+    when idle for longer than ``ttl_seconds`` and, once ``max_sessions`` is
+    exceeded, in least-recently-used order. Each session's history is trimmed
+    (oldest turns first) to stay within ``max_history_tokens``.
+    """
+
+    def __init__(self,
+                 path: str | None = None,
+                 max_sessions: int | None = None,
+                 ttl_seconds: float | None = None,
+                 max_history_tokens: int | None = None,
+                 clock: Callable[[], float] = time.time):
+        """Initialize the conversation store.
+
+        Args:
+            path (str | None, optional): Path of the SQLite database.
+                Defaults to ``settings.session_store_path``.
+            max_sessions (int | None, optional): Maximum number of live sessions.
+                Defaults to ``settings.session_max_count``.
+            ttl_seconds (float | None, optional): Idle time after which a session expires.
+                Defaults to ``settings.session_ttl_seconds``.
+            max_history_tokens (int | None, optional): Token budget for a session's stored history.
+                Defaults to ``settings.session_max_history_tokens``.
+            clock (Callable[[], float], optional): Wall-clock time source, injectable for tests.
+        """
+        self._connections = SQLiteConnections(path if path is not None else settings.session_store_path, schema=(
+            "CREATE TABLE IF NOT EXISTS conversation_sessions ("
+            "session_id TEXT PRIMARY KEY, messages TEXT NOT NULL, prompt_tokens INTEGER NOT NULL, "
+            "completion_tokens INTEGER NOT NULL, turns INTEGER NOT NULL, trimmed_turns INTEGER NOT NULL, "
+            "last_used REAL NOT NULL, recency INTEGER NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS conversation_sessions_recency ON conversation_sessions (recency)",
+        ))
+        self._max_sessions = max_sessions if max_sessions is not None else settings.session_max_count
+        self._ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.session_ttl_seconds
+        self._max_history_tokens = (
+            max_history_tokens if max_history_tokens is not None else settings.session_max_history_tokens
+        )
+        self._clock = clock
+
+    def __len__(self) -> int:
+        row = self._connection().execute(
+            "SELECT COUNT(*) FROM conversation_sessions WHERE last_used > ?", (self._cutoff(),)
+        ).fetchone()
+        return row[0]
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def history(self, session_id: str) -> List[ChatCompletionMessageParam]:
+        """Get a copy of the stored history for a session.
+
+        Args:
+            session_id (str): The session identifier.
+
+        Returns:
+            List[ChatCompletionMessageParam]: The session's user/assistant messages, oldest first.
+        """
+        connection = self._connection()
+        session = self._load(connection, session_id)
+        if session is None:
+            return []
+        self._touch(connection, session_id)
+        return session.messages
+
+    def record_turn(self,
+                    session_id: str,
+                    user_message: ChatCompletionMessageParam,
+                    assistant_message: ChatCompletionMessageParam,
+                    prompt_tokens: int = 0,
+                    completion_tokens: int = 0) -> ConversationSession:
+        """Append a user/assistant exchange to a session, creating it if needed.
+
+        Args:
+            session_id (str): The session identifier.
+            user_message (ChatCompletionMessageParam): The user message that was sent.
+            assistant_message (ChatCompletionMessageParam): The assistant's reply.
+            prompt_tokens (int, optional): Prompt tokens consumed by the exchange.
+            completion_tokens (int, optional): Completion tokens consumed by the exchange.
+
+        Returns:
+            ConversationSession: The updated session.
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM conversation_sessions WHERE last_used <= ?", (self._cutoff(),))
+            session = self._load(connection, session_id) or ConversationSession(session_id=session_id)
+            session.messages.extend([user_message, assistant_message])
+            session.prompt_tokens += prompt_tokens
+            session.completion_tokens += completion_tokens
+            session.turns += 1
+            self._trim(session)
+            session.last_used = self._clock()
+            connection.execute(
+                "INSERT OR REPLACE INTO conversation_sessions (session_id, messages, prompt_tokens, "
+                "completion_tokens, turns, trimmed_turns, last_used, recency) VALUES (?, ?, ?, ?, ?, ?, ?, "
+                "(SELECT COALESCE(MAX(recency), 0) + 1 FROM conversation_sessions))",
+                (session_id, json.dumps(session.messages), session.prompt_tokens, session.completion_tokens,
+                 session.turns, session.trimmed_turns, session.last_used),
+            )
+            connection.execute(
+                "DELETE FROM conversation_sessions WHERE session_id IN ("
+                "SELECT session_id FROM conversation_sessions ORDER BY recency DESC LIMIT -1 OFFSET ?)",
+                (self._max_sessions,),
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return session
+
+    def stats(self, session_id: str) -> Dict[str, int | str] | None:
+        """Get token accounting for a session.
+
+        Args:
+            session_id (str): The session identifier.
+
+        Returns:
+            Dict[str, int | str] | None: The session summary, or None if the session does not exist.
+        """
+        session = self._load(self._connection(), session_id)
+        return session.to_dict() if session is not None else None
+
+    def drop(self, session_id: str) -> bool:
+        """Remove a session.
+
+        Args:
+            session_id (str): The session identifier.
+
+        Returns:
+            bool: True if the session existed.
+        """
+        cursor = self._connection().execute(
+            "DELETE FROM conversation_sessions WHERE session_id = ?", (session_id,)
+        )
+        return cursor.rowcount > 0
+
+    def _cutoff(self) -> float:
+        return self._clock() - self._ttl_seconds
+
+    def _load(self, connection: sqlite3.Connection, session_id: str) -> ConversationSession | None:
+        # Expired sessions read as missing; they are deleted on the next recorded turn.
+        row = connection.execute(
+            "SELECT messages, prompt_tokens, completion_tokens, turns, trimmed_turns, last_used "
+            "FROM conversation_sessions WHERE session_id = ? AND last_used > ?",
+            (session_id, self._cutoff()),
+        ).fetchone()
+        if row is None:
+            return None
+        return ConversationSession(session_id=session_id, messages=json.loads(row[0]), prompt_tokens=row[1],
+                                   completion_tokens=row[2], turns=row[3], trimmed_turns=row[4], last_used=row[5])
+
+    def _touch(self, connection: sqlite3.Connection, session_id: str) -> None:
+        connection.execute(
+            "UPDATE conversation_sessions SET last_used = ?, "
+            "recency = (SELECT MAX(recency) + 1 FROM conversation_sessions) WHERE session_id = ?",
+            (self._clock(), session_id),
+        )
+
+    def _trim(self, session: ConversationSession) -> None:
+        # Drop whole user/assistant pairs from the front, but always keep the latest exchange.
+        while len(session.messages) > 2 and session.history_tokens > self._max_history_tokens:
+            del session.messages[:2]
+            session.trimmed_turns += 1
@@ -0,0 +1,378 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.sqlite import SQLiteConnections
+
+
+def normalize_source(code: str) -> str:
+    """Normalize Ada source so that formatting-only differences share a cache entry.
+
+    Line endings are unified, trailing whitespace is removed from each line and
+    leading/trailing blank lines are dropped.
+    """
+    lines = code.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip("\n")
+
+
+def conversion_key(code: str, model: str, system_prompt: str) -> str:
+    """Build the content address of a conversion.
+
+    Args:
+        code (str): The Ada source being converted.
+        model (str): The model performing the conversion.
+        system_prompt (str): The system prompt the model is given.
+
+    Returns:
+        str: A SHA-256 hex digest of the normalized source, model and system prompt.
+    """
+    digest = hashlib.sha256()
+    for part in (normalize_source(code), model, system_prompt):
+        encoded = part.encode("utf-8")
+        # Length-prefix each part so that part boundaries cannot be shifted.
+        digest.update(str(len(encoded)).encode("ascii") + b":" + encoded)
+    return digest.hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    """A cached conversion and its bookkeeping."""
+
+    key: str
+    value: str
+    model: str
+    created_at: float
+    hits: int = 0
+
+    def describe(self) -> Dict[str, Any]:
+        """Return JSON-serializable metadata about the entry (without the value)."""
+        return {
+            "key": self.key,
+            "model": self.model,
+            "size": len(self.value),
+            "created_at": self.created_at,
+            "hits": self.hits,
+        }
+
+
+class MemoryCacheTier:
+    """An in-process LRU cache tier bounded by entry count and age."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int, ttl_seconds: float, clock: Callable[[], float] = time.time):
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+
+    def get(self, key: str) -> CacheEntry | None:
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                return None
+            entry.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, entry: CacheEntry) -> None:
+        if self._max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[entry.key] = entry
+            self._entries.move_to_end(entry.key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def peek(self, key: str) -> CacheEntry | None:
+        with self._lock:
+            return self._live(key)
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            return count
+
+    def entries(self, limit: int) -> List[CacheEntry]:
+        cutoff = self._clock() - self._ttl_seconds
+        with self._lock:
+            return [entry for entry in reversed(self._entries.values()) if entry.created_at >= cutoff][:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self._max_entries}
+
+    def _live(self, key: str) -> CacheEntry | None:
+        # Callers hold the lock
+        entry = self._entries.get(key)
+        if entry is not None and self._clock() - entry.created_at > self._ttl_seconds:
+            del self._entries[key]
+            return None
+        return entry
+
+
+class SqliteCacheTier:
+    """A SQLite-backed cache tier shared by every worker process on the host.
+
+    It also keeps a generation number, bumped whenever entries are deleted or
+    purged, which tells workers that their in-process tiers may hold stale entries.
+    """
+
+    name = "disk"
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: float, clock: Callable[[], float] = time.time):
+        self._connections = SQLiteConnections(path, schema=(
+            "CREATE TABLE IF NOT EXISTS conversions ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, model TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_hit_at REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)",
+            "CREATE INDEX IF NOT EXISTS conversions_last_hit_at ON conversions (last_hit_at)",
+            "CREATE TABLE IF NOT EXISTS conversions_generation ("
+            "id INTEGER PRIMARY KEY CHECK (id = 0), generation INTEGER NOT NULL)",
+            "INSERT OR IGNORE INTO conversions_generation (id, generation) VALUES (0, 0)",
+        ))
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def get(self, key: str) -> CacheEntry | None:
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT key, value, model, created_at, hits FROM conversions WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        now = self._clock()
+        if now - row[3] > self._ttl_seconds:
+            connection.execute("DELETE FROM conversions WHERE key = ?", (key,))
+            return None
+        connection.execute(
+            "UPDATE conversions SET hits = hits + 1, last_hit_at = ? WHERE key = ?", (now, key)
+        )
+        return CacheEntry(key=row[0], value=row[1], model=row[2], created_at=row[3], hits=row[4] + 1)
+
+    def set(self, entry: CacheEntry) -> None:
+        if self._max_entries <= 0:
+            return
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO conversions (key, value, model, created_at, last_hit_at, hits) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (entry.key, entry.value, entry.model, entry.created_at, entry.created_at, entry.hits),
+        )
+        connection.execute(
+            "DELETE FROM conversions WHERE created_at < ? OR key IN ("
+            "SELECT key FROM conversions ORDER BY last_hit_at DESC LIMIT -1 OFFSET ?)",
+            (self._clock() - self._ttl_seconds, self._max_entries),
+        )
+
+    def peek(self, key: str) -> CacheEntry | None:
+        row = self._connection().execute(
+            "SELECT key, value, model, created_at, hits FROM conversions WHERE key = ? AND created_at >= ?",
+            (key, self._clock() - self._ttl_seconds),
+        ).fetchone()
+        return CacheEntry(key=row[0], value=row[1], model=row[2], created_at=row[3], hits=row[4]) if row else None
+
+    def delete(self, key: str) -> bool:
+        return self._invalidate("DELETE FROM conversions WHERE key = ?", (key,)) > 0
+
+    def clear(self) -> int:
+        return self._invalidate("DELETE FROM conversions", ())
+
+    def generation(self) -> int:
+        """The number of deletes and purges so far, as seen by every worker."""
+        (generation,) = self._connection().execute(
+            "SELECT generation FROM conversions_generation WHERE id = 0"
+        ).fetchone()
+        return generation
+
+    def _invalidate(self, statement: str, parameters: Tuple[Any, ...]) -> int:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            removed = connection.execute(statement, parameters).rowcount
+            # Bumped even if nothing was removed here: other workers' memory tiers may still hold the entry
+            connection.execute("UPDATE conversions_generation SET generation = generation + 1 WHERE id = 0")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return removed
+
+    def entries(self, limit: int) -> List[CacheEntry]:
+        rows = self._connection().execute(
+            "SELECT key, value, model, created_at, hits FROM conversions WHERE created_at >= ? "
+            "ORDER BY last_hit_at DESC LIMIT ?",
+            (self._clock() - self._ttl_seconds, limit),
+        ).fetchall()
+        return [CacheEntry(key=r[0], value=r[1], model=r[2], created_at=r[3], hits=r[4]) for r in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        (count,) = self._connection().execute("SELECT COUNT(*) FROM conversions").fetchone()
+        return {"entries": count, "max_entries": self._max_entries, "path": self._connections.path}
+
+
+class ConversionCache:
+    """A two-tier (in-process LRU, then shared on-disk) cache of converter responses.
+
+    Deletes and purges go to both tiers. Other workers notice them through the
+    on-disk tier's generation number and drop their whole in-process tier.
+    """
+
+    def __init__(self,
+                 memory: MemoryCacheTier | None,
+                 disk: SqliteCacheTier | None = None,
+                 clock: Callable[[], float] = time.time):
+        """Initialize the conversion cache.
+
+        Args:
+            memory (MemoryCacheTier | None): The in-process tier, or None to disable it.
+            disk (SqliteCacheTier | None, optional): The shared on-disk tier, or None to disable it.
+            clock (Callable[[], float], optional): Wall-clock time source, injectable for tests.
+        """
+        self._clock = clock
+        self._tiers = [tier for tier in (memory, disk) if tier is not None]
+        self._memory = memory
+        self._disk = disk
+        self._lock = threading.Lock()
+        # The disk tier's generation the memory tier was last validated against
+        self._generation: int | None = None
+        self._hits = 0
+        self._misses = 0
+
+    @classmethod
+    def from_settings(cls) -> "ConversionCache":
+        """Build a cache configured from application settings."""
+        if not settings.conversion_cache_enabled:
+            return cls(memory=None)
+        memory = MemoryCacheTier(
+            max_entries=settings.conversion_cache_max_entries,
+            ttl_seconds=settings.conversion_cache_ttl_seconds,
+        )
+        disk = None
+        if settings.conversion_cache_path:
+            disk = SqliteCacheTier(
+                path=settings.conversion_cache_path,
+                max_entries=settings.conversion_cache_disk_max_entries,
+                ttl_seconds=settings.conversion_cache_ttl_seconds,
+            )
+        return cls(memory=memory, disk=disk)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any cache tier is configured."""
+        return bool(self._tiers)
+
+    def get(self, key: str) -> Tuple[str, str] | None:
+        """Look up a cached converter response.
+
+        Args:
+            key (str): The conversion key (see ``conversion_key``).
+
+        Returns:
+            Tuple[str, str] | None: The cached response and the name of the tier that
+                served it, or None on a miss.
+        """
+        with metrics.stage_seconds.time(stage="cache"):
+            self._sync_memory()
+            for tier in self._tiers:
+                entry = tier.get(key)
+                if entry is not None:
+                    if tier is not self._memory and self._memory is not None:
+                        self._memory.set(entry)
+                    with self._lock:
+                        self._hits += 1
+                    metrics.conversion_cache_lookups_total.inc(result=tier.name)
+                    return entry.value, tier.name
+            with self._lock:
+                self._misses += 1
+            metrics.conversion_cache_lookups_total.inc(result="miss")
+            return None
+
+    def set(self, key: str, value: str, model: str) -> None:
+        """Store a converter response in every tier.
+
+        Args:
+            key (str): The conversion key (see ``conversion_key``).
+            value (str): The raw converter response.
+            model (str): The model that produced the response.
+        """
+        entry = CacheEntry(key=key, value=value, model=model, created_at=self._clock())
+        self._sync_memory()
+        for tier in self._tiers:
+            tier.set(entry)
+
+    def lookup(self, key: str) -> CacheEntry | None:
+        """Get a cached entry, with its metadata, without counting it as a hit."""
+        self._sync_memory()
+        for tier in self._tiers:
+            entry = tier.peek(key)
+            if entry is not None:
+                return entry
+        return None
+
+    def delete(self, key: str) -> bool:
+        """Remove an entry from every tier, and from other workers' memory tiers.
+
+        Returns:
+            bool: True if any tier held the entry.
+        """
+        return self._invalidate(lambda: any([tier.delete(key) for tier in self._tiers]))
+
+    def clear(self) -> Dict[str, int]:
+        """Purge every tier, and other workers' memory tiers.
+
+        Returns:
+            Dict[str, int]: The number of entries removed, by tier name.
+        """
+        return self._invalidate(lambda: {tier.name: tier.clear() for tier in self._tiers})
+
+    def entries(self, limit: int = 100) -> Dict[str, List[Dict[str, Any]]]:
+        """List the most recently used entries of each tier."""
+        self._sync_memory()
+        return {tier.name: [entry.describe() for entry in tier.entries(limit)] for tier in self._tiers}
+
+    def stats(self) -> Dict[str, Any]:
+        """Report hit/miss counters for this process and the size of each tier."""
+        with self._lock:
+            counters = {"hits": self._hits, "misses": self._misses}
+        return {**counters, "tiers": {tier.name: tier.stats() for tier in self._tiers}}
+
+    def _invalidate(self, remove: Callable[[], Any]) -> Any:
+        """Remove entries, keeping this worker's memory tier unless another worker invalidated meanwhile."""
+        self._sync_memory()
+        with self._lock:
+            before = self._generation
+        removed = remove()
+        if self._disk is not None and before is not None:
+            generation = self._disk.generation()
+            with self._lock:
+                # Our own bump only: the memory tier has already been updated
+                if generation == before + 1 and self._generation == before:
+                    self._generation = generation
+        return removed
+
+    def _sync_memory(self) -> None:
+        """Drop the memory tier if the shared tier was purged or had entries deleted since it was last checked."""
+        if self._memory is None or self._disk is None:
+            return
+        generation = self._disk.generation()
+        with self._lock:
+            stale = self._generation is not None and generation != self._generation
+            self._generation = generation
+        if stale:
+            self._memory.clear()
@@ -0,0 +1,289 @@
+import asyncio
+import math
+import queue
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Tuple, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """A window of recent latencies per model, for percentile-derived deadlines."""
+
+    def __init__(self, window: int = 200):
+        self._window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, model: str, seconds: float) -> None:
+        """Record one latency observation for ``model``."""
+        with self._lock:
+            self._samples.setdefault(model, deque(maxlen=self._window)).append(seconds)
+
+    def count(self, model: str) -> int:
+        """Number of observations held for ``model``."""
+        with self._lock:
+            return len(self._samples.get(model, ()))
+
+    def percentile(self, model: str, percentile: float) -> float | None:
+        """Nearest-rank percentile of the observations for ``model``, or None if there are none."""
+        with self._lock:
+            values = sorted(self._samples.get(model, ()))
+        if not values:
+            return None
+        rank = max(1, math.ceil(percentile / 100 * len(values)))
+        return values[min(rank, len(values)) - 1]
+
+
+class HedgePolicy:
+    """When to fire a second (hedge) request for a call that has stalled.
+
+    A call that has produced neither a first token nor a result within the
+    deadline gets a hedge, possibly on a faster fallback model, and the first of
+    the two to finish wins. The deadline is a percentile of recent times to
+    first token for the model, clamped to ``[min_delay, max_delay]``; until
+    ``min_samples`` have been seen it is ``max_delay``.
+    """
+
+    def __init__(self,
+                 enabled: bool,
+                 percentile: float = 95.0,
+                 min_delay: float = 2.0,
+                 max_delay: float = 30.0,
+                 min_samples: int = 20,
+                 fallback_model: str | None = None,
+                 tracker: LatencyTracker | None = None):
+        """Initialize the hedging policy.
+
+        Args:
+            enabled (bool): Whether calls are hedged at all.
+            percentile (float, optional): Percentile of recent times to first token used as the deadline.
+            min_delay (float, optional): Shortest deadline, so hedges are not fired for ordinary calls.
+            max_delay (float, optional): Longest deadline, and the deadline while there is too little data.
+            min_samples (int, optional): Observations needed before the percentile is trusted.
+            fallback_model (str | None, optional): Model for hedge requests. None hedges on the same model.
+            tracker (LatencyTracker | None, optional): Where times to first token are recorded.
+        """
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.fallback_model = fallback_model or None
+        self.tracker = tracker if tracker is not None else LatencyTracker()
+
+    @classmethod
+    def from_settings(cls) -> "HedgePolicy":
+        """Build a hedging policy configured from application settings."""
+        return cls(
+            enabled=settings.openai_hedging_enabled,
+            percentile=settings.openai_hedge_percentile,
+            min_delay=settings.openai_hedge_min_delay_seconds,
+            max_delay=settings.openai_hedge_max_delay_seconds,
+            min_samples=settings.openai_hedge_min_samples,
+            fallback_model=settings.openai_hedge_model,
+        )
+
+    def delay(self, model: str) -> float:
+        """Seconds to wait for a first token from ``model`` before firing a hedge."""
+        if self.tracker.count(model) < self.min_samples:
+            return self.max_delay
+        deadline = self.tracker.percentile(model, self.percentile)
+        return min(self.max_delay, max(self.min_delay, deadline))
+
+    def hedge_model(self, model: str) -> str:
+        """The model a hedge for a call to ``model`` goes to."""
+        return self.fallback_model or model
+
+    def record_first_token(self, model: str, seconds: float) -> None:
+        """Record how long ``model`` took to produce its first token."""
+        self.tracker.record(model, seconds)
+
+
+class Attempt:
+    """One of the calls racing in a hedged request, run on a thread of its own.
+
+    The call reports its first token with ``progress`` and should stop once
+    ``cancelled``; callbacks registered with ``on_cancel`` (e.g. closing the
+    response stream) run when it loses the race.
+    """
+
+    def __init__(self, hedge: bool):
+        self.hedge = hedge
+        self.started = time.perf_counter()
+        self.progressed = threading.Event()
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._on_cancel: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def progress(self) -> None:
+        """Report that the call has produced its first token."""
+        self.progressed.set()
+
+    def on_cancel(self, callback: Callable[[], None]) -> None:
+        """Run ``callback`` if the attempt is cancelled (at once if it already has been)."""
+        with self._lock:
+            if not self._cancelled:
+                self._on_cancel.append(callback)
+                return
+        callback()
+
+    def unless_cancelled(self, callback: Callable[[], None]) -> bool:
+        """Run ``callback`` unless the attempt has been cancelled, as one step with respect to ``cancel``.
+
+        Returns:
+            bool: Whether ``callback`` ran.
+        """
+        with self._lock:
+            if self._cancelled:
+                return False
+            callback()
+            return True
+
+    def cancel(self) -> None:
+        """Stop the attempt: it lost the race."""
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            callbacks, self._on_cancel = self._on_cancel, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                # The loser's fate does not matter once there is a winner
+                pass
+
+
+def run_hedged(call: Callable[[Attempt], T],
+               delay: float,
+               on_hedge: Callable[[], None],
+               discard: Callable[[T], None] | None = None) -> Tuple[T, bool]:
+    """Run ``call``, hedging it with a second call if it stalls.
+
+    Both calls run on their own threads. The first to succeed wins and the other
+    is cancelled; if one fails, the other still gets to finish.
+
+    Args:
+        call (Callable[[Attempt], T]): Makes the call; ``attempt.hedge`` tells a hedge from the original.
+        delay (float): Seconds to wait for the original's first token or result before hedging.
+        on_hedge (Callable[[], None]): Called when a hedge is fired.
+        discard (Callable[[T], None] | None, optional): Called, possibly after this returns, with the
+            result of a call that lost the race (e.g. to settle what it reserved).
+
+    Returns:
+        Tuple[T, bool]: The winning result, and whether the hedge won.
+    """
+    finished: "queue.Queue[Tuple[Attempt, T | None, BaseException | None]]" = queue.Queue()
+
+    def start(hedge: bool) -> Attempt:
+        attempt = Attempt(hedge)
+
+        def run() -> None:
+            try:
+                result = call(attempt)
+            except BaseException as e:
+                finished.put((attempt, None, e))
+            else:
+                # A result is either queued before the attempt is cancelled (and then
+                # discarded by the winner) or discarded here
+                queued = attempt.unless_cancelled(lambda: finished.put((attempt, result, None)))
+                if not queued and discard is not None:
+                    discard(result)
+            finally:
+                attempt.progressed.set()
+
+        threading.Thread(target=run, name="openai-hedge" if hedge else "openai-call", daemon=True).start()
+        return attempt
+
+    attempts = [start(hedge=False)]
+    if not attempts[0].progressed.wait(delay):
+        on_hedge()
+        attempts.append(start(hedge=True))
+
+    error: BaseException | None = None
+    for _ in attempts:
+        attempt, result, attempt_error = finished.get()
+        if attempt_error is None:
+            for other in attempts:
+                if other is not attempt:
+                    other.cancel()
+            # A loser that finished before it could be cancelled
+            while not finished.empty():
+                _, lost_result, lost_error = finished.get()
+                if lost_error is None and discard is not None:
+                    discard(lost_result)
+            return result, attempt.hedge
+        error = error or attempt_error
+    raise error
+
+
+async def run_hedged_async(call: Callable[[bool, asyncio.Event], Awaitable[T]],
+                           delay: float,
+                           on_hedge: Callable[[], None],
+                           discard: Callable[[T], None] | None = None) -> Tuple[T, bool]:
+    """Like ``run_hedged``, for coroutine calls; the losing call's task is cancelled.
+
+    Args:
+        call (Callable[[bool, asyncio.Event], Awaitable[T]]): Makes the call, given whether it
+            is the hedge and an event to set on its first token.
+        delay (float): Seconds to wait for the original's first token or result before hedging.
+        on_hedge (Callable[[], None]): Called when a hedge is fired.
+        discard (Callable[[T], None] | None, optional): Called with the result of a call that finished
+            but lost the race. A call cancelled while running must settle for itself.
+
+    Returns:
+        Tuple[T, bool]: The winning result, and whether the hedge won.
+    """
+    first_token = asyncio.Event()
+    winner: "asyncio.Future[T] | None" = None
+    original = asyncio.ensure_future(call(False, first_token))
+    tasks = {original: False}
+    try:
+        progressed = asyncio.ensure_future(first_token.wait())
+        done, _ = await asyncio.wait({original, progressed}, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+        progressed.cancel()
+        if not done:
+            on_hedge()
+            tasks[asyncio.ensure_future(call(True, asyncio.Event()))] = True
+
+        error: BaseException | None = None
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    winner = task
+                    return task.result(), tasks[task]
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if task is winner:
+                continue
+            if task.done() and not task.cancelled() and task.exception() is None:
+                if discard is not None:
+                    discard(task.result())
+            else:
+                task.cancel()
+
+
+_default_hedge_policy: HedgePolicy | None = None
+_lock = threading.Lock()
+
+
+def default_hedge_policy() -> HedgePolicy:
+    """Get the process-wide hedging policy, so every client shares its latency history."""
+    global _default_hedge_policy
+    with _lock:
+        if _default_hedge_policy is None:
+            _default_hedge_policy = HedgePolicy.from_settings()
+        return _default_hedge_policy
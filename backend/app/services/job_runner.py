@@ -0,0 +1,131 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from app.core.exceptions import JobQueueFullError
+from app.services.job_store import JobStore
+
+
+class JobRunner:
+    """Runs conversion jobs on a bounded pool of background threads.
+
+    At most ``max_workers`` conversions run at once and at most ``max_pending``
+    jobs may be queued or running in this process; further submissions are
+    rejected instead of piling up behind slow LLM calls. Jobs left unfinished by
+    a worker process that exited are picked up again by ``recover``, which scans
+    the store at most once every ``recover_interval`` seconds.
+    """
+
+    def __init__(self,
+                 store: JobStore,
+                 convert: Callable[[str], Dict[str, Any]],
+                 max_workers: int,
+                 max_pending: int,
+                 recover_interval: float = 0,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize the job runner.
+
+        Args:
+            store (JobStore): Where job state and results are recorded.
+            convert (Callable[[str], Dict[str, Any]]): Converts Ada source into the result payload.
+            max_workers (int): Number of conversions run concurrently.
+            max_pending (int): Maximum number of unfinished jobs accepted by this process.
+            recover_interval (float, optional): Minimum seconds between two scans for orphaned jobs.
+            clock (Callable[[], float], optional): Time source for ``recover_interval``.
+        """
+        self._store = store
+        self._convert = convert
+        self._max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="conversion-job")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._recover_interval = recover_interval
+        self._clock = clock
+        self._last_recovery: float | None = None
+
+    @property
+    def store(self) -> JobStore:
+        """The store holding job state."""
+        return self._store
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs queued or running in this process."""
+        with self._lock:
+            return self._pending
+
+    def submit(self, ada_code: str, filename: str | None = None) -> str:
+        """Queue an Ada source file for conversion.
+
+        Args:
+            ada_code (str): The Ada source to convert.
+            filename (str | None, optional): Name of the uploaded file.
+
+        Returns:
+            str: The id of the queued job.
+
+        Raises:
+            JobQueueFullError: If ``max_pending`` jobs are already unfinished.
+        """
+        with self._lock:
+            if self._pending >= self._max_pending:
+                raise JobQueueFullError("Too many conversion jobs are pending; retry later")
+            self._pending += 1
+        
+        try:
+            job_id = self._store.create(filename=filename, source=ada_code)
+            self._executor.submit(self._run, job_id, ada_code)
+        except Exception:
+            self._release()
+            raise
+        return job_id
+
+    def recover(self) -> int:
+        """Run the jobs of worker processes that exited before finishing them, as room allows.
+
+        Called on every job request, so the store is scanned (and the owners of
+        unfinished jobs probed) at most once every ``recover_interval`` seconds;
+        calls in between take over nothing.
+
+        Returns:
+            int: The number of jobs taken over by this process.
+        """
+        with self._lock:
+            now = self._clock()
+            if self._last_recovery is not None and now - self._last_recovery < self._recover_interval:
+                return 0
+            self._last_recovery = now
+            room = self._max_pending - self._pending
+            if room <= 0:
+                return 0
+            # Reserved up front so concurrent submissions cannot overshoot max_pending
+            self._pending += room
+        
+        claimed = []
+        try:
+            claimed = self._store.claim_orphans(limit=room)
+            for job_id, ada_code in claimed:
+                self._executor.submit(self._run, job_id, ada_code)
+        finally:
+            with self._lock:
+                self._pending -= room - len(claimed)
+        return len(claimed)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting jobs, optionally waiting for running ones to finish."""
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job_id: str, ada_code: str) -> None:
+        try:
+            self._store.mark_running(job_id)
+            result = self._convert(ada_code)
+            self._store.mark_succeeded(job_id, result)
+        except Exception as e:
+            self._store.mark_failed(job_id, str(e))
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
@@ -0,0 +1,204 @@
+import json
+import os
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.core import processes
+from app.core.sqlite import SQLiteConnections
+
+# Job lifecycle states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+# Times a job is started before it is given up on (a job that keeps killing its worker fails)
+MAX_JOB_ATTEMPTS = 3
+
+
+class JobStore:
+    """Persistent conversion job records shared by every worker process on the host.
+
+    Jobs are owned by the worker process that runs them. The source of an
+    unfinished job is kept alongside it, so if that process exits (e.g. gunicorn
+    recycles it) another worker can claim the job and run it again (see
+    ``claim_orphans``). A job without a stored source, or one already started
+    ``MAX_JOB_ATTEMPTS`` times, is reported as failed instead.
+    """
+
+    def __init__(self,
+                 path: str,
+                 retention_seconds: float,
+                 clock: Callable[[], float] = time.time,
+                 process_alive: Callable[[int], bool] = processes.process_alive):
+        """Initialize the job store.
+
+        Args:
+            path (str): Path of the SQLite database file.
+            retention_seconds (float): How long finished jobs are kept.
+            clock (Callable[[], float], optional): Wall-clock time source, injectable for tests.
+            process_alive (Callable[[int], bool], optional): Liveness check for owning workers.
+        """
+        self._connections = SQLiteConnections(path, schema=(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, filename TEXT, owner_pid INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, result TEXT, error TEXT)",
+            "CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs (created_at)",
+            # Sources of unfinished jobs, removed once they finish
+            "CREATE TABLE IF NOT EXISTS job_sources ("
+            "id TEXT PRIMARY KEY, source TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0)",
+        ))
+        self._retention_seconds = retention_seconds
+        self._clock = clock
+        self._process_alive = process_alive
+
+    def create(self, filename: str | None = None, source: str | None = None) -> str:
+        """Record a new queued job owned by this process.
+
+        Args:
+            filename (str | None, optional): Name of the uploaded file being converted.
+            source (str | None, optional): The Ada source, kept until the job finishes so the
+                job can be resumed if this process exits.
+
+        Returns:
+            str: The new job id.
+        """
+        job_id = uuid.uuid4().hex
+        now = self._clock()
+        connection = self._connections.get()
+        connection.execute(
+            "DELETE FROM jobs WHERE created_at < ? AND status NOT IN (?, ?)",
+            (now - self._retention_seconds, *ACTIVE_STATUSES),
+        )
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "INSERT INTO jobs (id, status, filename, owner_pid, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, filename, os.getpid(), now),
+            )
+            if source is not None:
+                connection.execute("INSERT INTO job_sources (id, source) VALUES (?, ?)", (job_id, source))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return job_id
+
+    def mark_running(self, job_id: str) -> None:
+        """Record that a job has started converting."""
+        connection = self._connections.get()
+        connection.execute(
+            "UPDATE jobs SET status = ?, started_at = ? WHERE id = ?", (RUNNING, self._clock(), job_id)
+        )
+        connection.execute("UPDATE job_sources SET attempts = attempts + 1 WHERE id = ?", (job_id,))
+
+    def mark_succeeded(self, job_id: str, result: Dict[str, Any]) -> None:
+        """Record a job's conversion result."""
+        connection = self._connections.get()
+        connection.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, result = ? WHERE id = ?",
+            (SUCCEEDED, self._clock(), json.dumps(result), job_id),
+        )
+        connection.execute("DELETE FROM job_sources WHERE id = ?", (job_id,))
+
+    def mark_failed(self, job_id: str, error: str) -> None:
+        """Record that a job could not be converted."""
+        connection = self._connections.get()
+        connection.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE id = ?",
+            (FAILED, self._clock(), error, job_id),
+        )
+        connection.execute("DELETE FROM job_sources WHERE id = ?", (job_id,))
+
+    def claim_orphans(self, limit: int) -> List[Tuple[str, str]]:
+        """Take over unfinished jobs whose worker process exited, re-queueing them under this process.
+
+        Orphans that cannot be resumed (no stored source, or out of attempts) are failed.
+        Each orphan is claimed by one process only, however many look at once.
+
+        Args:
+            limit (int): Most jobs to claim.
+
+        Returns:
+            List[Tuple[str, str]]: The id and Ada source of each claimed job.
+        """
+        connection = self._connections.get()
+        rows = connection.execute(
+            "SELECT j.id, j.owner_pid, s.attempts FROM jobs j LEFT JOIN job_sources s ON s.id = j.id "
+            "WHERE j.status IN (?, ?)",
+            ACTIVE_STATUSES,
+        ).fetchall()
+        claimed = []
+        for job_id, owner_pid, attempts in rows:
+            if len(claimed) >= limit or self._process_alive(owner_pid):
+                continue
+            if attempts is None or attempts >= MAX_JOB_ATTEMPTS:
+                self._fail_orphan(job_id, owner_pid, attempts)
+                continue
+            cursor = connection.execute(
+                "UPDATE jobs SET status = ?, owner_pid = ?, started_at = NULL WHERE id = ? AND owner_pid = ?",
+                (QUEUED, os.getpid(), job_id, owner_pid),
+            )
+            if cursor.rowcount:
+                row = connection.execute("SELECT source FROM job_sources WHERE id = ?", (job_id,)).fetchone()
+                if row is not None:
+                    claimed.append((job_id, row[0]))
+        return claimed
+
+    def _fail_orphan(self, job_id: str, owner_pid: int, attempts: int | None) -> None:
+        if attempts is None:
+            error = "Conversion was interrupted because its worker process exited"
+        else:
+            error = f"Conversion was interrupted {attempts} times because its worker process exited"
+        connection = self._connections.get()
+        cursor = connection.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE id = ? AND owner_pid = ?",
+            (FAILED, self._clock(), error, job_id, owner_pid),
+        )
+        if cursor.rowcount:
+            connection.execute("DELETE FROM job_sources WHERE id = ?", (job_id,))
+
+    def get(self, job_id: str) -> Dict[str, Any] | None:
+        """Get a job's status and, once finished, its result or error.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            Dict[str, Any] | None: The job record, or None if it does not exist.
+        """
+        row = self._connections.get().execute(
+            "SELECT id, status, filename, owner_pid, created_at, started_at, finished_at, result, error "
+            "FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        
+        job_id, status, filename, owner_pid, created_at, started_at, finished_at, result, error = row
+        if status in ACTIVE_STATUSES and not self._process_alive(owner_pid):
+            source = self._connections.get().execute(
+                "SELECT attempts FROM job_sources WHERE id = ?", (job_id,)
+            ).fetchone()
+            if source is None or source[0] >= MAX_JOB_ATTEMPTS:
+                self._fail_orphan(job_id, owner_pid, None if source is None else source[0])
+                return self.get(job_id)
+            # Resumable: reported as queued until a worker claims it
+            status, started_at = QUEUED, None
+        
+        job = {
+            "job_id": job_id,
+            "status": status,
+            "filename": filename,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+        }
+        if result is not None:
+            job["result"] = json.loads(result)
+        if error is not None:
+            job["error"] = error
+        return job
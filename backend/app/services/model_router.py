@@ -0,0 +1,190 @@
+import json
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List
+
+from app.core.config import settings
+from app.core.tokens import estimate_tokens
+from app.services.ada_lexer import WORD, tokenize
+
+# Weights of each measure in a complexity score. A ten-line procedure scores about 3;
+# a 2,000-line generic package with a few hundred subprograms scores several hundred.
+TOKENS_PER_POINT = 100
+SUBPROGRAM_WEIGHT = 2.0
+GENERIC_WEIGHT = 8.0
+TASKING_WEIGHT = 5.0
+
+_SUBPROGRAM_WORDS = frozenset({"procedure", "function"})
+_INSTANTIATED_WORDS = frozenset({"package", "procedure", "function"})
+_TASKING_WORDS = frozenset({"task", "protected", "entry", "accept", "select", "requeue", "abort"})
+
+
+@dataclass(frozen=True)
+class ComplexityScore:
+    """How hard a piece of Ada source is likely to be to convert.
+
+    Attributes:
+        tokens (int): Estimated prompt tokens.
+        subprograms (int): Procedure and function declarations (specs and bodies both count).
+        generics (int): Generic units declared and instantiated.
+        tasking (int): Tasking constructs (tasks, protected objects, entries, accept, select, ...).
+        score (float): The weighted sum of the measures above.
+    """
+
+    tokens: int
+    subprograms: int
+    generics: int
+    tasking: int
+    score: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def score_complexity(code: str) -> ComplexityScore:
+    """Score Ada source by its size, subprograms, generics and tasking constructs.
+
+    Args:
+        code (str): The Ada source.
+
+    Returns:
+        ComplexityScore: The measures and their weighted score.
+    """
+    words = [token.lower for token in tokenize(code) if token.kind == WORD]
+    subprograms = generics = tasking = 0
+    for index, word in enumerate(words):
+        previous = words[index - 1] if index else None
+        if word in _SUBPROGRAM_WORDS and previous != "access":
+            subprograms += 1
+        elif word == "generic":
+            generics += 1
+        elif word == "new" and previous == "is" and index >= 3 and words[index - 3] in _INSTANTIATED_WORDS:
+            # "package Int_IO is new Integer_IO (...)" instantiates a generic
+            generics += 1
+        if word in _TASKING_WORDS and previous != "end":
+            tasking += 1
+
+    tokens = estimate_tokens(code)
+    score = (
+        tokens / TOKENS_PER_POINT
+        + subprograms * SUBPROGRAM_WEIGHT
+        + generics * GENERIC_WEIGHT
+        + tasking * TASKING_WEIGHT
+    )
+    return ComplexityScore(tokens=tokens, subprograms=subprograms, generics=generics, tasking=tasking,
+                           score=round(score, 2))
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    """A model, and the call settings to use with it, for inputs up to a complexity score.
+
+    Attributes:
+        name (str): Identifies the tier in metrics and logs.
+        model (str | None): The model to call. None uses the client's default model.
+        max_score (float | None): Highest complexity score routed to this tier; None accepts any score.
+        max_tokens (int | None): Completion token limit for calls in this tier. None leaves it to the API.
+        timeout_seconds (float | None): Per-call timeout for this tier. None uses OPENAI_TIMEOUT_SECONDS.
+    """
+
+    name: str
+    model: str | None = None
+    max_score: float | None = None
+    max_tokens: int | None = None
+    timeout_seconds: float | None = None
+
+    def request_options(self) -> Dict[str, Any]:
+        """Options to pass to ``OpenAIClient.send_message`` for calls in this tier."""
+        options: Dict[str, Any] = {}
+        if self.max_tokens is not None:
+            options["max_tokens"] = self.max_tokens
+        if self.timeout_seconds is not None:
+            options["timeout"] = self.timeout_seconds
+        return options
+
+
+@dataclass(frozen=True)
+class Route:
+    """The tier chosen for a piece of source, and the score it was chosen on."""
+
+    tier: ModelTier
+    complexity: ComplexityScore
+
+
+class ModelRouter:
+    """Pick a model tier for each conversion from the complexity of its source.
+
+    Tiers are tried in order of ``max_score``; the first tier whose ``max_score``
+    is at least the source's score is chosen, and the last tier takes anything
+    scoring higher than every limit.
+    """
+
+    def __init__(self, tiers: List[ModelTier]):
+        """Initialize the router.
+
+        Args:
+            tiers (List[ModelTier]): The tiers to choose from.
+
+        Raises:
+            ValueError: If there are no tiers or two tiers share a name.
+        """
+        if not tiers:
+            raise ValueError("A model router needs at least one tier")
+        names = [tier.name for tier in tiers]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Model tier names must be unique, got {', '.join(names)}")
+        self.tiers = sorted(tiers, key=lambda tier: (tier.max_score is None, tier.max_score or 0))
+
+    @classmethod
+    def from_settings(cls) -> "ModelRouter":
+        """Build a router from MODEL_TIERS, or a single tier on the default model if it is unset."""
+        if not settings.model_tiers.strip():
+            return cls([ModelTier(name="default")])
+        return cls(parse_tiers(settings.model_tiers))
+
+    @property
+    def signature(self) -> str:
+        """Describe the tiers, e.g. ``small=gpt-4o-mini<=20,large=gpt-4o``.
+
+        Routing depends only on the source and the tiers, so this identifies which
+        models a conversion goes to (for cache keys) without scoring the source.
+        """
+        return ",".join(
+            f"{tier.name}={tier.model or 'default'}" + (f"<={tier.max_score:g}" if tier.max_score is not None else "")
+            for tier in self.tiers
+        )
+
+    def route(self, code: str) -> Route:
+        """Choose the tier for Ada source.
+
+        Args:
+            code (str): The Ada source (or chunk) to convert.
+
+        Returns:
+            Route: The chosen tier and the source's complexity score.
+        """
+        complexity = score_complexity(code)
+        for tier in self.tiers:
+            if tier.max_score is not None and complexity.score <= tier.max_score:
+                return Route(tier, complexity)
+        return Route(self.tiers[-1], complexity)
+
+
+def parse_tiers(value: str) -> List[ModelTier]:
+    """Parse MODEL_TIERS: a JSON list of tier objects.
+
+    For example ``[{"name": "small", "model": "gpt-4o-mini", "max_score": 20,
+    "max_tokens": 2048, "timeout_seconds": 30}, {"name": "large", "model": "gpt-4o"}]``.
+
+    Raises:
+        ValueError: If the value is not a list of objects with the ``ModelTier`` fields.
+    """
+    try:
+        entries = json.loads(value)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"MODEL_TIERS is not valid JSON: {e}") from e
+    if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+        raise ValueError("MODEL_TIERS must be a JSON list of objects")
+    try:
+        return [ModelTier(**entry) for entry in entries]
+    except TypeError as e:
+        raise ValueError(f"Invalid MODEL_TIERS entry: {e}") from e
@@ -1,10 +1,18 @@
 import os
-from typing import Dict, Any, List
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Tuple
 from openai import OpenAI
 from openai.types.chat import ChatCompletionMessageParam
 from openai.types.chat.chat_completion_system_message_param import ChatCompletionSystemMessageParam
 from openai.types.chat.chat_completion_user_message_param import ChatCompletionUserMessageParam
 from openai.types.chat.chat_completion_assistant_message_param import ChatCompletionAssistantMessageParam
+from app.core import metrics
+from app.core.config import settings
+from app.core.tokens import estimate_tokens
+from app.services.conversation_store import ConversationStore
+from app.services.hedging import Attempt, HedgePolicy, default_hedge_policy, run_hedged
+from app.services.openai_transport import OpenAITransport, default_transport, openai_timeout, shared_http_client
 
 class OpenAIClient:
     """A wrapper around OpenAI's client that maintains configuration and message formatting."""
@@ -15,7 +23,10 @@ class OpenAIClient:
     def __init__(self, 
                  system_prompt: str | None = None, 
                  api_key: str | None = None, 
-                 model: str | None = None):
+                 model: str | None = None,
+                 conversation_store: ConversationStore | None = None,
+                 transport: OpenAITransport | None = None,
+                 hedge_policy: HedgePolicy | None = None):
         """Initialize an OpenAI client instance.
         
         Args:
@@ -24,6 +35,12 @@ class OpenAIClient:
             api_key (str | None, optional): The OpenAI API key. If not provided,
                 it will be read from the OPENAI_API_KEY environment variable.
             model (str | None, optional): The OpenAI model to use. Defaults to DEFAULT_MODEL.
+            conversation_store (ConversationStore | None, optional): Store holding history for
+                messages sent with a session id. Defaults to a new store configured from settings.
+            transport (OpenAITransport | None, optional): Rate limiting and retry policy for API calls.
+                Defaults to the process-wide transport, so every client shares one budget.
+            hedge_policy (HedgePolicy | None, optional): When to hedge a stalled ``send_message``
+                call with a second request. Defaults to the process-wide policy (OPENAI_HEDGING_*).
         
         Raises:
             ValueError: If no API key is provided and OPENAI_API_KEY environment variable is not set.
@@ -40,60 +57,356 @@ class OpenAIClient:
         self._system_prompt = system_prompt or self.DEFAULT_SYSTEM_PROMPT
         self._model = model or self.DEFAULT_MODEL
         
-        system_message: ChatCompletionSystemMessageParam = {
+        self._system_message: ChatCompletionSystemMessageParam = {
             "role": "system", 
             "content": self._system_prompt
         }
-        self._messages: List[ChatCompletionMessageParam] = [system_message]
+        self._conversations = conversation_store if conversation_store is not None else ConversationStore()
         
-        self._client = OpenAI(api_key=final_api_key)
+        self._transport = transport if transport is not None else default_transport()
+        self._hedge_policy = hedge_policy if hedge_policy is not None else default_hedge_policy()
+        self._client = self._create_client(final_api_key)
+    
+    def _create_client(self, api_key: str) -> OpenAI:
+        """Create the OpenAI client; retries are handled by the transport, and the pooled
+        HTTP client keeps connections alive between calls."""
+        return OpenAI(
+            api_key=api_key,
+            base_url=settings.openai_base_url,
+            http_client=shared_http_client(),
+            max_retries=0,
+            timeout=openai_timeout()
+        )
     
     @property
     def client(self) -> OpenAI:
         """Get the underlying OpenAI client instance."""
         return self._client
     
+    @property
+    def transport(self) -> OpenAITransport:
+        """Get the transport that rate limits and retries API calls."""
+        return self._transport
+    
+    @property
+    def model(self) -> str:
+        """Get the model used for chat completions."""
+        return self._model
+    
+    @property
+    def system_prompt(self) -> str:
+        """Get the system prompt sent ahead of every message."""
+        return self._system_prompt
+    
+    @property
+    def conversations(self) -> ConversationStore:
+        """Get the store holding per-session message history."""
+        return self._conversations
+    
     @property
     def messages(self) -> List[ChatCompletionMessageParam]:
-        """Get the current message history."""
-        return self._messages.copy()
+        """Get the messages sent ahead of a stateless (session-less) message."""
+        return [self._system_message]
+    
+    def session_messages(self, session_id: str) -> List[ChatCompletionMessageParam]:
+        """Get the messages sent ahead of the next message in a session.
+        
+        Args:
+            session_id (str): The conversation session identifier.
+        
+        Returns:
+            List[ChatCompletionMessageParam]: The system message followed by the session's retained history.
+        """
+        return [self._system_message, *self._conversations.history(session_id)]
         
-    def send_message(self, message: str) -> str:
+    def send_message(self,
+                     message: str,
+                     session_id: str | None = None,
+                     timeout: float | None = None,
+                     response_format: Dict[str, Any] | None = None,
+                     max_tokens: int | None = None) -> str:
         """Send a message to OpenAI's chat completion API and get the response.
         
+        Without a session id the message is sent on its own (after the system prompt)
+        and nothing is retained. With a session id the session's history is sent along
+        with it and the exchange is recorded in the conversation store.
+        
+        With hedging enabled the response is streamed, and a call with no first token
+        by the hedging deadline races a second request (see ``HedgePolicy``).
+        
         Args:
             message (str): The message content to send.
+            session_id (str | None, optional): Conversation session to continue. Defaults to None.
+            timeout (float | None, optional): Seconds to allow this call, overriding
+                OPENAI_TIMEOUT_SECONDS. Defaults to None.
+            response_format (Dict[str, Any] | None, optional): The API's ``response_format``
+                (e.g. a JSON schema the response must follow). Defaults to None (free text).
+            max_tokens (int | None, optional): Completion token limit for this call. Defaults to None.
         
         Returns:
             str: The assistant's response message content.
             
         Raises:
             ValueError: If the API returns no content or None.
+            UpstreamRateLimitError: If the API keeps rate limiting the request.
+            UpstreamTimeoutError: If the API keeps timing out.
         """
         # Create user message and prepare API request
         user_message: ChatCompletionUserMessageParam = {"role": "user", "content": message}
-        api_messages = self.messages  # Get current history
-        api_messages.append(user_message)  # Add user message for API call
+        api_messages = self._api_messages(user_message, session_id)
         
         # Make API call with messages as they were before this interaction
-        response = self._client.chat.completions.create(
-            messages=api_messages,
-            model=self._model
-        )
-        
-        # Extract assistant's response
-        assistant_message = response.choices[0].message
-        assistant_content = assistant_message.content
+        estimated_tokens = self._estimated_tokens(api_messages)
+        options = self._request_options(timeout, response_format, max_tokens)
+        model = self._model
+        with self._instrumented_call():
+            if self._hedge_policy.enabled:
+                assistant_content, usage, model = self._hedged_completion(api_messages, options, estimated_tokens)
+            else:
+                response = self._transport.call(
+                    lambda: self._client.chat.completions.create(
+                        messages=api_messages,
+                        model=self._model,
+                        **options
+                    ),
+                    estimated_tokens
+                )
+                usage = getattr(response, "usage", None)
+                
+                # Extract assistant's response
+                assistant_message = response.choices[0].message
+                assistant_content = assistant_message.content
+        self._account_usage(api_messages, assistant_content or "", usage, estimated_tokens, model)
         
         if assistant_content is None:
             raise ValueError("OpenAI API returned no content")
         
-        # Update message history with both user message and assistant's response
-        self._messages.append(user_message)
+        if session_id is not None:
+            self._record_turn(session_id, api_messages, assistant_content, usage)
+        
+        return assistant_content
+    
+    def stream_message(self,
+                       message: str,
+                       session_id: str | None = None,
+                       timeout: float | None = None,
+                       response_format: Dict[str, Any] | None = None,
+                       max_tokens: int | None = None) -> Iterator[str]:
+        """Send a message to OpenAI's chat completion API and stream the response.
+        
+        Behaves like ``send_message`` but yields the assistant's content as it is
+        generated. Session history is only updated once the stream completes.
+        
+        Args:
+            message (str): The message content to send.
+            session_id (str | None, optional): Conversation session to continue. Defaults to None.
+            timeout (float | None, optional): Seconds to allow between streamed chunks,
+                overriding OPENAI_TIMEOUT_SECONDS. Defaults to None.
+            response_format (Dict[str, Any] | None, optional): The API's ``response_format``.
+                Defaults to None (free text).
+            max_tokens (int | None, optional): Completion token limit for this call. Defaults to None.
+        
+        Yields:
+            str: Successive fragments of the assistant's response.
+            
+        Raises:
+            ValueError: If the API streams no content.
+        """
+        user_message: ChatCompletionUserMessageParam = {"role": "user", "content": message}
+        api_messages = self._api_messages(user_message, session_id)
+        
+        # Only opening the stream is retried; a failure mid-stream is reported to the caller
+        estimated_tokens = self._estimated_tokens(api_messages)
+        fragments: List[str] = []
+        usage = None
+        with self._instrumented_call():
+            stream = self._transport.call(
+                lambda: self._client.chat.completions.create(
+                    messages=api_messages,
+                    model=self._model,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **self._request_options(timeout, response_format, max_tokens)
+                ),
+                estimated_tokens
+            )
+            
+            with stream:
+                for chunk in stream:
+                    if chunk.usage is not None:
+                        usage = chunk.usage
+                    if not chunk.choices:
+                        continue
+                    content = chunk.choices[0].delta.content
+                    if content:
+                        fragments.append(content)
+                        yield content
+        
+        self._account_usage(api_messages, "".join(fragments), usage, estimated_tokens)
+        
+        if not fragments:
+            raise ValueError("OpenAI API returned no content")
+        
+        if session_id is not None:
+            self._record_turn(session_id, api_messages, "".join(fragments), usage)
+    
+    def _hedged_completion(self,
+                           api_messages: List[ChatCompletionMessageParam],
+                           options: Dict[str, Any],
+                           estimated_tokens: int) -> Tuple[str | None, Any, str]:
+        """Stream a completion, hedging it with a second request if no token arrives in time.
+        
+        The hedge goes to the policy's fallback model, if any. Whichever call finishes
+        first wins; the other's stream is closed and its rate limit reservation settled
+        with what it used.
+        
+        Returns:
+            Tuple[str | None, Any, str]: The winning call's content, usage and model.
+        """
+        policy = self._hedge_policy
+        
+        def call(attempt: Attempt) -> Tuple[str | None, Any, str]:
+            model = policy.hedge_model(self._model) if attempt.hedge else self._model
+            stream = self._transport.call(
+                lambda: self._client.chat.completions.create(
+                    messages=api_messages,
+                    model=model,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **options
+                ),
+                estimated_tokens
+            )
+            attempt.on_cancel(stream.close)
+            fragments: List[str] = []
+            usage = None
+            try:
+                with stream:
+                    for chunk in stream:
+                        if attempt.cancelled:
+                            break
+                        if chunk.usage is not None:
+                            usage = chunk.usage
+                        if not chunk.choices:
+                            continue
+                        content = chunk.choices[0].delta.content
+                        if content:
+                            if not fragments:
+                                policy.record_first_token(model, time.perf_counter() - attempt.started)
+                                attempt.progress()
+                            fragments.append(content)
+            except Exception:
+                # Closing the stream of a call that lost may break its iteration
+                if not attempt.cancelled:
+                    raise
+            return "".join(fragments) or None, usage, model
+        
+        def discard(result: Tuple[str | None, Any, str]) -> None:
+            content, usage, model = result
+            self._account_usage(api_messages, content or "", usage, estimated_tokens, model, partial=True)
+        
+        result, hedge_won = run_hedged(
+            call, policy.delay(self._model), lambda: metrics.llm_hedges_total.inc(model=self._model), discard
+        )
+        if hedge_won:
+            metrics.llm_hedge_wins_total.inc(model=self._model)
+        return result
+    
+    def _api_messages(self,
+                      user_message: ChatCompletionUserMessageParam,
+                      session_id: str | None) -> List[ChatCompletionMessageParam]:
+        """Build the messages to send: the system prompt, any session history, then the new message."""
+        if session_id is None:
+            api_messages = self.messages
+        else:
+            api_messages = self.session_messages(session_id)
+        api_messages.append(user_message)
+        return api_messages
+    
+    @contextmanager
+    def _instrumented_call(self) -> Iterator[None]:
+        """Time an API call (including retries) and count it as in flight while it runs."""
+        outcome = "error"
+        try:
+            with metrics.llm_calls_in_flight.track(model=self._model), metrics.stage_seconds.time(stage="llm"):
+                yield
+            outcome = "success"
+        finally:
+            metrics.llm_calls_total.inc(model=self._model, outcome=outcome)
+    
+    def _account_usage(self,
+                       api_messages: List[ChatCompletionMessageParam],
+                       assistant_content: str,
+                       usage: Any,
+                       estimated_tokens: int,
+                       model: str | None = None,
+                       partial: bool = False) -> None:
+        """Count a call's tokens by model (the client's unless a hedge answered) and reconcile
+        the rate limiter's estimate.
+        
+        A ``partial`` call (a hedged call that lost the race) rarely reports usage, so its
+        tokens are estimated from what it produced rather than left at the reservation."""
+        model = model or self._model
+        prompt_tokens, completion_tokens = self._usage(usage, api_messages, assistant_content)
+        metrics.llm_tokens_total.inc(prompt_tokens, model=model, kind="prompt")
+        metrics.llm_tokens_total.inc(completion_tokens, model=model, kind="completion")
+        fallback_tokens = prompt_tokens + completion_tokens if partial else estimated_tokens
+        self._transport.record_usage(estimated_tokens, self._total_tokens(usage, fallback_tokens))
+    
+    @staticmethod
+    def _request_options(timeout: float | None,
+                         response_format: Dict[str, Any] | None = None,
+                         max_tokens: int | None = None) -> Dict[str, Any]:
+        """Per-call options for the API request; empty unless this call overrides a default."""
+        options: Dict[str, Any] = {}
+        if timeout is not None:
+            options["timeout"] = openai_timeout(timeout)
+        if response_format is not None:
+            options["response_format"] = response_format
+        if max_tokens is not None:
+            options["max_tokens"] = max_tokens
+        return options
+    
+    @staticmethod
+    def _estimated_tokens(api_messages: List[ChatCompletionMessageParam]) -> int:
+        """Estimate the tokens a call will use: its prompt plus the expected completion."""
+        prompt_tokens = sum(estimate_tokens(str(m.get("content") or "")) for m in api_messages)
+        return prompt_tokens + settings.openai_expected_completion_tokens
+    
+    @staticmethod
+    def _total_tokens(usage: Any, estimated_tokens: int) -> int:
+        """Get the tokens a call actually used, falling back to the estimate if usage was not reported."""
+        total_tokens = getattr(usage, "total_tokens", None)
+        return total_tokens if isinstance(total_tokens, int) else estimated_tokens
+    
+    def _record_turn(self,
+                     session_id: str,
+                     api_messages: List[ChatCompletionMessageParam],
+                     assistant_content: str,
+                     usage: Any) -> None:
+        """Update session history with both the user message and the assistant's response."""
         assistant_response: ChatCompletionAssistantMessageParam = {
             "role": "assistant", 
             "content": assistant_content
         }
-        self._messages.append(assistant_response)
-        
-        return assistant_content
\ No newline at end of file
+        prompt_tokens, completion_tokens = self._usage(usage, api_messages, assistant_content)
+        self._conversations.record_turn(
+            session_id,
+            api_messages[-1],
+            assistant_response,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens
+        )
+    
+    @staticmethod
+    def _usage(usage: Any,
+               api_messages: List[ChatCompletionMessageParam],
+               assistant_content: str) -> Tuple[int, int]:
+        """Get prompt and completion token counts, estimating them if the API did not report usage."""
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        if not isinstance(prompt_tokens, int):
+            prompt_tokens = sum(estimate_tokens(str(m.get("content") or "")) for m in api_messages)
+        if not isinstance(completion_tokens, int):
+            completion_tokens = estimate_tokens(assistant_content)
+        return prompt_tokens, completion_tokens
@@ -0,0 +1,453 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+import httpx
+import openai
+
+from app.core.config import settings
+from app.core.exceptions import UpstreamRateLimitError, UpstreamTimeoutError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Upstream errors worth retrying: throttling, transient server failures and network problems
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APIConnectionError,  # includes APITimeoutError
+)
+
+
+class TokenBucket:
+    """A thread-safe token bucket refilled continuously at a fixed rate.
+
+    The balance may go negative when actual usage turns out higher than what was
+    reserved; later callers then wait until the debt is repaid.
+    """
+
+    def __init__(self,
+                 capacity: float,
+                 refill_per_second: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self._capacity = capacity
+        self._refill_per_second = refill_per_second
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._refill_per_second)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take ``amount`` tokens if available.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise how many seconds until they will be.
+        """
+        with self._lock:
+            self._refill()
+            # Requests larger than the bucket are let through once it is full.
+            needed = min(amount, self._capacity)
+            if self._tokens >= needed:
+                self._tokens -= amount
+                return 0.0
+            return (needed - self._tokens) / self._refill_per_second
+
+    def adjust(self, amount: float) -> None:
+        """Charge (positive) or refund (negative) tokens after the fact."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._capacity, self._tokens - amount)
+
+
+class RateLimiter:
+    """A process-wide limiter on requests per minute and tokens per minute.
+
+    Callers block until their request fits under both budgets. When the API
+    answers 429, every caller pauses until the advertised ``Retry-After`` has passed,
+    instead of each thread bouncing off the quota on its own.
+    """
+
+    def __init__(self,
+                 requests_per_minute: int,
+                 tokens_per_minute: int,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep,
+                 async_sleep: Callable[[float], Awaitable[None]] = asyncio.sleep):
+        """Initialize the rate limiter.
+
+        Args:
+            requests_per_minute (int): Request budget; 0 disables the limit.
+            tokens_per_minute (int): Token budget; 0 disables the limit.
+            clock (Callable[[], float], optional): Monotonic time source, injectable for tests.
+            sleep (Callable[[float], None], optional): Sleep function, injectable for tests.
+            async_sleep (Callable[[float], Awaitable[None]], optional): Sleep coroutine used by
+                ``acquire_async``, injectable for tests.
+        """
+        self._requests = TokenBucket(requests_per_minute, requests_per_minute / 60, clock) if requests_per_minute > 0 else None
+        self._tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60, clock) if tokens_per_minute > 0 else None
+        self._clock = clock
+        self._sleep = sleep
+        self._async_sleep = async_sleep
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+
+    def acquire(self, tokens: int, timeout: float) -> None:
+        """Wait until a request using ``tokens`` tokens may be sent.
+
+        Args:
+            tokens (int): Estimated tokens (prompt plus expected completion) for the request.
+            timeout (float): Maximum seconds to wait.
+
+        Raises:
+            UpstreamRateLimitError: If the request cannot be sent within ``timeout``.
+        """
+        deadline = self._clock() + timeout
+        held = self._held()
+        while (wait := self._reserve(held, tokens, deadline)) > 0:
+            self._sleep(wait)
+
+    async def acquire_async(self, tokens: int, timeout: float) -> None:
+        """Like ``acquire``, but waits without blocking the event loop."""
+        deadline = self._clock() + timeout
+        held = self._held()
+        while (wait := self._reserve(held, tokens, deadline)) > 0:
+            await self._async_sleep(wait)
+
+    def _held(self) -> Dict[str, bool]:
+        return {"request": self._requests is None, "tokens": self._tokens is None}
+
+    def _reserve(self, held: Dict[str, bool], tokens: int, deadline: float) -> float:
+        """Try to take the request and its tokens; return how long to wait before trying again (0 once held)."""
+        with self._lock:
+            wait = max(0.0, self._paused_until - self._clock())
+        if wait == 0 and not held["request"]:
+            wait = self._requests.reserve(1)
+            held["request"] = wait == 0
+        if wait == 0 and not held["tokens"]:
+            wait = self._tokens.reserve(tokens)
+            held["tokens"] = wait == 0
+        if wait == 0 and held["request"] and held["tokens"]:
+            return 0.0
+        if self._clock() + wait > deadline:
+            if held["request"] and self._requests is not None:
+                self._requests.adjust(-1)
+            raise UpstreamRateLimitError(
+                "OpenAI rate limit budget exhausted; retry later",
+                retry_after=max(1.0, wait)
+            )
+        return wait
+
+    def record_usage(self, estimated: int, actual: int) -> None:
+        """Reconcile the token budget once actual usage is known."""
+        if self._tokens is not None:
+            self._tokens.adjust(actual - estimated)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller for ``seconds`` (e.g. after a 429)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, honoring the API's ``Retry-After`` hints."""
+
+    def __init__(self,
+                 max_retries: int,
+                 base_delay: float,
+                 max_delay: float,
+                 random_fn: Callable[[], float] = random.random):
+        """Initialize the retry policy.
+
+        Args:
+            max_retries (int): Retries after the first attempt; 0 disables retrying.
+            base_delay (float): Backoff ceiling for the first retry, doubled for each further retry.
+            max_delay (float): Longest delay worth waiting; a longer ``Retry-After`` is not retried.
+            random_fn (Callable[[], float], optional): Source of jitter in [0, 1), injectable for tests.
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._random = random_fn
+
+    def delay(self, attempt: int, error: Exception) -> float | None:
+        """Get the delay before retrying after ``error``.
+
+        Args:
+            attempt (int): Number of attempts made so far (1 after the first failure).
+            error (Exception): The error raised by the last attempt.
+
+        Returns:
+            float | None: Seconds to wait, or None if the error should not be retried.
+        """
+        if attempt > self.max_retries or not isinstance(error, RETRYABLE_ERRORS):
+            return None
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_delay else None
+        return min(self.max_delay, self.base_delay * 2 ** (attempt - 1)) * self._random()
+
+
+def retry_after_seconds(error: Exception) -> float | None:
+    """Read the ``retry-after-ms`` or ``Retry-After`` header of an API error, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) * scale)
+        except ValueError:
+            pass
+        try:
+            # Retry-After may also be an HTTP date.
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+class OpenAITransport:
+    """Sends OpenAI calls through the rate limiter and retry policy.
+
+    One transport is shared by every client in the process so that all threads
+    draw on the same request and token budgets.
+    """
+
+    def __init__(self,
+                 limiter: RateLimiter,
+                 retry_policy: RetryPolicy,
+                 wait_timeout: float,
+                 sleep: Callable[[float], None] = time.sleep,
+                 async_sleep: Callable[[float], Awaitable[None]] = asyncio.sleep):
+        """Initialize the transport.
+
+        Args:
+            limiter (RateLimiter): Budget every call must fit under.
+            retry_policy (RetryPolicy): When and how long to back off after a failure.
+            wait_timeout (float): Longest a call may wait for rate limit budget.
+            sleep (Callable[[float], None], optional): Sleep function, injectable for tests.
+            async_sleep (Callable[[float], Awaitable[None]], optional): Sleep coroutine used by
+                ``call_async``, injectable for tests.
+        """
+        self.limiter = limiter
+        self.retry_policy = retry_policy
+        self.wait_timeout = wait_timeout
+        self._sleep = sleep
+        self._async_sleep = async_sleep
+
+    @classmethod
+    def from_settings(cls) -> "OpenAITransport":
+        """Build a transport configured from application settings."""
+        return cls(
+            limiter=RateLimiter(settings.openai_requests_per_minute, settings.openai_tokens_per_minute),
+            retry_policy=RetryPolicy(
+                max_retries=settings.openai_max_retries,
+                base_delay=settings.openai_retry_base_delay,
+                max_delay=settings.openai_retry_max_delay,
+            ),
+            wait_timeout=settings.openai_rate_limit_wait_seconds,
+        )
+
+    def call(self, send: Callable[[], T], estimated_tokens: int) -> T:
+        """Make an API call, waiting for rate limit budget and retrying transient failures.
+
+        Args:
+            send (Callable[[], T]): Performs the API call.
+            estimated_tokens (int): Tokens the call is expected to use (prompt plus completion).
+
+        Returns:
+            T: The result of ``send``.
+
+        Raises:
+            UpstreamRateLimitError: If the API keeps answering 429 or the local budget is exhausted.
+            UpstreamTimeoutError: If the API keeps timing out.
+        """
+        attempt = 0
+        while True:
+            self.limiter.acquire(estimated_tokens, self.wait_timeout)
+            attempt += 1
+            try:
+                return send()
+            except RETRYABLE_ERRORS as e:
+                self._refund(estimated_tokens)
+                self._sleep(self._retry_delay(attempt, e))
+            except BaseException:
+                self._refund(estimated_tokens)
+                raise
+
+    async def call_async(self, send: Callable[[], Awaitable[T]], estimated_tokens: int) -> T:
+        """Like ``call``, for coroutine API calls; waits without blocking the event loop."""
+        attempt = 0
+        while True:
+            await self.limiter.acquire_async(estimated_tokens, self.wait_timeout)
+            attempt += 1
+            try:
+                return await send()
+            except RETRYABLE_ERRORS as e:
+                self._refund(estimated_tokens)
+                await self._async_sleep(self._retry_delay(attempt, e))
+            except BaseException:
+                self._refund(estimated_tokens)
+                raise
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the token budget once a call's actual usage is known."""
+        self.limiter.record_usage(estimated_tokens, actual_tokens)
+
+    def _refund(self, estimated_tokens: int) -> None:
+        """Give back a failed attempt's reservation: it produced nothing, and the next attempt reserves anew."""
+        self.limiter.record_usage(estimated_tokens, 0)
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        """Get the delay before retrying ``error``, re-raising it (mapped to an upstream error) if it should not be."""
+        retry_after = retry_after_seconds(error)
+        if isinstance(error, openai.RateLimitError):
+            # Hold back every caller in the process, not just this one.
+            self.limiter.pause(retry_after if retry_after is not None else self.retry_policy.base_delay)
+        delay = self.retry_policy.delay(attempt, error)
+        if delay is None:
+            upstream_error = self._upstream_error(error, retry_after)
+            if upstream_error is None:
+                raise error
+            raise upstream_error from error
+        logger.warning("OpenAI call failed (%s); retry %d in %.2fs", type(error).__name__, attempt, delay)
+        return delay
+
+    def _upstream_error(self, error: Exception, retry_after: float | None) -> Exception | None:
+        if isinstance(error, openai.RateLimitError):
+            return UpstreamRateLimitError(
+                "OpenAI rate limit exceeded; retry later",
+                retry_after=retry_after if retry_after is not None else self.retry_policy.max_delay
+            )
+        if isinstance(error, openai.APITimeoutError):
+            return UpstreamTimeoutError("OpenAI request timed out")
+        return None
+
+
+_default_transport: OpenAITransport | None = None
+_shared_http_client: tuple[int, httpx.Client] | None = None
+_shared_async_http_client: tuple[int, httpx.AsyncClient] | None = None
+_lock = threading.Lock()
+
+
+def default_transport() -> OpenAITransport:
+    """Get the process-wide transport, creating it from settings on first use."""
+    global _default_transport
+    with _lock:
+        if _default_transport is None:
+            _default_transport = OpenAITransport.from_settings()
+        return _default_transport
+
+
+def shared_http_client() -> httpx.Client:
+    """Get the process-wide keep-alive connection pool used for OpenAI calls.
+
+    A forked worker gets a pool of its own rather than sharing sockets with its parent.
+    """
+    global _shared_http_client
+    with _lock:
+        if _shared_http_client is None or _shared_http_client[0] != os.getpid():
+            client = httpx.Client(
+                timeout=openai_timeout(),
+                limits=httpx.Limits(
+                    max_connections=settings.openai_max_connections,
+                    max_keepalive_connections=settings.openai_max_connections,
+                    keepalive_expiry=settings.openai_keepalive_seconds,
+                ),
+                follow_redirects=True,
+            )
+            _shared_http_client = (os.getpid(), client)
+        return _shared_http_client[1]
+
+
+def shared_async_http_client() -> httpx.AsyncClient:
+    """Get the process-wide keep-alive connection pool used for async OpenAI calls.
+
+    The pool is sized by OPENAI_ASYNC_MAX_CONNECTIONS, since one event loop can
+    hold far more calls in flight than a thread pool. A closed pool (e.g. after
+    the ASGI app shut down) is replaced on next use.
+    """
+    global _shared_async_http_client
+    with _lock:
+        if (_shared_async_http_client is None
+                or _shared_async_http_client[0] != os.getpid()
+                or _shared_async_http_client[1].is_closed):
+            client = httpx.AsyncClient(
+                timeout=openai_timeout(),
+                limits=httpx.Limits(
+                    max_connections=settings.openai_async_max_connections,
+                    max_keepalive_connections=settings.openai_async_max_connections,
+                    keepalive_expiry=settings.openai_keepalive_seconds,
+                ),
+                follow_redirects=True,
+            )
+            _shared_async_http_client = (os.getpid(), client)
+        return _shared_async_http_client[1]
+
+
+def openai_timeout(seconds: float | None = None) -> httpx.Timeout:
+    """Build the timeout for an OpenAI call (``seconds`` overall, defaulting to the configured timeout)."""
+    return httpx.Timeout(
+        seconds if seconds is not None else settings.openai_timeout_seconds,
+        connect=settings.openai_connect_timeout_seconds,
+    )
+
+
+def prewarm(base_url: str, connections: int) -> int:
+    """Open keep-alive connections to the API ahead of the first conversion.
+
+    Each connection is opened with a lightweight unauthenticated request, so DNS
+    resolution and the TLS handshake are paid at boot rather than by a user.
+
+    Args:
+        base_url (str): The API base URL.
+        connections (int): How many connections to open concurrently.
+
+    Returns:
+        int: The number of connections opened successfully.
+    """
+    client = shared_http_client()
+    url = base_url.rstrip("/") + "/models"
+
+    def touch(_: int) -> bool:
+        try:
+            client.head(url, timeout=openai_timeout())
+            return True
+        except httpx.HTTPError as e:
+            logger.info("Could not prewarm OpenAI connection: %s", e)
+            return False
+
+    count = max(1, connections)
+    with ThreadPoolExecutor(max_workers=count, thread_name_prefix="openai-prewarm") as executor:
+        return sum(executor.map(touch, range(count)))
+
+
+async def prewarm_async(base_url: str, connections: int) -> int:
+    """Like ``prewarm``, for the async connection pool."""
+    client = shared_async_http_client()
+    url = base_url.rstrip("/") + "/models"
+
+    async def touch() -> bool:
+        try:
+            await client.head(url, timeout=openai_timeout())
+            return True
+        except httpx.HTTPError as e:
+            logger.info("Could not prewarm OpenAI connection: %s", e)
+            return False
+
+    return sum(await asyncio.gather(*(touch() for _ in range(max(1, connections)))))
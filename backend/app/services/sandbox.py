@@ -0,0 +1,228 @@
+"""Runs generated unit tests against generated code inside a verification subprocess.
+
+This module is preloaded by the verifier's forkserver, so it imports nothing
+from the application: every verification process forks from an interpreter
+that already has it (and ``unittest``) loaded.
+"""
+import ctypes
+import importlib.abc
+import importlib.util
+import io
+import os
+import pwd
+import resource
+import socket
+import sys
+import tempfile
+import traceback
+import types
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from typing import Any, Dict
+
+# Name the generated code is importable under (e.g. "from solution import main")
+SOLUTION_MODULE = "solution"
+TESTS_MODULE = "test_solution"
+
+# Largest file the generated code may write
+MAX_FILE_BYTES = 16 * 1024 * 1024
+
+# Account verification processes switch to when the server runs as root
+UNPRIVILEGED_USER = "nobody"
+
+_CLONE_NEWNS = 0x00020000
+_CLONE_NEWUSER = 0x10000000
+_CLONE_NEWNET = 0x40000000
+_MS_NOSUID, _MS_NODEV, _MS_NOEXEC = 0x2, 0x4, 0x8
+_MS_REC = 0x4000
+_MS_PRIVATE = 0x40000
+
+
+class _SolutionFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """Resolve imports of unknown top-level modules to the generated code.
+
+    Generated tests import the code under test by whatever name the model chose
+    ("from converted import ...", "import main", ...). Installed modules are
+    found first; only names no other finder knows fall through to here.
+    """
+
+    def __init__(self, module: types.ModuleType):
+        self._module = module
+
+    def find_spec(self, name, path, target=None):
+        if path is None and "." not in name:
+            return importlib.util.spec_from_loader(name, self)
+        return None
+
+    def create_module(self, spec):
+        return self._module
+
+    def exec_module(self, module):
+        pass
+
+
+def apply_limits(cpu_seconds: int, memory_mb: int) -> None:
+    """Cap the CPU time, address space and file size of the current process."""
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    if memory_mb > 0:
+        memory = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (MAX_FILE_BYTES, MAX_FILE_BYTES))
+
+
+def isolate(workdir: str) -> None:
+    """Cut the current process off from the server's secrets and from the network.
+
+    The environment is replaced with a minimal one, and the copy the kernel keeps
+    (``/proc/self/environ``) is wiped. Where the kernel allows it the process moves
+    into new network and mount namespaces (and a user namespace unless it is root):
+    it is left without network interfaces, and ``/proc`` is hidden so the
+    environments of the server's processes cannot be read. A root server also
+    switches the process to ``UNPRIVILEGED_USER``. Sockets are refused in any case.
+
+    Args:
+        workdir (str): The scratch directory the process runs in, used as its home.
+    """
+    _scrub_environment(workdir)
+    try:
+        _unshare()
+    except OSError:
+        # Namespaces are not available (e.g. blocked by a container's seccomp profile)
+        pass
+    if os.geteuid() == 0:
+        _drop_privileges(workdir)
+    _refuse_sockets()
+
+
+def _scrub_environment(workdir: str) -> None:
+    os.environ.clear()
+    os.environ.update({"PATH": os.defpath, "HOME": workdir, "TMPDIR": workdir, "LANG": "C.UTF-8"})
+    tempfile.tempdir = workdir
+    try:
+        # Fields 50 and 51 of /proc/self/stat: where the environment the process started with lies
+        with open("/proc/self/stat", "rb") as stat:
+            fields = stat.read().rsplit(b")", 1)[1].split()
+        start, end = int(fields[47]), int(fields[48])
+        with open("/proc/self/mem", "r+b", buffering=0) as memory:
+            memory.seek(start)
+            memory.write(b"\0" * (end - start))
+    except (OSError, IndexError, ValueError):
+        pass
+
+
+def _unshare() -> None:
+    libc = ctypes.CDLL(None, use_errno=True)
+
+    def check(result: int) -> None:
+        if result != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    root = os.geteuid() == 0
+    uid, gid = os.getuid(), os.getgid()
+    check(libc.unshare(_CLONE_NEWNS | _CLONE_NEWNET | (0 if root else _CLONE_NEWUSER)))
+    if not root:
+        # Keep our own ids inside the user namespace
+        for path, content in (("setgroups", "deny"), ("uid_map", f"{uid} {uid} 1"), ("gid_map", f"{gid} {gid} 1")):
+            with open(f"/proc/self/{path}", "w") as mapping:
+                mapping.write(content)
+    # Private first, so the mount below does not propagate to the host
+    check(libc.mount(b"none", b"/", None, _MS_REC | _MS_PRIVATE, None))
+    check(libc.mount(b"tmpfs", b"/proc", b"tmpfs", _MS_NOSUID | _MS_NODEV | _MS_NOEXEC, b"size=4k,mode=555"))
+
+
+def _drop_privileges(workdir: str) -> None:
+    user = pwd.getpwnam(UNPRIVILEGED_USER)
+    os.chown(workdir, user.pw_uid, user.pw_gid)
+    os.setgroups([])
+    os.setgid(user.pw_gid)
+    os.setuid(user.pw_uid)
+
+
+def _refuse_sockets() -> None:
+    def refuse(*args, **kwargs):
+        raise PermissionError("Network access is disabled during verification")
+
+    for module in (socket, sys.modules.get("_socket")):
+        if module is not None:
+            for name in ("socket", "socketpair", "fromfd", "create_connection", "create_server"):
+                if hasattr(module, name):
+                    setattr(module, name, refuse)
+
+
+def run_tests(python_code: str, unit_tests: str) -> Dict[str, Any]:
+    """Load the generated code as a module and run the generated tests against it.
+
+    Tests may be ``unittest.TestCase`` classes or pytest-style ``test_*``
+    functions using plain asserts. The tests run with the code's names already
+    in scope, so tests that use the code without importing it work too.
+
+    Returns:
+        Dict[str, Any]: ``status`` ("passed", "failed" or "error"), ``tests_run``,
+            ``failures``, ``errors`` and the captured ``output``.
+    """
+    output = io.StringIO()
+    with redirect_stdout(output), redirect_stderr(output):
+        result = _run_tests(python_code, unit_tests, output)
+    result["output"] = output.getvalue()
+    return result
+
+
+def _run_tests(python_code: str, unit_tests: str, output: io.StringIO) -> Dict[str, Any]:
+    solution = types.ModuleType(SOLUTION_MODULE)
+    solution.__file__ = f"{SOLUTION_MODULE}.py"
+    sys.modules[SOLUTION_MODULE] = solution
+    try:
+        exec(compile(python_code, solution.__file__, "exec"), solution.__dict__)
+    except BaseException:
+        traceback.print_exc()
+        return {"status": "error", "tests_run": 0, "failures": 0, "errors": 1}
+    sys.meta_path.append(_SolutionFinder(solution))
+
+    tests = types.ModuleType(TESTS_MODULE)
+    tests.__dict__.update({name: value for name, value in solution.__dict__.items() if not name.startswith("__")})
+    tests.__file__ = f"{TESTS_MODULE}.py"
+    sys.modules[TESTS_MODULE] = tests
+    try:
+        exec(compile(unit_tests, tests.__file__, "exec"), tests.__dict__)
+    except BaseException:
+        traceback.print_exc()
+        return {"status": "error", "tests_run": 0, "failures": 0, "errors": 1}
+
+    suite = unittest.defaultTestLoader.loadTestsFromModule(tests)
+    for name, value in list(tests.__dict__.items()):
+        if (name.startswith("test") and isinstance(value, types.FunctionType)
+                and value.__module__ == TESTS_MODULE and value.__code__.co_argcount == 0):
+            suite.addTest(unittest.FunctionTestCase(value, description=name))
+
+    if suite.countTestCases() == 0:
+        print("No tests found", file=output)
+        return {"status": "error", "tests_run": 0, "failures": 0, "errors": 0}
+
+    result = unittest.TextTestRunner(stream=output, verbosity=2).run(suite)
+    return {
+        "status": "passed" if result.wasSuccessful() else "failed",
+        "tests_run": result.testsRun,
+        "failures": len(result.failures),
+        "errors": len(result.errors),
+    }
+
+
+def main(python_code: str, unit_tests: str, cpu_seconds: int, memory_mb: int, connection) -> None:
+    """Entry point of a verification process: apply limits, isolate, run the tests, send the result.
+
+    Runs in a scratch directory, so files the code writes are not left behind
+    in the server's working directory, and without the server's environment or
+    network access (see ``isolate``).
+    """
+    apply_limits(cpu_seconds, memory_mb)
+    with tempfile.TemporaryDirectory(prefix="ada-verify-") as workdir:
+        isolate(workdir)
+        os.chdir(workdir)
+        try:
+            result = run_tests(python_code, unit_tests)
+        except BaseException:
+            result = {"status": "error", "tests_run": 0, "failures": 0, "errors": 1,
+                      "output": traceback.format_exc()}
+        connection.send(result)
+        connection.close()
@@ -0,0 +1,351 @@
+import json
+import re
+from typing import Any, Dict, List, Sequence, Tuple
+
+# Section headers in converter responses and the result field each one fills
+SECTION_PATTERN = re.compile(r'# (Logic|Unit Test|Python Code)')
+SECTION_FIELDS = {
+    "Logic": "logic",
+    "Unit Test": "unit_tests",
+    "Python Code": "python_code",
+}
+
+# Header written for each field when composing a response
+SECTION_HEADERS = {field: name for name, field in SECTION_FIELDS.items()}
+
+# Opening code fence and its info string (```json, ```markdown, ...)
+_OPENING_FENCE = re.compile(r'```[\w+.-]*')
+
+# Longest header, used to avoid rescanning text that cannot start a header
+_MAX_HEADER_LENGTH = max(len("# " + name) for name in SECTION_FIELDS)
+
+# JSON string escapes and the characters they stand for
+_JSON_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+# A run of string characters that needs no decoding
+_JSON_PLAIN = re.compile(r'[^"\\]+')
+
+
+def parse_sections(response: str) -> Dict[str, str]:
+    """Parse a complete converter response into its ``logic``, ``unit_tests`` and ``python_code`` sections.
+
+    Text before the first header is ignored, and a missing section is an empty string.
+    """
+    sections = {field: "" for field in SECTION_HEADERS}
+    parts = SECTION_PATTERN.split(response)
+    for i in range(1, len(parts), 2):
+        sections[SECTION_FIELDS[parts[i]]] = parts[i + 1].strip() if i + 1 < len(parts) else ""
+    return sections
+
+
+def format_sections(sections: Dict[str, str]) -> str:
+    """Compose a converter response from its sections (the inverse of ``parse_sections``)."""
+    return "\n".join(f"# {SECTION_HEADERS[field]}\n{sections.get(field, '')}" for field in SECTION_HEADERS)
+
+
+def section_schema(fields: Sequence[str] = tuple(SECTION_HEADERS)) -> Dict[str, Any]:
+    """JSON schema of a structured converter response holding ``fields`` (by default every section)."""
+    return {
+        "type": "object",
+        "properties": {field: {"type": "string"} for field in fields},
+        "required": list(fields),
+        "additionalProperties": False,
+    }
+
+
+def is_structured(response: str) -> bool:
+    """Whether a converter response is a JSON object rather than ``# Section`` headers.
+
+    Either may be wrapped in a code fence (e.g. ```json or ```markdown); the
+    response is structured only if a ``{`` opens it once the fence is skipped.
+    """
+    return _first_content(response) == "{"
+
+
+def _first_content(response: str) -> str | None:
+    """The first non-blank character after an optional opening code fence, or None if the
+    (possibly partial) response ends before it."""
+    text = response.lstrip()
+    if text.startswith("```"):
+        rest = text[_OPENING_FENCE.match(text).end():]
+        if not rest:
+            # The fence's info string may still be arriving
+            return None
+        text = rest.lstrip()
+    elif "```".startswith(text):
+        # Blank, or a fence that has only begun
+        return None
+    return text[:1] or None
+
+
+def parse_structured(response: str) -> Dict[str, str]:
+    """Parse a complete structured (JSON) converter response into its sections.
+
+    Unlike ``json.loads`` this tolerates a truncated object (e.g. a completion
+    cut off by the token limit): sections whose value was completed are kept,
+    and the rest are empty strings.
+    """
+    parser = IncrementalJSONSectionParser()
+    sections = {field: "" for field in SECTION_HEADERS}
+    for field, content in [*parser.feed(response), *parser.close()]:
+        sections[field] = content
+    return sections
+
+
+def format_structured(sections: Dict[str, str]) -> str:
+    """Compose a structured converter response from its sections (the inverse of ``parse_structured``)."""
+    return json.dumps({field: sections.get(field, "") for field in SECTION_HEADERS})
+
+
+def parse_response(response: str) -> Dict[str, str]:
+    """Parse a complete converter response in either format into its sections."""
+    return parse_structured(response) if is_structured(response) else parse_sections(response)
+
+
+def missing_sections(sections: Dict[str, str]) -> List[str]:
+    """The fields of a parsed response whose section is missing or blank, in section order."""
+    return [field for field in SECTION_HEADERS if not sections.get(field, "").strip()]
+
+
+class IncrementalSectionParser:
+    """Split a converter response into sections while it is still being generated.
+
+    Text is fed in arbitrary chunks (e.g. streamed completion tokens). A section is
+    complete once the next section header is seen, or when the parser is closed, so
+    each section is reported as soon as its content is final. The sections produced
+    are the same as ``parse_sections`` would return for the full text.
+    """
+
+    def __init__(self):
+        self._section: str | None = None
+        self._buffer = ""
+        self._scanned = 0
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        """Add generated text.
+
+        Args:
+            text (str): The next chunk of the response.
+
+        Returns:
+            List[Tuple[str, str]]: ``(field, content)`` pairs for sections completed by this chunk.
+        """
+        self._buffer += text
+        completed = []
+        while True:
+            # A header may straddle chunks, so resume scanning just before the unscanned tail.
+            match = SECTION_PATTERN.search(self._buffer, max(0, self._scanned - _MAX_HEADER_LENGTH))
+            if match is None:
+                self._scanned = len(self._buffer)
+                return completed
+            completed.extend(self._finish_section(self._buffer[:match.start()]))
+            self._section = match.group(1)
+            self._buffer = self._buffer[match.end():]
+            self._scanned = 0
+
+    def close(self) -> List[Tuple[str, str]]:
+        """Finish parsing once the response is complete.
+
+        Returns:
+            List[Tuple[str, str]]: The final section, if the response contained any header.
+        """
+        completed = self._finish_section(self._buffer)
+        self._section = None
+        self._buffer = ""
+        self._scanned = 0
+        return completed
+
+    def _finish_section(self, content: str) -> List[Tuple[str, str]]:
+        if self._section is None:
+            # Text before the first header is not part of any section.
+            return []
+        return [(SECTION_FIELDS[self._section], content.strip())]
+
+
+class IncrementalJSONSectionParser:
+    """Extract sections from a structured (JSON) converter response while it is being generated.
+
+    Has the same interface as ``IncrementalSectionParser``. The response is
+    scanned once, character runs at a time, and a section is reported as soon as
+    its string value is closed. Text before the opening brace (e.g. a code fence)
+    is ignored, as are unknown keys and non-string values.
+    """
+
+    _START, _KEY_OR_END, _KEY, _COLON, _VALUE, _STRING, _SKIP, _AFTER_VALUE, _DONE = range(9)
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self) -> None:
+        self._state = self._START
+        self._chars: List[str] = []
+        self._key = ""
+        # Pending escape sequence inside a string ("" right after a backslash)
+        self._escape: str | None = None
+        # Nesting depth, and whether inside a string, while skipping a non-string value
+        self._depth = 0
+        self._skip_string = False
+        self._skip_escaped = False
+        self._seen: set = set()
+
+    @property
+    def complete(self) -> bool:
+        """Whether the closing brace of the response has been seen."""
+        return self._state == self._DONE
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        """Add generated text.
+
+        Args:
+            text (str): The next chunk of the response.
+
+        Returns:
+            List[Tuple[str, str]]: ``(field, content)`` pairs for sections completed by this chunk.
+        """
+        completed: List[Tuple[str, str]] = []
+        position = 0
+        while position < len(text):
+            if self._state in (self._KEY, self._STRING) and self._escape is None:
+                plain = _JSON_PLAIN.match(text, position)
+                if plain is not None:
+                    self._chars.append(plain.group())
+                    position = plain.end()
+                    continue
+            self._step(text[position], completed)
+            position += 1
+        return completed
+
+    def close(self) -> List[Tuple[str, str]]:
+        """Finish parsing once the response is complete.
+
+        A section whose value was cut off is incomplete, so it is not reported.
+
+        Returns:
+            List[Tuple[str, str]]: Always empty; kept for parity with ``IncrementalSectionParser``.
+        """
+        self._reset()
+        return []
+
+    def _step(self, char: str, completed: List[Tuple[str, str]]) -> None:
+        state = self._state
+        if state in (self._KEY, self._STRING):
+            value = self._string_char(char)
+            if value is None:
+                return
+            if state == self._KEY:
+                self._key = value
+                self._state = self._COLON
+            else:
+                if self._key in SECTION_HEADERS and self._key not in self._seen:
+                    self._seen.add(self._key)
+                    completed.append((self._key, value.strip()))
+                self._state = self._AFTER_VALUE
+        elif state == self._START:
+            if char == "{":
+                self._state = self._KEY_OR_END
+        elif state == self._KEY_OR_END:
+            if char == '"':
+                self._chars = []
+                self._state = self._KEY
+            elif char == "}":
+                self._state = self._DONE
+        elif state == self._COLON:
+            if char == ":":
+                self._state = self._VALUE
+        elif state == self._VALUE:
+            if char == '"':
+                self._chars = []
+                self._state = self._STRING
+            elif not char.isspace():
+                self._depth = 0
+                self._skip_string = False
+                self._state = self._SKIP
+                self._skip(char)
+        elif state == self._SKIP:
+            self._skip(char)
+        elif state == self._AFTER_VALUE:
+            if char == ",":
+                self._state = self._KEY_OR_END
+            elif char == "}":
+                self._state = self._DONE
+
+    def _string_char(self, char: str) -> str | None:
+        """Consume one character of a string; returns the decoded string once it is closed."""
+        if self._escape is None:
+            if char == "\\":
+                self._escape = ""
+            elif char == '"':
+                return "".join(self._chars)
+            else:
+                self._chars.append(char)
+            return None
+
+        self._escape += char
+        if self._escape[0] != "u":
+            self._chars.append(_JSON_ESCAPES.get(self._escape, self._escape))
+            self._escape = None
+        elif len(self._escape) == 5:
+            self._chars.append(chr(int(self._escape[1:], 16)))
+            self._escape = None
+            self._join_surrogates()
+        return None
+
+    def _join_surrogates(self) -> None:
+        # A character outside the BMP arrives as a pair of \u escapes
+        if len(self._chars) >= 2 and "\ud800" <= self._chars[-2] <= "\udbff" and "\udc00" <= self._chars[-1] <= "\udfff":
+            pair = self._chars.pop(-2) + self._chars.pop()
+            self._chars.append(pair.encode("utf-16", "surrogatepass").decode("utf-16"))
+
+    def _skip(self, char: str) -> None:
+        """Skip one character of a non-string value (number, literal, array or object)."""
+        if self._skip_string:
+            if self._skip_escaped:
+                self._skip_escaped = False
+            elif char == "\\":
+                self._skip_escaped = True
+            elif char == '"':
+                self._skip_string = False
+        elif char == '"':
+            self._skip_string = True
+        elif char in "[{":
+            self._depth += 1
+        elif char in "]}":
+            if self._depth == 0:
+                # The end of the response object itself
+                self._state = self._DONE
+                return
+            self._depth -= 1
+            if self._depth == 0:
+                self._state = self._AFTER_VALUE
+        elif char == "," and self._depth == 0:
+            self._state = self._KEY_OR_END
+
+
+class IncrementalResponseParser:
+    """Incrementally parse a converter response in either format.
+
+    The format is decided by the first non-blank text after an optional code
+    fence: a JSON object is parsed with ``IncrementalJSONSectionParser``,
+    anything else with ``IncrementalSectionParser``.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._parser: IncrementalSectionParser | IncrementalJSONSectionParser | None = None
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        """Add generated text (see ``IncrementalSectionParser.feed``)."""
+        if self._parser is None:
+            self._pending += text
+            if _first_content(self._pending) is None:
+                return []
+            self._parser = IncrementalJSONSectionParser() if is_structured(self._pending) else IncrementalSectionParser()
+            text, self._pending = self._pending, ""
+        return self._parser.feed(text)
+
+    def close(self) -> List[Tuple[str, str]]:
+        """Finish parsing once the response is complete (see ``IncrementalSectionParser.close``)."""
+        parser = self._parser or IncrementalSectionParser()
+        completed = parser.feed(self._pending) if self._parser is None else []
+        self._parser = None
+        self._pending = ""
+        return completed + parser.close()
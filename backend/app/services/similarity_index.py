@@ -0,0 +1,292 @@
+"""Near-duplicate lookup of previously converted Ada units.
+
+Units are compared on their token stream (``ada_lexer``) with identifiers,
+numbers and literals replaced by placeholders, so copy-pasted units that only
+rename things or change constants look the same. Each unit is reduced to a
+MinHash signature of its token shingles, whose matching positions estimate the
+Jaccard similarity of two units' shingle sets. Signatures are split into bands
+and every band is hashed into a bucket (locality-sensitive hashing); only units
+sharing a bucket with the upload are compared, through an index, so a lookup
+reads a handful of rows however many units are stored.
+"""
+
+import hashlib
+import random
+import sqlite3
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Callable, List, Sequence, Set, Tuple
+
+from app.core.config import settings
+from app.core.sqlite import SQLiteConnections
+from app.services.ada_lexer import CHARACTER, NUMBER, STRING, WORD, tokenize
+
+# Tokens per shingle
+SHINGLE_SIZE = 5
+# Signature layout: BANDS bands of ROWS positions. Units with similarity s share
+# a bucket with probability 1 - (1 - s**ROWS)**BANDS: ~100% at 0.85, ~57% at 0.5.
+BANDS = 16
+ROWS = 4
+NUM_PERMUTATIONS = BANDS * ROWS
+# Most bucket-sharing units whose signatures are compared on a lookup
+MAX_CANDIDATES = 16
+
+_PRIME = (1 << 61) - 1
+# Fixed seed: signatures are stored, so the permutations must not change between processes
+_random = random.Random(0x5EED)
+_PERMUTATIONS = [(_random.randrange(1, _PRIME), _random.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+_PLACEHOLDERS = {NUMBER: "<num>", STRING: "<str>", CHARACTER: "<chr>"}
+
+# Ada 2012 reserved words; every other word is an identifier
+_RESERVED_WORDS = frozenset({
+    "abort", "abs", "abstract", "accept", "access", "aliased", "all", "and", "array", "at",
+    "begin", "body", "case", "constant", "declare", "delay", "delta", "digits", "do", "else",
+    "elsif", "end", "entry", "exception", "exit", "for", "function", "generic", "goto", "if",
+    "in", "interface", "is", "limited", "loop", "mod", "new", "not", "null", "of", "or",
+    "others", "out", "overriding", "package", "pragma", "private", "procedure", "protected",
+    "raise", "range", "record", "rem", "renames", "requeue", "return", "reverse", "select",
+    "separate", "some", "subtype", "synchronized", "tagged", "task", "terminate", "then",
+    "type", "until", "use", "when", "while", "with", "xor",
+})
+
+
+def canonical_tokens(source: str) -> List[str]:
+    """The source's tokens with identifiers and literals replaced by placeholders (comments dropped)."""
+    canonical = []
+    for token in tokenize(source):
+        if token.kind == WORD:
+            canonical.append(token.lower if token.lower in _RESERVED_WORDS else "<id>")
+        else:
+            canonical.append(_PLACEHOLDERS.get(token.kind, token.text))
+    return canonical
+
+
+def shingles(tokens: Sequence[str], size: int = SHINGLE_SIZE) -> Set[int]:
+    """Hashes of every run of ``size`` consecutive tokens (the whole sequence if it is shorter)."""
+    windows = [tokens[i:i + size] for i in range(max(1, len(tokens) - size + 1))]
+    return {
+        int.from_bytes(hashlib.blake2b("\x00".join(window).encode("utf-8"), digest_size=8).digest(), "big")
+        for window in windows
+    }
+
+
+def minhash(hashes: Set[int]) -> Tuple[int, ...]:
+    """The MinHash signature of a set of shingle hashes."""
+    if not hashes:
+        return (_PRIME,) * NUM_PERMUTATIONS
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def estimated_similarity(first: Sequence[int], second: Sequence[int]) -> float:
+    """Estimate the Jaccard similarity of two units from their signatures."""
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_PERMUTATIONS
+
+
+def band_buckets(signature: Sequence[int], scope: str) -> List[str]:
+    """The LSH bucket of each band of a signature, within a scope (a model and prompt)."""
+    buckets = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(scope.encode("ascii"))
+        digest.update(array("Q", signature[band * ROWS:(band + 1) * ROWS]).tobytes())
+        buckets.append(f"{band}:{digest.hexdigest()}")
+    return buckets
+
+
+def _scope(model: str, system_prompt: str) -> str:
+    return hashlib.sha256(f"{len(model)}:{model}{system_prompt}".encode("utf-8")).hexdigest()[:16]
+
+
+def _token_digest(source: str) -> str:
+    """Identifies a unit's exact token sequence, so formatting and comments do not matter."""
+    return hashlib.sha256("\x00".join(token.text for token in tokenize(source)).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class SimilarMatch:
+    """A stored conversion of a unit close to the one being looked up."""
+
+    key: str
+    source: str
+    response: str
+    similarity: float
+    # Same tokens as the lookup (only formatting or comments differ) and converted without
+    # dependency context: the stored response can be reused as it is
+    exact: bool
+
+
+class SimilarityIndex:
+    """Converted units indexed for near-duplicate lookup, in SQLite shared by the workers on the host."""
+
+    def __init__(self, path: str, threshold: float, max_entries: int, clock: Callable[[], float] = time.time):
+        """Initialize the index.
+
+        Args:
+            path (str): Path of the SQLite database.
+            threshold (float): Least estimated similarity (0-1) of a match.
+            max_entries (int): Units kept, the least recently matched dropped first; 0 disables the index.
+            clock (Callable[[], float], optional): Wall-clock time source, injectable for tests.
+        """
+        self._connections = SQLiteConnections(path, schema=(
+            "CREATE TABLE IF NOT EXISTS similarity_units ("
+            "key TEXT PRIMARY KEY, scope TEXT NOT NULL, token_digest TEXT NOT NULL, contextual INTEGER NOT NULL, "
+            "signature BLOB NOT NULL, source TEXT NOT NULL, response TEXT NOT NULL, model TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_hit_at REAL NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS similarity_units_token_digest ON similarity_units (scope, token_digest)",
+            "CREATE INDEX IF NOT EXISTS similarity_units_last_hit_at ON similarity_units (last_hit_at)",
+            "CREATE TABLE IF NOT EXISTS similarity_buckets (bucket TEXT NOT NULL, key TEXT NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS similarity_buckets_bucket ON similarity_buckets (bucket)",
+            "CREATE INDEX IF NOT EXISTS similarity_buckets_key ON similarity_buckets (key)",
+        ))
+        self.threshold = threshold
+        self._max_entries = max_entries
+        self._clock = clock
+
+    @classmethod
+    def from_settings(cls) -> "SimilarityIndex":
+        """Build a similarity index configured from application settings."""
+        return cls(
+            path=settings.similarity_index_path,
+            threshold=settings.similarity_threshold,
+            max_entries=settings.similarity_index_max_entries if settings.similarity_index_enabled else 0,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Whether units are indexed and looked up at all."""
+        return self._max_entries > 0
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def find(self, source: str, model: str, system_prompt: str, contextual: bool = False) -> SimilarMatch | None:
+        """Find the stored conversion most similar to ``source``, if any reaches the threshold.
+
+        Args:
+            source (str): The Ada source about to be converted.
+            model (str): The model converting it; only its own conversions match.
+            system_prompt (str): The system prompt it is given; only conversions under it match.
+            contextual (bool, optional): Whether ``source`` is converted with dependency context,
+                in which case no match is ``exact``.
+
+        Returns:
+            SimilarMatch | None: The closest stored conversion, or None.
+        """
+        scope = _scope(model, system_prompt)
+        connection = self._connection()
+        row = None
+        if not contextual:
+            row = connection.execute(
+                "SELECT key, source, response FROM similarity_units "
+                "WHERE scope = ? AND token_digest = ? AND contextual = 0 LIMIT 1",
+                (scope, _token_digest(source)),
+            ).fetchone()
+        if row is not None:
+            match = SimilarMatch(key=row[0], source=row[1], response=row[2], similarity=1.0, exact=True)
+        else:
+            match = self._nearest(connection, minhash(shingles(canonical_tokens(source))), scope)
+        if match is not None:
+            connection.execute("UPDATE similarity_units SET last_hit_at = ? WHERE key = ?", (self._clock(), match.key))
+        return match
+
+    def _nearest(self, connection: sqlite3.Connection, signature: Tuple[int, ...], scope: str) -> SimilarMatch | None:
+        buckets = band_buckets(signature, scope)
+        candidates = connection.execute(
+            f"SELECT u.key, u.signature, u.source, u.response FROM similarity_units u JOIN ("
+            f"SELECT key, COUNT(*) AS shared FROM similarity_buckets WHERE bucket IN ({','.join('?' * len(buckets))}) "
+            f"GROUP BY key ORDER BY shared DESC LIMIT ?) c ON u.key = c.key",
+            (*buckets, MAX_CANDIDATES),
+        ).fetchall()
+        best = None
+        for key, stored, stored_source, response in candidates:
+            similarity = estimated_similarity(signature, array("Q", stored))
+            if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                best = SimilarMatch(key=key, source=stored_source, response=response,
+                                    similarity=similarity, exact=False)
+        return best
+
+    def add(self,
+            key: str,
+            source: str,
+            response: str,
+            model: str,
+            system_prompt: str,
+            contextual: bool = False) -> None:
+        """Index a finished conversion.
+
+        Args:
+            key (str): The conversion's cache key (see ``conversion_key``).
+            source (str): The converted Ada source.
+            response (str): The converter's response.
+            model (str): The model that converted it.
+            system_prompt (str): The system prompt it was given.
+            contextual (bool, optional): Whether it was converted with dependency context.
+        """
+        if not self.enabled:
+            return
+        scope = _scope(model, system_prompt)
+        signature = minhash(shingles(canonical_tokens(source)))
+        now = self._clock()
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM similarity_buckets WHERE key = ?", (key,))
+            connection.execute(
+                "INSERT OR REPLACE INTO similarity_units (key, scope, token_digest, contextual, signature, "
+                "source, response, model, created_at, last_hit_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, scope, _token_digest(source), int(contextual), array("Q", signature).tobytes(),
+                 source, response, model, now, now),
+            )
+            connection.executemany(
+                "INSERT INTO similarity_buckets (bucket, key) VALUES (?, ?)",
+                [(bucket, key) for bucket in band_buckets(signature, scope)],
+            )
+            evicted = connection.execute(
+                "SELECT key FROM similarity_units ORDER BY last_hit_at DESC LIMIT -1 OFFSET ?", (self._max_entries,)
+            ).fetchall()
+            for (old_key,) in evicted:
+                connection.execute("DELETE FROM similarity_buckets WHERE key = ?", (old_key,))
+                connection.execute("DELETE FROM similarity_units WHERE key = ?", (old_key,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def delete(self, key: str) -> bool:
+        """Remove a conversion from the index.
+
+        Args:
+            key (str): The conversion's cache key.
+
+        Returns:
+            bool: True if the conversion was indexed.
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM similarity_buckets WHERE key = ?", (key,))
+            removed = connection.execute("DELETE FROM similarity_units WHERE key = ?", (key,)).rowcount
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return removed > 0
+
+    def clear(self) -> int:
+        """Remove every conversion from the index.
+
+        Returns:
+            int: The number of conversions removed.
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM similarity_buckets")
+            removed = connection.execute("DELETE FROM similarity_units").rowcount
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return removed
@@ -0,0 +1,283 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Awaitable, Callable, Dict, IO, Tuple
+
+from app.core import metrics
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+_RESULT_SUFFIX = ".result"
+_LOCK_SUFFIX = ".lock"
+
+
+class _Call:
+    """A call in progress in this process, which other threads can wait on."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._result: str | None = None
+        self._error: BaseException | None = None
+
+    def resolve(self, result: str) -> None:
+        self._result = result
+        self._done.set()
+
+    def fail(self, error: BaseException) -> None:
+        self._error = error
+        self._done.set()
+
+    def wait(self, timeout: float) -> bool:
+        return self._done.wait(timeout)
+
+    def outcome(self) -> str:
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class SingleFlight:
+    """Coalesce identical concurrent calls so that only one of them does the work.
+
+    Within a process, callers with the same key wait for the first caller (the
+    leader) and share its result or its error. Across processes (gunicorn workers
+    on one host) the leader holds an exclusive lock file for the key while it
+    works and leaves its result in a result file; a worker that finds the lock
+    taken waits for it and reuses the result instead of repeating the call.
+
+    Waiting is bounded: a caller that waits longer than ``wait_timeout`` (or
+    whose cross-worker leader failed or died) does the work itself.
+    """
+
+    def __init__(self,
+                 directory: str | None,
+                 wait_timeout: float,
+                 result_ttl: float = 60.0,
+                 poll_interval: float = 0.05,
+                 enabled: bool = True,
+                 clock: Callable[[], float] = time.time):
+        """Initialize single-flight coalescing.
+
+        Args:
+            directory (str | None): Directory for lock and result files shared by the
+                workers on a host, or None to coalesce within this process only.
+            wait_timeout (float): Longest time to wait for another caller's result.
+            result_ttl (float, optional): How long result files are kept for late waiters.
+            poll_interval (float, optional): Seconds between attempts on a lock held by another worker.
+            enabled (bool, optional): When False every call runs on its own.
+            clock (Callable[[], float], optional): Wall-clock time source, injectable for tests.
+        """
+        self.enabled = enabled
+        self._directory = directory or None
+        self._wait_timeout = wait_timeout
+        self._result_ttl = result_ttl
+        self._poll_interval = poll_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls: Dict[str, asyncio.Future] = {}
+        self._last_prune = 0.0
+
+    @classmethod
+    def from_settings(cls) -> "SingleFlight":
+        """Build single-flight coalescing configured from application settings."""
+        return cls(
+            directory=settings.single_flight_dir,
+            wait_timeout=settings.single_flight_wait_seconds,
+            enabled=settings.single_flight_enabled,
+        )
+
+    def do(self, key: str, fn: Callable[[], str]) -> Tuple[str, bool]:
+        """Run ``fn`` unless an identical call is already in progress, then share its result.
+
+        Args:
+            key (str): Identifies identical calls (e.g. a ``conversion_key``).
+            fn (Callable[[], str]): Does the work; its result must be text.
+
+        Returns:
+            Tuple[str, bool]: The result, and whether it was shared from another caller.
+        """
+        if not self.enabled:
+            return fn(), False
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if call.wait(self._wait_timeout):
+                result = call.outcome()
+                metrics.coalesced_requests_total.inc(scope="process")
+                return result, True
+            return fn(), False
+
+        try:
+            result, shared = self._do_across_workers(key, fn)
+        except BaseException as e:
+            call.fail(e)
+            raise
+        else:
+            call.resolve(result)
+            return result, shared
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[str]]) -> Tuple[str, bool]:
+        """Await ``fn`` unless an identical call is already in progress (see ``do``).
+
+        Args:
+            key (str): Identifies identical calls (e.g. a ``conversion_key``).
+            fn (Callable[[], Awaitable[str]]): Does the work; its result must be text.
+
+        Returns:
+            Tuple[str, bool]: The result, and whether it was shared from another caller.
+        """
+        if not self.enabled:
+            return await fn(), False
+
+        future = self._async_calls.get(key)
+        if future is not None:
+            try:
+                # Shielded so that a waiter giving up does not cancel the leader's call
+                result = await asyncio.wait_for(asyncio.shield(future), self._wait_timeout)
+            except asyncio.TimeoutError:
+                return await fn(), False
+            metrics.coalesced_requests_total.inc(scope="process")
+            return result, True
+
+        future = self._async_calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result, shared = await self._do_across_workers_async(key, fn)
+        except BaseException as e:
+            future.set_exception(e)
+            # Nobody may be waiting; don't report the exception as never retrieved
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, shared
+        finally:
+            self._async_calls.pop(key, None)
+
+    def _do_across_workers(self, key: str, fn: Callable[[], str]) -> Tuple[str, bool]:
+        if self._directory is None or fcntl is None:
+            return fn(), False
+
+        lock_path = self._path(key, _LOCK_SUFFIX)
+        os.makedirs(self._directory, exist_ok=True)
+        with open(lock_path, "a") as lock_file:
+            # Keep lock files in use from being pruned as expired
+            os.utime(lock_path)
+            locked = self._try_lock(lock_file)
+            if not locked:
+                # Another worker is making the same call
+                deadline = time.monotonic() + self._wait_timeout
+                while not locked and time.monotonic() < deadline:
+                    time.sleep(self._poll_interval)
+                    locked = self._try_lock(lock_file)
+                result = self._read_result(key)
+                if result is not None:
+                    self._unlock(lock_file, locked)
+                    metrics.coalesced_requests_total.inc(scope="host")
+                    return result, True
+            try:
+                result = fn()
+                self._write_result(key, result)
+                return result, False
+            finally:
+                self._unlock(lock_file, locked)
+
+    async def _do_across_workers_async(self, key: str, fn: Callable[[], Awaitable[str]]) -> Tuple[str, bool]:
+        if self._directory is None or fcntl is None:
+            return await fn(), False
+
+        lock_path = self._path(key, _LOCK_SUFFIX)
+        os.makedirs(self._directory, exist_ok=True)
+        with open(lock_path, "a") as lock_file:
+            # Keep lock files in use from being pruned as expired
+            os.utime(lock_path)
+            locked = self._try_lock(lock_file)
+            if not locked:
+                deadline = time.monotonic() + self._wait_timeout
+                while not locked and time.monotonic() < deadline:
+                    await asyncio.sleep(self._poll_interval)
+                    locked = self._try_lock(lock_file)
+                result = self._read_result(key)
+                if result is not None:
+                    self._unlock(lock_file, locked)
+                    metrics.coalesced_requests_total.inc(scope="host")
+                    return result, True
+            try:
+                result = await fn()
+                self._write_result(key, result)
+                return result, False
+            finally:
+                self._unlock(lock_file, locked)
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self._directory, key + suffix)
+
+    @staticmethod
+    def _try_lock(lock_file: IO) -> bool:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+
+    @staticmethod
+    def _unlock(lock_file: IO, locked: bool) -> None:
+        if locked:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_result(self, key: str) -> str | None:
+        """Read a result left by another worker, if it is recent enough to share."""
+        path = self._path(key, _RESULT_SUFFIX)
+        try:
+            if self._clock() - os.path.getmtime(path) > self._result_ttl:
+                return None
+            with open(path, encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_result(self, key: str, result: str) -> None:
+        path = self._path(key, _RESULT_SUFFIX)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(result)
+            # Replaced atomically, so a waiter never reads a partial result
+            os.replace(temp_path, path)
+        except OSError:
+            return
+        self._prune()
+
+    def _prune(self) -> None:
+        """Delete expired lock and result files, at most once per ``result_ttl``."""
+        now = self._clock()
+        with self._lock:
+            if now - self._last_prune < self._result_ttl:
+                return
+            self._last_prune = now
+        try:
+            names = os.listdir(self._directory)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self._directory, name)
+            try:
+                # A lock file unlinked while another worker holds it only costs a duplicate
+                # call: a later caller locks a fresh file instead of waiting.
+                if now - os.path.getmtime(path) > self._result_ttl:
+                    os.remove(path)
+            except OSError:
+                continue
@@ -0,0 +1,225 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List
+
+from app.core import metrics
+from app.services.ada_normalizer import normalize_ada
+from app.services.batch import has_allowed_extension, output_paths
+from app.services.conversion_cache import conversion_key
+from app.services.section_parser import parse_response
+
+# Checkpoint of a tree conversion, written next to its outputs
+MANIFEST_NAME = "manifest.jsonl"
+
+
+def find_sources(root: str, allowed_extensions: Iterable[str], exclude: Iterable[str] = ()) -> List[str]:
+    """List the Ada sources under ``root`` as sorted, ``/``-separated relative paths.
+
+    Hidden directories and the directories in ``exclude`` (e.g. an output
+    directory inside the tree) are not searched.
+    """
+    excluded = {os.path.realpath(path) for path in exclude}
+    sources = []
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories[:] = sorted(
+            name for name in subdirectories
+            if not name.startswith(".") and os.path.realpath(os.path.join(directory, name)) not in excluded
+        )
+        for name in filenames:
+            if has_allowed_extension(name, allowed_extensions):
+                sources.append(os.path.relpath(os.path.join(directory, name), root).replace(os.sep, "/"))
+    return sorted(sources)
+
+
+class ConversionManifest:
+    """Append-only record of the files a tree conversion has finished.
+
+    Each finished file adds one JSON line (written and flushed before the next),
+    so an interrupted run loses at most the line it was writing; on resume the
+    last line for each file wins and a torn final line is ignored.
+    """
+
+    def __init__(self, path: str):
+        """Open (or create) the manifest at ``path`` and load what it already records."""
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(path, encoding="utf-8") as source:
+                for line in source:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._entries[entry["filename"]] = entry
+        except FileNotFoundError:
+            pass
+
+    def entry(self, filename: str) -> Dict[str, Any] | None:
+        """The latest entry recorded for a source file."""
+        return self._entries.get(filename)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """The latest entry of every recorded file, by filename."""
+        return [self._entries[filename] for filename in sorted(self._entries)]
+
+    def is_current(self, filename: str, fingerprint: str, output_dir: str) -> bool:
+        """Whether ``filename`` was converted successfully from the same source and settings,
+        and its outputs are still in place."""
+        entry = self._entries.get(filename)
+        return (entry is not None
+                and entry["status"] == "succeeded"
+                and entry.get("fingerprint") == fingerprint
+                and all(os.path.exists(os.path.join(output_dir, path)) for path in entry["outputs"].values()))
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        """Append a finished file's entry and flush it to disk."""
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as output:
+                output.write(line)
+                output.flush()
+                os.fsync(output.fileno())
+            self._entries[entry["filename"]] = entry
+
+
+@dataclass
+class TreeProgress:
+    """Running totals of a tree conversion."""
+
+    total: int
+    done: int = 0
+    skipped: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    prompt_tokens: float = 0.0
+    completion_tokens: float = 0.0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def converted(self) -> int:
+        """Files sent to the converter this run (succeeded or failed)."""
+        return self.succeeded + self.failed
+
+    @property
+    def files_per_second(self) -> float:
+        """Conversion throughput of this run (skipped files excluded)."""
+        return self.converted / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "skipped": self.skipped,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "elapsed_seconds": round(self.elapsed_seconds, 1),
+            "files_per_second": round(self.files_per_second, 2),
+            "prompt_tokens": int(self.prompt_tokens),
+            "completion_tokens": int(self.completion_tokens),
+        }
+
+
+def convert_tree(source_dir: str,
+                 output_dir: str,
+                 converter,
+                 concurrency: int,
+                 allowed_extensions: Iterable[str],
+                 normalization: str = "off",
+                 force: bool = False,
+                 on_progress: Callable[[TreeProgress, Dict[str, Any]], None] | None = None) -> TreeProgress:
+    """Convert every Ada source under ``source_dir``, resuming from the manifest in ``output_dir``.
+
+    Each ``dir/name.adb`` is written to ``output_dir`` as ``dir/name.py``,
+    ``dir/test_name.py`` and ``dir/name.logic.md`` (see ``output_paths``) and
+    recorded in ``manifest.jsonl`` once its outputs are in place. A file whose
+    manifest entry succeeded with the same fingerprint (a ``conversion_key`` of
+    its normalized source, the model and the system prompt) is skipped, so an
+    interrupted run picks up where it stopped and a re-run only converts files
+    that changed. Failed files are retried.
+
+    Args:
+        source_dir (str): The tree to convert.
+        output_dir (str): Where outputs and the manifest are written.
+        converter: An ``AdaConverter`` (anything with ``convert``, ``model`` and ``system_prompt``).
+        concurrency (int): Maximum number of files converted at once.
+        allowed_extensions (Iterable[str]): Extensions of the files to convert.
+        normalization (str, optional): ADA_NORMALIZATION level applied before converting.
+        force (bool, optional): Convert every file, even those the manifest has as current.
+        on_progress (Callable[[TreeProgress, Dict[str, Any]], None] | None, optional): Called
+            (from one thread at a time) with the totals and the entry of each finished file.
+
+    Returns:
+        TreeProgress: The totals of the run.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = ConversionManifest(os.path.join(output_dir, MANIFEST_NAME))
+    filenames = find_sources(source_dir, allowed_extensions, exclude=[output_dir])
+    progress = TreeProgress(total=len(filenames))
+    lock = threading.Lock()
+    started = time.perf_counter()
+    tokens_before = (metrics.llm_tokens_total.total(kind="prompt"), metrics.llm_tokens_total.total(kind="completion"))
+
+    # Outputs are assigned up front, in a stable order, so reruns write to the same paths
+    used_stems: set = set()
+    outputs = {filename: output_paths(filename, used_stems) for filename in filenames}
+
+    def finish(entry: Dict[str, Any]) -> None:
+        with lock:
+            progress.done += 1
+            if entry["status"] == "skipped":
+                progress.skipped += 1
+            elif entry["status"] == "succeeded":
+                progress.succeeded += 1
+            else:
+                progress.failed += 1
+            progress.prompt_tokens = metrics.llm_tokens_total.total(kind="prompt") - tokens_before[0]
+            progress.completion_tokens = metrics.llm_tokens_total.total(kind="completion") - tokens_before[1]
+            progress.elapsed_seconds = time.perf_counter() - started
+            if on_progress is not None:
+                on_progress(progress, entry)
+
+    def convert_one(filename: str) -> None:
+        entry: Dict[str, Any] = {"filename": filename, "outputs": outputs[filename]}
+        file_started = time.perf_counter()
+        try:
+            with open(os.path.join(source_dir, filename), encoding="utf-8") as source:
+                ada_code = normalize_ada(source.read(), normalization).text
+            if not ada_code.strip():
+                raise ValueError("File is empty")
+            entry["fingerprint"] = conversion_key(ada_code, str(converter.model), str(converter.system_prompt))
+            if not force and manifest.is_current(filename, entry["fingerprint"], output_dir):
+                finish({**manifest.entry(filename), "status": "skipped"})
+                return
+            result = parse_response(converter.convert(ada_code))
+            for field, path in outputs[filename].items():
+                _write_atomically(os.path.join(output_dir, path), result.get(field, ""))
+            entry.update(status="succeeded", model=str(converter.model))
+        except UnicodeDecodeError:
+            entry.update(status="failed", error="File must be valid UTF-8 text")
+        except Exception as e:
+            entry.update(status="failed", error=str(e))
+        entry["duration_ms"] = round((time.perf_counter() - file_started) * 1000, 1)
+        entry["converted_at"] = time.time()
+        manifest.record(entry)
+        finish(entry)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="tree-convert")
+    try:
+        for future in as_completed([executor.submit(convert_one, filename) for filename in filenames]):
+            future.result()
+    finally:
+        # On an interrupt, files not yet started are dropped; the manifest has every finished one
+        executor.shutdown(wait=True, cancel_futures=True)
+    progress.elapsed_seconds = time.perf_counter() - started
+    return progress
+
+
+def _write_atomically(path: str, content: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as output:
+        output.write(content)
+    os.replace(path + ".tmp", path)
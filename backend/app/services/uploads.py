@@ -0,0 +1,220 @@
+import codecs
+import os
+import tempfile
+from typing import BinaryIO, IO, Iterable, List
+
+from app.core.exceptions import FileUploadError
+
+# Bytes read at a time when decoding an upload that was not streamed into a TextUploadStream
+DECODE_CHUNK_SIZE = 64 * 1024
+
+INVALID_UTF8 = "File must be valid UTF-8 text"
+
+
+class TextUploadStream:
+    """An upload container that decodes UTF-8 as the request body arrives.
+
+    Only the decoded text is kept: each chunk of raw bytes is dropped once it has
+    been decoded, so an upload is never held as bytes and text at the same time.
+    Decoding stops at the first invalid byte (or NUL character, which means the
+    file is binary); with ``strict`` the upload is rejected there and then,
+    otherwise the rest of the file is discarded and the error is raised by ``text``.
+
+    It is written by the multipart parser (``write``, then ``seek(0)``) and read
+    with ``text``; ``read`` returns the text re-encoded, for code expecting bytes.
+    """
+
+    def __init__(self, filename: str | None = None, strict: bool = True):
+        self.filename = filename
+        self.error: str | None = None
+        self._strict = strict
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._pieces: List[str] = []
+        self._size = 0
+        self._finished = False
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        """Decode the next chunk of the upload.
+
+        Raises:
+            FileUploadError: If ``strict`` and the chunk is not valid UTF-8 text.
+        """
+        if self.error is None:
+            try:
+                text = self._decoder.decode(data)
+            except UnicodeDecodeError as e:
+                self._fail(f"{INVALID_UTF8} (invalid byte at offset {self._size + e.start})")
+            else:
+                nul = text.find("\x00")
+                if nul >= 0:
+                    self._fail(f"{INVALID_UTF8}, not binary data")
+                else:
+                    self._pieces.append(text)
+        self._size += len(data)
+        return len(data)
+
+    @property
+    def size(self) -> int:
+        """Bytes received so far."""
+        return self._size
+
+    def text(self) -> str:
+        """Get the decoded upload.
+
+        Raises:
+            FileUploadError: If the upload was not valid UTF-8 text.
+        """
+        self._finish()
+        if self.error is not None:
+            raise FileUploadError(self.error)
+        if len(self._pieces) > 1:
+            self._pieces = ["".join(self._pieces)]
+        return self._pieces[0] if self._pieces else ""
+
+    def _finish(self) -> None:
+        if self._finished:
+            return
+        self._finished = True
+        if self.error is None:
+            try:
+                # A multi-byte sequence cut off by the end of the file is invalid too
+                self._pieces.append(self._decoder.decode(b"", final=True))
+            except UnicodeDecodeError:
+                self._fail(f"{INVALID_UTF8} (truncated at offset {self._size})")
+
+    def _fail(self, message: str) -> None:
+        self.error = message
+        self._pieces = []
+        if self._strict:
+            raise FileUploadError(message if self.filename is None else f"{self.filename}: {message}")
+
+    # File-like methods used by the parser and by FileStorage
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        self._finish()
+        self._position = offset if whence == os.SEEK_SET else self._position + offset
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.text().encode("utf-8")
+        end = len(data) if size is None or size < 0 else self._position + size
+        chunk = data[self._position:end]
+        self._position += len(chunk)
+        return chunk
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        self._pieces = []
+
+    def __iter__(self):
+        return iter(self.read().splitlines(keepends=True))
+
+
+class DiscardedUpload:
+    """An upload container for files that are skipped unread: it only counts their bytes."""
+
+    def __init__(self, filename: str | None = None):
+        self.filename = filename
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        return 0
+
+    def tell(self) -> int:
+        return 0
+
+    def read(self, size: int = -1) -> bytes:
+        return b""
+
+    def close(self) -> None:
+        pass
+
+
+def spooled_file(max_memory: int, directory: str | None = None) -> IO[bytes]:
+    """A container for a binary upload (e.g. an archive) that moves to disk past ``max_memory`` bytes.
+
+    Args:
+        max_memory (int): Bytes kept in memory before the upload is written to a temporary file.
+        directory (str | None, optional): Where the temporary file goes. Defaults to the system temp directory.
+    """
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return tempfile.SpooledTemporaryFile(max_size=max_memory, mode="w+b", dir=directory or None)
+
+
+def upload_container(filename: str | None,
+                     allowed_extensions: Iterable[str],
+                     archive_suffixes: Iterable[str],
+                     strict: bool,
+                     spool_max_memory: int,
+                     spool_dir: str | None = None) -> IO[bytes] | TextUploadStream | DiscardedUpload:
+    """Choose where an uploaded file's bytes go as they arrive, based on its filename.
+
+    Ada sources are decoded as they stream in; archives are spooled, to disk once
+    they outgrow ``spool_max_memory``; anything else is rejected (``strict``) or
+    discarded unread.
+
+    Args:
+        filename (str | None): The uploaded file's name.
+        allowed_extensions (Iterable[str]): Extensions of Ada sources.
+        archive_suffixes (Iterable[str]): Suffixes of accepted archives.
+        strict (bool): Reject the upload at the first bad file instead of leaving it to the caller.
+        spool_max_memory (int): Bytes of an archive kept in memory before it is spooled to disk.
+        spool_dir (str | None, optional): Directory for spooled archives.
+
+    Raises:
+        FileUploadError: If ``strict`` and the file is neither an Ada source nor an archive.
+    """
+    name = (filename or "").lower()
+    if os.path.splitext(name)[1] in set(allowed_extensions):
+        return TextUploadStream(filename, strict=strict)
+    if name.endswith(tuple(archive_suffixes)):
+        return spooled_file(spool_max_memory, spool_dir)
+    if strict and filename:
+        check_extension(filename, allowed_extensions)
+    return DiscardedUpload(filename)
+
+
+def check_extension(filename: str, allowed_extensions: Iterable[str]) -> None:
+    """Reject a filename without one of the allowed (Ada) extensions.
+
+    Raises:
+        FileUploadError: If the extension is not allowed.
+    """
+    allowed_extensions = set(allowed_extensions)
+    if os.path.splitext(filename)[1].lower() not in allowed_extensions:
+        raise FileUploadError(
+            f"{filename} is not an Ada source file (" + ", ".join(sorted(allowed_extensions)) + ")"
+        )
+
+
+def decode_upload(stream: BinaryIO | TextUploadStream, filename: str | None = None) -> str:
+    """Get an uploaded file's text, decoding it a chunk at a time if it was not decoded on arrival.
+
+    Raises:
+        FileUploadError: If the file is not valid UTF-8 text.
+    """
+    if isinstance(stream, TextUploadStream):
+        return stream.text()
+    container = TextUploadStream(filename, strict=False)
+    while chunk := stream.read(DECODE_CHUNK_SIZE):
+        container.write(chunk)
+        if container.error is not None:
+            break
+    return container.text()
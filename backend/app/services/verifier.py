@@ -0,0 +1,228 @@
+import hashlib
+import json
+import multiprocessing
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Tuple
+
+from app.core import metrics
+from app.core.config import settings
+from app.services import sandbox
+from app.services.conversion_cache import CacheEntry, MemoryCacheTier, SqliteCacheTier
+
+# Captured test output returned in a verification result is cut to this many characters
+MAX_OUTPUT_CHARS = 8000
+
+# Seconds a verification process gets to exit once it has sent its result
+JOIN_SECONDS = 1.0
+
+
+@dataclass
+class VerificationResult:
+    """The outcome of running a conversion's unit tests against its Python code.
+
+    Attributes:
+        status (str): "passed", "failed" (a test failed), "error" (the code or tests
+            could not be loaded, or the process died, e.g. on its CPU or memory limit)
+            or "timeout".
+        tests_run (int): Tests that ran.
+        failures (int): Tests that failed an assertion.
+        errors (int): Tests (or loading steps) that raised an unexpected exception.
+        duration_ms (float): Wall-clock time of the run, including starting its process.
+        output (str): The test runner's output, truncated to ``MAX_OUTPUT_CHARS``.
+        cached (bool): Whether the result came from the verification cache.
+    """
+
+    status: str
+    tests_run: int = 0
+    failures: int = 0
+    errors: int = 0
+    duration_ms: float = 0.0
+    output: str = ""
+    cached: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def verification_key(python_code: str, unit_tests: str) -> str:
+    """Content address of a verification: a SHA-256 of the code and its tests."""
+    digest = hashlib.sha256()
+    for part in (python_code, unit_tests):
+        encoded = part.encode("utf-8")
+        # Length-prefix each part so that part boundaries cannot be shifted.
+        digest.update(str(len(encoded)).encode("ascii") + b":" + encoded)
+    return digest.hexdigest()
+
+
+class Verifier:
+    """Run generated unit tests against generated code in isolated, resource-limited processes.
+
+    Each verification gets a process of its own, forked from a forkserver that
+    has already imported the test harness, so starting one costs a fork rather
+    than an interpreter start-up. The process is capped in CPU time and address
+    space and killed if it runs past the timeout; at most ``workers`` run at
+    once. Results are cached by the hash of the code and tests.
+    """
+
+    def __init__(self,
+                 enabled: bool,
+                 workers: int = 2,
+                 timeout_seconds: float = 10.0,
+                 cpu_seconds: int = 5,
+                 memory_mb: int = 256,
+                 memory_cache: MemoryCacheTier | None = None,
+                 disk_cache: SqliteCacheTier | None = None):
+        """Initialize the verifier.
+
+        Args:
+            enabled (bool): Whether verification may be requested at all.
+            workers (int, optional): Verifications run at once; more wait their turn.
+            timeout_seconds (float, optional): Wall-clock limit of a verification process.
+            cpu_seconds (int, optional): CPU time limit of a verification process.
+            memory_mb (int, optional): Address space limit of a verification process; 0 for none.
+            memory_cache (MemoryCacheTier | None, optional): In-process result cache.
+            disk_cache (SqliteCacheTier | None, optional): Result cache shared by the host's workers.
+        """
+        self.enabled = enabled
+        self.workers = workers
+        self.timeout_seconds = timeout_seconds
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self._cache_tiers = [tier for tier in (memory_cache, disk_cache) if tier is not None]
+        self._slots = threading.BoundedSemaphore(max(1, workers))
+        self._context = None
+        self._context_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "Verifier":
+        """Build a verifier configured from application settings."""
+        memory_cache = MemoryCacheTier(
+            max_entries=settings.conversion_cache_max_entries,
+            ttl_seconds=settings.conversion_cache_ttl_seconds,
+        )
+        disk_cache = None
+        if settings.verification_cache_path:
+            disk_cache = SqliteCacheTier(
+                path=settings.verification_cache_path,
+                max_entries=settings.conversion_cache_disk_max_entries,
+                ttl_seconds=settings.conversion_cache_ttl_seconds,
+            )
+        return cls(
+            enabled=settings.verification_enabled,
+            workers=settings.verification_workers,
+            timeout_seconds=settings.verification_timeout_seconds,
+            cpu_seconds=settings.verification_cpu_seconds,
+            memory_mb=settings.verification_memory_mb,
+            memory_cache=memory_cache,
+            disk_cache=disk_cache,
+        )
+
+    def _get_context(self):
+        with self._context_lock:
+            if self._context is None:
+                if "forkserver" in multiprocessing.get_all_start_methods():
+                    self._context = multiprocessing.get_context("forkserver")
+                    self._context.set_forkserver_preload([sandbox.__name__, "unittest"])
+                else:
+                    self._context = multiprocessing.get_context("spawn")
+            return self._context
+
+    def warm(self) -> None:
+        """Start the forkserver now, so the first verification does not wait for it."""
+        context = self._get_context()
+        if context.get_start_method() == "forkserver":
+            from multiprocessing import forkserver
+            forkserver.ensure_running()
+
+    def verify(self, python_code: str, unit_tests: str) -> VerificationResult:
+        """Run ``unit_tests`` against ``python_code``, or return the cached result of doing so.
+
+        Args:
+            python_code (str): The generated Python code.
+            unit_tests (str): The generated unit tests.
+
+        Returns:
+            VerificationResult: Whether the tests passed, with counts, timing and output.
+        """
+        key = verification_key(python_code, unit_tests)
+        for tier in self._cache_tiers:
+            entry = tier.get(key)
+            if entry is not None:
+                metrics.verifications_total.inc(status="cached")
+                return VerificationResult(**{**json.loads(entry.value), "cached": True})
+
+        if not unit_tests.strip():
+            result, reported = VerificationResult(status="error", output="No unit tests to run"), True
+        else:
+            with self._slots, metrics.stage_seconds.time(stage="verify"):
+                result, reported = self._run(python_code, unit_tests)
+        metrics.verifications_total.inc(status=result.status)
+        if not reported:
+            # A timeout or a killed process may be down to a busy host, so let it be retried
+            return result
+
+        entry = CacheEntry(key=key, value=json.dumps(result.to_dict()), model="verifier", created_at=time.time())
+        for tier in self._cache_tiers:
+            tier.set(entry)
+        return result
+
+    def _run(self, python_code: str, unit_tests: str) -> Tuple[VerificationResult, bool]:
+        """Run the tests in a fresh verification process.
+
+        Returns:
+            Tuple[VerificationResult, bool]: The result, and whether the process
+                reported it (rather than timing out or dying).
+        """
+        context = self._get_context()
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(
+            target=sandbox.main,
+            args=(python_code, unit_tests, self.cpu_seconds, self.memory_mb, sender),
+            name="ada-verify",
+            daemon=True,
+        )
+        started = time.perf_counter()
+        process.start()
+        # Only the child writes; closing our end lets recv see EOF if it dies
+        sender.close()
+        try:
+            payload = None
+            timed_out = not receiver.poll(self.timeout_seconds)
+            if not timed_out:
+                try:
+                    payload = receiver.recv()
+                except EOFError:
+                    pass
+        finally:
+            receiver.close()
+            if not timed_out:
+                process.join(JOIN_SECONDS)
+            if process.is_alive():
+                process.kill()
+                process.join()
+        duration_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        if timed_out:
+            return VerificationResult(
+                status="timeout", duration_ms=duration_ms,
+                output=f"Tests did not finish within {self.timeout_seconds:g} seconds",
+            ), False
+        if payload is None:
+            return VerificationResult(
+                status="error", errors=1, duration_ms=duration_ms,
+                output=f"Verification process exited with code {process.exitcode} "
+                       "(CPU or memory limit exceeded?)",
+            ), False
+        output = payload.get("output", "")
+        if len(output) > MAX_OUTPUT_CHARS:
+            output = output[:MAX_OUTPUT_CHARS] + "\n... (truncated)"
+        return VerificationResult(
+            status=payload["status"],
+            tests_run=payload.get("tests_run", 0),
+            failures=payload.get("failures", 0),
+            errors=payload.get("errors", 0),
+            duration_ms=duration_ms,
+            output=output,
+        ), True
@@ -0,0 +1 @@
+"""Load-testing tools for the conversion API (run with ``python -m benchmarks.load_test``)."""
@@ -0,0 +1,370 @@
+"""Load test the conversion API against the stub OpenAI server.
+
+Starts a stub chat completions server (see ``benchmarks.stub_openai``), serves
+the app against it the way ``start.sh`` does (or with the Flask development
+server, or not at all with ``--url``), drives ``/api/v1/convert`` at one or more
+concurrency levels and reports throughput, latency percentiles, errors and the
+resident memory of every app worker::
+
+    python -m benchmarks.load_test -c 1 -c 8 -c 32 --requests 200
+    python -m benchmarks.load_test --server flask --stream --latency 1 --tokens-per-second 50
+    python -m benchmarks.load_test --workers 4 --threads 8 --rate-limit-rate 0.05 --json
+"""
+import json
+import math
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Sequence
+
+import click
+import httpx
+
+from benchmarks.stub_openai import StubConfig, StubOpenAIServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_ADA = """with Ada.Text_IO; use Ada.Text_IO;
+
+procedure Accumulate is
+   Total : Integer := 0;
+begin
+   for I in 1 .. 10 loop
+      Total := Total + I;
+   end loop;
+   Put_Line ("Total:" & Integer'Image (Total));
+end Accumulate;
+"""
+
+
+@dataclass
+class RequestResult:
+    """The outcome of one request to the app."""
+
+    status: int
+    seconds: float
+    # Streaming only: seconds until the first event arrived
+    first_event_seconds: float | None = None
+    error: str | None = None
+
+
+@dataclass
+class LevelReport:
+    """Throughput and latency at one concurrency level."""
+
+    concurrency: int
+    requests: int
+    seconds: float
+    requests_per_second: float
+    statuses: Dict[str, int]
+    latency_ms: Dict[str, float]
+    first_event_ms: Dict[str, float] = field(default_factory=dict)
+    # Per worker pid: resident memory after the level, and its growth since warm-up
+    worker_rss_mb: Dict[str, float] = field(default_factory=dict)
+    worker_rss_growth_mb: Dict[str, float] = field(default_factory=dict)
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (0 for no values)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def latency_summary(seconds: Sequence[float]) -> Dict[str, float]:
+    """p50/p90/p99/max of a list of durations, in milliseconds."""
+    if not seconds:
+        return {}
+    return {
+        "p50": round(percentile(seconds, 50) * 1000, 1),
+        "p90": round(percentile(seconds, 90) * 1000, 1),
+        "p99": round(percentile(seconds, 99) * 1000, 1),
+        "max": round(max(seconds) * 1000, 1),
+    }
+
+
+def summarize(concurrency: int, results: List[RequestResult], seconds: float) -> LevelReport:
+    """Aggregate the results of one concurrency level."""
+    statuses: Dict[str, int] = {}
+    for result in results:
+        key = str(result.status) if result.status else "failed"
+        statuses[key] = statuses.get(key, 0) + 1
+    ok = [result for result in results if result.status == 200]
+    return LevelReport(
+        concurrency=concurrency,
+        requests=len(results),
+        seconds=round(seconds, 3),
+        requests_per_second=round(len(results) / seconds, 2) if seconds > 0 else 0.0,
+        statuses=statuses,
+        latency_ms=latency_summary([result.seconds for result in ok]),
+        first_event_ms=latency_summary([
+            result.first_event_seconds for result in ok if result.first_event_seconds is not None
+        ]),
+    )
+
+
+def rss_mb(pid: int) -> float | None:
+    """Resident set size of a process in MiB, or None if it cannot be read (e.g. not Linux)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def worker_pids(pid: int) -> List[int]:
+    """The app worker processes: the children of a gunicorn master, or the server process itself."""
+    children = []
+    try:
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # The parent pid is the fourth field, after the parenthesized command name
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            if ppid == pid:
+                children.append(int(entry))
+    except OSError:
+        pass
+    return sorted(children) or [pid]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_serving(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise click.ClickException(f"The app exited with status {process.returncode} before serving")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise click.ClickException(f"The app did not start serving on {url} within {timeout:g}s")
+
+
+@contextmanager
+def serve_app(server: str, env: Dict[str, str], workers: int, threads: int, max_requests: int,
+              app_logs: bool = False) -> Iterator[tuple[str, int]]:
+    """Run the app in a subprocess and yield its URL and process id.
+
+    ``gunicorn`` mirrors the worker settings in ``start.sh``; ``flask`` uses the
+    threaded development server, for machines without gunicorn.
+    """
+    port = _free_port()
+    if server == "gunicorn":
+        if shutil.which("gunicorn") is None:
+            raise click.ClickException("gunicorn is not installed; use --server flask or --url")
+        command = [
+            "gunicorn", "app.main:create_app()",
+            "--bind", f"127.0.0.1:{port}",
+            "--workers", str(workers),
+            "--worker-class", "gthread",
+            "--threads", str(threads),
+            "--timeout", "120",
+            "--keep-alive", "2",
+            "--max-requests", str(max_requests),
+            "--max-requests-jitter", str(max_requests // 10),
+            "--error-logfile", "-",
+        ]
+    else:
+        command = [
+            sys.executable, "-m", "flask", "--app", "app.main:create_app()",
+            "run", "--host", "127.0.0.1", "--port", str(port), "--with-threads", "--no-reload", "--no-debugger",
+        ]
+
+    output = None if app_logs else subprocess.DEVNULL
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=output, stderr=output)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_serving(url, process)
+        yield url, process.pid
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def send_conversion(client: httpx.Client, url: str, ada_code: str, filename: str, stream: bool) -> RequestResult:
+    """Upload one file for conversion and time the response."""
+    path = "/api/v1/convert/stream" if stream else "/api/v1/convert"
+    files = {"ada_file": (filename, ada_code.encode("utf-8"), "text/plain")}
+    started = time.perf_counter()
+    try:
+        if not stream:
+            response = client.post(url + path, files=files)
+            return RequestResult(response.status_code, time.perf_counter() - started)
+
+        first_event = None
+        status = 0
+        with client.stream("POST", url + path, files=files) as response:
+            status = response.status_code
+            for line in response.iter_lines():
+                if first_event is None and line.startswith("event:"):
+                    first_event = time.perf_counter() - started
+                if line == "event: error":
+                    # The stream itself reported a failure; count it like an error response
+                    status = 502
+        return RequestResult(status, time.perf_counter() - started, first_event_seconds=first_event)
+    except httpx.HTTPError as e:
+        return RequestResult(0, time.perf_counter() - started, error=f"{type(e).__name__}: {e}")
+
+
+def run_level(url: str, concurrency: int, requests: int, ada_code: str, filename: str, stream: bool,
+              timeout: float) -> tuple[List[RequestResult], float]:
+    """Send ``requests`` conversions from ``concurrency`` concurrent clients."""
+    results: List[RequestResult] = []
+    lock = threading.Lock()
+    remaining = [requests]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    with httpx.Client(timeout=timeout, limits=limits) as client:
+        def worker() -> None:
+            while True:
+                with lock:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                result = send_conversion(client, url, ada_code, filename, stream)
+                with lock:
+                    results.append(result)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, time.perf_counter() - started
+
+
+def _print_report(report: LevelReport) -> None:
+    latency = report.latency_ms
+    click.echo(
+        f"c={report.concurrency:<4} {report.requests} requests in {report.seconds:.2f}s  "
+        f"{report.requests_per_second:.2f} req/s  "
+        f"p50={latency.get('p50', 0):.0f}ms p90={latency.get('p90', 0):.0f}ms "
+        f"p99={latency.get('p99', 0):.0f}ms max={latency.get('max', 0):.0f}ms"
+    )
+    if report.first_event_ms:
+        click.echo(f"       first event p50={report.first_event_ms['p50']:.0f}ms p99={report.first_event_ms['p99']:.0f}ms")
+    click.echo(f"       statuses {report.statuses}")
+    if report.worker_rss_mb:
+        click.echo("       worker RSS (MiB) " + ", ".join(
+            f"{pid}: {rss:.1f} ({report.worker_rss_growth_mb[pid]:+.1f})" for pid, rss in report.worker_rss_mb.items()
+        ))
+
+
+@click.command()
+@click.option("--url", default=None, help="Load test an app that is already running instead of starting one.")
+@click.option("--server", type=click.Choice(["gunicorn", "flask"]), default="gunicorn", show_default=True,
+              help="How to serve the app when --url is not given.")
+@click.option("--workers", default=2, show_default=True, help="gunicorn workers (start.sh uses 2).")
+@click.option("--threads", default=4, show_default=True, help="gunicorn threads per worker (start.sh uses 4).")
+@click.option("--max-requests", default=1000, show_default=True, help="gunicorn worker recycling (start.sh uses 1000).")
+@click.option("-c", "--concurrency", multiple=True, type=int, help="Concurrent clients; repeat for several levels.")
+@click.option("-n", "--requests", default=100, show_default=True, help="Requests per concurrency level.")
+@click.option("--warmup", default=10, show_default=True, help="Requests sent before measuring.")
+@click.option("--stream", is_flag=True, help="Use /api/v1/convert/stream and report time to first event.")
+@click.option("--ada-file", type=click.File("r"), default=None, help="Ada source to upload (defaults to a small sample).")
+@click.option("--cache/--no-cache", default=False, show_default=True,
+              help="Leave the conversion cache and coalescing on (every request after the first is a hit).")
+@click.option("--timeout", default=180.0, show_default=True, help="Client timeout per request in seconds.")
+@click.option("--latency", default=StubConfig.latency, show_default=True, help="Stub: seconds before the first token.")
+@click.option("--tokens-per-second", default=StubConfig.tokens_per_second, show_default=True,
+              help="Stub: generation speed; 0 answers at once.")
+@click.option("--completion-tokens", default=StubConfig.completion_tokens, show_default=True,
+              help="Stub: completion size.")
+@click.option("--error-rate", default=0.0, show_default=True, help="Stub: fraction of calls failing with a 500.")
+@click.option("--rate-limit-rate", default=0.0, show_default=True, help="Stub: fraction of calls answered with a 429.")
+@click.option("--retry-after", default=StubConfig.retry_after, show_default=True, help="Stub: Retry-After for 429s.")
+@click.option("--seed", type=int, default=None, help="Stub: seed for error injection.")
+@click.option("--json", "as_json", is_flag=True, help="Print the reports as JSON.")
+@click.option("--app-logs", is_flag=True, help="Show the app's own log output.")
+def main(url: str | None, server: str, workers: int, threads: int, max_requests: int, concurrency: tuple,
+         requests: int, warmup: int, stream: bool, ada_file: Any, cache: bool, timeout: float, as_json: bool,
+         app_logs: bool, **stub_options: Any) -> None:
+    """Measure conversion throughput, latency and worker memory against a stub OpenAI API."""
+    ada_code = ada_file.read() if ada_file else SAMPLE_ADA
+    filename = os.path.basename(ada_file.name) if ada_file else "accumulate.adb"
+    levels = concurrency or (1, 8, 32)
+
+    with StubOpenAIServer(StubConfig(**stub_options)) as stub, tempfile.TemporaryDirectory() as data_dir:
+        if url is not None:
+            reports = _run(url.rstrip("/"), None, levels, requests, warmup, ada_code, filename, stream, timeout,
+                           verbose=not as_json)
+        else:
+            env = {
+                **os.environ,
+                "OPENAI_API_KEY": "stub",
+                "OPENAI_BASE_URL": stub.base_url,
+                "OPENAI_PREWARM": "True",
+                "DEBUG": "False",
+                "DATA_DIR": data_dir,
+                # Every request uploads the same source; unless --cache, each must make its own call
+                "CONVERSION_CACHE_ENABLED": str(cache),
+                "SINGLE_FLIGHT_ENABLED": str(cache),
+                "PYTHONPATH": BACKEND_DIR,
+            }
+            with serve_app(server, env, workers, threads, max_requests, app_logs) as (app_url, pid):
+                reports = _run(app_url, pid, levels, requests, warmup, ada_code, filename, stream, timeout,
+                               verbose=not as_json)
+
+        if as_json:
+            click.echo(json.dumps({
+                "stub": {**asdict(stub.config), "outcomes": dict(stub.outcomes)},
+                "levels": [asdict(report) for report in reports],
+            }, indent=2))
+        else:
+            click.echo(f"stub OpenAI calls: {dict(stub.outcomes)}")
+
+
+def _run(url: str, pid: int | None, levels: Sequence[int], requests: int, warmup: int, ada_code: str,
+         filename: str, stream: bool, timeout: float, verbose: bool = True) -> List[LevelReport]:
+    if warmup:
+        run_level(url, min(warmup, max(levels)), warmup, ada_code, filename, stream, timeout)
+    baseline = {worker: rss_mb(worker) for worker in worker_pids(pid)} if pid else {}
+
+    reports = []
+    for level in levels:
+        results, seconds = run_level(url, level, requests, ada_code, filename, stream, timeout)
+        report = summarize(level, results, seconds)
+        if pid:
+            # Workers recycled by --max-requests show up under new pids, measured from their first sample
+            for worker in worker_pids(pid):
+                current = rss_mb(worker)
+                if current is None:
+                    continue
+                baseline.setdefault(worker, current)
+                report.worker_rss_mb[str(worker)] = current
+                report.worker_rss_growth_mb[str(worker)] = round(current - (baseline[worker] or current), 1)
+        reports.append(report)
+        if verbose:
+            _print_report(report)
+    return reports
+
+
+if __name__ == "__main__":
+    main()
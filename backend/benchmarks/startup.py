@@ -0,0 +1,119 @@
+"""Measure how long an app worker takes to start and serve its first conversion.
+
+Each sample is a fresh worker (see ``benchmarks.startup_probe``), pointed at
+the stub OpenAI server so the first conversion makes a real (local) call:
+
+* ``cold``: a new interpreter, as when a container or ``flask run`` starts;
+  ``process_ms`` adds the interpreter's own start-up.
+* ``fork``: forked from a master that has imported nothing of the app, as
+  gunicorn starts and recycles workers without a preload.
+* ``preload``: forked from a master that ran ``preload_modules()``, as with
+  ``gunicorn.conf.py`` and PRELOAD_MODULES (the default).
+
+::
+
+    python -m benchmarks.startup --samples 10
+    python -m benchmarks.startup --mode preload --json
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Sequence
+
+import click
+
+from benchmarks.load_test import BACKEND_DIR, percentile
+from benchmarks.stub_openai import StubConfig, StubOpenAIServer
+
+MODES = ("cold", "fork", "preload")
+MEASURES = ("import_ms", "create_app_ms", "first_request_ms", "ready_ms", "process_ms")
+
+
+@dataclass
+class StartupReport:
+    """Start-up timings of one mode: p50/p90/max of each measure, in milliseconds."""
+
+    mode: str
+    samples: int
+    timings_ms: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+
+def summarize(mode: str, samples: Sequence[Dict[str, float]]) -> StartupReport:
+    """Summarize the probe results of one mode."""
+    report = StartupReport(mode=mode, samples=len(samples))
+    for measure in MEASURES:
+        values = [sample[measure] for sample in samples if measure in sample]
+        if values:
+            report.timings_ms[measure] = {
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "max": max(values),
+            }
+    return report
+
+
+def probe_env(base_url: str, data_dir: str) -> Dict[str, str]:
+    """Environment for probe workers: the stub API, no caches, nothing in the background."""
+    return {
+        **os.environ,
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": base_url,
+        "OPENAI_PREWARM": "False",
+        "DATA_DIR": data_dir,
+        "METRICS_DIR": "",
+        # Every sample converts the same source; each must make its own call
+        "CONVERSION_CACHE_ENABLED": "False",
+        "SINGLE_FLIGHT_ENABLED": "False",
+        "PYTHONPATH": BACKEND_DIR,
+    }
+
+
+def run_probe(mode: str, samples: int, env: Dict[str, str]) -> List[Dict[str, float]]:
+    """Start ``samples`` workers in ``mode`` and collect their timings."""
+    command = [sys.executable, "-m", "benchmarks.startup_probe", mode]
+    if mode == "cold":
+        results = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            output = subprocess.run(command, env=env, cwd=BACKEND_DIR, check=True,
+                                    capture_output=True, text=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            result["process_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            results.append(result)
+        return results
+    output = subprocess.run(command + [str(samples)], env=env, cwd=BACKEND_DIR, check=True,
+                            capture_output=True, text=True).stdout
+    return [json.loads(line) for line in output.splitlines() if line.startswith("{")]
+
+
+def _print_report(report: StartupReport) -> None:
+    click.echo(f"\n{report.mode} ({report.samples} workers)")
+    for measure, summary in report.timings_ms.items():
+        click.echo(f"  {measure:<18} p50 {summary['p50']:>8.1f}  p90 {summary['p90']:>8.1f}  max {summary['max']:>8.1f}")
+
+
+@click.command()
+@click.option("--mode", "modes", multiple=True, type=click.Choice(MODES),
+              help="How workers are started; repeat for several (default: all).")
+@click.option("-n", "--samples", default=5, show_default=True, help="Workers started per mode.")
+@click.option("--json", "as_json", is_flag=True, help="Print the reports as JSON.")
+def main(modes: tuple, samples: int, as_json: bool) -> None:
+    """Measure worker start-up time: imports, create_app() and the first conversion."""
+    with StubOpenAIServer(StubConfig(latency=0.0, tokens_per_second=0.0)) as stub, \
+            tempfile.TemporaryDirectory() as data_dir:
+        env = probe_env(stub.base_url, data_dir)
+        reports = [summarize(mode, run_probe(mode, samples, env)) for mode in modes or MODES]
+
+    if as_json:
+        click.echo(json.dumps([asdict(report) for report in reports], indent=2))
+    else:
+        for report in reports:
+            _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
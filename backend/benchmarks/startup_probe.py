@@ -0,0 +1,89 @@
+"""Time one app worker's start-up from the inside (run by ``benchmarks.startup``).
+
+Only the standard library is imported before timing starts, so the figures
+cover exactly what a gunicorn worker pays: importing the app, ``create_app()``
+and the first conversion (which builds the converter and its OpenAI client).
+Results are printed as one JSON object per worker::
+
+    python -m benchmarks.startup_probe cold
+    python -m benchmarks.startup_probe fork 5
+    python -m benchmarks.startup_probe preload 5
+"""
+import io
+import json
+import os
+import sys
+import time
+from typing import Dict
+
+SAMPLE_ADA = b"""procedure Probe is
+begin
+   null;
+end Probe;
+"""
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def start_worker() -> Dict[str, float]:
+    """Import and create the app and serve its first conversion, timing each step."""
+    started = time.perf_counter()
+    from app.main import create_app
+    imported = time.perf_counter()
+    app = create_app()
+    created = time.perf_counter()
+    response = app.test_client().post(
+        '/api/v1/convert',
+        data={'ada_file': (io.BytesIO(SAMPLE_ADA), 'probe.adb')},
+        content_type='multipart/form-data',
+    )
+    if response.status_code != 200:
+        raise RuntimeError(f"First conversion failed with {response.status_code}: {response.get_data(as_text=True)}")
+    served = time.perf_counter()
+    return {
+        "import_ms": _ms(imported - started),
+        "create_app_ms": _ms(created - imported),
+        "first_request_ms": _ms(served - created),
+        "ready_ms": _ms(served - started),
+    }
+
+
+def fork_workers(count: int, preload: bool) -> None:
+    """Start ``count`` workers the way gunicorn does: forked from a master process.
+
+    With ``preload`` the master first imports what ``gunicorn.conf.py`` preloads.
+    """
+    if preload:
+        from app.main import preload_modules
+        preload_modules()
+    for _ in range(count):
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_end)
+            with os.fdopen(write_end, "w") as output:
+                output.write(json.dumps(start_worker()))
+            os._exit(0)
+        os.close(write_end)
+        with os.fdopen(read_end) as source:
+            result = source.read()
+        os.waitpid(pid, 0)
+        if not result:
+            raise RuntimeError("A forked worker exited without reporting")
+        print(result, flush=True)
+
+
+def main(argv: list[str]) -> None:
+    mode = argv[1] if len(argv) > 1 else "cold"
+    if mode == "cold":
+        print(json.dumps(start_worker()), flush=True)
+    elif mode in ("fork", "preload"):
+        fork_workers(int(argv[2]) if len(argv) > 2 else 1, preload=mode == "preload")
+    else:
+        raise SystemExit(f"Unknown mode {mode!r} (expected cold, fork or preload)")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
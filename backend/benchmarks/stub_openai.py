@@ -0,0 +1,293 @@
+"""A local stand-in for the OpenAI chat completions API.
+
+The stub answers ``POST /v1/chat/completions`` (plain and streamed) with a
+well-formed converter response (a JSON object when a ``response_format`` asks
+for one), so the whole API can be load tested without spending quota.
+Latency, generation speed, response size and error/429 injection are
+configurable.
+
+Run it on its own and point the app at it with ``OPENAI_BASE_URL``::
+
+    python -m benchmarks.stub_openai --port 8100 --latency 0.5 --tokens-per-second 100
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=stub ./start.sh
+"""
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator
+
+import click
+
+from app.core.tokens import CHARS_PER_TOKEN, estimate_tokens
+from app.services.section_parser import format_sections, format_structured
+
+# Tokens sent per streamed chunk
+STREAM_CHUNK_TOKENS = 4
+
+
+@dataclass
+class StubConfig:
+    """How the stub behaves.
+
+    Attributes:
+        latency (float): Seconds before the first token (time to first byte).
+        tokens_per_second (float): Generation speed after the first token; 0 returns everything at once.
+        completion_tokens (int): Approximate size of each completion.
+        error_rate (float): Fraction of requests answered with a 500.
+        rate_limit_rate (float): Fraction of requests answered with a 429.
+        retry_after (float): ``Retry-After`` seconds sent with 429s.
+        seed (int | None): Seed for error injection, for repeatable runs.
+    """
+
+    latency: float = 0.2
+    tokens_per_second: float = 200.0
+    completion_tokens: int = 400
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 1.0
+    seed: int | None = None
+
+
+def stub_completion(completion_tokens: int, structured: bool = False) -> str:
+    """Build a converter response of roughly ``completion_tokens`` tokens, as JSON if ``structured``."""
+    line = "    total = total + value  # accumulate\n"
+    lines = max(3, completion_tokens * CHARS_PER_TOKEN // len(line))
+    body = line * (lines // 3)
+    sections = {
+        "logic": "The procedure sums a sequence of values.\n" + body,
+        "unit_tests": "def test_total():\n" + body + "    assert total >= 0\n",
+        "python_code": "def main():\n    total = 0\n    for value in range(10):\n" + body,
+    }
+    return format_structured(sections) if structured else format_sections(sections)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "StubOpenAIServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # One line per request would swamp the load test output
+        pass
+
+    def do_HEAD(self) -> None:
+        self._send_json(200, {}, body=False)
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "stub", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "Invalid JSON body", "type": "invalid_request_error"}})
+            return
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+
+        outcome = self.server.pick_outcome()
+        self.server.record(outcome)
+        config = self.server.config
+        if outcome == "rate_limited":
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached (stub)", "type": "requests", "code": "rate_limit_exceeded"}},
+                headers={"Retry-After": f"{config.retry_after:g}"},
+            )
+            return
+        if outcome == "error":
+            self._send_json(500, {"error": {"message": "Injected failure (stub)", "type": "server_error"}})
+            return
+
+        time.sleep(config.latency)
+        prompt = "".join(str(message.get("content") or "") for message in payload.get("messages", []))
+        # JSON mode and structured outputs get a JSON object; plain requests get section headers
+        structured = (payload.get("response_format") or {}).get("type") in ("json_object", "json_schema")
+        content = stub_completion(config.completion_tokens, structured)
+        usage = {
+            "prompt_tokens": estimate_tokens(prompt),
+            "completion_tokens": estimate_tokens(content),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        model = payload.get("model", "stub")
+
+        if payload.get("stream"):
+            include_usage = bool((payload.get("stream_options") or {}).get("include_usage"))
+            self._send_stream(model, content, usage if include_usage else None)
+            return
+
+        time.sleep(self._generation_seconds(content))
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        })
+
+    def _generation_seconds(self, text: str) -> float:
+        tokens_per_second = self.server.config.tokens_per_second
+        return estimate_tokens(text) / tokens_per_second if tokens_per_second > 0 else 0.0
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Dict[str, str] | None = None,
+                   body: bool = True) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body:
+            self.wfile.write(data)
+
+    def _send_stream(self, model: str, content: str, usage: Dict[str, int] | None) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        # Without a length the end of the stream is marked by closing the connection
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        def event(choices: list, usage: Dict[str, int] | None = None) -> bytes:
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": choices,
+                "usage": usage,
+            }
+            return f"data: {json.dumps(data)}\n\n".encode("utf-8")
+
+        def delta(content: Dict[str, Any], finish_reason: str | None = None) -> bytes:
+            return event([{"index": 0, "delta": content, "finish_reason": finish_reason}])
+
+        try:
+            self.wfile.write(delta({"role": "assistant", "content": ""}))
+            for piece in _pieces(content, STREAM_CHUNK_TOKENS * CHARS_PER_TOKEN):
+                self.wfile.write(delta({"content": piece}))
+                self.wfile.flush()
+                time.sleep(self._generation_seconds(piece))
+            self.wfile.write(delta({}, finish_reason="stop"))
+            if usage is not None:
+                # With include_usage the API reports usage in a final chunk without choices
+                self.wfile.write(event([], usage=usage))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up mid-stream (e.g. its read timeout expired)
+            pass
+
+
+def _pieces(text: str, size: int) -> Iterator[str]:
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+class StubOpenAIServer(ThreadingHTTPServer):
+    """A threaded HTTP server speaking enough of the OpenAI API for the converter.
+
+    Use it as a context manager to serve from a background thread::
+
+        with StubOpenAIServer(StubConfig(latency=0.1)) as stub:
+            client = OpenAI(base_url=stub.base_url, api_key="stub")
+    """
+
+    daemon_threads = True
+    # Load tests open many connections at once
+    request_queue_size = 1024
+
+    def __init__(self, config: StubConfig | None = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _StubHandler)
+        self.config = config or StubConfig()
+        self.outcomes: Counter = Counter()
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        """The ``OPENAI_BASE_URL`` to point clients at."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def pick_outcome(self) -> str:
+        """Decide whether the next request succeeds, is rate limited or fails."""
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.config.rate_limit_rate:
+            return "rate_limited"
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            return "error"
+        return "success"
+
+    def record(self, outcome: str) -> None:
+        """Count a served request by outcome."""
+        with self._lock:
+            self.outcomes[outcome] += 1
+
+    def start(self) -> "StubOpenAIServer":
+        """Serve from a daemon thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name="stub-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "StubOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8100, show_default=True)
+@click.option("--latency", default=StubConfig.latency, show_default=True, help="Seconds before the first token.")
+@click.option("--tokens-per-second", default=StubConfig.tokens_per_second, show_default=True,
+              help="Generation speed; 0 answers at once.")
+@click.option("--completion-tokens", default=StubConfig.completion_tokens, show_default=True)
+@click.option("--error-rate", default=0.0, show_default=True, help="Fraction of requests answered with a 500.")
+@click.option("--rate-limit-rate", default=0.0, show_default=True, help="Fraction of requests answered with a 429.")
+@click.option("--retry-after", default=StubConfig.retry_after, show_default=True)
+@click.option("--seed", type=int, default=None)
+def main(host: str, port: int, **config: Any) -> None:
+    """Serve a stub OpenAI chat completions API."""
+    server = StubOpenAIServer(StubConfig(**config), host=host, port=port)
+    click.echo(f"Stub OpenAI API listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
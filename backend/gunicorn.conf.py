@@ -0,0 +1,10 @@
+"""gunicorn hooks; gunicorn reads this file from the working directory (see start.sh)."""
+from app.core.config import settings
+
+
+def on_starting(server):
+    # Import the app's heavy modules once, in the master: every worker forks with them
+    # loaded, so starting or recycling a worker skips them. Clients are still built per worker.
+    if settings.preload_modules:
+        from app.main import preload_modules
+        preload_modules()
@@ -3,10 +3,19 @@
 # Production startup script for Render
 echo "Starting Ada Converter API..."
 
+# Open pooled OpenAI connections as each worker boots
+export OPENAI_PREWARM=${OPENAI_PREWARM:-True}
+
+# Requests arrive through Render's load balancer, which appends the client to X-Forwarded-For
+export TRUSTED_PROXY_HOPS=${TRUSTED_PROXY_HOPS:-1}
+
 # Use gunicorn for production
 exec gunicorn app.main:create_app() \
+    --config gunicorn.conf.py \
     --bind 0.0.0.0:${PORT:-8000} \
     --workers 2 \
+    --worker-class gthread \
+    --threads ${WEB_THREADS:-4} \
     --timeout 120 \
     --keep-alive 2 \
     --max-requests 1000 \
@@ -0,0 +1,30 @@
+import gzip
+from flask import Flask, jsonify
+from app.api.compression import init_compression
+
+
+def _app():
+    app = Flask(__name__)
+    init_compression(app)
+    app.add_url_rule('/big', 'big', lambda: jsonify({"text": "x" * 5000}))
+    app.add_url_rule('/small', 'small', lambda: jsonify({"text": "x"}))
+    return app
+
+
+def test_large_responses_are_gzipped_for_clients_that_accept_it():
+    client = _app().test_client()
+
+    response = client.get('/big', headers={'Accept-Encoding': 'gzip, deflate'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert int(response.headers['Content-Length']) == len(response.data) < 5000
+    assert gzip.decompress(response.data).startswith(b'{"text":"xxx')
+
+
+def test_small_responses_and_clients_without_gzip_are_sent_as_is():
+    client = _app().test_client()
+
+    assert 'Content-Encoding' not in client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers
+    uncompressed = client.get('/big')
+    assert 'Content-Encoding' not in uncompressed.headers
+    assert uncompressed.headers['Vary'] == 'Accept-Encoding'
@@ -0,0 +1,46 @@
+import re
+from unittest.mock import patch
+
+
+def _sample(text, line_prefix):
+    match = re.search(rf"^{re.escape(line_prefix)} (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_metrics_endpoint_exposes_prometheus_text(flask_test_client):
+    """Test GET /metrics returns the Prometheus text exposition format."""
+    response = flask_test_client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    text = response.get_data(as_text=True)
+    assert '# TYPE ada_http_requests_total counter' in text
+    assert '# TYPE ada_conversion_stage_seconds histogram' in text
+    assert '# TYPE ada_llm_calls_in_flight gauge' in text
+
+
+def test_metrics_count_requests_and_stages(flask_test_client, sample_converter_response, ada_file_upload):
+    """Test a conversion is counted per endpoint and outcome and its stages are timed."""
+    requests_line = 'ada_http_requests_total{endpoint="api_v1.convert",outcome="success"}'
+    parse_line = 'ada_conversion_stage_seconds_count{stage="parse"}'
+    before = flask_test_client.get('/metrics').get_data(as_text=True)
+
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.convert.return_value = sample_converter_response
+        flask_test_client.post('/api/v1/convert',
+                               data={'ada_file': (ada_file_upload, 'hello.adb')},
+                               content_type='multipart/form-data')
+
+    after = flask_test_client.get('/metrics').get_data(as_text=True)
+    assert _sample(after, requests_line) == _sample(before, requests_line) + 1
+    assert _sample(after, parse_line) >= _sample(before, parse_line) + 1
+
+
+def test_metrics_count_client_errors(flask_test_client):
+    """Test a rejected upload is counted as a client error."""
+    line = 'ada_http_requests_total{endpoint="api_v1.convert",outcome="client_error"}'
+    before = _sample(flask_test_client.get('/metrics').get_data(as_text=True), line)
+
+    flask_test_client.post('/api/v1/convert', data={}, content_type='multipart/form-data')
+
+    assert _sample(flask_test_client.get('/metrics').get_data(as_text=True), line) == before + 1
@@ -0,0 +1,93 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+
+@pytest.fixture
+def admin_headers():
+    with patch('app.api.v1.endpoints.admin.settings') as mock_settings:
+        mock_settings.admin_token = 'secret'
+        yield {'Authorization': 'Bearer secret'}
+
+
+def test_admin_api_disabled_without_token(flask_test_client):
+    """Test that admin endpoints are unavailable when no admin token is configured."""
+    with patch('app.api.v1.endpoints.admin.settings') as mock_settings:
+        mock_settings.admin_token = None
+        
+        response = flask_test_client.get('/api/v1/admin/cache')
+        
+        assert response.status_code == 403
+
+
+def test_admin_api_rejects_wrong_token(flask_test_client, admin_headers):
+    """Test that admin endpoints require the configured bearer token."""
+    response = flask_test_client.get('/api/v1/admin/cache', headers={'Authorization': 'Bearer wrong'})
+    
+    assert response.status_code == 401
+
+
+def test_inspect_cache(flask_test_client, admin_headers, conversion_cache):
+    """Test GET /api/v1/admin/cache lists entries and stats."""
+    conversion_cache.set('abc', '# Logic\nx', model='gpt-4')
+    
+    response = flask_test_client.get('/api/v1/admin/cache', headers=admin_headers)
+    
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['entries']['memory'][0]['key'] == 'abc'
+    assert data['stats']['tiers']['memory']['entries'] == 1
+
+
+def test_get_cache_entry(flask_test_client, admin_headers, conversion_cache):
+    """Test GET /api/v1/admin/cache/<key> returns the cached response."""
+    conversion_cache.set('abc', '# Logic\nx', model='gpt-4')
+    
+    response = flask_test_client.get('/api/v1/admin/cache/abc', headers=admin_headers)
+    missing = flask_test_client.get('/api/v1/admin/cache/nope', headers=admin_headers)
+    
+    assert json.loads(response.data)['value'] == '# Logic\nx'
+    assert missing.status_code == 404
+
+
+def test_purge_cache(flask_test_client, admin_headers, conversion_cache, tmp_path):
+    """Test DELETE endpoints purge single entries and the whole cache, near-duplicate index included."""
+    from app.services.similarity_index import SimilarityIndex
+    index = SimilarityIndex(str(tmp_path / 'index.sqlite3'), threshold=0.85, max_entries=100)
+    for key, unit in (('abc', 'procedure A is begin null; end A;'), ('def', 'procedure B is begin null; end B;'),
+                      ('ghi', 'function C return Integer is begin return 1; end C;')):
+        conversion_cache.set(key, 'x', model='gpt-4')
+        index.add(key, unit, 'x', 'gpt-4', 'prompt')
+    
+    with patch('app.api.v1.endpoints.convert.similarity_index', index):
+        single = flask_test_client.delete('/api/v1/admin/cache/abc', headers=admin_headers)
+        purge = flask_test_client.delete('/api/v1/admin/cache', headers=admin_headers)
+    
+    assert single.status_code == 200
+    assert json.loads(purge.data) == {'purged': {'memory': 2, 'similarity': 2}}
+    assert index.find('procedure D is begin null; end D;', 'gpt-4', 'prompt') is None
+
+
+def test_admins_can_profile_a_request(admin_headers, tmp_path):
+    """Test that X-Profile from an admin returns span timings and stores the collapsed stacks."""
+    from flask import Flask
+    from app.api.v1.endpoints.admin import get_profile, profiled
+    from app.core.profiling import ProfileStore
+    app = Flask(__name__)
+    app.add_url_rule('/work', 'work', profiled(lambda: 'done'), methods=['GET'])
+    app.add_url_rule('/profiles/<profile_id>', 'get_profile', get_profile, methods=['GET'])
+    
+    with patch('app.api.v1.endpoints.admin.settings.profiling_interval_ms', 1.0), \
+            patch('app.api.v1.endpoints.admin.profile_store', ProfileStore(str(tmp_path), max_profiles=10)):
+        client = app.test_client()
+        profiled_response = client.get('/work', headers={**admin_headers, 'X-Profile': 'true'})
+        anonymous = client.get('/work', headers={'X-Profile': 'true'})
+        stacks = client.get(f"/profiles/{profiled_response.headers['X-Profile-Id']}", headers=admin_headers)
+    
+    assert profiled_response.get_data(as_text=True) == 'done'
+    assert profiled_response.headers['Server-Timing'].startswith('total;dur=')
+    assert 'Server-Timing' not in anonymous.headers
+    assert 'X-Profile-Id' not in anonymous.headers
+    assert stacks.status_code == 200
+    assert stacks.mimetype == 'text/plain'
@@ -0,0 +1,95 @@
+import asyncio
+import json
+from io import BytesIO
+from unittest.mock import AsyncMock, patch
+import pytest
+
+pytest.importorskip('quart')
+from werkzeug.datastructures import FileStorage
+
+
+@pytest.fixture
+def async_app(conversion_cache, single_flight):
+    """The async (ASGI) app, with a memory-only conversion cache."""
+    from app.main import create_async_app
+    app = create_async_app()
+    app.config['TESTING'] = True
+    with patch('app.api.v1.endpoints.convert.conversion_cache', conversion_cache), \
+            patch('app.api.v1.endpoints.convert.single_flight', single_flight):
+        yield app
+
+
+def _post(app, path, sample_ada_code, **form):
+    async def post():
+        client = app.test_client()
+        upload = FileStorage(stream=BytesIO(sample_ada_code.encode('utf-8')), filename='hello.adb')
+        response = await client.post(path, form=form, files={'ada_file': upload})
+        return response, await response.get_data(as_text=True)
+    return asyncio.run(post())
+
+
+def test_async_convert_awaits_the_converter(async_app, sample_converter_response, sample_ada_code):
+    """Test POST /api/v1/convert on the async app."""
+    with patch('app.api.v1.endpoints.async_convert.ada_converter') as mock_converter:
+        mock_converter.convert = AsyncMock(return_value=sample_converter_response)
+        
+        response, body = _post(async_app, '/api/v1/convert', sample_ada_code)
+        
+        assert response.status_code == 200
+        assert response.headers['X-Cache'] == 'MISS'
+        data = json.loads(body)
+        assert data['python_code'].startswith('def hello')
+        mock_converter.convert.assert_awaited_once()
+
+
+def test_async_convert_shares_the_conversion_cache(async_app, sample_converter_response, sample_ada_code):
+    """Test that repeat uploads are served from the cache without awaiting the converter."""
+    with patch('app.api.v1.endpoints.async_convert.ada_converter') as mock_converter:
+        mock_converter.convert = AsyncMock(return_value=sample_converter_response)
+        
+        _post(async_app, '/api/v1/convert', sample_ada_code)
+        response, _ = _post(async_app, '/api/v1/convert', sample_ada_code)
+        
+        assert response.headers['X-Cache'] == 'HIT'
+        assert mock_converter.convert.await_count == 1
+
+
+def test_async_convert_maps_upstream_rate_limit_to_429(async_app, sample_ada_code):
+    """Test that exhausted rate limit retries surface as 429 with Retry-After."""
+    from app.core.exceptions import UpstreamRateLimitError
+    with patch('app.api.v1.endpoints.async_convert.ada_converter') as mock_converter:
+        mock_converter.convert = AsyncMock(side_effect=UpstreamRateLimitError("rate limited", retry_after=3))
+        
+        response, _ = _post(async_app, '/api/v1/convert', sample_ada_code)
+        
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '3'
+
+
+def test_async_convert_missing_file(async_app):
+    """Test POST /api/v1/convert on the async app with missing file."""
+    async def post():
+        response = await async_app.test_client().post('/api/v1/convert', form={})
+        return response, await response.get_data(as_text=True)
+    
+    response, body = asyncio.run(post())
+    
+    assert response.status_code == 400
+    assert 'ada_file is required' in json.loads(body)['error']
+
+
+def test_async_convert_stream_emits_sections(async_app, sample_converter_response, sample_ada_code):
+    """Test POST /api/v1/convert/stream on the async app."""
+    async def stream(*args, **kwargs):
+        for index in range(0, len(sample_converter_response), 20):
+            yield sample_converter_response[index:index + 20]
+    
+    with patch('app.api.v1.endpoints.async_convert.ada_converter') as mock_converter:
+        mock_converter.convert_stream.side_effect = stream
+        
+        response, body = _post(async_app, '/api/v1/convert/stream', sample_ada_code)
+        
+        assert response.mimetype == 'text/event-stream'
+        events = [block.split('\n')[0][len('event: '):] for block in body.strip().split('\n\n')]
+        assert events[-1] == 'done'
+        assert {'logic', 'unit_tests', 'python_code'} <= set(events)
@@ -0,0 +1,114 @@
+import io
+import json
+import zipfile
+from unittest.mock import patch
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    buffer.seek(0)
+    return buffer
+
+
+def test_batch_converts_multiple_files(flask_test_client, sample_converter_response):
+    """Test POST /api/v1/convert/batch returns a manifest with a result per file."""
+    def convert(code, session_id=None, dependencies=None):
+        if 'Broken' in code:
+            raise RuntimeError('upstream error')
+        return sample_converter_response
+    
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.convert.side_effect = convert
+        
+        response = flask_test_client.post('/api/v1/convert/batch',
+                                        data={'ada_files': [
+                                            (io.BytesIO(b'procedure A is begin null; end A;'), 'a.adb'),
+                                            (io.BytesIO(b'procedure Broken is begin null; end Broken;'), 'broken.adb'),
+                                            (io.BytesIO(b'notes'), 'notes.txt'),
+                                        ]},
+                                        content_type='multipart/form-data')
+        
+        assert response.status_code == 200
+        manifest = json.loads(response.data)
+        assert manifest['summary']['total'] == 2
+        assert manifest['summary']['failed'] == 1
+        assert manifest['skipped'] == ['notes.txt']
+        by_name = {entry['filename']: entry for entry in manifest['files']}
+        assert by_name['a.adb']['result']['python_code'].startswith('def hello()')
+        assert by_name['broken.adb']['error'] == 'upstream error'
+
+
+def test_batch_reports_invalid_utf8_per_file(flask_test_client, sample_converter_response):
+    """Test that a file that is not UTF-8 fails on its own without failing the batch."""
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.convert.return_value = sample_converter_response
+        
+        response = flask_test_client.post('/api/v1/convert/batch',
+                                        data={'ada_files': [
+                                            (io.BytesIO(b'procedure A is begin null; end A;'), 'a.adb'),
+                                            (io.BytesIO(b'\xff\xfe-- latin-1'), 'latin1.adb'),
+                                        ]},
+                                        content_type='multipart/form-data')
+        
+        assert response.status_code == 200
+        by_name = {entry['filename']: entry for entry in json.loads(response.data)['files']}
+        assert by_name['a.adb']['status'] == 'succeeded'
+        assert by_name['latin1.adb']['status'] == 'failed'
+        assert 'UTF-8' in by_name['latin1.adb']['error']
+
+
+def test_batch_accepts_archive_and_returns_zip(flask_test_client, sample_converter_response):
+    """Test POST /api/v1/convert/batch?format=zip converts an archive into an archive."""
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.convert.return_value = sample_converter_response
+        
+        response = flask_test_client.post('/api/v1/convert/batch?format=zip',
+                                        data={'archive': (_zip({'src/hello.adb': 'null;', 'src/hello.ads': 'spec'}), 'project.zip')},
+                                        content_type='multipart/form-data')
+        
+        assert response.status_code == 200
+        assert response.headers['Content-Type'] == 'application/zip'
+        with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+            assert 'src/hello.py' in archive.namelist()
+            assert 'src/hello_spec.py' in archive.namelist()
+            assert json.loads(archive.read('manifest.json'))['summary']['succeeded'] == 2
+
+
+def test_batch_requires_files(flask_test_client):
+    """Test POST /api/v1/convert/batch with nothing to convert."""
+    response = flask_test_client.post('/api/v1/convert/batch',
+                                    data={'ada_files': [(io.BytesIO(b'x'), 'notes.txt')]},
+                                    content_type='multipart/form-data')
+    
+    assert response.status_code == 400
+
+
+def test_batch_rejects_unknown_format(flask_test_client):
+    """Test POST /api/v1/convert/batch validates the output format."""
+    response = flask_test_client.post('/api/v1/convert/batch?format=rar',
+                                    data={},
+                                    content_type='multipart/form-data')
+    
+    assert response.status_code == 400
+
+
+def test_batch_converts_specs_before_the_units_that_depend_on_them(flask_test_client, sample_converter_response):
+    """Test that a project is converted by dependency level, bodies given their converted specs."""
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.convert.return_value = sample_converter_response
+        
+        response = flask_test_client.post('/api/v1/convert/batch',
+                                        data={'archive': (_zip({
+                                            'greet.adb': 'package body Greet is\n   procedure Hello is begin null; end Hello;\nend Greet;\n',
+                                            'greet.ads': 'package Greet is\n   procedure Hello;\nend Greet;\n',
+                                        }), 'project.zip')},
+                                        content_type='multipart/form-data')
+        
+        manifest = json.loads(response.data)
+        assert manifest['summary']['levels'] == 2
+        assert {entry['filename']: entry['level'] for entry in manifest['files']} == {'greet.ads': 0, 'greet.adb': 1}
+        body_call = next(call for call in mock_converter.convert.call_args_list if 'package body' in call.args[0])
+        assert body_call.kwargs['dependencies'].startswith('# Converted from greet (spec, greet.ads)\ndef hello()')
@@ -0,0 +1,108 @@
+import gzip
+import json
+from io import BytesIO
+from unittest.mock import patch
+
+
+def _convert(client, sample_ada_code):
+    response = client.post('/api/v1/convert',
+                           data={'ada_file': (BytesIO(sample_ada_code.encode()), 'hello.adb')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    return json.loads(response.data)
+
+
+def test_conversion_can_be_fetched_by_its_id(flask_test_client, sample_converter_response, sample_ada_code):
+    """Test that a conversion is retrievable from GET /api/v1/conversions/<id>."""
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.model = 'gpt-4'
+        mock_converter.system_prompt = 'prompt'
+        mock_converter.convert.return_value = sample_converter_response
+        converted = _convert(flask_test_client, sample_ada_code)
+    
+    response = flask_test_client.get(f"/api/v1/conversions/{converted['conversion_id']}")
+    
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['conversion_id'] == converted['conversion_id']
+    assert data['python_code'] == converted['python_code']
+    assert data['model'] == 'gpt-4'
+    assert response.headers['ETag'].startswith('"')
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+
+def test_conversion_revalidates_with_if_none_match(flask_test_client, sample_converter_response, sample_ada_code):
+    """Test that a matching If-None-Match gets a 304 without a body."""
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.convert.return_value = sample_converter_response
+        url = f"/api/v1/conversions/{_convert(flask_test_client, sample_ada_code)['conversion_id']}"
+    
+    etag = flask_test_client.get(url).headers['ETag']
+    revalidated = flask_test_client.get(url, headers={'If-None-Match': etag})
+    stale = flask_test_client.get(url, headers={'If-None-Match': '"something-else"'})
+    
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+    assert revalidated.headers['ETag'] == etag
+    assert stale.status_code == 200
+
+
+def test_conversion_etag_changes_with_the_model_and_creation_time(flask_test_client, sample_converter_response,
+                                                                  sample_ada_code, conversion_cache):
+    """Test that a re-conversion with the same text but another model or time is not answered with a 304."""
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.convert.return_value = sample_converter_response
+        conversion_id = _convert(flask_test_client, sample_ada_code)['conversion_id']
+    url = f"/api/v1/conversions/{conversion_id}"
+    etag = flask_test_client.get(url).headers['ETag']
+    entry = conversion_cache.lookup(conversion_id)
+    
+    with patch.object(conversion_cache, '_clock', return_value=entry.created_at):
+        conversion_cache.set(conversion_id, entry.value, model='gpt-4')
+    remodeled = flask_test_client.get(url, headers={'If-None-Match': etag})
+    with patch.object(conversion_cache, '_clock', return_value=entry.created_at + 30):
+        conversion_cache.set(conversion_id, entry.value, model=entry.model)
+    redated = flask_test_client.get(url, headers={'If-None-Match': etag})
+    
+    assert remodeled.status_code == 200
+    assert json.loads(remodeled.data)['model'] == 'gpt-4'
+    assert redated.status_code == 200
+    assert redated.headers['ETag'] not in (etag, remodeled.headers['ETag'])
+
+
+def test_compressed_conversion_has_its_own_etag(flask_test_client, sample_ada_code):
+    """Test that large results are gzipped, with an ETag that still revalidates."""
+    response_text = "# Logic\nSums values.\n# Unit Test\ndef test_sum():\n    assert True\n# Python Code\n" + "x = 1\n" * 500
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.convert.return_value = response_text
+        url = f"/api/v1/conversions/{_convert(flask_test_client, sample_ada_code)['conversion_id']}"
+    
+    response = flask_test_client.get(url, headers={'Accept-Encoding': 'gzip'})
+    
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(gzip.decompress(response.data))['python_code'].count('x = 1') == 500
+    assert response.headers['ETag'].endswith('-gzip"')
+    revalidated = flask_test_client.get(url, headers={'Accept-Encoding': 'gzip',
+                                                      'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+
+
+def test_unknown_conversion_is_not_found(flask_test_client):
+    """Test that an id with no stored conversion is a 404."""
+    response = flask_test_client.get('/api/v1/conversions/' + '0' * 64)
+    
+    assert response.status_code == 404
+    assert 'error' in json.loads(response.data)
+
+
+def test_session_conversions_have_no_id(flask_test_client, sample_converter_response, ada_file_upload):
+    """Test that conversions continuing a session are not stored for retrieval."""
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.convert.return_value = sample_converter_response
+        mock_converter.session_stats.return_value = {}
+        response = flask_test_client.post('/api/v1/convert',
+                                        data={'ada_file': (ada_file_upload, 'hello.adb'), 'session_id': 'abc'},
+                                        content_type='multipart/form-data')
+    
+    assert 'conversion_id' not in json.loads(response.data)
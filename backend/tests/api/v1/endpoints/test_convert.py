@@ -1,6 +1,8 @@
 import pytest
 import json
+from types import SimpleNamespace
 from unittest.mock import patch
+from app.services.verifier import VerificationResult
 
 
 
@@ -45,4 +47,449 @@ def test_convert_endpoint_empty_file(flask_test_client):
     assert response.status_code == 400
     data = json.loads(response.data)
     assert 'error' in data
-    assert 'File is empty' in data['error']
\ No newline at end of file
+    assert 'File is empty' in data['error']
+
+def test_convert_endpoint_rejects_invalid_utf8(flask_test_client):
+    """Test that an upload that is not UTF-8 text is rejected with its offending offset."""
+    from io import BytesIO
+    
+    response = flask_test_client.post('/api/v1/convert',
+                                    data={'ada_file': (BytesIO(b'procedure P is\n\xff\xfe'), 'latin1.adb')},
+                                    content_type='multipart/form-data')
+    
+    assert response.status_code == 400
+    error = json.loads(response.data)['error']
+    assert 'UTF-8' in error
+    assert 'offset 15' in error
+
+
+def test_convert_endpoint_rejects_other_extensions(flask_test_client):
+    """Test that files other than Ada sources are rejected before they are read."""
+    from io import BytesIO
+    
+    response = flask_test_client.post('/api/v1/convert',
+                                    data={'ada_file': (BytesIO(b'print("hi")'), 'script.py')},
+                                    content_type='multipart/form-data')
+    
+    assert response.status_code == 400
+    assert 'not an Ada source file' in json.loads(response.data)['error']
+
+def test_convert_endpoint_with_session_reports_token_usage(flask_test_client, sample_converter_response, ada_file_upload):
+    """Test that a session id is forwarded to the converter and its usage is reported."""
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.convert.return_value = sample_converter_response
+        mock_converter.session_stats.return_value = {"session_id": "team-1", "turns": 1, "total_tokens": 42}
+        
+        response = flask_test_client.post('/api/v1/convert',
+                                        data={'ada_file': (ada_file_upload, 'hello.adb'), 'session_id': 'team-1'},
+                                        content_type='multipart/form-data')
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['session']['total_tokens'] == 42
+        assert mock_converter.convert.call_args.kwargs['session_id'] == 'team-1'
+
+
+def test_convert_endpoint_is_stateless_without_session(flask_test_client, sample_converter_response, ada_file_upload):
+    """Test that conversions without a session id are single-shot."""
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.convert.return_value = sample_converter_response
+        
+        response = flask_test_client.post('/api/v1/convert',
+                                        data={'ada_file': (ada_file_upload, 'hello.adb')},
+                                        content_type='multipart/form-data')
+        
+        assert response.status_code == 200
+        assert 'session' not in json.loads(response.data)
+        assert mock_converter.convert.call_args.kwargs['session_id'] is None
+
+
+def test_convert_endpoint_invalid_session_id(flask_test_client, ada_file_upload):
+    """Test that malformed session ids are rejected."""
+    response = flask_test_client.post('/api/v1/convert',
+                                    data={'ada_file': (ada_file_upload, 'hello.adb')},
+                                    headers={'X-Session-Id': 'not a valid id!'},
+                                    content_type='multipart/form-data')
+    
+    assert response.status_code == 400
+    assert 'session_id' in json.loads(response.data)['error']
+
+
+def test_convert_endpoint_maps_upstream_rate_limit_to_429(flask_test_client, ada_file_upload):
+    """Test that exhausted rate limit retries surface as 429 with Retry-After instead of a 500."""
+    from app.core.exceptions import UpstreamRateLimitError
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.convert.side_effect = UpstreamRateLimitError("OpenAI rate limit exceeded; retry later", retry_after=7.2)
+        
+        response = flask_test_client.post('/api/v1/convert',
+                                        data={'ada_file': (ada_file_upload, 'hello.adb')},
+                                        content_type='multipart/form-data')
+        
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '8'
+        assert 'rate limit' in json.loads(response.data)['error']
+
+
+def test_convert_endpoint_sheds_conversions_over_capacity(flask_test_client, ada_file_upload):
+    """Test that admission control answers 503 with Retry-After when the service is saturated."""
+    from app.services.admission import AdmissionController
+    full = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=1)
+    with patch('app.api.v1.endpoints.convert.admission', full), \
+            patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter, \
+            full.admit("someone-else"):
+        response = flask_test_client.post('/api/v1/convert',
+                                        data={'ada_file': (ada_file_upload, 'hello.adb')},
+                                        content_type='multipart/form-data')
+        
+        assert response.status_code == 503
+        assert int(response.headers['Retry-After']) >= 1
+        mock_converter.convert.assert_not_called()
+
+
+def test_convert_stream_is_admitted_before_streaming_starts(flask_test_client, ada_file_upload):
+    """Test that streamed conversions hold admission slots and are shed with 503 when saturated."""
+    from app.services.admission import AdmissionController
+    full = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=1)
+    with patch('app.api.v1.endpoints.convert.admission', full), \
+            patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter, \
+            full.admit("someone-else"):
+        mock_converter.concurrent_calls.return_value = 1
+        response = flask_test_client.post('/api/v1/convert/stream',
+                                        data={'ada_file': (ada_file_upload, 'hello.adb')},
+                                        content_type='multipart/form-data')
+        
+        assert response.status_code == 503
+        assert 'Retry-After' in response.headers
+        mock_converter.convert_stream.assert_not_called()
+
+
+def test_convert_endpoint_limits_each_client_to_its_share(flask_test_client, ada_file_upload):
+    """Test that a client over its fair share of capacity gets 429."""
+    from app.api.v1.endpoints.convert import get_client_id
+    from app.services.admission import AdmissionController
+    busy = AdmissionController(max_in_flight=2, max_queue=0, queue_timeout=1, client_share=0.5)
+    with patch('app.api.v1.endpoints.convert.admission', busy), \
+            patch('app.api.v1.endpoints.convert.ada_converter'), \
+            busy.admit(get_client_id(SimpleNamespace(headers={'X-API-Key': 'team-key'}, remote_addr=None))):
+        response = flask_test_client.post('/api/v1/convert',
+                                        data={'ada_file': (ada_file_upload, 'hello.adb')},
+                                        headers={'X-API-Key': 'team-key'},
+                                        content_type='multipart/form-data')
+        
+        assert response.status_code == 429
+        assert 'Retry-After' in response.headers
+
+
+def test_anonymous_clients_behind_a_trusted_proxy_are_told_apart(
+        monkeypatch, conversion_cache, similarity_index, single_flight, sample_converter_response, sample_ada_code):
+    """Test that with TRUSTED_PROXY_HOPS set, anonymous clients are keyed on X-Forwarded-For, not the proxy."""
+    from io import BytesIO
+    from app.core.config import settings
+    from app.main import create_app
+    from app.services.admission import AdmissionController
+    monkeypatch.setattr(settings, 'trusted_proxy_hops', 1)
+    with patch('app.services.ada_converter.OpenAIClient'):
+        app = create_app()
+    busy = AdmissionController(max_in_flight=2, max_queue=0, queue_timeout=1, client_share=0.5)
+    proxy = {'REMOTE_ADDR': '10.0.0.1'}
+    with patch('app.api.v1.endpoints.convert.conversion_cache', conversion_cache), \
+            patch('app.api.v1.endpoints.convert.similarity_index', similarity_index), \
+            patch('app.api.v1.endpoints.convert.single_flight', single_flight), \
+            patch('app.api.v1.endpoints.convert.admission', busy), \
+            patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter, \
+            busy.admit("ip:203.0.113.7"), \
+            app.test_client() as client:
+        mock_converter.convert.return_value = sample_converter_response
+        
+        def post(forwarded_for):
+            return client.post('/api/v1/convert',
+                               data={'ada_file': (BytesIO(sample_ada_code.encode('utf-8')), 'hello.adb')},
+                               headers={'X-Forwarded-For': forwarded_for},
+                               environ_base=proxy,
+                               content_type='multipart/form-data')
+        
+        assert post('203.0.113.7').status_code == 429
+        assert post('198.51.100.1, 203.0.113.9').status_code == 200
+
+
+def test_convert_endpoint_maps_upstream_timeout_to_504(flask_test_client, ada_file_upload):
+    """Test that upstream timeouts surface as 504."""
+    from app.core.exceptions import UpstreamTimeoutError
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.convert.side_effect = UpstreamTimeoutError("OpenAI request timed out")
+        
+        response = flask_test_client.post('/api/v1/convert',
+                                        data={'ada_file': (ada_file_upload, 'hello.adb')},
+                                        content_type='multipart/form-data')
+        
+        assert response.status_code == 504
+
+
+def test_convert_endpoint_rejects_oversized_upload(flask_test_client, sample_ada_code):
+    """Test that an upload over MAX_FILE_SIZE is answered with 413, not a server error."""
+    from io import BytesIO
+    flask_test_client.application.config['MAX_CONTENT_LENGTH'] = 64
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        response = flask_test_client.post('/api/v1/convert',
+                                        data={'ada_file': (BytesIO(sample_ada_code.encode() * 10), 'hello.adb')},
+                                        content_type='multipart/form-data')
+        
+        assert response.status_code == 413
+        mock_converter.convert.assert_not_called()
+
+
+def test_convert_endpoint_serves_repeat_uploads_from_cache(flask_test_client, sample_converter_response, sample_ada_code):
+    """Test that re-uploading the same source is served from the conversion cache."""
+    from io import BytesIO
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.model = 'gpt-4'
+        mock_converter.system_prompt = 'prompt'
+        mock_converter.convert.return_value = sample_converter_response
+        
+        first = flask_test_client.post('/api/v1/convert',
+                                     data={'ada_file': (BytesIO(sample_ada_code.encode()), 'hello.adb')},
+                                     content_type='multipart/form-data')
+        second = flask_test_client.post('/api/v1/convert',
+                                      data={'ada_file': (BytesIO(sample_ada_code.encode()), 'hello.adb')},
+                                      content_type='multipart/form-data')
+        
+        assert first.headers['X-Cache'] == 'MISS'
+        assert second.headers['X-Cache'] == 'HIT'
+        assert json.loads(first.data) == json.loads(second.data)
+        mock_converter.convert.assert_called_once()
+
+
+def test_convert_endpoint_reuses_or_adapts_near_duplicate_conversions(flask_test_client, sample_converter_response, tmp_path):
+    """Test that a near-duplicate upload is adapted from an earlier conversion, and a reformatted one reuses it."""
+    from io import BytesIO
+    from app.services.similarity_index import SimilarityIndex
+    original = "procedure Count_Up (Limit : Integer) is\nbegin\n   for I in 1 .. Limit loop\n      Put_Line (I'Image);\n   end loop;\nend Count_Up;"
+    renamed = original.replace("Count_Up", "Count_To").replace("Limit", "Last").replace("1 ..", "0 ..")
+    reformatted = "-- Same as Count_Up\n" + original.replace("   ", "  ")
+    index = SimilarityIndex(str(tmp_path / "similarity.sqlite3"), threshold=0.85, max_entries=100)
+    
+    def post(source):
+        return flask_test_client.post('/api/v1/convert',
+                                      data={'ada_file': (BytesIO(source.encode()), 'count.adb')},
+                                      content_type='multipart/form-data')
+    
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter, \
+            patch('app.api.v1.endpoints.convert.similarity_index', index):
+        mock_converter.model = 'gpt-4'
+        mock_converter.system_prompt = 'prompt'
+        mock_converter.convert.return_value = sample_converter_response
+        mock_converter.adapt.return_value = sample_converter_response
+        
+        first = post(original)
+        adapted = post(renamed)
+        reused = post(reformatted)
+        
+        assert first.headers['X-Cache'] == 'MISS'
+        assert 'similar_to' not in json.loads(first.data)
+        assert adapted.headers['X-Cache'] == 'MISS'
+        assert json.loads(adapted.data)['similar_to']['conversion_id'] == json.loads(first.data)['conversion_id']
+        code, reference_code, reference_response = mock_converter.adapt.call_args.args
+        assert "Count_To" in code and "Count_Up" in reference_code
+        assert reference_response == sample_converter_response
+        assert reused.headers['X-Cache'] == 'SIMILAR'
+        assert json.loads(reused.data)['similar_to']['similarity'] == 1.0
+        mock_converter.convert.assert_called_once()
+        mock_converter.adapt.assert_called_once()
+
+
+def test_concurrent_identical_conversions_share_one_converter_call(flask_test_client, sample_converter_response, sample_ada_code):
+    """Test that identical uploads converted at the same time make a single converter call."""
+    import threading
+    import time
+    from app.api.v1.endpoints.convert import run_conversion
+    release = threading.Event()
+    
+    def slow_convert(*args, **kwargs):
+        release.wait(5)
+        return sample_converter_response
+    
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.model = 'gpt-4'
+        mock_converter.system_prompt = 'prompt'
+        mock_converter.convert.side_effect = slow_convert
+        
+        statuses = []
+        threads = [threading.Thread(target=lambda: statuses.append(run_conversion(sample_ada_code)[1]))
+                   for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        
+        assert sorted(statuses) == ['COALESCED', 'COALESCED', 'MISS']
+        mock_converter.convert.assert_called_once()
+
+
+def test_convert_endpoint_normalizes_source_and_reports_token_savings(flask_test_client, sample_converter_response, sample_ada_code):
+    """Test that banner comments are stripped before prompting and the savings are reported."""
+    from io import BytesIO
+    banner = "-" * 60 + "\n-- Copyright (c) 1999 ACME Corp. All rights reserved.\n" + "-" * 60 + "\n"
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter, \
+            patch('app.api.v1.endpoints.convert.settings') as mock_settings:
+        mock_settings.ada_normalization = 'banners'
+        mock_converter.model = 'gpt-4'
+        mock_converter.system_prompt = 'prompt'
+        mock_converter.convert.return_value = sample_converter_response
+        
+        first = flask_test_client.post('/api/v1/convert',
+                                     data={'ada_file': (BytesIO((banner + sample_ada_code).encode()), 'hello.adb')},
+                                     content_type='multipart/form-data')
+        second = flask_test_client.post('/api/v1/convert',
+                                      data={'ada_file': (BytesIO(sample_ada_code.encode()), 'hello.adb')},
+                                      content_type='multipart/form-data')
+        
+        sent_code = mock_converter.convert.call_args.args[0]
+        assert 'Copyright' not in sent_code
+        assert sent_code.startswith('procedure Hello is')
+        normalization = json.loads(first.data)['normalization']
+        assert normalization['level'] == 'banners'
+        assert normalization['tokens_saved'] > 30
+        # Uploads that differ only in their banner share a cache entry
+        assert second.headers['X-Cache'] == 'HIT'
+
+
+def _sse_events(body):
+    """Parse a text/event-stream body into (event, data) pairs."""
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def test_convert_stream_emits_sections_as_they_complete(flask_test_client, sample_converter_response, ada_file_upload):
+    """Test POST /api/v1/convert/stream emits section events followed by the full result."""
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.model = 'gpt-4'
+        mock_converter.system_prompt = 'prompt'
+        chunks = [sample_converter_response[i:i + 5] for i in range(0, len(sample_converter_response), 5)]
+        mock_converter.convert_stream.return_value = iter(chunks)
+        
+        response = flask_test_client.post('/api/v1/convert/stream',
+                                        data={'ada_file': (ada_file_upload, 'hello.adb')},
+                                        content_type='multipart/form-data')
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        assert response.headers['X-Cache'] == 'MISS'
+        events = _sse_events(response.get_data(as_text=True))
+        sections = [name for name, _ in events if name not in ('delta', 'done')]
+        assert sections == ['logic', 'unit_tests', 'python_code']
+        assert ''.join(data['content'] for name, data in events if name == 'delta') == sample_converter_response
+        assert events[-1][0] == 'done'
+        assert events[-1][1]['python_code'].startswith('def hello()')
+
+
+def test_convert_endpoints_parse_structured_responses(flask_test_client, ada_file_upload, sample_ada_code):
+    """Test that JSON converter responses are split into sections, streamed or not."""
+    from io import BytesIO
+    structured = json.dumps({"logic": "Prints a greeting.", "unit_tests": "def test_hello(): ...",
+                             "python_code": "def hello(): ..."})
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.model = 'gpt-4'
+        mock_converter.system_prompt = 'json prompt'
+        mock_converter.convert.return_value = structured
+        mock_converter.convert_stream.return_value = iter([structured[i:i + 7] for i in range(0, len(structured), 7)])
+        
+        response = flask_test_client.post('/api/v1/convert',
+                                        data={'ada_file': (ada_file_upload, 'hello.adb')},
+                                        content_type='multipart/form-data')
+        mock_converter.system_prompt = 'other prompt'
+        streamed = flask_test_client.post('/api/v1/convert/stream',
+                                        data={'ada_file': (BytesIO(sample_ada_code.encode()), 'hello.adb')},
+                                        content_type='multipart/form-data')
+        
+        data = json.loads(response.data)
+        assert data['python_code'] == 'def hello(): ...'
+        events = _sse_events(streamed.get_data(as_text=True))
+        assert [name for name, _ in events if name not in ('delta', 'done')] == ['logic', 'unit_tests', 'python_code']
+        assert events[-1][1]['unit_tests'] == 'def test_hello(): ...'
+
+
+def test_convert_stream_replays_cached_conversion(flask_test_client, sample_converter_response, sample_ada_code):
+    """Test that a streamed conversion is cached and replayed on the next upload."""
+    from io import BytesIO
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.model = 'gpt-4'
+        mock_converter.system_prompt = 'prompt'
+        mock_converter.convert_stream.return_value = iter([sample_converter_response])
+        
+        first = flask_test_client.post('/api/v1/convert/stream',
+                                     data={'ada_file': (BytesIO(sample_ada_code.encode()), 'hello.adb')},
+                                     content_type='multipart/form-data')
+        first.get_data()
+        second = flask_test_client.post('/api/v1/convert/stream',
+                                      data={'ada_file': (BytesIO(sample_ada_code.encode()), 'hello.adb')},
+                                      content_type='multipart/form-data')
+        
+        assert second.headers['X-Cache'] == 'HIT'
+        assert [name for name, _ in _sse_events(second.get_data(as_text=True))] == [
+            'logic', 'unit_tests', 'python_code', 'done'
+        ]
+        mock_converter.convert_stream.assert_called_once()
+
+
+def test_convert_stream_reports_upstream_errors_as_events(flask_test_client, ada_file_upload):
+    """Test that failures after streaming has started are sent as an error event."""
+    def failing_stream(*args, **kwargs):
+        yield '# Logic\n'
+        raise RuntimeError('upstream went away')
+    
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.convert_stream.side_effect = failing_stream
+        
+        response = flask_test_client.post('/api/v1/convert/stream',
+                                        data={'ada_file': (ada_file_upload, 'hello.adb')},
+                                        content_type='multipart/form-data')
+        
+        events = _sse_events(response.get_data(as_text=True))
+        assert events[-1] == ('error', {'error': 'upstream went away'})
+
+
+def test_convert_stream_missing_file(flask_test_client):
+    """Test POST /api/v1/convert/stream validates the upload before streaming."""
+    response = flask_test_client.post('/api/v1/convert/stream',
+                                    data={},
+                                    content_type='multipart/form-data')
+    
+    assert response.status_code == 400
+    assert 'ada_file is required' in json.loads(response.data)['error']
+
+
+def test_convert_endpoint_verifies_generated_tests_on_request(flask_test_client, sample_converter_response, ada_file_upload):
+    """Test that verify=true adds the result of running the unit tests against the code."""
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter, \
+            patch('app.api.v1.endpoints.convert.verifier') as mock_verifier:
+        mock_converter.convert.return_value = sample_converter_response
+        mock_verifier.enabled = True
+        mock_verifier.verify.return_value = VerificationResult(status="passed", tests_run=2, duration_ms=40.0)
+        
+        response = flask_test_client.post('/api/v1/convert?verify=true',
+                                        data={'ada_file': (ada_file_upload, 'hello.adb')},
+                                        content_type='multipart/form-data')
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['verification']['status'] == 'passed'
+        assert data['verification']['tests_run'] == 2
+        mock_verifier.verify.assert_called_once_with(data['python_code'], data['unit_tests'])
+
+
+def test_convert_endpoint_rejects_verify_when_disabled(flask_test_client, ada_file_upload):
+    """Test that verify=true is refused when VERIFICATION_ENABLED is off."""
+    with patch('app.api.v1.endpoints.convert.verifier') as mock_verifier:
+        mock_verifier.enabled = False
+        
+        response = flask_test_client.post('/api/v1/convert',
+                                        data={'ada_file': (ada_file_upload, 'hello.adb'), 'verify': 'true'},
+                                        content_type='multipart/form-data')
+        
+        assert response.status_code == 400
+        assert 'Verification' in json.loads(response.data)['error']
@@ -0,0 +1,66 @@
+import json
+from unittest.mock import patch
+
+
+def test_create_job_returns_immediately_and_result_can_be_polled(flask_test_client, job_runner, sample_converter_response, ada_file_upload):
+    """Test POST /api/v1/convert/jobs queues a conversion whose result is served by GET."""
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.convert.return_value = sample_converter_response
+        
+        response = flask_test_client.post('/api/v1/convert/jobs',
+                                        data={'ada_file': (ada_file_upload, 'hello.adb')},
+                                        content_type='multipart/form-data')
+        
+        assert response.status_code == 202
+        data = json.loads(response.data)
+        assert data['status'] == 'queued'
+        assert response.headers['Location'] == data['status_url']
+        
+        job_runner.shutdown()
+        
+        status = flask_test_client.get(data['status_url'])
+        job = json.loads(status.data)
+        assert job['status'] == 'succeeded'
+        assert job['filename'] == 'hello.adb'
+        assert job['result']['python_code'].startswith('def hello()')
+
+
+def test_create_job_validates_upload(flask_test_client):
+    """Test POST /api/v1/convert/jobs rejects a missing file."""
+    response = flask_test_client.post('/api/v1/convert/jobs',
+                                    data={},
+                                    content_type='multipart/form-data')
+    
+    assert response.status_code == 400
+
+
+def test_create_job_rejects_oversized_upload(flask_test_client, sample_ada_code):
+    """Test POST /api/v1/convert/jobs answers an upload over MAX_FILE_SIZE with 413."""
+    from io import BytesIO
+    flask_test_client.application.config['MAX_CONTENT_LENGTH'] = 64
+    response = flask_test_client.post('/api/v1/convert/jobs',
+                                    data={'ada_file': (BytesIO(sample_ada_code.encode() * 10), 'hello.adb')},
+                                    content_type='multipart/form-data')
+    
+    assert response.status_code == 413
+
+
+def test_create_job_when_queue_is_full(flask_test_client, ada_file_upload):
+    """Test POST /api/v1/convert/jobs sheds load when too many jobs are pending."""
+    from app.core.exceptions import JobQueueFullError
+    with patch('app.api.v1.endpoints.jobs.job_runner') as mock_runner:
+        mock_runner.submit.side_effect = JobQueueFullError('Too many conversion jobs are pending; retry later')
+        
+        response = flask_test_client.post('/api/v1/convert/jobs',
+                                        data={'ada_file': (ada_file_upload, 'hello.adb')},
+                                        content_type='multipart/form-data')
+        
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '5'
+
+
+def test_get_unknown_job(flask_test_client):
+    """Test GET /api/v1/convert/jobs/<id> for a missing job."""
+    response = flask_test_client.get('/api/v1/convert/jobs/missing')
+    
+    assert response.status_code == 404
@@ -0,0 +1,34 @@
+import json
+from unittest.mock import patch
+
+
+def test_get_session_returns_usage(flask_test_client):
+    """Test GET /api/v1/sessions/<id> reports the session's token usage."""
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.session_stats.return_value = {"session_id": "team-1", "total_tokens": 42}
+        
+        response = flask_test_client.get('/api/v1/sessions/team-1')
+        
+        assert response.status_code == 200
+        assert json.loads(response.data)['total_tokens'] == 42
+
+
+def test_get_unknown_session(flask_test_client):
+    """Test GET /api/v1/sessions/<id> for a missing session."""
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.session_stats.return_value = None
+        
+        response = flask_test_client.get('/api/v1/sessions/missing')
+        
+        assert response.status_code == 404
+
+
+def test_delete_session(flask_test_client):
+    """Test DELETE /api/v1/sessions/<id> discards the session."""
+    with patch('app.api.v1.endpoints.convert.ada_converter') as mock_converter:
+        mock_converter.end_session.return_value = True
+        
+        response = flask_test_client.delete('/api/v1/sessions/team-1')
+        
+        assert response.status_code == 204
+        mock_converter.end_session.assert_called_once_with('team-1')
@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+from benchmarks.load_test import RequestResult, percentile, rss_mb, summarize
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile([], 50) == 0.0
+
+
+def test_summarize_reports_statuses_and_latency_of_successes_only():
+    results = [RequestResult(200, 0.1), RequestResult(200, 0.3), RequestResult(429, 5.0), RequestResult(0, 9.0)]
+
+    report = summarize(4, results, seconds=2.0)
+
+    assert report.requests == 4
+    assert report.requests_per_second == 2.0
+    assert report.statuses == {"200": 2, "429": 1, "failed": 1}
+    assert report.latency_ms["p50"] == 100.0
+    assert report.latency_ms["max"] == 300.0
+    assert report.first_event_ms == {}
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="needs /proc")
+def test_rss_of_this_process_is_reported():
+    assert rss_mb(os.getpid()) > 0
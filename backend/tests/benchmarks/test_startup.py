@@ -0,0 +1,15 @@
+from benchmarks.startup import summarize
+
+
+def test_summarize_reports_each_measure_present_in_the_samples():
+    samples = [
+        {"import_ms": 200.0, "create_app_ms": 10.0, "first_request_ms": 500.0, "ready_ms": 710.0},
+        {"import_ms": 300.0, "create_app_ms": 12.0, "first_request_ms": 700.0, "ready_ms": 1012.0},
+    ]
+
+    report = summarize("fork", samples)
+
+    assert report.samples == 2
+    assert report.timings_ms["import_ms"] == {"p50": 200.0, "p90": 300.0, "max": 300.0}
+    assert report.timings_ms["ready_ms"]["max"] == 1012.0
+    assert "process_ms" not in report.timings_ms
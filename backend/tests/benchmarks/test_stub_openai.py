@@ -0,0 +1,66 @@
+import openai
+import pytest
+
+from app.services.section_parser import parse_response, parse_sections
+from benchmarks.stub_openai import StubConfig, StubOpenAIServer, stub_completion
+
+
+def _client(stub):
+    return openai.OpenAI(api_key="stub", base_url=stub.base_url, max_retries=0)
+
+
+def test_stub_completion_is_a_parseable_converter_response():
+    sections = parse_sections(stub_completion(400))
+
+    assert all(sections[field] for field in ("logic", "unit_tests", "python_code"))
+
+
+def test_stub_answers_chat_completions_with_usage():
+    with StubOpenAIServer(StubConfig(latency=0, tokens_per_second=0)) as stub:
+        response = _client(stub).chat.completions.create(
+            model="gpt-test", messages=[{"role": "user", "content": "procedure Hello is begin null; end Hello;"}]
+        )
+
+    assert response.model == "gpt-test"
+    assert "# Python Code" in response.choices[0].message.content
+    assert response.usage.prompt_tokens > 0
+    assert response.usage.total_tokens == response.usage.prompt_tokens + response.usage.completion_tokens
+    assert stub.outcomes["success"] == 1
+
+
+def test_stub_streams_chunks_and_final_usage():
+    with StubOpenAIServer(StubConfig(latency=0, tokens_per_second=0, completion_tokens=100)) as stub:
+        stream = _client(stub).chat.completions.create(
+            model="gpt-test", messages=[{"role": "user", "content": "x"}],
+            stream=True, stream_options={"include_usage": True},
+        )
+        chunks = list(stream)
+
+    content = "".join(chunk.choices[0].delta.content or "" for chunk in chunks if chunk.choices)
+    assert content == stub_completion(100)
+    assert chunks[-1].usage.completion_tokens > 0
+
+
+def test_stub_injects_rate_limits_with_retry_after():
+    with StubOpenAIServer(StubConfig(rate_limit_rate=1.0, retry_after=3)) as stub:
+        with pytest.raises(openai.RateLimitError) as exc_info:
+            _client(stub).chat.completions.create(model="gpt-test", messages=[{"role": "user", "content": "x"}])
+
+    assert exc_info.value.response.headers["retry-after"] == "3"
+    assert stub.outcomes["rate_limited"] == 1
+
+
+def test_stub_injects_server_errors():
+    with StubOpenAIServer(StubConfig(error_rate=1.0)) as stub:
+        with pytest.raises(openai.InternalServerError):
+            _client(stub).chat.completions.create(model="gpt-test", messages=[{"role": "user", "content": "x"}])
+
+
+def test_stub_answers_json_when_a_response_format_is_requested():
+    with StubOpenAIServer(StubConfig(latency=0, tokens_per_second=0, completion_tokens=50)) as stub:
+        response = _client(stub).chat.completions.create(
+            model="gpt-test", messages=[{"role": "user", "content": "x"}], response_format={"type": "json_object"}
+        )
+
+    assert response.choices[0].message.content == stub_completion(50, structured=True)
+    assert parse_response(response.choices[0].message.content)["python_code"]
@@ -1,9 +1,22 @@
 """Shared test fixtures and configuration for the test suite."""
 
+import os
 import pytest
 from unittest.mock import patch
 from io import BytesIO
 
+# Keep test metrics in-process rather than in the host-wide snapshot directory
+os.environ.setdefault("METRICS_DIR", "")
+
+
+@pytest.fixture(autouse=True)
+def session_store_path(tmp_path, monkeypatch):
+    """Keep each test's conversation sessions in its own database."""
+    from app.core.config import settings
+    path = str(tmp_path / 'sessions.sqlite3')
+    monkeypatch.setattr(settings, 'session_store_path', path)
+    return path
+
 
 @pytest.fixture
 def mock_openai_client():
@@ -43,11 +56,52 @@ def ada_file_upload(sample_ada_code):
 
 
 @pytest.fixture
-def flask_test_client():
+def conversion_cache():
+    """An empty, memory-only conversion cache."""
+    from app.services.conversion_cache import ConversionCache, MemoryCacheTier
+    return ConversionCache(memory=MemoryCacheTier(max_entries=16, ttl_seconds=60))
+
+
+@pytest.fixture
+def similarity_index(tmp_path):
+    """A near-duplicate index in a temporary database, disabled as by default."""
+    from app.services.similarity_index import SimilarityIndex
+    return SimilarityIndex(str(tmp_path / 'similarity.sqlite3'), threshold=0.85, max_entries=0)
+
+
+@pytest.fixture
+def single_flight():
+    """Single-flight coalescing within this process only."""
+    from app.services.single_flight import SingleFlight
+    return SingleFlight(directory=None, wait_timeout=5)
+
+
+@pytest.fixture
+def job_runner(tmp_path):
+    """A background job runner backed by a temporary job store."""
+    from app.api.v1.endpoints.jobs import _convert_job
+    from app.services.job_runner import JobRunner
+    from app.services.job_store import JobStore
+    runner = JobRunner(
+        store=JobStore(str(tmp_path / 'jobs.sqlite3'), retention_seconds=60),
+        convert=_convert_job,
+        max_workers=1,
+        max_pending=2
+    )
+    yield runner
+    runner.shutdown()
+
+
+@pytest.fixture
+def flask_test_client(conversion_cache, similarity_index, single_flight, job_runner):
     """Create a Flask test client for API testing."""
     with patch('app.services.ada_converter.OpenAIClient'):
         from app.main import create_app
         app = create_app()
         app.config['TESTING'] = True
-        with app.test_client() as client:
-            yield client
\ No newline at end of file
+        with patch('app.api.v1.endpoints.convert.conversion_cache', conversion_cache), \
+                patch('app.api.v1.endpoints.convert.similarity_index', similarity_index), \
+                patch('app.api.v1.endpoints.convert.single_flight', single_flight), \
+                patch('app.api.v1.endpoints.jobs.job_runner', job_runner):
+            with app.test_client() as client:
+                yield client
\ No newline at end of file
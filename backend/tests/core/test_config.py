@@ -17,6 +17,48 @@ def test_settings_default_values():
         assert settings.debug is True
         assert settings.max_file_size == 1048576
         assert settings.allowed_extensions == {".ada", ".adb", ".ads"}
+        assert settings.upload_spool_max_memory == 524288
+        assert settings.session_max_count == 256
+        assert settings.session_ttl_seconds == 1800
+        assert settings.session_max_history_tokens == 6000
+        assert settings.conversion_cache_enabled is True
+        assert settings.conversion_cache_path.endswith("conversion_cache.sqlite3")
+        assert settings.admin_token is None
+        assert settings.openai_requests_per_minute == 0
+        assert settings.openai_max_retries == 3
+        assert settings.openai_prewarm is False
+        assert settings.openai_hedging_enabled is False
+        assert settings.openai_hedge_model == ""
+        assert settings.ada_normalization == "off"
+        assert settings.conversion_output_mode == "sections"
+        assert settings.conversion_max_repairs == 1
+        assert settings.model_tiers == ""
+        assert settings.metrics_enabled is True
+        assert settings.single_flight_enabled is True
+        assert settings.single_flight_dir.endswith("inflight")
+        assert settings.metrics_flush_seconds == 5
+        assert settings.verification_enabled is False
+        assert settings.preload_modules is True
+        assert settings.incremental_conversion is False
+        assert settings.web_threads == 4
+        assert settings.trusted_proxy_hops == 0
+        assert settings.job_recover_interval_seconds == 5
+        assert settings.admission_max_in_flight == 8
+        assert settings.admission_max_queue == 16
+        assert settings.admission_queue_timeout_seconds == 30.0
+        assert settings.admission_client_share == 0.5
+        assert settings.profiling_enabled is False
+        assert settings.profiling_interval_ms == 2.0
+        assert settings.profiling_max_profiles == 100
+        assert settings.batch_dependency_order is True
+        assert settings.dependency_context_max_tokens == 1500
+        assert settings.dependency_graph_cache_max_entries == 256
+        assert settings.similarity_index_enabled is False
+        assert settings.similarity_threshold == 0.85
+        assert settings.similarity_index_max_entries == 50000
+        assert settings.verification_timeout_seconds == 10
+        assert settings.verification_memory_mb == 256
+        assert settings.verification_cache_path.endswith("verification_cache.sqlite3")
 
 
 def test_settings_from_environment():
@@ -56,4 +98,31 @@ def test_settings_validation_success():
         settings = Settings()
         
         # Should not raise an exception
-        settings.validate()
\ No newline at end of file
+        settings.validate()
+
+
+def test_settings_validation_rejects_unknown_normalization_level():
+    """Test that validation fails for an unknown ADA_NORMALIZATION level."""
+    with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key', 'ADA_NORMALIZATION': 'aggressive'}, clear=True):
+        settings = Settings()
+        
+        with pytest.raises(ValueError, match="ADA_NORMALIZATION must be one of"):
+            settings.validate()
+
+
+def test_settings_validation_rejects_unknown_output_mode():
+    """Test that validation fails for an unknown CONVERSION_OUTPUT_MODE."""
+    with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key', 'CONVERSION_OUTPUT_MODE': 'yaml'}, clear=True):
+        settings = Settings()
+        
+        with pytest.raises(ValueError, match="CONVERSION_OUTPUT_MODE must be one of"):
+            settings.validate()
+
+
+def test_admission_defaults_follow_the_request_threads():
+    """Test that admission limits scale with WEB_THREADS unless set explicitly."""
+    with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key', 'WEB_THREADS': '8'}, clear=True):
+        settings = Settings()
+        
+        assert settings.admission_max_in_flight == 16
+        assert settings.admission_max_queue == 32
@@ -1,7 +1,7 @@
 """Tests for custom exceptions."""
 
 import pytest
-from app.core.exceptions import AdaConverterError, FileUploadError, ConfigurationError
+from app.core.exceptions import AdaConverterError, FileUploadError, ConfigurationError, JobQueueFullError
 
 
 def test_ada_converter_error():
@@ -32,4 +32,15 @@ def test_exceptions_are_subclass_of_exception():
     """Test that all custom exceptions inherit from Exception."""
     assert issubclass(AdaConverterError, Exception)
     assert issubclass(FileUploadError, Exception)
-    assert issubclass(ConfigurationError, Exception)
\ No newline at end of file
+    assert issubclass(ConfigurationError, Exception)
+    assert issubclass(JobQueueFullError, Exception)
+
+def test_upstream_errors_are_converter_errors():
+    """Test that upstream failures carry what the API needs to report them."""
+    from app.core.exceptions import UpstreamRateLimitError, UpstreamTimeoutError
+    
+    error = UpstreamRateLimitError("rate limited", retry_after=3.5)
+    
+    assert error.retry_after == 3.5
+    assert isinstance(error, AdaConverterError)
+    assert issubclass(UpstreamTimeoutError, AdaConverterError)
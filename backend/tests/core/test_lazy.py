@@ -0,0 +1,63 @@
+import os
+import threading
+
+import pytest
+
+from app.core.lazy import Lazy
+
+
+class Widget:
+    def __init__(self):
+        self.pid = os.getpid()
+
+    def describe(self):
+        return "widget"
+
+
+def test_object_is_built_on_first_attribute_access_only():
+    built = []
+    lazy = Lazy(lambda: built.append(1) or Widget())
+
+    assert not lazy.loaded
+    assert built == []
+    assert lazy.describe() == "widget"
+    assert lazy.describe() == "widget"
+    assert built == [1]
+    assert lazy.loaded
+
+
+def test_concurrent_first_use_builds_once():
+    built = []
+    barrier = threading.Barrier(8)
+    lazy = Lazy(lambda: built.append(1) or Widget())
+
+    def use():
+        barrier.wait()
+        lazy.get()
+
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert built == [1]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_child_builds_its_own_object():
+    lazy = Lazy(Widget)
+    parent = lazy.get()
+    read_end, write_end = os.pipe()
+
+    pid = os.fork()
+    if pid == 0:
+        child = lazy.get()
+        os.write(write_end, b"ok" if child is not parent and child.pid == os.getpid() else b"shared")
+        os._exit(0)
+    os.close(write_end)
+    result = os.read(read_end, 16)
+    os.waitpid(pid, 0)
+
+    assert result == b"ok"
+    assert lazy.get() is parent
@@ -0,0 +1,120 @@
+import json
+import os
+
+import pytest
+
+from app.core.metrics import MetricsRegistry, render
+
+
+def _registry(directory=None, alive=()):
+    return MetricsRegistry(str(directory) if directory else None, flush_interval=3600,
+                           process_alive=lambda pid: pid in alive)
+
+
+def test_counter_and_gauge_render_in_prometheus_format():
+    registry = _registry()
+    requests = registry.counter("requests_total", "Requests.", ("outcome",))
+    in_flight = registry.gauge("in_flight", "In flight.")
+
+    requests.inc(outcome="success")
+    requests.inc(2, outcome="success")
+    with in_flight.track():
+        text = registry.render()
+
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{outcome="success"} 3' in text
+    assert "in_flight 1" in text
+    assert "in_flight 0" in registry.render()
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = _registry()
+    latency = registry.histogram("latency_seconds", "Latency.", ("stage",), buckets=(0.1, 1))
+
+    latency.observe(0.05, stage="llm")
+    latency.observe(0.5, stage="llm")
+    latency.observe(5, stage="llm")
+    text = registry.render()
+
+    assert 'latency_seconds_bucket{stage="llm",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{stage="llm",le="1"} 2' in text
+    assert 'latency_seconds_bucket{stage="llm",le="+Inf"} 3' in text
+    assert 'latency_seconds_sum{stage="llm"} 5.55' in text
+    assert 'latency_seconds_count{stage="llm"} 3' in text
+
+
+def test_counter_totals_sum_matching_label_sets():
+    registry = _registry()
+    tokens = registry.counter("tokens_total", "Tokens.", ("model", "kind"))
+
+    tokens.inc(10, model="a", kind="prompt")
+    tokens.inc(5, model="b", kind="prompt")
+    tokens.inc(3, model="a", kind="completion")
+
+    assert tokens.total(kind="prompt") == 15
+    assert tokens.total(model="a") == 13
+    assert tokens.total() == 18
+
+
+def test_labels_must_match_and_names_are_unique():
+    registry = _registry()
+    requests = registry.counter("requests_total", "Requests.", ("outcome",))
+
+    with pytest.raises(ValueError):
+        requests.inc(endpoint="convert")
+    with pytest.raises(ValueError):
+        registry.counter("requests_total", "Again.")
+
+
+def test_label_values_are_escaped():
+    text = render({"m": {"kind": "counter", "help": "M.", "labelnames": ["path"], "samples": [[['a"b\\c'], 1]]}})
+
+    assert 'm{path="a\\"b\\\\c"} 1' in text
+
+
+def _other_worker_snapshot(directory, pid, requests, in_flight):
+    other = _registry()
+    other.counter("requests_total", "Requests.").inc(requests)
+    other.gauge("in_flight", "In flight.").inc(in_flight)
+    with open(os.path.join(directory, f"{pid}.json"), "w") as f:
+        json.dump(other.snapshot(), f)
+
+
+def test_collect_aggregates_live_workers(tmp_path):
+    registry = _registry(tmp_path, alive={101})
+    registry.counter("requests_total", "Requests.").inc(1)
+    registry.gauge("in_flight", "In flight.").inc(1)
+    _other_worker_snapshot(tmp_path, 101, requests=4, in_flight=2)
+
+    text = registry.render()
+
+    assert "requests_total 5" in text
+    assert "in_flight 3" in text
+
+
+def test_exited_workers_keep_their_counts_but_not_their_gauges(tmp_path):
+    registry = _registry(tmp_path)
+    registry.counter("requests_total", "Requests.")
+    registry.gauge("in_flight", "In flight.")
+    _other_worker_snapshot(tmp_path, 102, requests=4, in_flight=2)
+
+    first = registry.render()
+    second = registry.render()
+
+    # The exited worker's file is folded into the archive once, and still counted afterwards
+    assert not (tmp_path / "102.json").exists()
+    for text in (first, second):
+        assert "requests_total 4" in text
+        assert "in_flight 2" not in text
+
+
+def test_flush_writes_this_process_snapshot(tmp_path):
+    registry = _registry(tmp_path)
+    registry.counter("requests_total", "Requests.").inc(7)
+
+    registry.start()
+    registry.flush()
+
+    with open(tmp_path / f"{os.getpid()}.json") as f:
+        snapshot = json.load(f)
+    assert snapshot["requests_total"]["samples"] == [[[], 7.0]]
@@ -0,0 +1,53 @@
+import time
+
+from app.core.profiling import CONVERSION_SPANS, Profile, ProfileStore, SamplingProfiler
+
+SPANS = {"waiting": frozenset({(__name__, "wait_upstream")})}
+
+
+def wait_upstream():
+    time.sleep(0.05)
+
+
+def handle_request():
+    wait_upstream()
+    deadline = time.perf_counter() + 0.02
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_samples_are_collapsed_into_stacks_and_spans():
+    with SamplingProfiler(interval=0.001, spans=SPANS) as profiler:
+        handle_request()
+    profile = profiler.profile
+
+    assert profile.samples > 0
+    assert profile.wall_ms >= 70
+    assert any(stack.endswith(f"{__name__}:handle_request;{__name__}:wait_upstream") for stack in profile.stacks)
+    spans = profile.spans_ms()
+    assert spans["waiting"] > spans["other"]
+    assert profile.server_timing().startswith(f"total;dur={profile.wall_ms:.1f}, waiting;dur=")
+    lines = profile.collapsed().splitlines()
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == profile.samples
+
+
+def test_store_keeps_the_newest_profiles(tmp_path):
+    store = ProfileStore(str(tmp_path), max_profiles=2)
+    profiles = [Profile(profile_id=f"{n:032x}", wall_ms=1.0, samples=1) for n in range(3)]
+    for profile in profiles:
+        profile.stacks["a;b"] = 1
+        store.save(profile)
+        time.sleep(0.01)
+
+    assert store.read(profiles[0].profile_id) is None
+    assert store.read(profiles[2].profile_id) == "a;b 1\n"
+    assert store.read("../../etc/passwd") is None
+
+
+def test_every_converter_call_is_an_upstream_span():
+    from app.services.ada_converter import AdaConverter
+
+    for module, function in CONVERSION_SPANS["upstream"]:
+        assert module == AdaConverter.__module__
+        assert callable(getattr(AdaConverter, function))
+    assert {function for _, function in CONVERSION_SPANS["upstream"]} >= {"convert", "adapt"}
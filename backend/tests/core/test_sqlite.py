@@ -0,0 +1,30 @@
+"""Tests for SQLite connection helpers."""
+
+import threading
+
+from app.core.sqlite import SQLiteConnections
+
+
+def test_database_and_schema_are_created_on_first_use(tmp_path):
+    """Test that the database directory, file and schema are created lazily."""
+    path = tmp_path / "nested" / "state.sqlite3"
+    connections = SQLiteConnections(str(path), schema=["CREATE TABLE IF NOT EXISTS t (x INTEGER)"])
+    
+    assert not path.exists()
+    
+    connections.get().execute("INSERT INTO t VALUES (1)")
+    
+    assert path.exists()
+    assert connections.get().execute("SELECT x FROM t").fetchall() == [(1,)]
+
+
+def test_each_thread_gets_its_own_connection(tmp_path):
+    """Test that connections are not shared between threads."""
+    connections = SQLiteConnections(str(tmp_path / "state.sqlite3"))
+    seen = []
+    
+    thread = threading.Thread(target=lambda: seen.append(connections.get()))
+    thread.start()
+    thread.join()
+    
+    assert seen[0] is not connections.get()
@@ -0,0 +1,16 @@
+"""Tests for token estimation helpers."""
+
+from app.core.tokens import estimate_tokens
+
+
+def test_estimate_tokens_empty_text():
+    """Test that empty text has no tokens."""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens(None) == 0
+
+
+def test_estimate_tokens_rounds_up():
+    """Test that partial tokens are counted."""
+    assert estimate_tokens("a") == 1
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
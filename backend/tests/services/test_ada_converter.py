@@ -1,6 +1,9 @@
+import asyncio
+import json
 import unittest
-from unittest.mock import patch, MagicMock
-from app.services.ada_converter import AdaConverter
+from unittest.mock import patch, AsyncMock, MagicMock
+from app.services.ada_converter import AdaConverter, AsyncAdaConverter
+from app.services.conversion_cache import ConversionCache, MemoryCacheTier
 
 
 class TestAdaConverter(unittest.TestCase):
@@ -11,25 +14,50 @@ class TestAdaConverter(unittest.TestCase):
         """Test that AdaConverter initializes OpenAIClient with the correct system prompt."""
         # Arrange
         expected_system_prompt = (
-            "You are a helpful code convertion agent. "
+            "You are a helpful code conversion agent. "
             "You will convert code written in Ada programming language into python. "
-            "You will firt describe the logic within Ada code. "
+            "You will first describe the logic within Ada code. "
             "You will then convert the code into Python, while maintaining overall structure as much as possible. "
-            "You will then write unit tests by reverse-engineering the python code."
-            "You will return the response in the following format: "
-            "# Logc"
-            "<logic wihtin the original Ada code>"
-            "# Unit Tests"
-            "<Unit Tests written in Python based on the extracted logc>"
-            "# Python Code"
+            "You will then write unit tests by reverse-engineering the python code. "
+            "You will return the response in the following format:\n"
+            "# Logic\n"
+            "<logic within the original Ada code>\n"
+            "# Unit Test\n"
+            "<Unit Tests written in Python based on the extracted logic>\n"
+            "# Python Code\n"
             "<Resulting Python Code>"
         )
         
         # Act
-        ada_converter = AdaConverter()
+        ada_converter = AdaConverter(output_mode="sections")
         
         # Assert
         mock_openai_client.assert_called_once_with(system_prompt=expected_system_prompt)
+    
+    @patch('app.services.ada_converter.OpenAIClient')
+    def test_section_headers_in_prompt_match_the_parser(self, mock_openai_client):
+        """Test that the headers the prompt asks for are the ones responses are parsed on."""
+        from app.services.section_parser import SECTION_PATTERN
+        
+        AdaConverter(output_mode="sections")
+        
+        system_prompt = mock_openai_client.call_args.kwargs["system_prompt"]
+        self.assertEqual(SECTION_PATTERN.findall(system_prompt), ["Logic", "Unit Test", "Python Code"])
+    
+    @patch('app.services.ada_converter.OpenAIClient')
+    def test_json_mode_prompt_names_every_field(self, mock_openai_client):
+        """Test that the JSON mode prompt asks for a JSON object with each section field."""
+        AdaConverter(output_mode="json")
+        
+        system_prompt = mock_openai_client.call_args.kwargs["system_prompt"]
+        self.assertIn("JSON object", system_prompt)
+        for field in ('"logic"', '"unit_tests"', '"python_code"'):
+            self.assertIn(field, system_prompt)
+    
+    def test_unknown_output_mode_is_rejected(self):
+        """Test that an unknown output mode fails fast."""
+        with self.assertRaises(ValueError):
+            AdaConverter(output_mode="yaml")
 
     @patch('app.services.ada_converter.OpenAIClient')
     def test_convert_method_sends_correct_prompt_to_openai_client(self, mock_openai_client):
@@ -42,7 +70,7 @@ class TestAdaConverter(unittest.TestCase):
         ada_code = "procedure Hello is\nbegin\n   Put_Line(\"Hello World\");\nend Hello;"
         expected_prompt = "Convert the following Ada code into Python\n" + ada_code
         
-        ada_converter = AdaConverter()
+        ada_converter = AdaConverter(output_mode="sections")
         
         # Act
         result = ada_converter.convert(ada_code)
@@ -51,6 +79,317 @@ class TestAdaConverter(unittest.TestCase):
         mock_client_instance.send_message.assert_called_once_with(expected_prompt)
         self.assertEqual(result, "converted python code")
 
+    @patch('app.services.ada_converter.OpenAIClient')
+    def test_convert_method_forwards_session_id(self, mock_openai_client):
+        """Test that convert continues the given conversation session."""
+        # Arrange
+        mock_client_instance = MagicMock()
+        mock_openai_client.return_value = mock_client_instance
+        mock_client_instance.send_message.return_value = "converted python code"
+        
+        ada_converter = AdaConverter(output_mode="sections")
+        
+        # Act
+        ada_converter.convert("null;", session_id="team-1")
+        
+        # Assert
+        mock_client_instance.send_message.assert_called_once_with(
+            "Convert the following Ada code into Python\nnull;", session_id="team-1"
+        )
+
+    @patch('app.services.ada_converter.OpenAIClient')
+    def test_adapt_sends_the_reference_conversion_with_the_code(self, mock_openai_client):
+        """Test that adapt shows the near-duplicate unit and its conversion before the code to convert."""
+        # Arrange
+        mock_client_instance = MagicMock()
+        mock_openai_client.return_value = mock_client_instance
+        mock_client_instance.send_message.return_value = "adapted python code"
+        
+        ada_converter = AdaConverter(output_mode="sections")
+        
+        # Act
+        result = ada_converter.adapt("X := 2;", "Y := 1;", "y = 1")
+        
+        # Assert
+        (prompt,), _ = mock_client_instance.send_message.call_args
+        self.assertTrue(prompt.startswith("Convert the following Ada code into Python\n"))
+        self.assertLess(prompt.index("Y := 1;"), prompt.index("y = 1"))
+        self.assertTrue(prompt.endswith("-- Code to convert\nX := 2;"))
+        self.assertEqual(result, "adapted python code")
+
+    @patch('app.services.ada_converter.settings')
+    @patch('app.services.ada_converter.OpenAIClient')
+    def test_large_units_are_converted_in_concurrent_chunks(self, mock_openai_client, mock_settings):
+        """Test that large sources are split, converted per chunk and stitched in order."""
+        # Arrange
+        mock_settings.chunking_enabled = True
+        mock_settings.chunk_threshold_tokens = 10
+        mock_settings.chunk_max_tokens = 10
+        mock_settings.chunk_context_max_tokens = 100
+        mock_settings.chunk_concurrency = 4
+        mock_client_instance = MagicMock()
+        mock_openai_client.return_value = mock_client_instance
+        
+        def send_message(prompt):
+            name = "A" if "procedure A" in prompt.split("-- Code to convert")[-1] else "B"
+            return f"# Logic\nlogic {name}\n# Unit Test\ntest {name}\n# Python Code\ncode {name}"
+        mock_client_instance.send_message.side_effect = send_message
+        
+        ada_code = (
+            "package body P is\n"
+            "   procedure A is\n   begin\n      null;\n   end A;\n"
+            "   procedure B is\n   begin\n      null;\n   end B;\n"
+            "end P;\n"
+        )
+        
+        # Act
+        result = AdaConverter(output_mode="sections").convert(ada_code)
+        
+        # Assert
+        self.assertEqual(mock_client_instance.send_message.call_count, 2)
+        self.assertEqual(
+            result,
+            "# Logic\nlogic A\n\nlogic B\n# Unit Test\ntest A\n\ntest B\n# Python Code\ncode A\n\ncode B"
+        )
+    
+    @patch('app.services.ada_converter.settings')
+    @patch('app.services.ada_converter.OpenAIClient')
+    def test_edited_revisions_only_convert_changed_subprograms(self, mock_openai_client, mock_settings):
+        """Test that re-converting an edited file reuses the chunks it leaves unchanged."""
+        # Arrange
+        mock_settings.chunking_enabled = True
+        mock_settings.chunk_threshold_tokens = 10
+        mock_settings.chunk_max_tokens = 1000
+        mock_settings.chunk_context_max_tokens = 100
+        mock_settings.chunk_concurrency = 4
+        mock_client_instance = MagicMock()
+        mock_openai_client.return_value = mock_client_instance
+        mock_client_instance.send_message.side_effect = (
+            lambda prompt: f"# Logic\n{prompt.split('-- Code to convert')[-1].strip()}\n# Unit Test\n\n# Python Code\n"
+        )
+        converter = AdaConverter(output_mode="sections", unit_cache=ConversionCache(memory=MemoryCacheTier(max_entries=100, ttl_seconds=3600)))
+        revision = (
+            "package body P is\n"
+            "   procedure A is\n   begin\n      null;\n   end A;\n"
+            "   procedure B is\n   begin\n      null;\n   end B;\n"
+            "end P;\n"
+        )
+        converter.convert(revision)
+        mock_client_instance.send_message.reset_mock()
+        
+        # Act
+        result = converter.convert(revision.replace("null;\n   end B;", "Edited;\n   end B;"))
+        
+        # Assert
+        mock_client_instance.send_message.assert_called_once()
+        self.assertIn("Edited;", mock_client_instance.send_message.call_args[0][0])
+        self.assertIn("procedure A", result)
+        self.assertIn("Edited;", result)
+    
+    @patch('app.services.ada_converter.metrics')
+    @patch('app.services.ada_converter.OpenAIClient')
+    def test_prompts_are_sent_to_the_tier_their_source_is_routed_to(self, mock_openai_client, mock_metrics):
+        """Test that each tier gets its own client and call settings, sharing session history."""
+        from app.services.model_router import ModelRouter, ModelTier
+        clients = {"gpt-4o-mini": MagicMock(), "gpt-4o": MagicMock()}
+        mock_openai_client.side_effect = lambda **kwargs: clients[kwargs["model"]]
+        for client in clients.values():
+            client.send_message.return_value = "converted"
+        router = ModelRouter([
+            ModelTier(name="small", model="gpt-4o-mini", max_score=5, max_tokens=1024, timeout_seconds=20),
+            ModelTier(name="large", model="gpt-4o", max_tokens=4096),
+        ])
+        converter = AdaConverter(output_mode="sections", router=router)
+        
+        converter.convert("null;")
+        converter.convert("generic type T is private; package P is end P;")
+        
+        clients["gpt-4o-mini"].send_message.assert_called_once_with(
+            "Convert the following Ada code into Python\nnull;", max_tokens=1024, timeout=20
+        )
+        clients["gpt-4o"].send_message.assert_called_once_with(
+            "Convert the following Ada code into Python\ngeneric type T is private; package P is end P;",
+            max_tokens=4096
+        )
+        large_options = [call.kwargs for call in mock_openai_client.call_args_list if call.kwargs["model"] == "gpt-4o"]
+        self.assertIs(large_options[0]["conversation_store"], clients["gpt-4o-mini"].conversations)
+        self.assertEqual(converter.model, "small=gpt-4o-mini<=5,large=gpt-4o")
+        mock_metrics.model_route_total.inc.assert_any_call(tier="large")
+        self.assertEqual(mock_metrics.model_tier_seconds.observe.call_count, 2)
+
+
+class TestAsyncAdaConverter(unittest.TestCase):
+    """Test cases for AsyncAdaConverter class."""
+    
+    @patch('app.services.ada_converter.AsyncOpenAIClient')
+    def test_convert_awaits_the_async_client(self, mock_async_client):
+        """Test that conversions are awaited on an AsyncOpenAIClient with the same prompt."""
+        # Arrange
+        mock_client_instance = MagicMock()
+        mock_client_instance.send_message = AsyncMock(return_value="converted")
+        mock_async_client.return_value = mock_client_instance
+        
+        # Act
+        result = asyncio.run(AsyncAdaConverter(output_mode="sections").convert("procedure Hello is begin null; end Hello;"))
+        
+        # Assert
+        self.assertEqual(result, "converted")
+        mock_client_instance.send_message.assert_awaited_once_with(
+            "Convert the following Ada code into Python\nprocedure Hello is begin null; end Hello;"
+        )
+    
+    @patch('app.services.ada_converter.settings')
+    @patch('app.services.ada_converter.AsyncOpenAIClient')
+    def test_large_units_are_converted_in_concurrent_chunks(self, mock_async_client, mock_settings):
+        """Test that chunks are converted concurrently on the event loop and stitched in order."""
+        # Arrange
+        mock_settings.chunking_enabled = True
+        mock_settings.chunk_threshold_tokens = 10
+        mock_settings.chunk_max_tokens = 10
+        mock_settings.chunk_context_max_tokens = 100
+        mock_settings.chunk_concurrency = 4
+        mock_client_instance = MagicMock()
+        mock_async_client.return_value = mock_client_instance
+        
+        async def send_message(prompt):
+            name = "A" if "procedure A" in prompt.split("-- Code to convert")[-1] else "B"
+            # B finishes first; the result must still be in source order
+            await asyncio.sleep(0.01 if name == "A" else 0)
+            return f"# Logic\nlogic {name}\n# Unit Test\ntest {name}\n# Python Code\ncode {name}"
+        mock_client_instance.send_message.side_effect = send_message
+        
+        ada_code = (
+            "package body P is\n"
+            "   procedure A is\n   begin\n      null;\n   end A;\n"
+            "   procedure B is\n   begin\n      null;\n   end B;\n"
+            "end P;\n"
+        )
+        
+        # Act
+        result = asyncio.run(AsyncAdaConverter(output_mode="sections").convert(ada_code))
+        
+        # Assert
+        self.assertEqual(
+            result,
+            "# Logic\nlogic A\n\nlogic B\n# Unit Test\ntest A\n\ntest B\n# Python Code\ncode A\n\ncode B"
+        )
+
+
+class TestStructuredOutput(unittest.TestCase):
+    """Test cases for the JSON output modes."""
+    
+    SECTIONS = {"logic": "Prints a greeting.", "unit_tests": "def test_hello(): ...", "python_code": "def hello(): ..."}
+    
+    def _converter(self, mock_openai_client, *responses, output_mode="json"):
+        mock_client_instance = MagicMock()
+        mock_openai_client.return_value = mock_client_instance
+        mock_client_instance.send_message.side_effect = list(responses)
+        return AdaConverter(output_mode=output_mode), mock_client_instance
+    
+    @patch('app.services.ada_converter.OpenAIClient')
+    def test_json_mode_requests_a_json_object_and_validates_it(self, mock_openai_client):
+        """Test that a complete JSON response is returned in canonical form without a follow-up."""
+        converter, client = self._converter(mock_openai_client, json.dumps(self.SECTIONS))
+        
+        result = converter.convert("null;")
+        
+        client.send_message.assert_called_once_with(
+            "Convert the following Ada code into Python\nnull;", response_format={"type": "json_object"}
+        )
+        self.assertEqual(json.loads(result), self.SECTIONS)
+    
+    @patch('app.services.ada_converter.OpenAIClient')
+    def test_json_schema_mode_sends_the_section_schema(self, mock_openai_client):
+        """Test that structured outputs constrain the response to the section fields."""
+        converter, client = self._converter(mock_openai_client, json.dumps(self.SECTIONS), output_mode="json_schema")
+        
+        converter.convert("null;")
+        
+        response_format = client.send_message.call_args.kwargs["response_format"]
+        self.assertEqual(response_format["type"], "json_schema")
+        self.assertTrue(response_format["json_schema"]["strict"])
+        self.assertEqual(response_format["json_schema"]["schema"]["required"], ["logic", "unit_tests", "python_code"])
+    
+    @patch('app.services.ada_converter.settings')
+    @patch('app.services.ada_converter.OpenAIClient')
+    def test_only_missing_sections_are_requested_again(self, mock_openai_client, mock_settings):
+        """Test that a response missing a section gets one follow-up for just that section."""
+        mock_settings.chunking_enabled = False
+        mock_settings.conversion_max_repairs = 1
+        partial = json.dumps({**self.SECTIONS, "unit_tests": ""})
+        converter, client = self._converter(
+            mock_openai_client, partial, json.dumps({"unit_tests": "def test_repaired(): ..."}),
+            output_mode="json_schema"
+        )
+        
+        result = json.loads(converter.convert("null;"))
+        
+        self.assertEqual(client.send_message.call_count, 2)
+        repair_prompt = client.send_message.call_args.args[0]
+        self.assertIn('left out "unit_tests"', repair_prompt)
+        repair_schema = client.send_message.call_args.kwargs["response_format"]["json_schema"]["schema"]
+        self.assertEqual(repair_schema["required"], ["unit_tests"])
+        self.assertEqual(result, {**self.SECTIONS, "unit_tests": "def test_repaired(): ..."})
+    
+    @patch('app.services.ada_converter.settings')
+    @patch('app.services.ada_converter.OpenAIClient')
+    def test_truncated_response_keeps_completed_sections(self, mock_openai_client, mock_settings):
+        """Test that sections completed before a cut-off are kept and the rest repaired."""
+        mock_settings.chunking_enabled = False
+        mock_settings.conversion_max_repairs = 1
+        truncated = json.dumps(self.SECTIONS)[:-30]
+        converter, client = self._converter(
+            mock_openai_client, truncated, json.dumps({"python_code": "def hello(): ..."})
+        )
+        
+        result = json.loads(converter.convert("null;"))
+        
+        self.assertEqual(result, self.SECTIONS)
+        self.assertEqual(client.send_message.call_count, 2)
+    
+    @patch('app.services.ada_converter.settings')
+    @patch('app.services.ada_converter.OpenAIClient')
+    def test_repairs_can_be_disabled(self, mock_openai_client, mock_settings):
+        """Test that CONVERSION_MAX_REPAIRS=0 returns whatever sections were received."""
+        mock_settings.chunking_enabled = False
+        mock_settings.conversion_max_repairs = 0
+        converter, client = self._converter(mock_openai_client, json.dumps({"logic": "only logic"}))
+        
+        result = json.loads(converter.convert("null;"))
+        
+        client.send_message.assert_called_once()
+        self.assertEqual(result, {"logic": "only logic", "unit_tests": "", "python_code": ""})
+    
+    @patch('app.services.ada_converter.OpenAIClient')
+    def test_streaming_requests_the_json_format(self, mock_openai_client):
+        """Test that streamed conversions ask for the same response format."""
+        mock_client_instance = MagicMock()
+        mock_openai_client.return_value = mock_client_instance
+        mock_client_instance.stream_message.return_value = iter(['{"logic": ', '"x"}'])
+        
+        fragments = list(AdaConverter(output_mode="json").convert_stream("null;"))
+        
+        self.assertEqual(fragments, ['{"logic": ', '"x"}'])
+        mock_client_instance.stream_message.assert_called_once_with(
+            "Convert the following Ada code into Python\nnull;", session_id=None,
+            response_format={"type": "json_object"}
+        )
+    
+    @patch('app.services.ada_converter.AsyncOpenAIClient')
+    def test_async_converter_repairs_missing_sections(self, mock_async_client):
+        """Test that the async converter validates and repairs structured responses the same way."""
+        mock_client_instance = MagicMock()
+        mock_client_instance.send_message = AsyncMock(side_effect=[
+            json.dumps({**self.SECTIONS, "logic": " "}), json.dumps({"logic": "Prints a greeting."})
+        ])
+        mock_async_client.return_value = mock_client_instance
+        
+        result = asyncio.run(AsyncAdaConverter(output_mode="json").convert("null;"))
+        
+        self.assertEqual(json.loads(result), self.SECTIONS)
+        self.assertEqual(mock_client_instance.send_message.await_count, 2)
+
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
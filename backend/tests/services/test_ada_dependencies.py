@@ -0,0 +1,92 @@
+from unittest.mock import patch
+
+from app.services.ada_dependencies import (
+    DependencyGraph,
+    DependencyIndex,
+    dependency_context,
+    python_interface,
+    scan_unit,
+)
+
+PROJECT = {
+    "shapes.ads": "with Ada.Numerics; limited with Canvas;\npackage Shapes is\n   function Area (R : Float) return Float;\nend Shapes;\n",
+    "shapes.adb": "package body Shapes is\n   function Area (R : Float) return Float is\n   begin\n      return R * R;\n   end Area;\nend Shapes;\n",
+    "shapes-circles.ads": "package Shapes.Circles is\n   procedure Draw;\nend Shapes.Circles;\n",
+    "shapes-circles.adb": "with Ada.Text_IO;\npackage body Shapes.Circles is\n   procedure Draw is separate;\nend Shapes.Circles;\n",
+    "shapes-circles-draw.adb": "separate (Shapes.Circles)\nprocedure Draw is\nbegin\n   null;\nend Draw;\n",
+    "main.adb": "with Shapes.Circles; use Shapes.Circles;\nprocedure Main is\nbegin\n   Draw;\nend Main;\n",
+}
+
+
+def test_scan_unit_reads_context_clauses_and_unit_kind():
+    spec = scan_unit("shapes.ads", PROJECT["shapes.ads"])
+    subunit = scan_unit("shapes-circles-draw.adb", PROJECT["shapes-circles-draw.adb"])
+    main = scan_unit("main.adb", PROJECT["main.adb"])
+
+    assert (spec.name, spec.is_spec, spec.withs) == ("shapes", True, ("ada.numerics",))
+    assert (subunit.name, subunit.is_spec, subunit.separate_from) == ("shapes.circles.draw", False, "shapes.circles")
+    assert (main.name, main.is_spec, main.withs) == ("main", False, ("shapes.circles",))
+
+
+def test_scan_unit_tells_subprogram_specs_from_bodies():
+    generic = "generic\n   type T is private;\n   with procedure Show (Item : T);\nprocedure Show_All (Items : T);\n"
+    instance = "with Show_All;\nprocedure Show_Ints is new Show_All (Integer, Put);\n"
+
+    assert scan_unit("show_all.ads", generic).is_spec
+    assert scan_unit("show_ints.ads", instance).is_spec
+    assert not scan_unit("main.adb", PROJECT["main.adb"]).is_spec
+    assert scan_unit("notes.ada", "-- nothing here\n") is None
+
+
+def test_graph_orders_specs_before_their_bodies_and_dependents():
+    graph = DependencyGraph.build(PROJECT)
+
+    assert graph.dependencies["shapes.adb"] == ("shapes.ads",)
+    assert graph.dependencies["shapes-circles-draw.adb"] == ("shapes-circles.adb", "shapes-circles.ads", "shapes.ads")
+    assert graph.dependencies["main.adb"] == ("shapes-circles.ads", "shapes.ads")
+    assert graph.levels() == [
+        ["shapes.ads"],
+        ["shapes-circles.ads", "shapes.adb"],
+        ["main.adb", "shapes-circles.adb"],
+        ["shapes-circles-draw.adb"],
+    ]
+
+
+def test_cycles_are_converted_last_instead_of_dropped():
+    graph = DependencyGraph.build({
+        "a.ads": "with B;\npackage A is\nend A;\n",
+        "b.ads": "with A;\npackage B is\nend B;\n",
+        "c.ads": "package C is\nend C;\n",
+    })
+
+    assert graph.levels() == [["c.ads"], ["a.ads", "b.ads"]]
+
+
+def test_index_reuses_graphs_of_projects_seen_before(tmp_path):
+    path = str(tmp_path / "graphs.sqlite3")
+    first = DependencyIndex(path, max_entries=8).graph(PROJECT)
+
+    with patch.object(DependencyGraph, "build") as build:
+        again = DependencyIndex(path, max_entries=8).graph(PROJECT)
+        build.assert_not_called()
+
+    assert again.dependencies == first.dependencies
+    assert again.units == first.units
+    assert again.levels() == first.levels()
+
+
+def test_dependency_context_lists_interfaces_of_converted_dependencies():
+    graph = DependencyGraph.build(PROJECT)
+    results = {"shapes.ads": {"python_code": (
+        "import math\n\nPI = 3.14\n\ndef area(r: float) -> float:\n    return r * r\n\n"
+        "class Shape:\n    def draw(self):\n        print('x')\n"
+    )}}
+
+    context = dependency_context("shapes.adb", graph, results, max_tokens=1000)
+
+    assert context == (
+        "# Converted from shapes (spec, shapes.ads)\n"
+        "import math\nPI = 3.14\ndef area(r: float) -> float: ...\nclass Shape:\n    def draw(self): ..."
+    )
+    assert dependency_context("shapes.adb", graph, results, max_tokens=1) == ""
+    assert python_interface("def broken(:\n    pass\nclass Ok:\n") == "def broken(:\nclass Ok:"
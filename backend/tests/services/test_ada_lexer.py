@@ -0,0 +1,42 @@
+from app.services.ada_lexer import CHARACTER, COMMENT, NUMBER, STRING, SYMBOL, WORD, tokenize
+
+
+def _kinds_and_text(source, **kwargs):
+    return [(token.kind, token.text) for token in tokenize(source, **kwargs)]
+
+
+def test_comments_are_dropped_by_default():
+    assert _kinds_and_text("X := 1; -- end;") == [
+        (WORD, "X"), (SYMBOL, ":="), (NUMBER, "1"), (SYMBOL, ";")
+    ]
+    assert (COMMENT, "-- end;") in _kinds_and_text("X := 1; -- end;", include_comments=True)
+
+
+def test_string_literals_hide_their_contents():
+    assert _kinds_and_text('Put ("end; ""begin""");') == [
+        (WORD, "Put"), (SYMBOL, "("), (STRING, '"end; ""begin"""'), (SYMBOL, ")"), (SYMBOL, ";")
+    ]
+
+
+def test_character_literals_and_attribute_ticks():
+    tokens = _kinds_and_text("C := 'x'; L := S'Length; T := Character'('a');")
+    
+    assert (CHARACTER, "'x'") in tokens
+    assert (CHARACTER, "'a'") in tokens
+    assert (WORD, "Length") in tokens
+    assert tokens.count((SYMBOL, "'")) == 2
+
+
+def test_numbers_and_compound_symbols():
+    assert _kinds_and_text("for I in 1 .. 16#FF# loop") == [
+        (WORD, "for"), (WORD, "I"), (WORD, "in"), (NUMBER, "1"), (SYMBOL, ".."),
+        (NUMBER, "16#FF#"), (WORD, "loop")
+    ]
+
+
+def test_tokens_record_lines_and_offsets():
+    source = "begin\n  null;\nend;"
+    null = tokenize(source)[1]
+    
+    assert null.line == 2
+    assert source[null.start:null.end] == "null"
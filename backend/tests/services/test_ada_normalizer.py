@@ -0,0 +1,92 @@
+import pytest
+
+from app.services.ada_normalizer import BANNERS, COMMENTS, LEVELS, OFF, WHITESPACE, normalize_ada
+
+SOURCE = (
+    "-------------------------------------------\r\n"
+    "-- Copyright (c) 1999 ACME Corp.\r\n"
+    "-- Licensed under the GPL\r\n"
+    "-------------------------------------------\r\n"
+    "\r\n"
+    "with Ada.Text_IO;   \r\n"
+    "--  Greets the world\r\n"
+    "\r\n"
+    "\r\n"
+    "procedure Hello is\r\n"
+    "   S : String := \"-- not a comment\";  -- trailing\r\n"
+    "   --# global in out X;\r\n"
+    "begin\r\n"
+    "   ------------------\r\n"
+    "   Ada.Text_IO.Put_Line (S);\r\n"
+    "end Hello;\r\n"
+    "\r\n"
+)
+
+
+def test_off_keeps_the_source_unchanged():
+    result = normalize_ada(SOURCE, OFF)
+
+    assert result.text == SOURCE
+    assert result.tokens_saved == 0
+
+
+def test_whitespace_level_drops_trailing_whitespace_and_blank_runs():
+    text = normalize_ada(SOURCE, WHITESPACE).text
+
+    assert "\r" not in text
+    assert "with Ada.Text_IO;\n--  Greets the world\n\nprocedure Hello is" in text
+    assert text.startswith("-----") and text.endswith("end Hello;")
+
+
+def test_banners_level_drops_license_header_and_separators():
+    text = normalize_ada(SOURCE, BANNERS).text
+
+    assert text == (
+        "with Ada.Text_IO;\n"
+        "--  Greets the world\n"
+        "\n"
+        "procedure Hello is\n"
+        "   S : String := \"-- not a comment\";  -- trailing\n"
+        "   --# global in out X;\n"
+        "begin\n"
+        "   Ada.Text_IO.Put_Line (S);\n"
+        "end Hello;"
+    )
+
+
+def test_comments_level_drops_comments_but_not_literals_or_annotations():
+    text = normalize_ada(SOURCE, COMMENTS).text
+
+    assert "Copyright" not in text and "Greets" not in text and "trailing" not in text
+    assert 'S : String := "-- not a comment";\n' in text
+    assert "   --# global in out X;" in text
+
+
+@pytest.mark.parametrize("level", LEVELS)
+def test_normalization_is_idempotent(level):
+    once = normalize_ada(SOURCE, level).text
+
+    assert normalize_ada(once, level).text == once
+
+
+def test_token_accounting():
+    result = normalize_ada(SOURCE, COMMENTS)
+
+    assert result.tokens_before > result.tokens_after > 0
+    assert result.to_dict() == {
+        "level": COMMENTS,
+        "tokens_before": result.tokens_before,
+        "tokens_after": result.tokens_after,
+        "tokens_saved": result.tokens_before - result.tokens_after,
+    }
+
+
+def test_unknown_level_is_rejected():
+    with pytest.raises(ValueError, match="Unknown Ada normalization level"):
+        normalize_ada(SOURCE, "aggressive")
+
+
+def test_whitespace_level_removes_common_indentation():
+    text = normalize_ada("\n    procedure Hello is\n    begin\n       null;\n    end Hello;\n", WHITESPACE).text
+
+    assert text == "procedure Hello is\nbegin\n   null;\nend Hello;"
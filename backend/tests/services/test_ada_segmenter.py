@@ -0,0 +1,120 @@
+from app.services.ada_segmenter import BODY, CONTEXT, DECLARATION, STATEMENTS, plan_chunks, segment_unit
+
+PACKAGE_BODY = """with Ada.Text_IO; use Ada.Text_IO;
+
+package body Shapes is
+
+   -- A point
+   type Point is record
+      X, Y : Float;
+   end record;
+
+   Origin : constant Point := (X => 0.0, Y => 0.0);
+
+   generic
+      type T is private;
+      with procedure Show (Item : T);
+   procedure Show_All (Items : T);
+
+   function Area (R : Float) return Float is
+   begin
+      if R < 0.0 then
+         return 0.0;
+      end if;
+      return 3.14 * R * R;
+   end Area;
+
+   procedure Print (P : Point) is
+      S : String := "end;";
+   begin
+      for I in 1 .. 3 loop
+         Put_Line (Float'Image (P.X));
+      end loop;
+      declare
+         Tmp : Integer := 0;
+      begin
+         null;
+      end;
+   end Print;
+
+   function Twice (X : Integer) return Integer is (X * 2);
+
+   procedure Nothing is null;
+
+begin
+   Put_Line ("init");
+end Shapes;
+"""
+
+
+def _reassemble(unit):
+    return unit.header + "".join(segment.text for segment in unit.segments) + unit.footer
+
+
+def test_single_unit_is_split_into_its_declarations():
+    unit = segment_unit(PACKAGE_BODY)
+    
+    assert _reassemble(unit) == PACKAGE_BODY
+    assert unit.header.endswith("package body Shapes is")
+    assert unit.footer == "\nend Shapes;\n"
+    assert [(s.kind, s.name) for s in unit.segments] == [
+        (DECLARATION, "Point"),
+        (DECLARATION, None),
+        (DECLARATION, "Show_All"),
+        (BODY, "Area"),
+        (BODY, "Print"),
+        (DECLARATION, "Twice"),
+        (DECLARATION, "Nothing"),
+        (STATEMENTS, None),
+    ]
+    assert "-- A point" in unit.segments[0].text
+
+
+def test_multiple_library_units_are_split_at_top_level():
+    source = (
+        "with Ada.Text_IO;\n"
+        "procedure A is\nbegin\n   null;\nend A;\n\n"
+        "function B return Integer is\nbegin\n   return 1;\nend B;\n"
+    )
+    
+    unit = segment_unit(source)
+    
+    assert _reassemble(unit) == source
+    assert unit.header == ""
+    assert [(s.kind, s.name) for s in unit.segments] == [(CONTEXT, None), (BODY, "A"), (BODY, "B")]
+
+
+def test_plan_chunks_keeps_small_sources_whole():
+    plan = plan_chunks("procedure A is\nbegin\n   null;\nend A;\n", max_chunk_tokens=1000, max_context_tokens=1000)
+    
+    assert plan.chunks == ["procedure A is\nbegin\n   null;\nend A;\n"]
+    assert plan.context == ""
+
+
+def test_plan_chunks_groups_bodies_and_shares_declarations():
+    plan = plan_chunks(PACKAGE_BODY, max_chunk_tokens=60, max_context_tokens=1000)
+    
+    assert plan.context.startswith("with Ada.Text_IO;")
+    assert "type Point is record" in plan.context
+    assert "function Area" not in plan.context
+    # Declarations first, then the bodies and the initialization part.
+    assert "type Point is record" in plan.chunks[0]
+    assert any("function Area" in chunk for chunk in plan.chunks[1:])
+    assert any("procedure Print" in chunk for chunk in plan.chunks[1:])
+    assert 'Put_Line ("init")' in plan.chunks[-1]
+
+
+def test_plan_chunks_can_give_every_body_its_own_chunk():
+    plan = plan_chunks(PACKAGE_BODY, max_chunk_tokens=10000, max_context_tokens=1000, split_bodies=True)
+    
+    assert "type Point is record" in plan.chunks[0]
+    assert sum("function Area" in chunk for chunk in plan.chunks) == 1
+    assert not any("function Area" in chunk and "procedure Print" in chunk for chunk in plan.chunks)
+    assert 'Put_Line ("init")' in plan.chunks[-1]
+
+
+def test_plan_chunks_abbreviates_context_over_budget():
+    plan = plan_chunks(PACKAGE_BODY, max_chunk_tokens=60, max_context_tokens=20)
+    
+    assert "type Point is record ..." in plan.context
+    assert "X, Y : Float;" not in plan.context
@@ -0,0 +1,164 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core.exceptions import ClientOverLimitError, ServiceOverloadedError
+from app.services.admission import AdmissionController
+
+
+def _hold(controller, client, admitted, release):
+    with controller.admit(client):
+        admitted.set()
+        release.wait(5)
+
+
+def _start_holding(controller, client):
+    admitted, release = threading.Event(), threading.Event()
+    thread = threading.Thread(target=_hold, args=(controller, client, admitted, release))
+    thread.start()
+    assert admitted.wait(5)
+    return thread, release
+
+
+def test_requests_over_capacity_queue_until_a_slot_frees():
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=5)
+    holder, release = _start_holding(controller, "a")
+    
+    waiter_admitted, waiter_release = threading.Event(), threading.Event()
+    waiter = threading.Thread(target=_hold, args=(controller, "b", waiter_admitted, waiter_release))
+    waiter.start()
+    
+    assert not waiter_admitted.wait(0.1)
+    assert controller.stats() == {"in_flight": 1, "queued": 1}
+    release.set()
+    holder.join(5)
+    assert waiter_admitted.wait(5)
+    waiter_release.set()
+    waiter.join(5)
+    assert controller.stats() == {"in_flight": 0, "queued": 0}
+
+
+def test_a_request_holds_one_slot_per_concurrent_upstream_call():
+    controller = AdmissionController(max_in_flight=4, max_queue=1, queue_timeout=5)
+    releases = []
+
+    with controller.admit("a", weight=3):
+        assert controller.stats() == {"in_flight": 3, "queued": 0}
+        with controller.admit("b"):
+            assert controller.stats() == {"in_flight": 4, "queued": 0}
+        # Two more calls do not fit in the one free slot
+        queued = threading.Thread(target=lambda: releases.append(controller.acquire("c", weight=2)))
+        queued.start()
+        for _ in range(100):
+            if controller.stats()["queued"]:
+                break
+            threading.Event().wait(0.01)
+        assert controller.stats() == {"in_flight": 3, "queued": 1}
+
+    queued.join(5)
+    assert controller.stats() == {"in_flight": 2, "queued": 0}
+    releases[0]()
+    # Weights beyond the pool are capped so heavy requests can still run
+    release = controller.acquire("d", weight=100)
+    assert controller.stats()["in_flight"] == 4
+    release()
+    release()
+    assert controller.stats()["in_flight"] == 0
+
+
+def test_full_queue_sheds_with_a_retry_hint():
+    controller = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=5)
+    holder, release = _start_holding(controller, "a")
+    
+    with pytest.raises(ServiceOverloadedError) as shed:
+        with controller.admit("b"):
+            pass
+    
+    release.set()
+    holder.join(5)
+    assert shed.value.retry_after >= 1
+
+
+def test_waiting_past_the_deadline_sheds_the_request():
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=0.05)
+    holder, release = _start_holding(controller, "a")
+    
+    with pytest.raises(ServiceOverloadedError, match="within"):
+        with controller.admit("b"):
+            pass
+    
+    assert controller.stats() == {"in_flight": 1, "queued": 0}
+    release.set()
+    holder.join(5)
+
+
+def test_a_client_cannot_hold_more_than_its_share():
+    controller = AdmissionController(max_in_flight=2, max_queue=2, queue_timeout=5, client_share=0.25)
+    holder, release = _start_holding(controller, "a")
+    
+    with pytest.raises(ClientOverLimitError):
+        with controller.admit("a"):
+            pass
+    with controller.admit("b"):
+        pass
+    
+    release.set()
+    holder.join(5)
+
+
+def test_freed_slots_go_to_the_client_with_fewest_running():
+    controller = AdmissionController(max_in_flight=2, max_queue=2, queue_timeout=5)
+    first, release_first = _start_holding(controller, "a")
+    second, release_second = _start_holding(controller, "a")
+    order = []
+    
+    def queue(client):
+        with controller.admit(client):
+            order.append(client)
+    
+    queued_a = threading.Thread(target=queue, args=("a",))
+    queued_a.start()
+    while controller.stats()["queued"] < 1:
+        threading.Event().wait(0.01)
+    queued_b = threading.Thread(target=queue, args=("b",))
+    queued_b.start()
+    while controller.stats()["queued"] < 2:
+        threading.Event().wait(0.01)
+    
+    release_first.set()
+    first.join(5)
+    queued_b.join(5)
+    release_second.set()
+    for thread in (second, queued_a):
+        thread.join(5)
+    
+    assert order == ["b", "a"]
+
+
+def test_async_requests_wait_for_slots_on_the_event_loop():
+    controller = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout=5)
+    running, peak = 0, 0
+    
+    async def convert():
+        nonlocal running, peak
+        async with controller.admit_async("a"):
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+    
+    async def main():
+        await asyncio.gather(*(convert() for _ in range(3)))
+    
+    asyncio.run(main())
+    
+    assert peak == 1
+    assert controller.stats() == {"in_flight": 0, "queued": 0}
+
+
+def test_zero_in_flight_admits_everything():
+    controller = AdmissionController(max_in_flight=0, max_queue=0, queue_timeout=0)
+    
+    with controller.admit("a"), controller.admit("a"):
+        assert controller.stats() == {"in_flight": 0, "queued": 0}
@@ -0,0 +1,105 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+from openai import AsyncOpenAI
+from app.services.async_openai_client import AsyncOpenAIClient
+
+
+def _passthrough_transport():
+    transport = Mock()
+    
+    async def call_async(send, estimated_tokens):
+        return await send()
+    transport.call_async.side_effect = call_async
+    return transport
+
+
+def test_async_client_uses_async_openai():
+    # When
+    client = AsyncOpenAIClient(system_prompt="You are a helpful assistant.", api_key="test-key")
+    
+    # Then
+    assert isinstance(client.client, AsyncOpenAI)
+
+
+def test_send_message_awaits_completion_and_records_session():
+    # Given
+    transport = _passthrough_transport()
+    client = AsyncOpenAIClient(system_prompt="You are a helpful assistant.", api_key="test-key", transport=transport)
+    mock_response = Mock()
+    mock_response.choices = [Mock(message=Mock(content="Hello!"))]
+    mock_response.usage = Mock(prompt_tokens=9, completion_tokens=2, total_tokens=11)
+    
+    with patch.object(client._client.chat.completions, 'create', AsyncMock(return_value=mock_response)) as mock_create:
+        # When
+        response = asyncio.run(client.send_message("Hi!", session_id="abc"))
+        
+        # Then
+        assert response == "Hello!"
+        assert mock_create.call_args.kwargs["messages"][-1] == {"role": "user", "content": "Hi!"}
+        assert client.session_messages("abc")[-1] == {"role": "assistant", "content": "Hello!"}
+        transport.record_usage.assert_called_once_with(transport.call_async.call_args.args[1], 11)
+
+
+def test_stream_message_yields_fragments():
+    # Given
+    client = AsyncOpenAIClient(system_prompt="You are a helpful assistant.", api_key="test-key",
+                               transport=_passthrough_transport())
+    
+    def chunk(content=None, usage=None):
+        return Mock(usage=usage, choices=[] if content is None else [Mock(delta=Mock(content=content))])
+    
+    async def chunks():
+        for item in (chunk("Hel"), chunk("lo!"), chunk(usage=Mock(prompt_tokens=9, completion_tokens=2))):
+            yield item
+    
+    stream = MagicMock()
+    stream.__aenter__.return_value = stream
+    stream.__aiter__.side_effect = lambda: chunks()
+    
+    async def collect():
+        return [fragment async for fragment in client.stream_message("Hi!", session_id="abc")]
+    
+    with patch.object(client._client.chat.completions, 'create', AsyncMock(return_value=stream)):
+        # When
+        fragments = asyncio.run(collect())
+        
+        # Then
+        assert fragments == ["Hel", "lo!"]
+        assert client.conversations.stats("abc")["prompt_tokens"] == 9
+
+
+def test_stalled_call_cancelled_by_its_hedge_settles_its_reservation():
+    # Given
+    from app.services.hedging import HedgePolicy
+    transport = _passthrough_transport()
+    policy = HedgePolicy(enabled=True, max_delay=0.05, fallback_model="gpt-4o-mini")
+    client = AsyncOpenAIClient(system_prompt="You are a helpful assistant.", api_key="test-key", model="gpt-4o",
+                               transport=transport, hedge_policy=policy)
+    
+    async def stall():
+        await asyncio.sleep(5)
+        yield Mock(usage=None, choices=[])
+    
+    async def answer():
+        yield Mock(usage=None, choices=[Mock(delta=Mock(content="Hello!"))])
+    
+    def stream(chunks):
+        response = MagicMock()
+        response.__aenter__.return_value = response
+        response.__aiter__.side_effect = lambda: chunks()
+        return response
+    
+    async def create(**kwargs):
+        return stream(stall if kwargs["model"] == "gpt-4o" else answer)
+    
+    with patch.object(client._client.chat.completions, 'create', side_effect=create):
+        # When
+        response = asyncio.run(client.send_message("Hi!"))
+        
+        # Then
+        assert response == "Hello!"
+        estimated = transport.call_async.call_args.args[1]
+        settled = sorted(actual for _, actual in (recorded.args for recorded in transport.record_usage.call_args_list))
+        # The winner reported no usage and keeps its estimate; the cancelled call is charged its prompt only
+        assert len(settled) == 2
+        assert 0 < settled[0] < estimated == settled[1]
@@ -0,0 +1,162 @@
+import io
+import json
+import tarfile
+import threading
+import time
+import zipfile
+
+import pytest
+
+from app.core.exceptions import FileUploadError
+from app.services.batch import (
+    BatchFile,
+    build_result_archive,
+    convert_batch,
+    extract_archive,
+    summarize_batch,
+)
+
+ADA_EXTENSIONS = {".ada", ".adb", ".ads"}
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    buffer.seek(0)
+    return buffer
+
+
+def _tar(members):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, content in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    buffer.seek(0)
+    return buffer
+
+
+def test_extract_zip_keeps_only_ada_sources():
+    stream = _zip({"src/a.adb": b"null;", "src/a.ads": b"spec", "README.md": b"docs"})
+    
+    files, skipped = extract_archive("project.zip", stream, ADA_EXTENSIONS, max_files=10, max_total_bytes=1000)
+    
+    assert [f.filename for f in files] == ["src/a.adb", "src/a.ads"]
+    assert files[0].content == b"null;"
+    assert skipped == ["README.md"]
+
+
+def test_extract_tar_gz():
+    stream = _tar({"pkg/b.ada": b"null;"})
+    
+    files, _ = extract_archive("project.tar.gz", stream, ADA_EXTENSIONS, max_files=10, max_total_bytes=1000)
+    
+    assert files == [BatchFile(filename="pkg/b.ada", content=b"null;")]
+
+
+def test_extract_archive_enforces_limits():
+    with pytest.raises(FileUploadError, match="more than 1 Ada files"):
+        extract_archive("p.zip", _zip({"a.adb": b"x", "b.adb": b"y"}), ADA_EXTENSIONS, max_files=1, max_total_bytes=1000)
+    with pytest.raises(FileUploadError, match="bytes of Ada source"):
+        extract_archive("p.zip", _zip({"a.adb": b"x" * 100}), ADA_EXTENSIONS, max_files=10, max_total_bytes=10)
+
+
+def test_extract_corrupt_archive():
+    with pytest.raises(FileUploadError, match="Could not read archive"):
+        extract_archive("p.zip", io.BytesIO(b"not a zip"), ADA_EXTENSIONS, max_files=10, max_total_bytes=1000)
+
+
+def test_convert_batch_isolates_failures():
+    def convert(code):
+        if "bad" in code:
+            raise RuntimeError("upstream error")
+        return {"python_code": code}, "MISS"
+    
+    files = [
+        BatchFile("ok.adb", b"good"),
+        BatchFile("bad.adb", b"bad"),
+        BatchFile("binary.adb", b"\xff\xfe"),
+        BatchFile("empty.adb", b"  "),
+    ]
+    
+    entries = convert_batch(files, convert, concurrency=2)
+    
+    assert [e["status"] for e in entries] == ["succeeded", "failed", "failed", "failed"]
+    assert entries[0]["result"] == {"python_code": "good"}
+    assert entries[1]["error"] == "upstream error"
+    assert entries[2]["error"] == "File must be valid UTF-8 text"
+    assert entries[3]["error"] == "File is empty"
+    assert all("duration_ms" in e for e in entries)
+    assert summarize_batch(entries, 12.34, 2) == {
+        "total": 4, "succeeded": 1, "failed": 3, "concurrency": 2, "duration_ms": 12.3
+    }
+
+
+def test_convert_batch_respects_concurrency_limit():
+    lock = threading.Lock()
+    active = [0]
+    peak = [0]
+    
+    def convert(code):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return {}, "MISS"
+    
+    convert_batch([BatchFile(f"{i}.adb", b"null;") for i in range(8)], convert, concurrency=3)
+    
+    assert peak[0] == 3
+
+
+def test_build_result_archive():
+    manifest = {
+        "files": [
+            {"filename": "src/a.adb", "status": "succeeded", "duration_ms": 1.0,
+             "result": {"logic": "L", "unit_tests": "T", "python_code": "P"}},
+            {"filename": "src/a.ads", "status": "succeeded", "duration_ms": 1.0,
+             "result": {"logic": "", "unit_tests": "", "python_code": "S"}},
+            {"filename": "bad.adb", "status": "failed", "duration_ms": 1.0, "error": "boom"},
+        ],
+        "skipped": [],
+        "summary": {"total": 3},
+    }
+    
+    with zipfile.ZipFile(io.BytesIO(build_result_archive(manifest))) as archive:
+        assert archive.read("src/a.py") == b"P"
+        assert archive.read("src/test_a.py") == b"T"
+        assert archive.read("src/a.logic.md") == b"L"
+        assert archive.read("src/a_spec.py") == b"S"
+        written = json.loads(archive.read("manifest.json"))
+    
+    assert written["files"][0]["outputs"]["python_code"] == "src/a.py"
+    assert "result" not in written["files"][0]
+    assert written["files"][2]["error"] == "boom"
+
+
+def test_convert_batch_follows_dependency_levels_with_context():
+    from app.services.ada_dependencies import DependencyGraph
+    sources = {
+        "main.adb": "with Greet;\nprocedure Main is\nbegin\n   Greet.Hello;\nend Main;\n",
+        "greet.ads": "package Greet is\n   procedure Hello;\nend Greet;\n",
+    }
+    calls = []
+    
+    def convert(code, dependencies=None):
+        calls.append((code.split("\n")[1 if code.startswith("with") else 0], dependencies))
+        return {"python_code": "def hello() -> None:\n    print('hi')\n"}, "MISS"
+    
+    files = [BatchFile(filename, content.encode()) for filename, content in sources.items()]
+    entries = convert_batch(files, convert, concurrency=2, graph=DependencyGraph.build(sources), context_max_tokens=500)
+    
+    assert [entry["filename"] for entry in entries] == ["main.adb", "greet.ads"]
+    assert [entry["level"] for entry in entries] == [1, 0]
+    assert calls == [
+        ("package Greet is", None),
+        ("procedure Main is", "# Converted from greet (spec, greet.ads)\ndef hello() -> None: ..."),
+    ]
@@ -0,0 +1,117 @@
+import threading
+
+from app.services.conversation_store import ConversationStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _user(content):
+    return {"role": "user", "content": content}
+
+
+def _assistant(content):
+    return {"role": "assistant", "content": content}
+
+
+def make_store(tmp_path, **options):
+    return ConversationStore(str(tmp_path / "sessions.sqlite3"), **options)
+
+
+def test_history_is_empty_for_unknown_session(tmp_path):
+    store = make_store(tmp_path, max_sessions=4, ttl_seconds=60, max_history_tokens=1000)
+    
+    assert store.history("missing") == []
+    assert store.stats("missing") is None
+
+
+def test_record_turn_accumulates_history_and_tokens(tmp_path):
+    store = make_store(tmp_path, max_sessions=4, ttl_seconds=60, max_history_tokens=1000)
+    
+    store.record_turn("s1", _user("a"), _assistant("b"), prompt_tokens=10, completion_tokens=5)
+    store.record_turn("s1", _user("c"), _assistant("d"), prompt_tokens=20, completion_tokens=7)
+    
+    assert store.history("s1") == [_user("a"), _assistant("b"), _user("c"), _assistant("d")]
+    stats = store.stats("s1")
+    assert stats["turns"] == 2
+    assert stats["prompt_tokens"] == 30
+    assert stats["completion_tokens"] == 12
+    assert stats["total_tokens"] == 42
+
+
+def test_history_is_trimmed_to_token_budget_keeping_latest_turn(tmp_path):
+    store = make_store(tmp_path, max_sessions=4, ttl_seconds=60, max_history_tokens=10)
+    
+    store.record_turn("s1", _user("x" * 16), _assistant("y" * 16))
+    store.record_turn("s1", _user("z" * 40), _assistant("w" * 40))
+    
+    assert store.history("s1") == [_user("z" * 40), _assistant("w" * 40)]
+    assert store.stats("s1")["trimmed_turns"] == 1
+
+
+def test_least_recently_used_session_is_evicted(tmp_path):
+    store = make_store(tmp_path, max_sessions=2, ttl_seconds=60, max_history_tokens=1000)
+    
+    store.record_turn("s1", _user("a"), _assistant("b"))
+    store.record_turn("s2", _user("a"), _assistant("b"))
+    store.history("s1")  # s1 becomes most recently used
+    store.record_turn("s3", _user("a"), _assistant("b"))
+    
+    assert store.stats("s2") is None
+    assert store.stats("s1") is not None
+    assert store.stats("s3") is not None
+
+
+def test_idle_sessions_expire(tmp_path):
+    clock = FakeClock()
+    store = make_store(tmp_path, max_sessions=4, ttl_seconds=60, max_history_tokens=1000, clock=clock)
+    
+    store.record_turn("s1", _user("a"), _assistant("b"))
+    clock.now = 61
+    
+    assert store.history("s1") == []
+    assert len(store) == 0
+
+
+def test_drop_removes_session(tmp_path):
+    store = make_store(tmp_path, max_sessions=4, ttl_seconds=60, max_history_tokens=1000)
+    store.record_turn("s1", _user("a"), _assistant("b"))
+    
+    assert store.drop("s1") is True
+    assert store.drop("s1") is False
+
+
+def test_concurrent_turns_are_all_recorded(tmp_path):
+    store = make_store(tmp_path, max_sessions=4, ttl_seconds=60, max_history_tokens=10**6)
+    
+    def worker():
+        for _ in range(100):
+            store.record_turn("s1", _user("a"), _assistant("b"), prompt_tokens=1)
+    
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert store.stats("s1")["turns"] == 800
+    assert store.stats("s1")["prompt_tokens"] == 800
+
+
+def test_sessions_are_shared_between_workers(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    first = ConversationStore(path, max_sessions=4, ttl_seconds=60, max_history_tokens=1000)
+    second = ConversationStore(path, max_sessions=4, ttl_seconds=60, max_history_tokens=1000)
+    
+    first.record_turn("s1", _user("a"), _assistant("b"), prompt_tokens=3)
+    second.record_turn("s1", _user("c"), _assistant("d"), prompt_tokens=4)
+    
+    assert first.history("s1") == [_user("a"), _assistant("b"), _user("c"), _assistant("d")]
+    assert first.stats("s1")["prompt_tokens"] == 7
+    assert second.drop("s1") is True
+    assert first.stats("s1") is None
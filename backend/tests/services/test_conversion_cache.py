@@ -0,0 +1,137 @@
+from app.services.conversion_cache import (
+    ConversionCache,
+    MemoryCacheTier,
+    SqliteCacheTier,
+    conversion_key,
+    normalize_source,
+)
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_source_ignores_formatting_differences():
+    assert normalize_source("\nnull;  \r\nend;\t\n\n") == "null;\nend;"
+
+
+def test_conversion_key_depends_on_source_model_and_prompt():
+    base = conversion_key("null;", "gpt-4", "prompt")
+    
+    assert conversion_key("null;   \n", "gpt-4", "prompt") == base
+    assert conversion_key("begin null; end;", "gpt-4", "prompt") != base
+    assert conversion_key("null;", "gpt-3.5-turbo", "prompt") != base
+    assert conversion_key("null;", "gpt-4", "other prompt") != base
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ConversionCache(memory=MemoryCacheTier(max_entries=2, ttl_seconds=60))
+    cache.set("a", "A", model="m")
+    cache.set("b", "B", model="m")
+    cache.get("a")
+    cache.set("c", "C", model="m")
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == ("A", "memory")
+    assert cache.get("c") == ("C", "memory")
+
+
+def test_memory_tier_expires_entries():
+    clock = FakeClock()
+    tier = MemoryCacheTier(max_entries=2, ttl_seconds=60, clock=clock)
+    cache = ConversionCache(memory=tier, clock=clock)
+    cache.set("a", "A", model="m")
+    
+    clock.now += 61
+    
+    assert cache.get("a") is None
+
+
+def test_disk_tier_is_shared_and_promotes_to_memory(tmp_path):
+    path = str(tmp_path / "cache" / "conversions.sqlite3")
+    writer = ConversionCache(
+        memory=MemoryCacheTier(max_entries=2, ttl_seconds=60),
+        disk=SqliteCacheTier(path, max_entries=10, ttl_seconds=60),
+    )
+    writer.set("a", "A", model="m")
+    
+    reader = ConversionCache(
+        memory=MemoryCacheTier(max_entries=2, ttl_seconds=60),
+        disk=SqliteCacheTier(path, max_entries=10, ttl_seconds=60),
+    )
+    
+    assert reader.get("a") == ("A", "disk")
+    assert reader.get("a") == ("A", "memory")
+    assert reader.stats()["hits"] == 2
+
+
+def test_disk_tier_is_bounded(tmp_path):
+    tier = SqliteCacheTier(str(tmp_path / "c.sqlite3"), max_entries=2, ttl_seconds=60)
+    cache = ConversionCache(memory=None, disk=tier)
+    for key in ("a", "b", "c"):
+        cache.set(key, key.upper(), model="m")
+    
+    assert tier.stats()["entries"] == 2
+
+
+def test_delete_and_clear_affect_every_tier(tmp_path):
+    cache = ConversionCache(
+        memory=MemoryCacheTier(max_entries=4, ttl_seconds=60),
+        disk=SqliteCacheTier(str(tmp_path / "c.sqlite3"), max_entries=10, ttl_seconds=60),
+    )
+    cache.set("a", "A", model="m")
+    cache.set("b", "B", model="m")
+    
+    assert cache.delete("a") is True
+    assert cache.get("a") is None
+    assert cache.clear() == {"memory": 1, "disk": 1}
+    assert cache.lookup("b") is None
+
+
+def test_lookups_without_a_hit_respect_the_ttl(tmp_path):
+    clock = FakeClock()
+    cache = ConversionCache(
+        memory=MemoryCacheTier(max_entries=4, ttl_seconds=60, clock=clock),
+        disk=SqliteCacheTier(str(tmp_path / "c.sqlite3"), max_entries=10, ttl_seconds=60, clock=clock),
+        clock=clock,
+    )
+    cache.set("a", "A", model="m")
+    
+    clock.now += 61
+    
+    assert cache.lookup("a") is None
+    assert cache.entries() == {"memory": [], "disk": []}
+
+
+def test_deletes_and_purges_reach_other_workers_memory_tiers(tmp_path):
+    path = str(tmp_path / "c.sqlite3")
+    workers = [
+        ConversionCache(memory=MemoryCacheTier(max_entries=4, ttl_seconds=60),
+                        disk=SqliteCacheTier(path, max_entries=10, ttl_seconds=60))
+        for _ in range(2)
+    ]
+    workers[0].set("a", "A", model="m")
+    workers[0].set("b", "B", model="m")
+    assert workers[1].get("a") == ("A", "disk")
+    assert workers[1].get("b") == ("B", "disk")
+    
+    workers[0].delete("a")
+    assert workers[1].get("a") is None
+    assert workers[1].get("b") == ("B", "disk")
+    
+    workers[1].get("b")
+    workers[0].clear()
+    assert workers[1].get("b") is None
+    assert workers[1].lookup("b") is None
+
+
+def test_disabled_cache_misses():
+    cache = ConversionCache(memory=None)
+    cache.set("a", "A", model="m")
+    
+    assert cache.enabled is False
+    assert cache.get("a") is None
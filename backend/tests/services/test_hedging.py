@@ -0,0 +1,179 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.hedging import HedgePolicy, LatencyTracker, run_hedged, run_hedged_async
+
+
+def test_tracker_reports_nearest_rank_percentiles():
+    tracker = LatencyTracker(window=10)
+    for seconds in range(1, 21):
+        tracker.record("gpt-4o", float(seconds))
+
+    # Only the last ten observations are kept
+    assert tracker.count("gpt-4o") == 10
+    assert tracker.percentile("gpt-4o", 50) == 15
+    assert tracker.percentile("gpt-4o", 95) == 20
+    assert tracker.percentile("other", 95) is None
+
+
+def test_delay_is_the_max_delay_until_enough_samples():
+    policy = HedgePolicy(enabled=True, percentile=90, min_delay=1, max_delay=30, min_samples=5)
+    for _ in range(4):
+        policy.record_first_token("gpt-4o", 3.0)
+    assert policy.delay("gpt-4o") == 30
+
+    policy.record_first_token("gpt-4o", 3.0)
+    assert policy.delay("gpt-4o") == 3.0
+
+
+def test_delay_is_clamped():
+    policy = HedgePolicy(enabled=True, min_delay=2, max_delay=10, min_samples=1)
+    policy.record_first_token("fast", 0.1)
+    policy.record_first_token("slow", 60)
+
+    assert policy.delay("fast") == 2
+    assert policy.delay("slow") == 10
+
+
+def test_hedge_model_falls_back_to_the_same_model():
+    assert HedgePolicy(enabled=True).hedge_model("gpt-4o") == "gpt-4o"
+    assert HedgePolicy(enabled=True, fallback_model="gpt-4o-mini").hedge_model("gpt-4o") == "gpt-4o-mini"
+
+
+def test_call_that_answers_in_time_is_not_hedged():
+    hedges = []
+
+    result, hedge_won = run_hedged(lambda attempt: "primary", delay=5, on_hedge=lambda: hedges.append(1))
+
+    assert (result, hedge_won) == ("primary", False)
+    assert hedges == []
+
+
+def test_stalled_call_is_hedged_and_cancelled_when_the_hedge_wins():
+    hedges = []
+    stalled = threading.Event()
+    closed = threading.Event()
+
+    def call(attempt):
+        if attempt.hedge:
+            return "hedge"
+        attempt.on_cancel(closed.set)
+        stalled.wait(5)
+        return "primary"
+
+    result, hedge_won = run_hedged(call, delay=0.05, on_hedge=lambda: hedges.append(1))
+
+    assert (result, hedge_won) == ("hedge", True)
+    assert hedges == [1]
+    assert closed.wait(1)
+    stalled.set()
+
+
+def test_a_call_that_has_started_streaming_is_not_hedged():
+    hedges = []
+
+    def call(attempt):
+        attempt.progress()
+        threading.Event().wait(0.1)
+        return "primary"
+
+    result, _ = run_hedged(call, delay=0.01, on_hedge=lambda: hedges.append(1))
+
+    assert result == "primary"
+    assert hedges == []
+
+
+def test_failed_call_falls_back_to_the_other():
+    release = threading.Event()
+
+    def call(attempt):
+        if attempt.hedge:
+            release.set()
+            return "hedge"
+        release.wait(5)
+        raise TimeoutError("stalled")
+
+    assert run_hedged(call, delay=0.05, on_hedge=lambda: None) == ("hedge", True)
+
+
+def test_the_losing_result_is_discarded_even_if_it_finished():
+    both_started = threading.Barrier(2)
+    discarded = []
+    discarded_once = threading.Event()
+
+    def call(attempt):
+        both_started.wait(5)
+        return "hedge" if attempt.hedge else "primary"
+
+    def discard(result):
+        discarded.append(result)
+        discarded_once.set()
+
+    result, _ = run_hedged(call, delay=0.05, on_hedge=lambda: None, discard=discard)
+
+    assert discarded_once.wait(5)
+    assert sorted([result, *discarded]) == ["hedge", "primary"]
+
+
+def test_error_is_raised_when_every_call_fails():
+    def call(attempt):
+        raise ValueError("hedge" if attempt.hedge else "primary")
+
+    with pytest.raises(ValueError, match="primary"):
+        run_hedged(call, delay=0.01, on_hedge=lambda: None)
+
+
+def test_async_hedge_wins_and_the_stalled_task_is_cancelled():
+    cancelled = []
+
+    async def call(hedge, first_token):
+        if hedge:
+            return "hedge"
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "primary"
+
+    result = asyncio.run(run_hedged_async(call, delay=0.05, on_hedge=lambda: None))
+
+    assert result == ("hedge", True)
+    assert cancelled == [True]
+
+
+def test_async_call_with_a_first_token_is_not_hedged():
+    hedges = []
+
+    async def call(hedge, first_token):
+        first_token.set()
+        await asyncio.sleep(0.1)
+        return "hedge" if hedge else "primary"
+
+    result = asyncio.run(run_hedged_async(call, delay=0.01, on_hedge=lambda: hedges.append(1)))
+
+    assert result == ("primary", False)
+    assert hedges == []
+
+
+def test_async_loser_that_finished_is_discarded():
+    discarded = []
+
+    async def race():
+        gate = asyncio.Event()
+
+        async def call(hedge, first_token):
+            if hedge:
+                # Wakes the original, so both calls are done by the time a winner is picked
+                gate.set()
+                return "hedge"
+            await gate.wait()
+            return "primary"
+
+        return await run_hedged_async(call, delay=0.01, on_hedge=lambda: None, discard=discarded.append)
+
+    result, _ = asyncio.run(race())
+
+    assert sorted([result, *discarded]) == ["hedge", "primary"]
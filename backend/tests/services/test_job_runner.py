@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+
+from app.core.exceptions import JobQueueFullError
+from app.services.job_runner import JobRunner
+from app.services.job_store import JobStore
+
+
+def test_submitted_job_is_converted_in_background(tmp_path):
+    runner = JobRunner(
+        store=JobStore(str(tmp_path / "jobs.sqlite3"), retention_seconds=60),
+        convert=lambda code: {"python_code": code.upper()},
+        max_workers=2,
+        max_pending=4,
+    )
+    
+    job_id = runner.submit("null;")
+    runner.shutdown()
+    
+    job = runner.store.get(job_id)
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"python_code": "NULL;"}
+    assert runner.pending == 0
+
+
+def test_failed_conversion_is_recorded(tmp_path):
+    def convert(code):
+        raise RuntimeError("rate limited")
+    
+    runner = JobRunner(
+        store=JobStore(str(tmp_path / "jobs.sqlite3"), retention_seconds=60),
+        convert=convert,
+        max_workers=1,
+        max_pending=4,
+    )
+    
+    job_id = runner.submit("null;")
+    runner.shutdown()
+    
+    assert runner.store.get(job_id)["error"] == "rate limited"
+
+
+def test_submissions_beyond_max_pending_are_rejected(tmp_path):
+    release = threading.Event()
+    runner = JobRunner(
+        store=JobStore(str(tmp_path / "jobs.sqlite3"), retention_seconds=60),
+        convert=lambda code: release.wait(5) and {},
+        max_workers=1,
+        max_pending=2,
+    )
+    
+    runner.submit("a")
+    runner.submit("b")
+    with pytest.raises(JobQueueFullError):
+        runner.submit("c")
+    
+    release.set()
+    runner.shutdown()
+    assert runner.pending == 0
+
+
+def test_jobs_of_an_exited_worker_are_recovered(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    # A worker that exited with a job still queued
+    job_id = JobStore(path, retention_seconds=60).create(source="null;")
+    runner = JobRunner(
+        store=JobStore(path, retention_seconds=60, process_alive=lambda pid: False),
+        convert=lambda code: {"python_code": code.upper()},
+        max_workers=1,
+        max_pending=4,
+    )
+    
+    assert runner.recover() == 1
+    runner.shutdown()
+    
+    assert runner.store.get(job_id)["result"] == {"python_code": "NULL;"}
+    assert runner.pending == 0
+
+
+def test_recovery_scans_at_most_once_per_interval(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(path, retention_seconds=60, process_alive=lambda pid: False)
+    now = [100.0]
+    runner = JobRunner(
+        store=store,
+        convert=lambda code: {"python_code": code.upper()},
+        max_workers=1,
+        max_pending=4,
+        recover_interval=5,
+        clock=lambda: now[0],
+    )
+    
+    assert runner.recover() == 0
+    # Orphaned after the last scan: left alone until the interval has passed
+    job_id = JobStore(path, retention_seconds=60).create(source="null;")
+    now[0] += 4
+    assert runner.recover() == 0
+    now[0] += 1
+    assert runner.recover() == 1
+    runner.shutdown()
+    
+    assert runner.store.get(job_id)["status"] == "succeeded"
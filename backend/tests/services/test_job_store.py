@@ -0,0 +1,92 @@
+from app.services.job_store import MAX_JOB_ATTEMPTS, JobStore
+
+
+def test_job_lifecycle(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"), retention_seconds=60)
+    
+    job_id = store.create(filename="hello.adb")
+    assert store.get(job_id)["status"] == "queued"
+    
+    store.mark_running(job_id)
+    assert store.get(job_id)["started_at"] is not None
+    
+    store.mark_succeeded(job_id, {"python_code": "pass"})
+    job = store.get(job_id)
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"python_code": "pass"}
+    assert job["filename"] == "hello.adb"
+
+
+def test_failed_job_reports_error(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"), retention_seconds=60)
+    job_id = store.create()
+    
+    store.mark_failed(job_id, "boom")
+    
+    assert store.get(job_id)["status"] == "failed"
+    assert store.get(job_id)["error"] == "boom"
+
+
+def test_jobs_survive_a_new_store_instance(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    job_id = JobStore(path, retention_seconds=60).create()
+    JobStore(path, retention_seconds=60).mark_succeeded(job_id, {"logic": "x"})
+    
+    assert JobStore(path, retention_seconds=60).get(job_id)["result"] == {"logic": "x"}
+
+
+def test_unfinished_job_of_exited_worker_is_failed(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"), retention_seconds=60, process_alive=lambda pid: False)
+    job_id = store.create()
+    
+    job = store.get(job_id)
+    
+    assert job["status"] == "failed"
+    assert "worker process exited" in job["error"]
+
+
+def test_unfinished_job_of_exited_worker_is_claimed_once(tmp_path):
+    alive = {"value": True}
+    store = JobStore(str(tmp_path / "jobs.sqlite3"), retention_seconds=60,
+                     process_alive=lambda pid: alive["value"])
+    job_id = store.create(source="null;")
+    store.mark_running(job_id)
+    assert store.claim_orphans(limit=10) == []
+    
+    alive["value"] = False
+    assert store.get(job_id)["status"] == "queued"
+    assert store.claim_orphans(limit=10) == [(job_id, "null;")]
+    
+    # Claimed by this (live) process: nobody else takes it
+    alive["value"] = True
+    assert store.claim_orphans(limit=10) == []
+
+
+def test_job_that_keeps_killing_its_worker_is_failed(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"), retention_seconds=60, process_alive=lambda pid: False)
+    job_id = store.create(source="null;")
+    for _ in range(MAX_JOB_ATTEMPTS):
+        store.mark_running(job_id)
+    
+    assert store.claim_orphans(limit=10) == []
+    job = store.get(job_id)
+    assert job["status"] == "failed"
+    assert f"interrupted {MAX_JOB_ATTEMPTS} times" in job["error"]
+
+
+def test_finished_jobs_are_pruned_after_retention(tmp_path):
+    now = [1000.0]
+    store = JobStore(str(tmp_path / "jobs.sqlite3"), retention_seconds=60, clock=lambda: now[0])
+    old_job = store.create()
+    store.mark_succeeded(old_job, {})
+    running_job = store.create()
+    
+    now[0] += 61
+    store.create()
+    
+    assert store.get(old_job) is None
+    assert store.get(running_job) is not None
+
+
+def test_unknown_job(tmp_path):
+    assert JobStore(str(tmp_path / "jobs.sqlite3"), retention_seconds=60).get("missing") is None
@@ -0,0 +1,116 @@
+import pytest
+
+from app.services.model_router import ModelRouter, ModelTier, parse_tiers, score_complexity
+
+SMALL_PROCEDURE = """
+procedure Hello is
+begin
+   Put_Line ("Hello, World!");
+end Hello;
+"""
+
+GENERIC_TASKING_PACKAGE = """
+with Ada.Text_IO;
+generic
+   type Element is private;
+package Buffers is
+   package Int_IO is new Ada.Text_IO.Integer_IO (Integer);
+   type Callback is access procedure (E : Element);
+   protected type Buffer is
+      entry Put (E : Element);
+      entry Get (E : out Element);
+   private
+      Item : Element;
+   end Buffer;
+   task Worker is
+      entry Start;
+   end Worker;
+   procedure Drain;
+   function Size return Natural;
+end Buffers;
+"""
+
+
+def _router():
+    return ModelRouter([
+        ModelTier(name="large", model="gpt-4o", max_tokens=8192, timeout_seconds=180),
+        ModelTier(name="small", model="gpt-4o-mini", max_score=10, max_tokens=2048, timeout_seconds=30),
+        ModelTier(name="medium", model="gpt-4o", max_score=50),
+    ])
+
+
+def test_score_counts_subprograms_generics_and_tasking():
+    complexity = score_complexity(GENERIC_TASKING_PACKAGE)
+
+    # Access-to-subprogram types are not subprograms
+    assert complexity.subprograms == 2
+    # The generic formal part and the instantiation
+    assert complexity.generics == 2
+    # protected, task and three entries; "end" lines are not counted again
+    assert complexity.tasking == 5
+    assert complexity.score > score_complexity(SMALL_PROCEDURE).score
+
+
+def test_score_ignores_words_in_comments_and_strings():
+    complexity = score_complexity('-- task and generic\nprocedure P is begin Put ("entry"); end P;')
+
+    assert (complexity.subprograms, complexity.generics, complexity.tasking) == (1, 0, 0)
+
+
+def test_tiers_are_tried_in_order_of_max_score():
+    router = _router()
+
+    assert [tier.name for tier in router.tiers] == ["small", "medium", "large"]
+    assert router.route(SMALL_PROCEDURE).tier.name == "small"
+    assert router.route(GENERIC_TASKING_PACKAGE).tier.name == "medium"
+    assert router.route(GENERIC_TASKING_PACKAGE * 3).tier.name == "large"
+
+
+def test_source_scoring_above_every_limit_goes_to_the_last_tier():
+    router = ModelRouter([ModelTier(name="small", max_score=1), ModelTier(name="medium", max_score=2)])
+
+    assert router.route(GENERIC_TASKING_PACKAGE).tier.name == "medium"
+
+
+def test_tier_request_options_only_include_overrides():
+    assert ModelTier(name="default").request_options() == {}
+    assert ModelTier(name="small", max_tokens=2048, timeout_seconds=30).request_options() == {
+        "max_tokens": 2048, "timeout": 30
+    }
+
+
+def test_signature_describes_models_and_thresholds():
+    assert _router().signature == "small=gpt-4o-mini<=10,medium=gpt-4o<=50,large=gpt-4o"
+
+
+def test_parse_tiers_reads_a_json_list():
+    tiers = parse_tiers('[{"name": "small", "model": "gpt-4o-mini", "max_score": 20, "max_tokens": 1024},'
+                        ' {"name": "large", "model": "gpt-4o", "timeout_seconds": 120}]')
+
+    assert tiers == [
+        ModelTier(name="small", model="gpt-4o-mini", max_score=20, max_tokens=1024),
+        ModelTier(name="large", model="gpt-4o", timeout_seconds=120),
+    ]
+
+
+@pytest.mark.parametrize("value", ["not json", '{"name": "small"}', '[{"name": "small", "size": 3}]'])
+def test_parse_tiers_rejects_invalid_values(value):
+    with pytest.raises(ValueError):
+        parse_tiers(value)
+
+
+def test_router_rejects_duplicate_or_missing_tiers():
+    with pytest.raises(ValueError):
+        ModelRouter([])
+    with pytest.raises(ValueError):
+        ModelRouter([ModelTier(name="a"), ModelTier(name="a", max_score=3)])
+
+
+def test_unset_tiers_route_everything_to_the_default_model(monkeypatch):
+    from app.services import model_router
+    monkeypatch.setattr(model_router.settings, "model_tiers", "")
+
+    router = ModelRouter.from_settings()
+
+    assert router.tiers == [ModelTier(name="default")]
+    assert router.route(GENERIC_TASKING_PACKAGE).tier.name == "default"
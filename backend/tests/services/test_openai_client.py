@@ -1,5 +1,6 @@
 import os
-from unittest.mock import Mock, patch, call, ANY
+import threading
+from unittest.mock import MagicMock, Mock, patch, call, ANY
 import pytest
 from app.services.openai_client import OpenAIClient
 from openai import OpenAI
@@ -122,9 +123,164 @@ def test_message_history():
         # When
         client.send_message("Hi!")
         
-        # Then
-        assert client.messages == [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": "Hi!"},
+        # Then messages sent without a session are not retained
+        assert client.messages == [{"role": "system", "content": system_prompt}]
+        assert len(client.conversations) == 0
+
+def test_session_message_history():
+    # Given
+    system_prompt = "You are a helpful assistant."
+    client = OpenAIClient(system_prompt=system_prompt, api_key="test-key")
+    
+    with patch.object(client._client.chat.completions, 'create') as mock_create:
+        mock_message = Mock()
+        mock_message.content = "Hello!"
+        mock_response = Mock()
+        mock_response.choices = [Mock(message=mock_message)]
+        mock_response.usage = Mock(prompt_tokens=12, completion_tokens=3)
+        mock_create.return_value = mock_response
+        
+        # When
+        client.send_message("Hi!", session_id="abc")
+        client.send_message("Again", session_id="abc")
+        
+        # Then the second call carries the first exchange
+        assert mock_create.call_args_list[1] == call(
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": "Hi!"},
+                {"role": "assistant", "content": "Hello!"},
+                {"role": "user", "content": "Again"}
+            ],
+            model=OpenAIClient.DEFAULT_MODEL
+        )
+        assert client.session_messages("abc")[-2:] == [
+            {"role": "user", "content": "Again"},
             {"role": "assistant", "content": "Hello!"}
         ]
+        stats = client.conversations.stats("abc")
+        assert stats["turns"] == 2
+        assert stats["prompt_tokens"] == 24
+        assert stats["completion_tokens"] == 6
+
+def _stream_chunk(content=None, usage=None):
+    chunk = Mock()
+    chunk.usage = usage
+    chunk.choices = [] if content is None else [Mock(delta=Mock(content=content))]
+    return chunk
+
+def test_stream_message_yields_fragments_and_records_session():
+    # Given
+    system_prompt = "You are a helpful assistant."
+    client = OpenAIClient(system_prompt=system_prompt, api_key="test-key")
+    stream = MagicMock()
+    stream.__enter__.return_value = stream
+    stream.__iter__.return_value = iter([
+        _stream_chunk("Hel"),
+        _stream_chunk("lo!"),
+        _stream_chunk(usage=Mock(prompt_tokens=9, completion_tokens=2)),
+    ])
+    
+    with patch.object(client._client.chat.completions, 'create', return_value=stream) as mock_create:
+        # When
+        fragments = list(client.stream_message("Hi!", session_id="abc"))
+        
+        # Then
+        assert fragments == ["Hel", "lo!"]
+        assert mock_create.call_args.kwargs["stream"] is True
+        assert client.session_messages("abc")[-1] == {"role": "assistant", "content": "Hello!"}
+        assert client.conversations.stats("abc")["prompt_tokens"] == 9
+
+def test_send_message_goes_through_the_transport_with_per_call_timeout():
+    # Given
+    transport = Mock()
+    transport.call.side_effect = lambda send, estimated_tokens: send()
+    client = OpenAIClient(system_prompt="You are a helpful assistant.", api_key="test-key", transport=transport)
+    
+    with patch.object(client._client.chat.completions, 'create') as mock_create:
+        mock_response = Mock()
+        mock_response.choices = [Mock(message=Mock(content="Hello!"))]
+        mock_response.usage = Mock(total_tokens=40)
+        mock_create.return_value = mock_response
+        
+        # When
+        client.send_message("Hi!", timeout=12)
+        
+        # Then the call is rate limited, bounded by the timeout and reconciled with actual usage
+        estimated_tokens = transport.call.call_args.args[1]
+        assert mock_create.call_args.kwargs["timeout"].read == 12
+        transport.record_usage.assert_called_once_with(estimated_tokens, 40)
+
+
+def test_send_message_passes_the_response_format():
+    # Given
+    client = OpenAIClient(system_prompt="You are a helpful assistant.", api_key="test-key")
+    
+    with patch.object(client._client.chat.completions, 'create') as mock_create:
+        mock_response = Mock()
+        mock_response.choices = [Mock(message=Mock(content='{"logic": "x"}'))]
+        mock_response.usage = None
+        mock_create.return_value = mock_response
+        
+        # When
+        client.send_message("Hi!", response_format={"type": "json_object"})
+        
+        # Then
+        assert mock_create.call_args.kwargs["response_format"] == {"type": "json_object"}
+
+
+def test_send_message_passes_a_max_tokens_limit():
+    # Given
+    client = OpenAIClient(system_prompt="You are a helpful assistant.", api_key="test-key")
+    
+    with patch.object(client._client.chat.completions, 'create') as mock_create:
+        mock_response = Mock()
+        mock_response.choices = [Mock(message=Mock(content="Hello"))]
+        mock_response.usage = None
+        mock_create.return_value = mock_response
+        
+        # When
+        client.send_message("Hi!", max_tokens=256)
+        
+        # Then
+        assert mock_create.call_args.kwargs["max_tokens"] == 256
+
+def test_stalled_send_message_is_hedged_on_the_fallback_model():
+    # Given
+    from app.services.hedging import HedgePolicy
+    transport = Mock()
+    transport.call.side_effect = lambda send, estimated_tokens: send()
+    policy = HedgePolicy(enabled=True, max_delay=0.05, fallback_model="gpt-4o-mini")
+    client = OpenAIClient(system_prompt="You are a helpful assistant.", api_key="test-key", model="gpt-4o",
+                          transport=transport, hedge_policy=policy)
+    stalled = MagicMock()
+    stalled.__enter__.return_value = stalled
+    released = threading.Event()
+    stalled.__iter__.side_effect = lambda: (released.wait(5), iter([]))[1]
+    stalled.close.side_effect = lambda: released.set()
+    fast = MagicMock()
+    fast.__enter__.return_value = fast
+    fast.__iter__.return_value = iter([_stream_chunk("Hello!"), _stream_chunk(usage=None)])
+    
+    def create(**kwargs):
+        return stalled if kwargs["model"] == "gpt-4o" else fast
+    
+    with patch.object(client._client.chat.completions, 'create', side_effect=create):
+        # When
+        response = client.send_message("Hi!")
+        
+        # Then
+        assert response == "Hello!"
+        assert released.wait(1)
+        assert policy.tracker.count("gpt-4o-mini") == 1
+        # The stalled call's reservation is settled too, down to the prompt it sent
+        for _ in range(100):
+            if transport.record_usage.call_count == 2:
+                break
+            threading.Event().wait(0.01)
+        settled = [recorded.args for recorded in transport.record_usage.call_args_list]
+        estimated = transport.call.call_args.args[1]
+        assert [reserved for reserved, _ in settled] == [estimated, estimated]
+        # The winner reported no usage and keeps its estimate; the loser is charged its prompt only
+        assert max(actual for _, actual in settled) == estimated
+        assert 0 < min(actual for _, actual in settled) < estimated
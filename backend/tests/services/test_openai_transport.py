@@ -0,0 +1,239 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from app.core.exceptions import UpstreamRateLimitError, UpstreamTimeoutError
+from app.services.openai_transport import (
+    OpenAITransport,
+    RateLimiter,
+    RetryPolicy,
+    TokenBucket,
+    retry_after_seconds,
+)
+
+_REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _rate_limit_error(headers=None):
+    response = httpx.Response(429, headers=headers or {}, request=_REQUEST)
+    return openai.RateLimitError("Rate limit reached", response=response, body=None)
+
+
+def _server_error():
+    response = httpx.Response(503, request=_REQUEST)
+    return openai.InternalServerError("Service unavailable", response=response, body=None)
+
+
+def _transport(clock, max_retries=3, requests_per_minute=0, tokens_per_minute=0, max_delay=30.0):
+    return OpenAITransport(
+        limiter=RateLimiter(requests_per_minute, tokens_per_minute, clock=clock, sleep=clock.sleep),
+        retry_policy=RetryPolicy(max_retries=max_retries, base_delay=1.0, max_delay=max_delay, random_fn=lambda: 0.5),
+        wait_timeout=60.0,
+        sleep=clock.sleep,
+    )
+
+
+def _failing(*errors, result="ok"):
+    errors = list(errors)
+    calls = []
+
+    def send():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    return send, calls
+
+
+def test_token_bucket_reports_wait_until_refilled():
+    clock = FakeClock()
+    bucket = TokenBucket(capacity=60, refill_per_second=1, clock=clock)
+
+    assert bucket.reserve(50) == 0
+    assert bucket.reserve(20) == pytest.approx(10.0)
+    clock.now += 10
+    assert bucket.reserve(20) == 0
+
+
+def test_token_bucket_lets_oversized_requests_through_when_full():
+    clock = FakeClock()
+    bucket = TokenBucket(capacity=10, refill_per_second=1, clock=clock)
+
+    assert bucket.reserve(25) == 0
+    # The overdraft is repaid before anything else goes through.
+    assert bucket.reserve(1) == pytest.approx(16.0)
+
+
+def test_rate_limiter_paces_requests_per_minute():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=0, clock=clock, sleep=clock.sleep)
+
+    limiter.acquire(100, timeout=60)
+    limiter.acquire(100, timeout=60)
+    limiter.acquire(100, timeout=60)
+
+    assert sum(clock.sleeps) == pytest.approx(30.0)
+
+
+def test_rate_limiter_fails_fast_when_budget_cannot_be_met_in_time():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=600, clock=clock, sleep=clock.sleep)
+    limiter.acquire(600, timeout=1)
+
+    with pytest.raises(UpstreamRateLimitError) as exc_info:
+        limiter.acquire(300, timeout=1)
+
+    assert exc_info.value.retry_after == pytest.approx(30.0)
+    assert clock.sleeps == []
+
+
+def test_rate_limiter_reconciles_actual_usage():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=600, clock=clock, sleep=clock.sleep)
+    limiter.acquire(600, timeout=0)
+
+    # The call used far less than estimated, so the difference is available again.
+    limiter.record_usage(estimated=600, actual=100)
+    limiter.acquire(500, timeout=0)
+
+
+def test_rate_limiter_pause_holds_back_every_caller():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=0, clock=clock, sleep=clock.sleep)
+
+    limiter.pause(5)
+    limiter.acquire(1, timeout=10)
+
+    assert clock.sleeps == [5]
+
+
+def test_retry_after_headers_are_honored():
+    assert retry_after_seconds(_rate_limit_error({"retry-after": "12"})) == 12
+    assert retry_after_seconds(_rate_limit_error({"retry-after-ms": "250"})) == pytest.approx(0.25)
+    assert retry_after_seconds(_rate_limit_error()) is None
+    assert retry_after_seconds(ValueError("no response")) is None
+
+
+def test_retry_policy_backs_off_exponentially_with_jitter():
+    policy = RetryPolicy(max_retries=3, base_delay=1.0, max_delay=3.0, random_fn=lambda: 0.5)
+    error = _server_error()
+
+    assert [policy.delay(attempt, error) for attempt in (1, 2, 3, 4)] == [0.5, 1.0, 1.5, None]
+    assert policy.delay(1, ValueError("not retryable")) is None
+    assert policy.delay(1, _rate_limit_error({"retry-after": "2"})) == 2
+    assert policy.delay(1, _rate_limit_error({"retry-after": "60"})) is None
+
+
+def test_transport_retries_transient_failures():
+    clock = FakeClock()
+    send, calls = _failing(_server_error(), _server_error())
+
+    assert _transport(clock).call(send, estimated_tokens=10) == "ok"
+    assert len(calls) == 3
+    assert clock.sleeps == [0.5, 1.0]
+
+
+def test_transport_pauses_the_process_on_rate_limits():
+    clock = FakeClock()
+    transport = _transport(clock)
+    send, calls = _failing(_rate_limit_error({"retry-after": "4"}))
+
+    assert transport.call(send, estimated_tokens=10) == "ok"
+    # The limiter pause and the retry delay overlap rather than adding up.
+    assert sum(clock.sleeps) == pytest.approx(4.0)
+
+
+def test_transport_raises_upstream_rate_limit_error_when_retries_run_out():
+    clock = FakeClock()
+    send, _ = _failing(*[_rate_limit_error({"retry-after": "2"})] * 3)
+
+    with pytest.raises(UpstreamRateLimitError) as exc_info:
+        _transport(clock, max_retries=2).call(send, estimated_tokens=10)
+
+    assert exc_info.value.retry_after == 2
+
+
+def test_transport_raises_upstream_timeout_error_when_retries_run_out():
+    clock = FakeClock()
+    send, calls = _failing(openai.APITimeoutError(request=_REQUEST), openai.APITimeoutError(request=_REQUEST))
+
+    with pytest.raises(UpstreamTimeoutError):
+        _transport(clock, max_retries=1).call(send, estimated_tokens=10)
+    assert len(calls) == 2
+
+
+def test_transport_does_not_retry_client_errors():
+    clock = FakeClock()
+    error = openai.BadRequestError("bad request", response=httpx.Response(400, request=_REQUEST), body=None)
+    send, calls = _failing(error)
+
+    with pytest.raises(openai.BadRequestError):
+        _transport(clock).call(send, estimated_tokens=10)
+    assert len(calls) == 1
+
+
+def test_transport_retries_coroutine_calls_without_blocking():
+    clock = FakeClock()
+    errors = [_server_error()]
+
+    async def async_sleep(seconds):
+        clock.sleep(seconds)
+
+    transport = OpenAITransport(
+        limiter=RateLimiter(0, 0, clock=clock, sleep=clock.sleep, async_sleep=async_sleep),
+        retry_policy=RetryPolicy(max_retries=3, base_delay=1.0, max_delay=30.0, random_fn=lambda: 0.5),
+        wait_timeout=60.0,
+        sleep=lambda seconds: pytest.fail("blocking sleep in async call"),
+        async_sleep=async_sleep,
+    )
+
+    async def send():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert asyncio.run(transport.call_async(send, estimated_tokens=10)) == "ok"
+    assert clock.sleeps == [0.5]
+
+
+def test_failed_attempts_give_their_token_reservation_back():
+    clock = FakeClock()
+    transport = _transport(clock, max_retries=3, tokens_per_minute=6000)
+    send, calls = _failing(*[_server_error()] * 4)
+
+    with pytest.raises(openai.InternalServerError):
+        transport.call(send, estimated_tokens=1000)
+    assert len(calls) == 4
+
+    # The whole budget is available again: the next call is not held back
+    clock.sleeps.clear()
+    transport.limiter.acquire(6000, timeout=0)
+    assert clock.sleeps == []
+
+
+def test_failed_coroutine_calls_give_their_token_reservation_back():
+    clock = FakeClock()
+    transport = _transport(clock, tokens_per_minute=6000)
+
+    async def send():
+        raise openai.BadRequestError("bad request", response=httpx.Response(400, request=_REQUEST), body=None)
+
+    with pytest.raises(openai.BadRequestError):
+        asyncio.run(transport.call_async(send, estimated_tokens=5000))
+    transport.limiter.acquire(6000, timeout=0)
@@ -0,0 +1,154 @@
+import pytest
+
+import json
+
+from app.services.section_parser import (
+    IncrementalJSONSectionParser,
+    IncrementalResponseParser,
+    IncrementalSectionParser,
+    format_sections,
+    format_structured,
+    missing_sections,
+    parse_response,
+    parse_sections,
+    parse_structured,
+    section_schema,
+)
+
+RESPONSE = """Preamble that belongs to no section
+# Logic
+Prints a greeting.
+# Unit Test
+def test_hello():
+    assert hello() == 'Hello'
+# Python Code
+def hello():
+    return 'Hello'
+"""
+
+EXPECTED = {
+    "logic": "Prints a greeting.",
+    "unit_tests": "def test_hello():\n    assert hello() == 'Hello'",
+    "python_code": "def hello():\n    return 'Hello'",
+}
+
+
+def _parse_in_chunks(text, size):
+    parser = IncrementalSectionParser()
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start:start + size]))
+    events.extend(parser.close())
+    return events
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(RESPONSE)])
+def test_incremental_parse_is_independent_of_chunking(size):
+    events = _parse_in_chunks(RESPONSE, size)
+    
+    assert dict(events) == EXPECTED
+    assert [field for field, _ in events] == ["logic", "unit_tests", "python_code"]
+
+
+def test_section_is_emitted_when_next_header_arrives():
+    parser = IncrementalSectionParser()
+    
+    assert parser.feed("# Logic\nDoes things\n# Uni") == []
+    assert parser.feed("t Test\n") == [("logic", "Does things")]
+    assert parser.feed("def test_x(): pass") == []
+    assert parser.close() == [("unit_tests", "def test_x(): pass")]
+
+
+def test_response_without_headers_has_no_sections():
+    parser = IncrementalSectionParser()
+    
+    assert parser.feed("no sections here") == []
+    assert parser.close() == []
+
+
+def test_parse_sections_fills_missing_sections():
+    assert parse_sections("# Python Code\nx = 1") == {"logic": "", "unit_tests": "", "python_code": "x = 1"}
+
+
+def test_format_sections_round_trips():
+    assert parse_sections(format_sections(EXPECTED)) == EXPECTED
+
+
+STRUCTURED = json.dumps({
+    "logic": "Prints a \"greeting\" \u00e9 \U0001F600.",
+    "unit_tests": "def test_hello():\n    assert hello() == 'Hello'",
+    "python_code": "def hello():\n    return {'a': [1]}",
+})
+
+
+def _parse_json_in_chunks(text, size, parser_class=IncrementalJSONSectionParser):
+    parser = parser_class()
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start:start + size]))
+    events.extend(parser.close())
+    return events
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(STRUCTURED)])
+def test_incremental_json_parse_is_independent_of_chunking(size):
+    events = _parse_json_in_chunks(STRUCTURED, size)
+    
+    assert dict(events) == json.loads(STRUCTURED)
+    assert [field for field, _ in events] == ["logic", "unit_tests", "python_code"]
+
+
+def test_json_section_is_emitted_when_its_string_closes():
+    parser = IncrementalJSONSectionParser()
+    
+    assert parser.feed('{"logic": "Does \\') == []
+    assert parser.feed('"things\\"", "pyth') == [("logic", 'Does "things"')]
+    assert parser.feed('on_code": "x = 1"}') == [("python_code", "x = 1")]
+    assert parser.complete
+
+
+def test_json_parser_skips_preamble_unknown_keys_and_other_values():
+    response = '```json\n{"notes": {"a": ["}", 1]}, "score": 0.5, "done": true, "python_code": "x"}\n```'
+    
+    assert parse_structured(response) == {"logic": "", "unit_tests": "", "python_code": "x"}
+
+
+def test_truncated_json_keeps_only_completed_sections():
+    truncated = STRUCTURED[:STRUCTURED.index('"python_code"') + 30]
+    
+    sections = parse_structured(truncated)
+    
+    assert sections["logic"] and sections["unit_tests"]
+    assert sections["python_code"] == ""
+    assert missing_sections(sections) == ["python_code"]
+
+
+def test_format_structured_round_trips():
+    assert parse_structured(format_structured(EXPECTED)) == EXPECTED
+
+
+@pytest.mark.parametrize("response", [RESPONSE, format_structured(EXPECTED), "\n  " + format_structured(EXPECTED)])
+def test_response_format_is_detected(response):
+    assert parse_response(response) == EXPECTED
+    assert dict(_parse_json_in_chunks(response, 5, IncrementalResponseParser)) == EXPECTED
+
+
+@pytest.mark.parametrize("size", [1, 2, 5, 64])
+def test_fenced_responses_are_parsed_in_their_own_format(size):
+    fenced_sections = "```markdown\n" + RESPONSE + "\n```"
+    fenced_json = "```json\n" + format_structured(EXPECTED) + "\n```"
+    
+    sections = parse_response(fenced_sections)
+    assert sections["logic"] == EXPECTED["logic"]
+    assert sections["python_code"].startswith(EXPECTED["python_code"])
+    assert dict(_parse_json_in_chunks(fenced_sections, size, IncrementalResponseParser)) == sections
+    assert parse_response(fenced_json) == EXPECTED
+    assert dict(_parse_json_in_chunks(fenced_json, size, IncrementalResponseParser)) == EXPECTED
+
+
+def test_section_schema_requires_the_given_fields_only():
+    schema = section_schema(["unit_tests"])
+    
+    assert schema["required"] == ["unit_tests"]
+    assert list(schema["properties"]) == ["unit_tests"]
+    assert schema["additionalProperties"] is False
@@ -0,0 +1,108 @@
+from app.services.similarity_index import SimilarityIndex, canonical_tokens, minhash, shingles
+
+
+STACK = """
+package body Int_Stacks is
+   procedure Push (S : in out Int_Stack; Item : Integer) is
+   begin
+      if S.Top = 100 then
+         raise Stack_Full with "stack is full";
+      end if;
+      S.Top := S.Top + 1;
+      S.Items (S.Top) := Item;
+   end Push;
+
+   procedure Pop (S : in out Int_Stack; Item : out Integer) is
+   begin
+      if S.Top = 0 then
+         raise Stack_Empty;
+      end if;
+      Item := S.Items (S.Top);
+      S.Top := S.Top - 1;
+   end Pop;
+end Int_Stacks;
+"""
+
+# The same unit copy-pasted for another element type: only names and literals differ
+RENAMED = (STACK.replace("Int_Stack", "Float_Stack").replace("Integer", "Float")
+           .replace("100", "250").replace("stack is full", "no room"))
+
+UNRELATED = """
+function Checksum (Data : Byte_Array) return Unsigned_32 is
+   Sum : Unsigned_32 := 0;
+begin
+   for B of Data loop
+      Sum := Rotate_Left (Sum, 5) xor Unsigned_32 (B);
+   end loop;
+   return Sum;
+end Checksum;
+"""
+
+
+def make_index(tmp_path, threshold=0.85, max_entries=100):
+    return SimilarityIndex(str(tmp_path / "similarity.sqlite3"), threshold=threshold, max_entries=max_entries)
+
+
+def test_canonical_tokens_ignore_names_literals_and_comments():
+    first = canonical_tokens('X := Y + 1; -- bump\nPut_Line ("a");')
+    second = canonical_tokens('Count := Total + 42;\nLog ("something else");')
+    assert first == second
+    assert first[:4] == ["<id>", ":=", "<id>", "+"]
+    assert minhash(shingles(first)) == minhash(shingles(second))
+
+
+def test_near_duplicate_is_adapted_from_the_stored_conversion(tmp_path):
+    index = make_index(tmp_path)
+    index.add("stack", STACK, "stack response", "gpt-4", "prompt")
+    index.add("checksum", UNRELATED, "checksum response", "gpt-4", "prompt")
+
+    match = index.find(RENAMED, "gpt-4", "prompt")
+
+    assert match.key == "stack"
+    assert match.response == "stack response"
+    assert match.similarity >= 0.85
+    assert match.exact is False
+
+
+def test_formatting_only_difference_is_an_exact_match(tmp_path):
+    index = make_index(tmp_path)
+    index.add("stack", STACK, "stack response", "gpt-4", "prompt")
+
+    reformatted = "-- Copied from the int stacks\n" + STACK.replace("   ", "\t")
+    assert index.find(reformatted, "gpt-4", "prompt").exact is True
+    # Converted with dependency context, the stored response is only a reference
+    assert index.find(reformatted, "gpt-4", "prompt", contextual=True).exact is False
+
+
+def test_no_match_across_models_or_below_threshold(tmp_path):
+    index = make_index(tmp_path)
+    index.add("stack", STACK, "stack response", "gpt-4", "prompt")
+
+    assert index.find(RENAMED, "gpt-4o", "prompt") is None
+    assert index.find(RENAMED, "gpt-4", "another prompt") is None
+    assert index.find(UNRELATED, "gpt-4", "prompt") is None
+
+
+def test_index_keeps_the_most_recently_matched_units(tmp_path):
+    clock = iter(range(100))
+    index = SimilarityIndex(str(tmp_path / "similarity.sqlite3"), threshold=0.85, max_entries=2,
+                            clock=lambda: next(clock))
+    index.add("stack", STACK, "stack response", "gpt-4", "prompt")
+    index.add("checksum", UNRELATED, "checksum response", "gpt-4", "prompt")
+    index.find(RENAMED, "gpt-4", "prompt")
+    index.add("other", "procedure Noop is begin null; end Noop;", "noop response", "gpt-4", "prompt")
+
+    assert index.find(RENAMED, "gpt-4", "prompt").key == "stack"
+    assert index.find(UNRELATED, "gpt-4", "prompt") is None
+
+
+def test_deleted_and_cleared_units_no_longer_match(tmp_path):
+    index = make_index(tmp_path)
+    index.add("stack", STACK, "stack response", "gpt-4", "prompt")
+    index.add("checksum", UNRELATED, "checksum response", "gpt-4", "prompt")
+
+    assert index.delete("stack") is True
+    assert index.delete("stack") is False
+    assert index.find(RENAMED, "gpt-4", "prompt") is None
+    assert index.clear() == 1
+    assert index.find(UNRELATED, "gpt-4", "prompt") is None
@@ -0,0 +1,194 @@
+import asyncio
+import fcntl
+import threading
+import time
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+class BlockingCall:
+    """A call that blocks until released, counting how often it runs."""
+
+    def __init__(self, result="converted", error=None):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self._result = result
+        self._error = error
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+def _run_in_threads(single_flight, call, count):
+    results, errors = [], []
+
+    def run():
+        try:
+            results.append(single_flight.do("key", call))
+        except Exception as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=run)
+    leader.start()
+    call.started.wait(5)
+    followers = [threading.Thread(target=run) for _ in range(count - 1)]
+    for thread in followers:
+        thread.start()
+    # Give the followers time to start waiting on the leader
+    time.sleep(0.2)
+    call.release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+    return results, errors
+
+
+def test_concurrent_identical_calls_share_one_call():
+    call = BlockingCall()
+
+    results, errors = _run_in_threads(SingleFlight(directory=None, wait_timeout=5), call, count=4)
+
+    assert call.calls == 1
+    assert errors == []
+    assert sorted(results) == [("converted", False)] + [("converted", True)] * 3
+
+
+def test_errors_are_shared_with_waiting_callers():
+    call = BlockingCall(error=ValueError("upstream failed"))
+
+    results, errors = _run_in_threads(SingleFlight(directory=None, wait_timeout=5), call, count=3)
+
+    assert call.calls == 1
+    assert results == []
+    assert [str(e) for e in errors] == ["upstream failed"] * 3
+
+
+def test_calls_after_completion_run_again():
+    single_flight = SingleFlight(directory=None, wait_timeout=5)
+    calls = []
+
+    for _ in range(2):
+        single_flight.do("key", lambda: calls.append(1) or "converted")
+
+    assert len(calls) == 2
+
+
+def test_disabled_single_flight_runs_every_call():
+    call = BlockingCall()
+    call.release.set()
+
+    single_flight = SingleFlight(directory=None, wait_timeout=5, enabled=False)
+
+    assert single_flight.do("key", call) == ("converted", False)
+    assert single_flight.do("key", call) == ("converted", False)
+    assert call.calls == 2
+
+
+def _other_worker_holds_lock(tmp_path, key="key"):
+    # flock locks belong to the open file, so a second open() stands in for another worker
+    lock_file = open(tmp_path / f"{key}.lock", "a")
+    fcntl.flock(lock_file, fcntl.LOCK_EX)
+    return lock_file
+
+
+def _do_in_thread(single_flight, fn):
+    outcome = {}
+    thread = threading.Thread(target=lambda: outcome.setdefault("result", single_flight.do("key", fn)))
+    thread.start()
+    return thread, outcome
+
+
+def test_waits_for_the_result_of_another_worker(tmp_path):
+    single_flight = SingleFlight(directory=str(tmp_path), wait_timeout=5, poll_interval=0.01)
+    lock_file = _other_worker_holds_lock(tmp_path)
+    calls = []
+
+    thread, outcome = _do_in_thread(single_flight, lambda: calls.append(1) or "mine")
+    time.sleep(0.1)
+    (tmp_path / "key.result").write_text("theirs")
+    fcntl.flock(lock_file, fcntl.LOCK_UN)
+    lock_file.close()
+    thread.join(5)
+
+    assert outcome["result"] == ("theirs", True)
+    assert calls == []
+
+
+def test_runs_the_call_when_the_other_worker_leaves_no_result(tmp_path):
+    single_flight = SingleFlight(directory=str(tmp_path), wait_timeout=5, poll_interval=0.01)
+    lock_file = _other_worker_holds_lock(tmp_path)
+
+    thread, outcome = _do_in_thread(single_flight, lambda: "mine")
+    time.sleep(0.1)
+    fcntl.flock(lock_file, fcntl.LOCK_UN)
+    lock_file.close()
+    thread.join(5)
+
+    assert outcome["result"] == ("mine", False)
+    # The result is left for workers that were waiting on this one
+    assert (tmp_path / "key.result").read_text() == "mine"
+
+
+def test_stops_waiting_for_another_worker_after_the_timeout(tmp_path):
+    single_flight = SingleFlight(directory=str(tmp_path), wait_timeout=0.1, poll_interval=0.01)
+    lock_file = _other_worker_holds_lock(tmp_path)
+    try:
+        assert single_flight.do("key", lambda: "mine") == ("mine", False)
+    finally:
+        lock_file.close()
+
+
+def test_expired_results_are_not_shared(tmp_path):
+    now = [1000.0]
+    single_flight = SingleFlight(directory=str(tmp_path), wait_timeout=5, result_ttl=60,
+                                 poll_interval=0.01, clock=lambda: now[0])
+    (tmp_path / "key.result").write_text("stale")
+    lock_file = _other_worker_holds_lock(tmp_path)
+    now[0] = time.time() + 120
+
+    thread, outcome = _do_in_thread(single_flight, lambda: "fresh")
+    time.sleep(0.05)
+    fcntl.flock(lock_file, fcntl.LOCK_UN)
+    lock_file.close()
+    thread.join(5)
+
+    assert outcome["result"] == ("fresh", False)
+
+
+def test_concurrent_identical_coroutines_share_one_call():
+    single_flight = SingleFlight(directory=None, wait_timeout=5)
+    calls = []
+
+    async def convert():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "converted"
+
+    async def run():
+        return await asyncio.gather(*(single_flight.do_async("key", convert) for _ in range(3)))
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert sorted(results) == [("converted", False), ("converted", True), ("converted", True)]
+
+
+def test_coroutine_errors_are_shared():
+    single_flight = SingleFlight(directory=None, wait_timeout=5)
+
+    async def convert():
+        await asyncio.sleep(0.05)
+        raise ValueError("upstream failed")
+
+    async def run():
+        return await asyncio.gather(*(single_flight.do_async("key", convert) for _ in range(2)),
+                                    return_exceptions=True)
+
+    assert [str(e) for e in asyncio.run(run())] == ["upstream failed"] * 2
@@ -0,0 +1,88 @@
+import json
+import os
+
+from app.services.tree_conversion import MANIFEST_NAME, ConversionManifest, convert_tree, find_sources
+
+EXTENSIONS = {".ada", ".adb", ".ads"}
+
+
+class FakeConverter:
+    model = "gpt-test"
+    system_prompt = "Convert"
+
+    def __init__(self, fail_on=()):
+        self.converted = []
+        self._fail_on = fail_on
+
+    def convert(self, ada_code):
+        self.converted.append(ada_code)
+        if any(marker in ada_code for marker in self._fail_on):
+            raise RuntimeError("model unavailable")
+        return f"# Logic\nlogic\n# Unit Test\ndef test_it(): ...\n# Python Code\n# {ada_code.strip()}"
+
+
+def _write(root, path, content):
+    full_path = os.path.join(root, path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, "w", encoding="utf-8") as output:
+        output.write(content)
+
+
+def _tree(tmp_path):
+    source = tmp_path / "src"
+    _write(source, "a.adb", "procedure A is begin null; end A;")
+    _write(source, "pkg/b.ads", "package B is end B;")
+    _write(source, "pkg/readme.txt", "not Ada")
+    _write(source, ".git/c.adb", "procedure C is begin null; end C;")
+    return str(source)
+
+
+def test_find_sources_skips_hidden_and_excluded_directories(tmp_path):
+    source = _tree(tmp_path)
+    _write(source, "out/d.adb", "procedure D is begin null; end D;")
+
+    assert find_sources(source, EXTENSIONS, exclude=[os.path.join(source, "out")]) == ["a.adb", "pkg/b.ads"]
+
+
+def test_tree_is_converted_and_recorded_in_the_manifest(tmp_path):
+    source, output = _tree(tmp_path), str(tmp_path / "out")
+
+    progress = convert_tree(source, output, FakeConverter(), concurrency=2, allowed_extensions=EXTENSIONS)
+
+    assert (progress.succeeded, progress.failed, progress.skipped) == (2, 0, 0)
+    assert (tmp_path / "out" / "pkg" / "b_spec.py").read_text() == "# package B is end B;"
+    assert (tmp_path / "out" / "pkg" / "test_b_spec.py").read_text() == "def test_it(): ..."
+    assert (tmp_path / "out" / "a.logic.md").read_text() == "logic"
+    entries = ConversionManifest(os.path.join(output, MANIFEST_NAME)).entries()
+    assert [entry["filename"] for entry in entries] == ["a.adb", "pkg/b.ads"]
+    assert all(entry["status"] == "succeeded" for entry in entries)
+
+
+def test_rerun_only_converts_changed_and_failed_files(tmp_path):
+    source, output = _tree(tmp_path), str(tmp_path / "out")
+    convert_tree(source, output, FakeConverter(fail_on=["package B"]), concurrency=2, allowed_extensions=EXTENSIONS)
+    _write(source, "c.adb", "procedure C is begin null; end C;")
+
+    converter = FakeConverter()
+    progress = convert_tree(source, output, converter, concurrency=2, allowed_extensions=EXTENSIONS)
+
+    assert sorted(converter.converted) == ["package B is end B;", "procedure C is begin null; end C;"]
+    assert (progress.skipped, progress.succeeded, progress.failed) == (1, 2, 0)
+
+
+def test_interrupted_manifest_resumes_from_its_complete_lines(tmp_path):
+    source, output = _tree(tmp_path), str(tmp_path / "out")
+    convert_tree(source, output, FakeConverter(), concurrency=1, allowed_extensions=EXTENSIONS)
+    manifest_path = os.path.join(output, MANIFEST_NAME)
+    with open(manifest_path, encoding="utf-8") as manifest:
+        first_line = manifest.readline()
+    # The run was killed while writing the second entry
+    with open(manifest_path, "w", encoding="utf-8") as manifest:
+        manifest.write(first_line + '{"filename": "pkg/b.ads", "sta')
+
+    converter = FakeConverter()
+    progress = convert_tree(source, output, converter, concurrency=1, allowed_extensions=EXTENSIONS)
+
+    assert json.loads(first_line)["filename"] == "a.adb"
+    assert converter.converted == ["package B is end B;"]
+    assert (progress.skipped, progress.succeeded) == (1, 1)
@@ -0,0 +1,85 @@
+import io
+
+import pytest
+
+from app.core.exceptions import FileUploadError
+from app.services.uploads import (
+    DiscardedUpload,
+    TextUploadStream,
+    decode_upload,
+    spooled_file,
+    upload_container,
+)
+
+ADA = {".ada", ".adb", ".ads"}
+ARCHIVES = (".zip", ".tar.gz")
+
+
+def test_text_stream_decodes_characters_split_across_chunks():
+    stream = TextUploadStream("hello.adb")
+    data = '-- Grüße\nPut_Line ("π");\n'.encode("utf-8")
+
+    for index in range(len(data)):
+        stream.write(data[index:index + 1])
+    stream.seek(0)
+
+    assert stream.text() == '-- Grüße\nPut_Line ("π");\n'
+    assert stream.size == len(data)
+    assert stream.read() == data
+
+
+def test_strict_stream_rejects_the_first_invalid_chunk():
+    stream = TextUploadStream("bad.adb", strict=True)
+    stream.write(b"procedure P is\n")
+
+    with pytest.raises(FileUploadError, match=r"bad.adb: .*UTF-8.*offset 15"):
+        stream.write(b"\xff\xfe")
+
+
+def test_lenient_stream_discards_the_rest_and_reports_the_error():
+    stream = TextUploadStream("bad.adb", strict=False)
+    stream.write(b"\xff")
+    stream.write(b"more bytes that are never decoded")
+
+    assert stream.error is not None
+    with pytest.raises(FileUploadError, match="UTF-8"):
+        stream.text()
+
+
+def test_binary_and_truncated_uploads_are_rejected():
+    binary = TextUploadStream(strict=False)
+    binary.write(b"PK\x03\x04\x00\x00")
+    truncated = TextUploadStream(strict=False)
+    truncated.write("π".encode("utf-8")[:1])
+
+    for stream in (binary, truncated):
+        with pytest.raises(FileUploadError):
+            stream.text()
+
+
+def test_container_is_chosen_by_filename():
+    def container(filename, strict=True):
+        return upload_container(filename, ADA, ARCHIVES, strict=strict, spool_max_memory=1024)
+
+    assert isinstance(container("Hello.ADB"), TextUploadStream)
+    assert not isinstance(container("project.tar.gz"), (TextUploadStream, DiscardedUpload))
+    assert isinstance(container("notes.txt", strict=False), DiscardedUpload)
+    with pytest.raises(FileUploadError, match="not an Ada source file"):
+        container("notes.txt")
+
+
+def test_spooled_archives_move_to_disk_past_the_memory_limit(tmp_path):
+    spool = spooled_file(max_memory=16, directory=str(tmp_path / "spool"))
+
+    spool.write(b"x" * 8)
+    assert not spool._rolled
+    spool.write(b"x" * 16)
+    assert spool._rolled
+    spool.seek(0)
+    assert spool.read() == b"x" * 24
+
+
+def test_decode_upload_reads_other_streams_in_chunks():
+    assert decode_upload(io.BytesIO("naïve".encode("utf-8"))) == "naïve"
+    with pytest.raises(FileUploadError):
+        decode_upload(io.BytesIO(b"\xc3("))
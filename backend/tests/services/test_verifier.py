@@ -0,0 +1,122 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from app.services.conversion_cache import MemoryCacheTier, SqliteCacheTier
+from app.services.verifier import VerificationResult, Verifier, verification_key
+
+CODE = "def add(a, b):\n    return a + b\n"
+
+
+@pytest.fixture
+def verifier():
+    return Verifier(enabled=True, workers=2, timeout_seconds=5, cpu_seconds=5, memory_mb=256,
+                    memory_cache=MemoryCacheTier(max_entries=16, ttl_seconds=60))
+
+
+def test_passing_pytest_style_tests_that_import_the_code_by_any_name(verifier):
+    tests = "from converted import add\n\n\ndef test_add():\n    assert add(1, 2) == 3\n"
+
+    result = verifier.verify(CODE, tests)
+
+    assert result.status == "passed"
+    assert result.tests_run == 1
+    assert result.duration_ms > 0
+    assert not result.cached
+
+
+def test_failing_unittest_case(verifier):
+    tests = (
+        "import unittest\n\n\nclass TestAdd(unittest.TestCase):\n"
+        "    def test_add(self):\n        self.assertEqual(add(2, 2), 4)\n\n"
+        "    def test_wrong(self):\n        self.assertEqual(add(2, 2), 5)\n"
+    )
+
+    result = verifier.verify(CODE, tests)
+
+    assert result.status == "failed"
+    assert (result.tests_run, result.failures, result.errors) == (2, 1, 0)
+    assert "test_wrong" in result.output
+
+
+def test_code_that_does_not_load_is_an_error(verifier):
+    result = verifier.verify("def broken(:\n", "def test_nothing():\n    pass\n")
+
+    assert result.status == "error"
+    assert "SyntaxError" in result.output
+
+
+def test_runaway_tests_time_out_and_are_not_cached():
+    verifier = Verifier(enabled=True, timeout_seconds=1, memory_cache=MemoryCacheTier(max_entries=16, ttl_seconds=60))
+    tests = "def test_forever():\n    while True:\n        pass\n"
+
+    result = verifier.verify(CODE, tests)
+
+    assert result.status == "timeout"
+    assert not verifier.verify(CODE, tests).cached
+
+
+def test_memory_is_limited(verifier):
+    result = verifier.verify(CODE, "def test_hog():\n    blob = bytearray(1024 * 1024 * 1024)\n")
+
+    assert result.status == "failed"
+    assert "MemoryError" in result.output
+
+
+def test_generated_code_cannot_read_server_secrets_or_reach_the_network(verifier, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-sandbox-probe")
+    code = (
+        "import os\n\n"
+        "def secret_sources():\n"
+        "    for path in ('/proc/self/environ', f'/proc/{os.getppid()}/environ', '/proc/1/environ'):\n"
+        "        try:\n"
+        "            with open(path, 'rb') as source:\n"
+        "                yield source.read()\n"
+        "        except OSError:\n"
+        "            pass\n"
+        "    yield repr(dict(os.environ)).encode()\n"
+    )
+    tests = (
+        "import socket\n\n"
+        "def test_no_api_key():\n"
+        "    assert not [source for source in secret_sources() if b'OPENAI' in source]\n\n"
+        "def test_no_network():\n"
+        "    try:\n"
+        "        socket.create_connection(('1.1.1.1', 443), timeout=1)\n"
+        "    except OSError:\n"
+        "        return\n"
+        "    raise AssertionError('connected')\n"
+    )
+
+    result = verifier.verify(code, tests)
+
+    assert result.status == "passed", result.output
+    assert result.tests_run == 2
+    assert "sk-sandbox-probe" not in result.output
+
+
+def test_repeat_verifications_are_served_from_the_shared_cache(tmp_path):
+    path = str(tmp_path / "verification.sqlite3")
+    tests = "def test_add():\n    assert add(1, 2) == 3\n"
+    first = Verifier(enabled=True, disk_cache=SqliteCacheTier(path, max_entries=16, ttl_seconds=60))
+    first.verify(CODE, tests)
+
+    second = Verifier(enabled=True, disk_cache=SqliteCacheTier(path, max_entries=16, ttl_seconds=60))
+    with patch.object(second, "_run") as run:
+        result = second.verify(CODE, tests)
+
+    run.assert_not_called()
+    assert result.cached
+    assert result.status == "passed"
+
+
+def test_verification_key_separates_code_from_tests():
+    assert verification_key("ab", "c") != verification_key("a", "bc")
+    assert verification_key(CODE, "t") == verification_key(CODE, "t")
+
+
+def test_result_round_trips_through_json():
+    result = VerificationResult(status="passed", tests_run=3, duration_ms=12.5)
+
+    assert VerificationResult(**json.loads(json.dumps(result.to_dict()))) == result
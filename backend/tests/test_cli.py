@@ -0,0 +1,24 @@
+import json
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from app.cli import main
+
+
+def test_cli_converts_a_tree_and_prints_a_summary(tmp_path):
+    source = tmp_path / "src"
+    source.mkdir()
+    (source / "hello.adb").write_text("procedure Hello is begin null; end Hello;")
+
+    with patch('app.services.ada_converter.AdaConverter') as mock_converter:
+        mock_converter.return_value.model = "gpt-test"
+        mock_converter.return_value.system_prompt = "Convert"
+        mock_converter.return_value.convert.return_value = "# Logic\nx\n# Unit Test\ny\n# Python Code\nz"
+        result = CliRunner().invoke(main, [str(source), "-o", str(tmp_path / "out"), "--json"])
+
+    assert result.exit_code == 0, result.output
+    summary = json.loads(result.stdout)
+    assert summary["succeeded"] == 1
+    assert summary["total"] == 1
+    assert (tmp_path / "out" / "hello.py").read_text() == "z"